@@ -0,0 +1,426 @@
+/**
+ * Direct client for the adb server, used by the ADB fallback tier.
+ *
+ * Running `adb shell ...` through exec costs a local shell, an adb client
+ * process and a fresh device shell for every tap. This module speaks the adb
+ * server's smart-socket protocol over TCP instead and keeps one interactive
+ * `shell:` stream open per device. Commands are written to that shell back to
+ * back and their output is split again by sentinel markers, so a tap is one
+ * line on an open socket. Hierarchy dumps go to /dev/tty and stream straight
+ * into the UI parser without touching /sdcard.
+ */
+
+import { Socket, connect } from 'net';
+import { randomBytes } from 'crypto';
+import { StringDecoder } from 'string_decoder';
+import { UIHierarchyParser, UITree } from './ui-parser.js';
+
+export interface AdbTransportOptions {
+  host?: string; // adb server address (default: ANDROID_ADB_SERVER_ADDRESS or 127.0.0.1)
+  port?: number; // adb server port (default: ANDROID_ADB_SERVER_PORT or 5037)
+  commandTimeoutMs?: number; // Default timeout for one shell command
+}
+
+export interface ShellResult {
+  output: Buffer;
+  exitCode: number;
+}
+
+export interface ShellCommandOptions {
+  timeoutMs?: number;
+  onData?: (chunk: Buffer) => void; // Receives the output as it arrives instead of collecting it
+}
+
+const DEFAULT_COMMAND_TIMEOUT_MS = 10000;
+const HANDSHAKE_TIMEOUT_MS = 5000;
+// Start of the per-session markers that end each command's output
+const MARKER_PREFIX = '__AMCP_';
+
+function serverAddress(options: AdbTransportOptions): { host: string; port: number } {
+  return {
+    host: options.host ?? process.env.ANDROID_ADB_SERVER_ADDRESS ?? '127.0.0.1',
+    port: options.port ?? parseInt(process.env.ANDROID_ADB_SERVER_PORT || '5037', 10),
+  };
+}
+
+function encodeRequest(payload: string): Buffer {
+  const body = Buffer.from(payload, 'utf8');
+  return Buffer.concat([Buffer.from(body.length.toString(16).padStart(4, '0'), 'ascii'), body]);
+}
+
+/**
+ * Quotes a value for the device shell.
+ */
+export function shellQuote(value: string): string {
+  return `'${value.replace(/'/g, `'\\''`)}'`;
+}
+
+/**
+ * Socket to the adb server with buffered exact-length reads for the handshake.
+ * Once a service is open, release() hands over whatever was read past it.
+ */
+class SmartSocket {
+  private chunks: Buffer[] = [];
+  private buffered = 0;
+  private waiter: (() => void) | null = null;
+  private failure: Error | null = null;
+
+  private constructor(readonly socket: Socket) {
+    socket.on('data', this.onData);
+    socket.on('error', (error) => this.fail(error));
+    socket.on('close', () => this.fail(new Error('adb server closed the connection')));
+  }
+
+  static open(options: AdbTransportOptions): Promise<SmartSocket> {
+    const { host, port } = serverAddress(options);
+    return new Promise((resolve, reject) => {
+      const socket = connect({ host, port });
+      socket.setNoDelay(true);
+      const timer = setTimeout(() => {
+        socket.destroy();
+        reject(new Error(`Timed out connecting to adb server at ${host}:${port}`));
+      }, HANDSHAKE_TIMEOUT_MS);
+      socket.once('connect', () => {
+        clearTimeout(timer);
+        socket.removeListener('error', reject);
+        resolve(new SmartSocket(socket));
+      });
+      socket.once('error', (error) => {
+        clearTimeout(timer);
+        reject(error);
+      });
+    });
+  }
+
+  private onData = (chunk: Buffer): void => {
+    this.chunks.push(chunk);
+    this.buffered += chunk.length;
+    this.wake();
+  };
+
+  private fail(error: Error): void {
+    this.failure ??= error;
+    this.wake();
+  }
+
+  private wake(): void {
+    const waiter = this.waiter;
+    this.waiter = null;
+    waiter?.();
+  }
+
+  async read(length: number): Promise<Buffer> {
+    while (this.buffered < length) {
+      if (this.failure) throw this.failure;
+      await new Promise<void>(resolve => { this.waiter = resolve; });
+    }
+    const data = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks);
+    const rest = data.subarray(length);
+    this.chunks = rest.length ? [rest] : [];
+    this.buffered = rest.length;
+    return data.subarray(0, length);
+  }
+
+  async readLengthPrefixed(): Promise<string> {
+    const length = parseInt((await this.read(4)).toString('ascii'), 16);
+    return (await this.read(length)).toString('utf8');
+  }
+
+  /**
+   * Sends one request and waits for OKAY; FAIL becomes an error carrying the server's message.
+   */
+  async request(payload: string): Promise<void> {
+    this.socket.write(encodeRequest(payload));
+    const status = (await this.read(4)).toString('ascii');
+    if (status === 'OKAY') return;
+    if (status === 'FAIL') {
+      throw new Error(`adb ${payload}: ${await this.readLengthPrefixed()}`);
+    }
+    throw new Error(`adb ${payload}: unexpected reply ${JSON.stringify(status)}`);
+  }
+
+  /** Stops buffering and returns the socket with any bytes already read from the service */
+  release(): { socket: Socket; pending: Buffer } {
+    this.socket.removeListener('data', this.onData);
+    this.socket.removeAllListeners('error');
+    this.socket.removeAllListeners('close');
+    const pending = Buffer.concat(this.chunks);
+    this.chunks = [];
+    this.buffered = 0;
+    return { socket: this.socket, pending };
+  }
+
+  destroy(): void {
+    this.socket.destroy();
+  }
+}
+
+/**
+ * One host: request, e.g. host:version or host:devices, answered with a length-prefixed string.
+ */
+export async function adbHostQuery(payload: string, options: AdbTransportOptions = {}): Promise<string> {
+  const smart = await SmartSocket.open(options);
+  try {
+    await smart.request(payload);
+    return await smart.readLengthPrefixed();
+  } finally {
+    smart.destroy();
+  }
+}
+
+/**
+ * Serials of devices in the "device" state, like `adb devices`.
+ */
+export async function adbDevices(options: AdbTransportOptions = {}): Promise<string[]> {
+  const listing = await adbHostQuery('host:devices', options);
+  return listing.split('\n')
+    .map(line => line.split('\t'))
+    .filter(([serial, state]) => serial && state === 'device')
+    .map(([serial]) => serial);
+}
+
+/**
+ * Opens a device service (shell:, exec:, ...) on the device with serial, or the only device.
+ */
+export async function openDeviceService(serial: string | undefined, service: string, options: AdbTransportOptions = {}): Promise<{ socket: Socket; pending: Buffer }> {
+  const smart = await SmartSocket.open(options);
+  try {
+    await smart.request(serial ? `host:transport:${serial}` : 'host:transport-any');
+    await smart.request(service);
+    return smart.release();
+  } catch (error) {
+    smart.destroy();
+    throw error;
+  }
+}
+
+interface PendingCommand {
+  marker: Buffer;
+  chunks: Buffer[];
+  onData?: (chunk: Buffer) => void;
+  resolve: (result: ShellResult) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+/**
+ * A long-lived interactive shell on one device.
+ *
+ * The shell runs on a PTY (that is what makes /dev/tty usable), switched to
+ * raw mode without echo so output bytes come back unchanged. Every command is
+ * followed by a printf of a per-session marker and the exit status; commands
+ * can be written before earlier ones finished and complete in order.
+ */
+export class AdbShellSession {
+  private socket: Socket | null = null;
+  private opening: Promise<void> | null = null;
+  private queue: PendingCommand[] = [];
+  private buffer: Buffer = Buffer.alloc(0);
+  private nextId = 0;
+  private readonly nonce = randomBytes(4).toString('hex');
+
+  constructor(private serial?: string, private options: AdbTransportOptions = {}) {}
+
+  get connected(): boolean {
+    return this.socket !== null;
+  }
+
+  async open(): Promise<void> {
+    if (this.socket) return;
+    if (!this.opening) {
+      this.opening = this.start().finally(() => {
+        this.opening = null;
+      });
+    }
+    return this.opening;
+  }
+
+  private async start(): Promise<void> {
+    const { socket, pending } = await openDeviceService(this.serial, 'shell:', this.options);
+    const ready = `${MARKER_PREFIX}${this.nonce}_READY\n`;
+    // The marker is split in the command so the echo of this line cannot match it
+    socket.write(`stty raw -echo 2>/dev/null; PS1=''; PS2=''; export PS1 PS2; printf '%s_READY\\n' '${MARKER_PREFIX}${this.nonce}'\n`);
+
+    await new Promise<void>((resolve, reject) => {
+      let seen = pending;
+      const timer = setTimeout(() => fail(new Error('Timed out waiting for the device shell')), HANDSHAKE_TIMEOUT_MS);
+      const onData = (chunk: Buffer) => {
+        seen = Buffer.concat([seen, chunk]);
+        const at = seen.indexOf(ready);
+        if (at === -1) return;
+        cleanup();
+        // Anything after the ready line belongs to the first command
+        this.buffer = seen.subarray(at + ready.length);
+        resolve();
+      };
+      const fail = (error: Error) => {
+        cleanup();
+        socket.destroy();
+        reject(error);
+      };
+      const onClose = () => fail(new Error('Device shell closed during setup'));
+      const cleanup = () => {
+        clearTimeout(timer);
+        socket.removeListener('data', onData);
+        socket.removeListener('close', onClose);
+        socket.removeListener('error', fail);
+      };
+      socket.on('data', onData);
+      socket.once('close', onClose);
+      socket.once('error', fail);
+      if (pending.length) onData(Buffer.alloc(0));
+    });
+
+    this.socket = socket;
+    socket.on('data', (chunk: Buffer) => this.onData(chunk));
+    socket.on('error', () => socket.destroy());
+    socket.on('close', () => {
+      if (this.socket !== socket) return;
+      this.socket = null;
+      this.failAll(new Error('Device shell closed'));
+    });
+    if (this.buffer.length) this.onData(Buffer.alloc(0));
+  }
+
+  /**
+   * Runs command in the session shell. Its stdin is /dev/null so it cannot
+   * swallow the commands queued behind it; stderr is merged into the output.
+   */
+  async run(command: string, options: ShellCommandOptions = {}): Promise<ShellResult> {
+    await this.open();
+    const socket = this.socket;
+    if (!socket) throw new Error('Device shell is not open');
+
+    const id = ++this.nextId;
+    const timeoutMs = options.timeoutMs ?? this.options.commandTimeoutMs ?? DEFAULT_COMMAND_TIMEOUT_MS;
+    return new Promise<ShellResult>((resolve, reject) => {
+      const entry: PendingCommand = {
+        marker: Buffer.from(`\n${MARKER_PREFIX}${this.nonce}_${id}:`),
+        chunks: [],
+        onData: options.onData,
+        resolve,
+        reject,
+        timer: setTimeout(() => {
+          reject(new Error(`Shell command timed out after ${timeoutMs}ms: ${command}`));
+          // The shell is still busy with this command, so everything queued behind it is lost too
+          this.close();
+        }, timeoutMs),
+      };
+      this.queue.push(entry);
+      socket.write(`(${command}) </dev/null 2>&1; printf '\\n%s_%d:%d\\n' '${MARKER_PREFIX}${this.nonce}' ${id} $?\n`);
+    });
+  }
+
+  private onData(chunk: Buffer): void {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+
+    while (this.queue.length) {
+      const current = this.queue[0];
+      const at = this.buffer.indexOf(current.marker);
+      if (at === -1) {
+        // Pass on everything that cannot be the start of the marker yet
+        const keep = Math.min(this.buffer.length, current.marker.length);
+        const flush = this.buffer.length - keep;
+        if (flush > 0) {
+          this.emit(current, this.buffer.subarray(0, flush));
+          this.buffer = this.buffer.subarray(flush);
+        }
+        return;
+      }
+
+      const lineEnd = this.buffer.indexOf(0x0a, at + current.marker.length);
+      if (lineEnd === -1) return;
+      if (at > 0) this.emit(current, this.buffer.subarray(0, at));
+      const exitCode = parseInt(this.buffer.toString('ascii', at + current.marker.length, lineEnd), 10);
+      this.buffer = this.buffer.subarray(lineEnd + 1);
+
+      this.queue.shift();
+      clearTimeout(current.timer);
+      current.resolve({ output: Buffer.concat(current.chunks), exitCode });
+    }
+  }
+
+  private emit(command: PendingCommand, data: Buffer): void {
+    if (command.onData) {
+      command.onData(data);
+    } else {
+      command.chunks.push(Buffer.from(data));
+    }
+  }
+
+  private failAll(error: Error): void {
+    const queue = this.queue;
+    this.queue = [];
+    this.buffer = Buffer.alloc(0);
+    for (const command of queue) {
+      clearTimeout(command.timer);
+      command.reject(error);
+    }
+  }
+
+  close(): void {
+    const socket = this.socket;
+    this.socket = null;
+    socket?.destroy();
+    this.failAll(new Error('Device shell closed'));
+  }
+}
+
+/**
+ * ADB access to one device over a persistent shell session.
+ */
+export class AdbTransport {
+  private session: AdbShellSession;
+
+  constructor(private serial?: string, private options: AdbTransportOptions = {}) {
+    this.session = new AdbShellSession(serial, options);
+  }
+
+  /**
+   * Output of a shell command; a non-zero exit status is an error.
+   */
+  async shell(command: string, timeoutMs?: number): Promise<string> {
+    const { output, exitCode } = await this.session.run(command, { timeoutMs });
+    const text = output.toString('utf8');
+    if (exitCode !== 0) {
+      throw new Error(`'${command}' exited with ${exitCode}: ${text.trim()}`);
+    }
+    return text;
+  }
+
+  /**
+   * Current UI hierarchy, parsed while `uiautomator dump /dev/tty` is still writing it.
+   */
+  async dumpHierarchy(timeoutMs = 15000): Promise<UITree> {
+    const parser = new UIHierarchyParser();
+    // Chunks can end in the middle of a multi-byte character
+    const decoder = new StringDecoder('utf8');
+    const { exitCode } = await this.session.run('uiautomator dump /dev/tty', {
+      timeoutMs,
+      onData: (chunk) => parser.write(decoder.write(chunk)),
+    });
+    parser.write(decoder.end());
+    const tree = parser.end();
+    if (exitCode !== 0 || tree.nodes.length === 0) {
+      throw new Error(`uiautomator dump failed with exit code ${exitCode}`);
+    }
+    return tree;
+  }
+
+  /**
+   * Binary-safe output of a one-off command on a separate exec: stream, e.g. screencap -p.
+   */
+  async execOut(command: string): Promise<Buffer> {
+    const { socket, pending } = await openDeviceService(this.serial, `exec:${command}`, this.options);
+    return new Promise<Buffer>((resolve, reject) => {
+      const chunks: Buffer[] = pending.length ? [pending] : [];
+      socket.on('data', (chunk: Buffer) => chunks.push(chunk));
+      socket.once('error', reject);
+      socket.once('close', () => resolve(Buffer.concat(chunks)));
+    });
+  }
+
+  close(): void {
+    this.session.close();
+  }
+}
@@ -1,12 +1,24 @@
 import { spawn, exec } from 'child_process';
 import { promisify } from 'util';
-import axios from 'axios';
-import { UIAutomator2Bridge } from './uiautomator2-bridge.js';
+import { resolve } from 'path';
+import { BatchStep, FindImageOptions, ScreenshotOptions, UIAutomator2Bridge, UIAutomator2Response } from './uiautomator2-bridge.js';
 import { logger } from '../utils/logger.js';
-import sharp from 'sharp';
+import { ScreenCacheStats, ScreenStateCache } from './screen-cache.js';
+import { Bounds, parseHierarchy, selectByXPath, UINode, UITree } from './ui-parser.js';
+import { AdbTransport, shellQuote } from './adb-transport.js';
+import { BackendActionError, BackendRouter, RouterStats } from './backend-router.js';
+import { metrics } from '../utils/metrics.js';
+import { RequestAbortedError } from '../utils/request-context.js';
 
 const execAsync = promisify(exec);
 
+// axios only serves the HTTP tier, which most sessions never reach; load it on first use
+let axiosModule: Promise<typeof import('axios').default> | null = null;
+function loadAxios(): Promise<typeof import('axios').default> {
+  axiosModule ??= import('axios').then(m => m.default);
+  return axiosModule;
+}
+
 export interface FindElementOptions {
   text?: string;
   description?: string;
@@ -14,11 +26,98 @@ export interface FindElementOptions {
   className?: string;
 }
 
+export interface WaitResult {
+  met: boolean; // UI became idle / selector condition reached before the timeout
+  waitedMs: number;
+  polls: number;
+  currentApp?: string; // Foreground package at the end of an idle wait
+  found?: boolean; // Whether the element exists at the end of an element wait
+}
+
+export type ScrollDirection = 'up' | 'down' | 'left' | 'right';
+
+export interface ScrollToOptions {
+  direction?: ScrollDirection; // Way to move through the list; down shows what is below (default)
+  maxSwipes?: number; // Give up after this many swipes (default: 20)
+  container?: FindElementOptions; // List to swipe in (default: the largest scrollable element)
+}
+
+export interface ScrollToResult {
+  found: boolean;
+  element?: UIElement;
+  scrolls: number; // Swipes made
+  reachedEnd: boolean; // Stopped because a swipe no longer moved the list
+  waitedMs: number;
+}
+
+export interface ImageMatch {
+  found: boolean;
+  score: number; // NCC of the best match, 1 for identical pixels
+  scale: number; // Template size of the best match, relative to the template image
+  element?: UIElement; // Bounds of the match, set when found
+  center?: [number, number];
+  clicked?: boolean;
+  cached: boolean; // The template was already prepared by an earlier search
+}
+
+// Fraction of the container a scroll_to swipe travels, from SCROLL_FROM to SCROLL_TO of its length
+const SCROLL_FROM = 0.75;
+const SCROLL_TO = 0.25;
+// Pause after a bridge-less scroll_to swipe for the list to come to rest
+const SCROLL_SETTLE_MS = 150;
+
+// Poll interval for the bridge-less waits: start fast, back off on slow screens
+const WAIT_INITIAL_INTERVAL_MS = 50;
+const WAIT_MAX_INTERVAL_MS = 500;
+const WAIT_BACKOFF = 1.5;
+// How long openApp waits for the launched app to settle before returning anyway
+const APP_LAUNCH_TIMEOUT_MS = 5000;
+// How long of that openApp waits for the launched package itself; a trampoline may land in another app
+const APP_FOREGROUND_TIMEOUT_MS = 1000;
+
+export interface BatchStepResult {
+  action: string;
+  status: 'ok' | 'skipped' | 'failed';
+  ms: number;
+  [key: string]: any; // What the action returned: message, element, data or error
+}
+
+export interface BatchResult {
+  steps: BatchStepResult[];
+  completed: boolean; // False when a step failed and the rest were not run
+  failedStep?: number;
+  totalMs: number;
+}
+
+export interface AppPage {
+  apps: { packageName: string; appName: string }[];
+  total: number; // Installed user apps on the device
+  offset: number;
+  nextOffset?: number; // Offset of the next page, if there is one
+}
+
+export interface ScreenshotResult {
+  base64Data: string;
+  mimeType: string;
+  width: number;
+  height: number;
+  bytes: number;
+  message?: string;
+  changed?: boolean; // Only set for changedSince captures; false means no image was taken
+  regions?: [number, number, number, number][]; // Changed areas since the previous screenshot
+  region?: [number, number, number, number]; // Area of the screen the image covers, if cropped
+}
+
+// Byte budget for screenshots when the caller does not give one
+const DEFAULT_SCREENSHOT_BYTES = 128 * 1024;
+
 export interface ScreenInfo {
   width: number;
   height: number;
   elements: UIElement[];
   currentApp: string;
+  readonly tree?: UITree; // Indexed hierarchy behind elements; not enumerable, so never serialized
+  readonly elementNodes?: UINode[]; // Tree node for each entry of elements, same order; not enumerable
 }
 
 export interface UIElement {
@@ -31,17 +130,200 @@ export interface UIElement {
   enabled?: boolean;
 }
 
+// Classes worth listing even without text, description or resource-id
+const MEANINGFUL_CLASS_PATTERN = /Button|Text|Edit|View|Image/;
+
+/**
+ * Compact element for tool output: text only when present, flags only when they differ from the default.
+ */
+export function toUIElement(node: UINode): UIElement {
+  const element: UIElement = {
+    description: node.description,
+    resourceId: node.resourceId,
+    className: node.className,
+    bounds: node.bounds
+  };
+  if (node.text) element.text = node.text;
+  if (node.clickable) element.clickable = true;
+  if (!node.enabled) element.enabled = false;
+  return element;
+}
+
+/**
+ * Element matching options on an already parsed screen, answered from the hierarchy indexes.
+ */
+function findInScreen(screenInfo: ScreenInfo, options: FindElementOptions): UIElement | null {
+  if (screenInfo.tree) {
+    const node = screenInfo.tree.find(options);
+    return node ? toUIElement(node) : null;
+  }
+
+  for (const element of screenInfo.elements) {
+    if (options.text && (element.text?.includes(options.text) || element.description.includes(options.text))) {
+      return element;
+    }
+    if (options.description && element.description.includes(options.description)) {
+      return element;
+    }
+    if (options.resourceId && element.resourceId.includes(options.resourceId)) {
+      return element;
+    }
+    if (options.className && element.className.includes(options.className)) {
+      return element;
+    }
+  }
+  return null;
+}
+
+function escapeRegExp(value: string): string {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+/**
+ * uiautomator2 selectors for options, best first: every field exact, then every field as a substring.
+ */
+function rankedSelectors(options: FindElementOptions): Record<string, string>[] {
+  const exact: Record<string, string> = {};
+  const relaxed: Record<string, string> = {};
+  if (options.text) {
+    exact.text = options.text;
+    relaxed.textContains = options.text;
+  }
+  if (options.description) {
+    exact.description = options.description;
+    relaxed.descriptionContains = options.description;
+  }
+  if (options.resourceId) {
+    exact.resourceId = options.resourceId;
+    relaxed.resourceIdMatches = `.*${escapeRegExp(options.resourceId)}.*`;
+  }
+  if (options.className) {
+    exact.className = options.className;
+    relaxed.classNameMatches = `.*${escapeRegExp(options.className)}.*`;
+  }
+  return Object.keys(exact).length ? [exact, relaxed] : [];
+}
+
+function matchesExactly(node: UINode, options: FindElementOptions): boolean {
+  return (!options.text || node.text === options.text || node.description === options.text)
+    && (!options.description || node.description === options.description)
+    && (!options.resourceId || node.resourceId === options.resourceId)
+    && (!options.className || node.className === options.className);
+}
+
+function boundsArea(bounds: Bounds): number {
+  return Math.max(0, bounds[2] - bounds[0]) * Math.max(0, bounds[3] - bounds[1]);
+}
+
+/**
+ * Serials of all devices adb reports in the `device` state.
+ */
+export async function listDevices(): Promise<string[]> {
+  try {
+    const { stdout } = await execAsync('adb devices');
+    const lines = stdout.split('\n').slice(1);
+    const devices = lines
+      .filter(line => line.includes('\tdevice'))
+      .map(line => line.split('\t')[0]);
+    return devices;
+  } catch (error) {
+    throw new Error(`Failed to get devices: ${error instanceof Error ? error.message : String(error)}`);
+  }
+}
+
 export class AndroidAutomation {
   private deviceSerial?: string;
   private uiautomatorPort = 9008;
   private baseUrl: string;
   private pythonBridge?: UIAutomator2Bridge;
   private usePythonBridge = true; // Prefer Python bridge over HTTP API
+  private screenCache: ScreenStateCache;
+  private adb: AdbTransport;
+  private router: BackendRouter;
 
-  constructor(deviceSerial?: string) {
+  constructor(deviceSerial?: string, pythonBridge?: UIAutomator2Bridge) {
     this.deviceSerial = deviceSerial;
     this.baseUrl = `http://localhost:${this.uiautomatorPort}`;
-    this.pythonBridge = new UIAutomator2Bridge(deviceSerial);
+    this.pythonBridge = pythonBridge ?? new UIAutomator2Bridge(deviceSerial);
+    this.adb = new AdbTransport(deviceSerial);
+    this.screenCache = new ScreenStateCache(parseInt(process.env.ANDROID_MCP_SCREEN_CACHE_TTL_MS || '2000', 10));
+    // Probes that tell when a backend with an open circuit answers again
+    this.router = new BackendRouter({
+      python: async () => {
+        const result = await this.pythonBridge!.ping();
+        if (!result.success) throw new Error(result.error || 'Python bridge ping failed');
+      },
+      http: async () => (await loadAxios()).get(`${this.baseUrl}/ping`, { timeout: 1000 }),
+      adb: () => this.adb.shell('true'),
+    });
+  }
+
+  /**
+   * A Python bridge command as a router tier, left out while the bridge is
+   * disabled. A failure the bridge reports for the action itself is a
+   * BackendActionError. The bridge failing (not running, exited, timed out)
+   * or reporting that it cannot reach the device (transport errors: no
+   * connection, adb offline, uiautomator2 server down) lets the router fall
+   * through and counts against the python circuit.
+   */
+  private bridgeTier<T = void>(
+    what: string,
+    command: (bridge: UIAutomator2Bridge) => Promise<UIAutomator2Response>,
+    read: (result: UIAutomator2Response) => T = () => undefined as T
+  ): (() => Promise<T>) | undefined {
+    const bridge = this.pythonBridge;
+    if (!this.usePythonBridge || !bridge) return undefined;
+    return async () => {
+      const result = await command(bridge);
+      if (result.transport) throw new Error(`Python bridge ${what} failed: ${result.error}`);
+      if (!result.success) throw new BackendActionError(result.error || `Python bridge ${what} failed`);
+      return read(result);
+    };
+  }
+
+  /**
+   * Runs a command in the device shell over the persistent adb session, or
+   * through the adb executable when the adb server cannot be reached directly
+   * (the executable also starts the server if it is not running).
+   */
+  private async adbShell(command: string): Promise<string> {
+    try {
+      return await this.adb.shell(command);
+    } catch (error) {
+      logger.debug('ADB session command failed, retrying through adb exec:', error);
+      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
+      const { stdout } = await execAsync(`adb ${deviceFlag} shell "${command.replace(/(["\\$`])/g, '\\$1')}"`);
+      return stdout;
+    }
+  }
+
+  private async adbExecOut(command: string): Promise<Buffer> {
+    try {
+      return await this.adb.execOut(command);
+    } catch (error) {
+      logger.debug('ADB exec stream failed, retrying through adb exec-out:', error);
+      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
+      const { stdout } = await execAsync(`adb ${deviceFlag} exec-out ${command}`, {
+        encoding: 'buffer',
+        maxBuffer: 64 * 1024 * 1024
+      });
+      return stdout;
+    }
+  }
+
+  getCacheStats(): ScreenCacheStats {
+    return this.screenCache.stats();
+  }
+
+  /**
+   * Circuit state per backend, latency per action and backend, and the last routing decisions.
+   */
+  getRoutingStats(): RouterStats {
+    return this.router.stats();
+  }
+
+  get serial(): string | undefined {
+    return this.deviceSerial;
   }
 
   async initializeDevice(): Promise<void> {
@@ -82,16 +364,7 @@ export class AndroidAutomation {
   }
 
   private async getDevices(): Promise<string[]> {
-    try {
-      const { stdout } = await execAsync('adb devices');
-      const lines = stdout.split('\n').slice(1);
-      const devices = lines
-        .filter(line => line.includes('\tdevice'))
-        .map(line => line.split('\t')[0]);
-      return devices;
-    } catch (error) {
-      throw new Error(`Failed to get devices: ${error instanceof Error ? error.message : String(error)}`);
-    }
+    return listDevices();
   }
 
   private async installUiautomator2(): Promise<void> {
@@ -126,7 +399,7 @@ export class AndroidAutomation {
     const startTime = Date.now();
     while (Date.now() - startTime < timeout) {
       try {
-        await axios.get(`${this.baseUrl}/ping`, { timeout: 1000 });
+        await (await loadAxios()).get(`${this.baseUrl}/ping`, { timeout: 1000 });
         return;
       } catch (error) {
         await new Promise(resolve => setTimeout(resolve, 500));
@@ -136,72 +409,50 @@ export class AndroidAutomation {
   }
 
   async openApp(packageName: string, stop = false, useMonkey = false, activity?: string): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.openApp(packageName, stop, useMonkey, activity);
-          if (result.success) {
-            // Reduced wait time for app to load
-            await new Promise(resolve => setTimeout(resolve, 500));
-            return;
+      await this.router.run('open_app', {
+        python: this.bridgeTier('open app', bridge => bridge.openApp(packageName, stop, useMonkey, activity)),
+        adb: async () => {
+          if (stop) {
+            // Stop app first if requested
+            await this.adbShell(`am force-stop ${packageName}`);
           }
-          throw new Error(result.error || 'Python bridge open app failed');
-        } catch (error) {
-          console.warn('Python bridge open app failed, falling back to ADB:', error);
-        }
-      }
 
-      // Fallback to ADB monkey command
-      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-      
-      if (stop) {
-        // Stop app first if requested
-        await execAsync(`adb ${deviceFlag} shell am force-stop ${packageName}`);
-      }
-      
-      if (activity) {
-        // Start with specific activity
-        await execAsync(`adb ${deviceFlag} shell am start -n ${packageName}/${activity}`);
-      } else if (useMonkey) {
-        // Use monkey to start the app
-        await execAsync(`adb ${deviceFlag} shell monkey -p ${packageName} -c android.intent.category.LAUNCHER 1`);
-      } else {
-        // Try monkey as default
-        await execAsync(`adb ${deviceFlag} shell monkey -p ${packageName} -c android.intent.category.LAUNCHER 1`);
+          if (activity) {
+            // Start with specific activity
+            await this.adbShell(`am start -n ${packageName}/${activity}`);
+          } else {
+            // Use monkey to start the app
+            await this.adbShell(`monkey -p ${packageName} -c android.intent.category.LAUNCHER 1`);
+          }
+        },
+      });
+
+      const launched = await this.waitForIdle(APP_FOREGROUND_TIMEOUT_MS, packageName);
+      if (!launched.met) {
+        logger.info(`${packageName} is not in the foreground after launch (current app: ${launched.currentApp || 'unknown'}), waiting for the screen to settle`);
+        await this.waitForIdle(APP_LAUNCH_TIMEOUT_MS - APP_FOREGROUND_TIMEOUT_MS);
       }
-      
-      // Reduced wait time for app to load
-      await new Promise(resolve => setTimeout(resolve, 500));
     } catch (error) {
       throw new Error(`Failed to open app ${packageName}: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
   async tap(x: number, y: number): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.tap(x, y);
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge tap failed');
-        } catch (error) {
-          console.warn('Python bridge tap failed, falling back to HTTP/ADB:', error);
-        }
-      }
-
-      // Try uiautomator2 API first
-      try {
-        await axios.post(`${this.baseUrl}/click`, { x, y }, { timeout: 5000 });
-        return;
-      } catch (apiError) {
-        // Fallback to ADB
-        const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-        await execAsync(`adb ${deviceFlag} shell input tap ${x} ${y}`);
-      }
+      await this.router.run('tap', {
+        python: this.bridgeTier('tap', bridge => bridge.tap(x, y)),
+        http: async () => { await (await loadAxios()).post(`${this.baseUrl}/click`, { x, y }, { timeout: 5000 }); },
+        adb: async () => { await this.adbShell(`input tap ${x} ${y}`); },
+      });
     } catch (error) {
       throw new Error(`Failed to tap at (${x}, ${y}): ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
@@ -222,106 +473,238 @@ export class AndroidAutomation {
   }
 
   async findElement(options: FindElementOptions): Promise<UIElement | null> {
+    return this.findFirst([options]);
+  }
+
+  /**
+   * First element matching any of patterns, tried in order. With the Python
+   * bridge this is one hierarchy dump; each pattern is tried as an exact
+   * match first, then as a substring match.
+   */
+  async findFirst(patterns: FindElementOptions[]): Promise<UIElement | null> {
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
+      // Only the bridge can match on the device; otherwise parse the screen here
+      const python = this.bridgeTier('find element', bridge => bridge.findAny(patterns.flatMap(rankedSelectors)), result => {
+        if (!result.found || !result.element) return null;
+        const element: UIElement = {
+          description: result.element.description,
+          resourceId: result.element.resourceId,
+          className: result.element.className,
+          bounds: result.element.bounds
+          // Only include the 4 required attributes
+        };
+        return element;
+      });
+      if (python) {
         try {
-          const result = await this.pythonBridge.findElement({
-            text: options.text,
-            textContains: options.text, // Also try textContains for better matching
-            description: options.description,
-            resourceId: options.resourceId,
-            className: options.className
-          });
-          
-          if (result.success && result.found && result.element) {
-            return {
-              description: result.element.description,
-              resourceId: result.element.resourceId,
-              className: result.element.className,
-              bounds: result.element.bounds
-              // Only include the 4 required attributes
-            };
-          } else if (result.success && !result.found) {
-            return null;
-          }
-          throw new Error(result.error || 'Python bridge find element failed');
+          return await this.router.run('find_any', { python });
         } catch (error) {
-          console.warn('Python bridge find element failed, falling back to screen parsing:', error);
+          // The caller stopped waiting, or the bridge ran the action and it failed: falling back
+          // would act on the device for nobody, or fail the same way
+          if (error instanceof RequestAbortedError || error instanceof BackendActionError) throw error;
+          logger.warn('Python bridge find element failed, falling back to screen parsing:', error);
         }
       }
 
-      // Fallback to screen info parsing
       const screenInfo = await this.getScreenInfo();
-      
-      for (const element of screenInfo.elements) {
-        if (options.text && element.description && element.description.includes(options.text)) {
-          return element;
-        }
-        if (options.description && element.description.includes(options.description)) {
-          return element;
-        }
-        if (options.resourceId && element.resourceId.includes(options.resourceId)) {
-          return element;
-        }
-        if (options.className && element.className.includes(options.className)) {
-          return element;
-        }
+      for (const options of patterns) {
+        const element = findInScreen(screenInfo, options);
+        if (element) return element;
       }
-      
       return null;
     } catch (error) {
       throw new Error(`Failed to find element: ${error instanceof Error ? error.message : String(error)}`);
     }
   }
-
   async inputText(text: string): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
+      await this.router.run('input_text', {
+        python: this.bridgeTier('input text', bridge => bridge.inputText(text)),
+        http: async () => { await (await loadAxios()).post(`${this.baseUrl}/send_keys`, { text }, { timeout: 5000 }); },
+        // `input text` reads %s as a space
+        adb: async () => { await this.adbShell(`input text ${shellQuote(text.replace(/ /g, '%s'))}`); },
+      });
+    } catch (error) {
+      throw new Error(`Failed to input text "${text}": ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
+    }
+  }
+
+  /**
+   * Runs an XPath action: click, input_text, get_text, get_attribute or
+   * get_all. Reads come back as JSON. Without a working Python bridge the
+   * common XPath forms are evaluated on the parsed screen here.
+   */
+  async xpathOperation(xpath: string, action: string = 'click', text?: string): Promise<string> {
+    const mutates = action === 'click' || action === 'input_text';
+    if (mutates) this.screenCache.invalidate();
+    try {
+      const python = this.bridgeTier('XPath operation', bridge => bridge.xpathOperation(xpath, action, text),
+        result => result.message || (result.data ? JSON.stringify(result.data) : `XPath operation '${action}' completed successfully`));
+      if (python) {
         try {
-          const result = await this.pythonBridge.inputText(text);
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge input text failed');
+          return await this.router.run('xpath_operation', { python });
         } catch (error) {
-          console.warn('Python bridge input text failed, falling back to HTTP/ADB:', error);
+          if (error instanceof RequestAbortedError || error instanceof BackendActionError) throw error;
+          logger.warn('Python bridge XPath operation failed, falling back to screen parsing:', error);
         }
       }
+      return await this.xpathOnScreen(xpath, action, text);
+    } catch (error) {
+      throw new Error(`Failed to execute XPath operation: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      if (mutates) this.screenCache.invalidate();
+    }
+  }
 
-      // Try uiautomator2 API first
-      try {
-        await axios.post(`${this.baseUrl}/send_keys`, { text }, { timeout: 5000 });
-        return;
-      } catch (apiError) {
-        // Fallback to ADB
-        const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-        const escapedText = text.replace(/[\"\'\\]/g, '\\$&');
-        await execAsync(`adb ${deviceFlag} shell input text "${escapedText}"`);
+  private async xpathOnScreen(xpath: string, action: string, text?: string): Promise<string> {
+    const { tree } = await this.getScreenInfo();
+    const nodes = tree ? selectByXPath(tree, xpath) : null;
+    if (!nodes) {
+      throw new Error(`XPath ${xpath} needs the Python bridge with uiautomator2`);
+    }
+    if (action === 'get_all') {
+      return JSON.stringify({ count: nodes.length, elements: nodes.map(toUIElement) });
+    }
+    if (!nodes.length) {
+      throw new Error(`No element matches ${xpath}`);
+    }
+    const element = toUIElement(nodes[0]);
+    const [x1, y1, x2, y2] = element.bounds;
+    switch (action) {
+      case 'get_text':
+        return JSON.stringify({ text: nodes[0].text });
+      case 'get_attribute':
+        return JSON.stringify({ attributes: element });
+      case 'click':
+        await this.tap((x1 + x2) / 2, (y1 + y2) / 2);
+        return `Clicked element with xpath: ${xpath}`;
+      case 'input_text':
+        if (text === undefined) throw new Error('Text parameter required for input_text action');
+        await this.tap((x1 + x2) / 2, (y1 + y2) / 2);
+        await this.inputText(text);
+        return `Input text '${text}' to element with xpath: ${xpath}`;
+      default:
+        throw new Error(`Unsupported action: ${action}`);
+    }
+  }
+
+  /**
+   * Runs steps in order in a single bridge command, stopping at the first failure.
+   */
+  async runBatch(steps: BatchStep[], timeoutMs = 30000): Promise<BatchResult> {
+    if (!this.usePythonBridge || !this.pythonBridge) {
+      throw new Error('Batch actions require Python bridge with uiautomator2');
+    }
+    this.screenCache.invalidate();
+    try {
+      const result = await this.pythonBridge.runBatch(steps, timeoutMs);
+      if (result.success && result.data) {
+        return result.data as BatchResult;
       }
-    } catch (error) {
-      throw new Error(`Failed to input text "${text}": ${error instanceof Error ? error.message : String(error)}`);
+      throw new Error(result.error || 'Python bridge batch failed');
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
-  async xpathOperation(xpath: string, action: string = 'click', text?: string): Promise<string> {
+  /**
+   * Waits until the screen stops changing (and, with packageName, until that
+   * app is in the foreground). Resolves with met=false on timeout rather than throwing.
+   */
+  async waitForIdle(timeoutMs = 5000, packageName?: string): Promise<WaitResult> {
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
+      const python = this.bridgeTier('wait for idle', bridge => bridge.waitForIdle(timeoutMs, packageName), (result): WaitResult => {
+        const { idle, waitedMs, polls, package: currentApp } = result.data;
+        return { met: idle, waitedMs, polls, currentApp };
+      });
+      if (python) {
         try {
-          const result = await this.pythonBridge.xpathOperation(xpath, action, text);
-          if (result.success) {
-            return result.message || `XPath operation '${action}' completed successfully`;
-          }
-          throw new Error(result.error || 'Python bridge XPath operation failed');
+          return await this.router.run('wait_for_idle', { python });
         } catch (error) {
-          console.warn('Python bridge XPath operation failed, no fallback available:', error);
-          throw error;
+          if (error instanceof RequestAbortedError || error instanceof BackendActionError) throw error;
+          logger.warn('Python bridge wait for idle failed, falling back to screen polling:', error);
         }
       }
 
-      throw new Error('XPath operations require Python bridge with uiautomator2');
-    } catch (error) {
-      throw new Error(`Failed to execute XPath operation: ${error instanceof Error ? error.message : String(error)}`);
+      // Fallback: compare consecutive fresh dumps
+      let last = '';
+      let currentApp = '';
+      const result = await this.poll(timeoutMs, async () => {
+        const screenInfo = await this.getScreenInfo(true).catch(() => null);
+        if (!screenInfo) return false;
+        currentApp = screenInfo.currentApp;
+        if (packageName && currentApp !== packageName) {
+          last = '';
+          return false;
+        }
+        const signature = currentApp + JSON.stringify(screenInfo.elements);
+        const stable = signature === last;
+        last = signature;
+        return stable;
+      });
+      return { ...result, currentApp };
+    } finally {
+      // Anything read while the UI was still moving is stale now
+      this.screenCache.invalidate();
+    }
+  }
+
+  /**
+   * Waits until an element matching options appears, or disappears when gone is true.
+   * Text and description match as substrings, like findElement's local lookup.
+   */
+  async waitForElement(options: FindElementOptions, timeoutMs = 10000, gone = false): Promise<WaitResult> {
+    const python = this.bridgeTier('wait for element', bridge => bridge.waitForElement({
+      textContains: options.text,
+      descriptionContains: options.description,
+      resourceId: options.resourceId,
+      className: options.className
+    }, timeoutMs, gone), (result): WaitResult => {
+      const { met, found, waitedMs, polls } = result.data;
+      return { met, found, waitedMs, polls };
+    });
+    if (python) {
+      try {
+        return await this.router.run('wait_for_element', { python });
+      } catch (error) {
+        if (error instanceof RequestAbortedError || error instanceof BackendActionError) throw error;
+        logger.warn('Python bridge wait for element failed, falling back to screen polling:', error);
+      }
+    }
+
+    let found = false;
+    const result = await this.poll(timeoutMs, async () => {
+      this.screenCache.invalidate();
+      try {
+        found = (await this.findElement(options)) !== null;
+      } catch (error) {
+        return false;
+      }
+      return found !== gone;
+    });
+    return { ...result, found };
+  }
+
+  /**
+   * Runs check with a growing interval until it returns true or timeoutMs runs out.
+   */
+  private async poll(timeoutMs: number, check: () => Promise<boolean>): Promise<WaitResult> {
+    const start = Date.now();
+    let interval = WAIT_INITIAL_INTERVAL_MS;
+    let polls = 0;
+    while (true) {
+      polls++;
+      if (await check()) {
+        return { met: true, waitedMs: Date.now() - start, polls };
+      }
+      if (Date.now() - start + interval > timeoutMs) {
+        return { met: false, waitedMs: Date.now() - start, polls };
+      }
+      await new Promise(resolve => setTimeout(resolve, interval));
+      interval = Math.min(interval * WAIT_BACKOFF, WAIT_MAX_INTERVAL_MS);
     }
   }
 
@@ -338,11 +721,8 @@ export class AndroidAutomation {
         { className: 'EditText' }
       ];
 
-      let searchElement = null;
-      for (const pattern of searchPatterns) {
-        searchElement = await this.findElement(pattern);
-        if (searchElement) break;
-      }
+      // One lookup for all patterns instead of one round trip each
+      const searchElement = await this.findFirst(searchPatterns);
 
       if (!searchElement) {
         return 'Search box not found';
@@ -353,8 +733,8 @@ export class AndroidAutomation {
       const centerY = (searchElement.bounds[1] + searchElement.bounds[3]) / 2;
       await this.tap(centerX, centerY);
       
-      // Reduced wait time for search box to focus
-      await new Promise(resolve => setTimeout(resolve, 300));
+      // Wait for the search box to take focus (or a search page to open) instead of a fixed delay
+      await this.waitForIdle(2000);
       
       // Input search query
       await this.inputText(query);
@@ -368,7 +748,68 @@ export class AndroidAutomation {
     }
   }
 
-  async getScreenInfo(): Promise<ScreenInfo> {
+  /**
+   * Parsed UI hierarchy of the current screen. Served from the screen cache
+   * unless it expired or an action changed the screen since it was taken;
+   * pass fresh=true to always dump.
+   */
+  async getScreenInfo(fresh = false): Promise<ScreenInfo> {
+    if (fresh) {
+      this.screenCache.invalidate();
+    }
+    return this.screenCache.getScreen(() => this.fetchScreenInfo());
+  }
+
+  /**
+   * Display width/height, fetched once per session.
+   */
+  async getDisplaySize(): Promise<{ width: number; height: number }> {
+    return this.screenCache.getStatic('displaySize', async () => {
+      if (this.usePythonBridge && this.pythonBridge) {
+        try {
+          const info = await this.getDeviceInfo();
+          if (info.displayWidth && info.displayHeight) {
+            return { width: info.displayWidth, height: info.displayHeight };
+          }
+        } catch (error) {
+          logger.warn('Python bridge device info failed, falling back to ADB for display size:', error);
+        }
+      }
+      return this.getDisplaySizeViaADB();
+    });
+  }
+
+  /**
+   * uiautomator2 device_info plus display metrics, fetched once per session.
+   */
+  async getDeviceInfo(): Promise<Record<string, any>> {
+    return this.screenCache.getStatic('deviceInfo', async () => {
+      if (!this.pythonBridge) {
+        throw new Error('Device info requires the Python bridge');
+      }
+      // A bridge that has started already sent the info with its ready frame
+      if (this.pythonBridge.deviceInfo) {
+        return this.pythonBridge.deviceInfo;
+      }
+      const result = await this.pythonBridge.getDeviceInfo();
+      if (!result.success || !result.data) {
+        throw new Error(result.error || 'Python bridge get device info failed');
+      }
+      return result.data;
+    });
+  }
+
+  private async getDisplaySizeViaADB(): Promise<{ width: number; height: number }> {
+    const sizeOutput = await this.adbShell('wm size');
+    logger.debug('Screen size output:', sizeOutput);
+    const sizeMatch = sizeOutput.match(/(\d+)x(\d+)/);
+    return {
+      width: sizeMatch ? parseInt(sizeMatch[1]) : 1080,
+      height: sizeMatch ? parseInt(sizeMatch[2]) : 1920
+    };
+  }
+
+  private async fetchScreenInfo(): Promise<ScreenInfo> {
     try {
       logger.info('🔍 Starting getScreenInfo()');
       
@@ -384,38 +825,19 @@ export class AndroidAutomation {
 
       logger.debug("Getting screen info...")
 
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          logger.debug('Trying Python bridge for screen dump');
-          const result = await this.pythonBridge.getScreenDump();
-          if (result.success && result.data) {
-            logger.info('✅ Python bridge screen dump successful');
-            return this.parseScreenInfo({
-              xml: result.data.xml,
-              displayWidth: result.data.displayWidth,
-              displayHeight: result.data.displayHeight,
-              currentPackageName: result.data.currentPackageName
-            });
-          }
-          logger.warn("❌ Python bridge screen dump failed, trying fallback", result.error);
-          throw new Error(result.error || 'Python bridge screen dump failed');
-        } catch (error) {
-          logger.warn('❌ Python bridge screen dump failed, falling back to HTTP/ADB:', error);
-        }
-      }
-
-      // Try uiautomator2 API first
-      try {
-        logger.debug("Trying uiautomator2 HTTP API");
-        const response = await axios.get(`${this.baseUrl}/dump`, { timeout: 10000 });
-        logger.info('✅ uiautomator2 HTTP API successful');
-        return this.parseScreenInfo(response.data);
-      } catch (apiError) {
-        logger.warn('❌ uiautomator2 HTTP API failed, falling back to ADB UI dump:', apiError);
-        // Fallback to ADB UI dump
-        return await this.getScreenInfoViaADB();
-      }
+      return await this.router.run('get_screen_dump', {
+        python: this.bridgeTier('screen dump', bridge => bridge.getScreenDump(), result => this.parseScreenInfo({
+          xml: result.data.xml,
+          displayWidth: result.data.displayWidth,
+          displayHeight: result.data.displayHeight,
+          currentPackageName: result.data.currentPackageName
+        })),
+        http: async () => {
+          const response = await (await loadAxios()).get(`${this.baseUrl}/dump`, { timeout: 10000 });
+          return this.parseScreenInfo(response.data);
+        },
+        adb: () => this.getScreenInfoViaADB(),
+      });
     } catch (error) {
       throw new Error(`Failed to get screen info: ${error instanceof Error ? error.message : String(error)}`);
     }
@@ -427,20 +849,16 @@ export class AndroidAutomation {
       const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
       logger.debug(`Using device flag: "${deviceFlag}"`);
       
-      // Get screen size
+      // Get screen size (static for the session)
       logger.debug('Getting screen size...');
-      const { stdout: sizeOutput } = await execAsync(`adb ${deviceFlag} shell wm size`);
-      logger.debug('Screen size output:', sizeOutput);
-      const sizeMatch = sizeOutput.match(/(\d+)x(\d+)/);
-      const width = sizeMatch ? parseInt(sizeMatch[1]) : 1080;
-      const height = sizeMatch ? parseInt(sizeMatch[2]) : 1920;
+      const { width, height } = await this.screenCache.getStatic('displaySize', () => this.getDisplaySizeViaADB());
       logger.info(`📱 Screen dimensions: ${width}x${height}`);
       
-      // Get current app (Windows compatible)
+      // Get current app, filtered on the device so only one line comes back
       let currentApp = 'unknown';
       try {
         logger.debug('Getting current focused app...');
-        const { stdout: appOutput } = await execAsync(`adb ${deviceFlag} shell dumpsys window`);
+        const appOutput = await this.adbShell('dumpsys window | grep mCurrentFocus');
         const lines = appOutput.split('\n');
         for (const line of lines) {
           if (line.includes('mCurrentFocus')) {
@@ -461,6 +879,15 @@ export class AndroidAutomation {
       let dumpMethod = 'unknown';
       
       logger.info('🔍 Starting UI dump attempts...');
+
+      // Stream the dump over the persistent shell straight into the parser
+      try {
+        const tree = await this.adb.dumpHierarchy();
+        logger.info('✅ Streamed UI dump succeeded');
+        return this.parseUIDump(tree, width, height, currentApp);
+      } catch (error) {
+        logger.warn('❌ Streamed UI dump failed, falling back to adb exec:', error);
+      }
       
       try {
         // Method 1: Try standard uiautomator dump
@@ -511,7 +938,7 @@ export class AndroidAutomation {
       
       logger.info(`📋 Using dump method: ${dumpMethod}`);
       logger.debug(`Dump output length: ${dumpOutput.length} characters`);
-      logger.debug(`Dump preview: ${dumpOutput.substring(0, 300)}`);
+      logger.debug('Dump preview', () => dumpOutput.substring(0, 300));
       
       return this.parseUIDump(dumpOutput, width, height, currentApp);
     } catch (error) {
@@ -520,6 +947,10 @@ export class AndroidAutomation {
   }
 
   private parseScreenInfo(data: any): ScreenInfo {
+    if (data.displayWidth && data.displayHeight && !this.screenCache.peekStatic('displaySize')) {
+      this.screenCache.setStatic('displaySize', { width: data.displayWidth, height: data.displayHeight });
+    }
+
     // Handle both Python bridge data and uiautomator2 API response
     if (data.xml) {
       // Python bridge format
@@ -535,74 +966,58 @@ export class AndroidAutomation {
     }
   }
 
-  private parseUIDump(xml: string, width: number, height: number, currentApp: string): ScreenInfo {
-    const elements: UIElement[] = [];
-    
+  private parseUIDump(xml: string | UITree, width: number, height: number, currentApp: string): ScreenInfo {
     logger.info('🔍 Starting parseUIDump (simplified mode)');
-    logger.debug('XML dump details', {
-      length: xml.length,
-      preview: xml.substring(0, 200),
-      hasNodes: xml.includes('<node'),
-      hasHierarchy: xml.includes('<hierarchy')
-    });
-    
-    // Handle both self-closing and opening node tags
-    const nodeMatches = xml.match(/<node[^>]*\/?>/g) || [];
-    logger.info(`📊 Found ${nodeMatches.length} node matches in XML`);
-    
-    for (const nodeMatch of nodeMatches) {
-      // Only extract essential attributes: resource-id, class, description, bounds
-      const resourceMatch = nodeMatch.match(/resource-id="([^"]*)"/);
-      const classMatch = nodeMatch.match(/class="([^"]*)"/);
-      const descMatch = nodeMatch.match(/content-desc="([^"]*)"/);
-      const boundsMatch = nodeMatch.match(/bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"/);
-      
-      if (boundsMatch) {
-        const element: UIElement = {
-          description: descMatch ? descMatch[1] : '',
-          resourceId: resourceMatch ? resourceMatch[1] : '',
-          className: classMatch ? classMatch[1] : '',
-          bounds: [
-            parseInt(boundsMatch[1]), // x1 (left)
-            parseInt(boundsMatch[2]), // y1 (top)
-            parseInt(boundsMatch[3]), // x2 (right)
-            parseInt(boundsMatch[4])  // y2 (bottom)
-          ]
-          // text, clickable, enabled are now optional and not included
-        };
-        elements.push(element);
+    if (typeof xml === 'string') {
+      logger.debug('XML dump details', () => ({
+        length: xml.length,
+        preview: xml.substring(0, 200)
+      }));
+    }
+
+    const tree = typeof xml === 'string' ? parseHierarchy(xml) : xml;
+    const elements: UIElement[] = [];
+    const filteredElements: UIElement[] = [];
+    const filteredNodes: UINode[] = [];
+    let withDescription = 0;
+    let withResourceId = 0;
+
+    // One pass builds the element list, the filtered list and the stats
+    for (const node of tree.nodes) {
+      const element = toUIElement(node);
+      elements.push(element);
+      if (node.description) withDescription++;
+      if (node.resourceId) withResourceId++;
+      // Use more relaxed filtering - include elements with any meaningful content
+      if (node.description || node.resourceId || node.text || MEANINGFUL_CLASS_PATTERN.test(node.className)) {
+        filteredElements.push(element);
+        filteredNodes.push(node);
       }
     }
-    
-    // Use more relaxed filtering - include elements with any meaningful content
-    const filteredElements = elements.filter(el => 
-      el.description || 
-      el.resourceId || 
-      el.className.includes('Button') ||
-      el.className.includes('Text') ||
-      el.className.includes('Edit') ||
-      el.className.includes('View') ||
-      el.className.includes('Image')
-    );
-    
+
     logger.info('📈 Simplified element processing complete', {
       totalElements: elements.length,
       filteredElements: filteredElements.length,
-      elementsWithDescription: elements.filter(el => el.description).length,
-      elementsWithResourceId: elements.filter(el => el.resourceId).length
+      elementsWithDescription: withDescription,
+      elementsWithResourceId: withResourceId
     });
     
     // If still no elements after filtering, return all elements
-    const finalElements = filteredElements.length > 0 ? filteredElements : elements;
+    const useFiltered = filteredElements.length > 0;
+    const finalElements = useFiltered ? filteredElements : elements;
     
     logger.info(`🎯 Returning ${finalElements.length} simplified elements`);
     
-    return {
+    const screenInfo: ScreenInfo = {
       width,
       height,
       elements: finalElements,
       currentApp
     };
+    // Keep the indexed tree with the snapshot for lookups, but out of JSON output
+    Object.defineProperty(screenInfo, 'tree', { value: tree, enumerable: false });
+    Object.defineProperty(screenInfo, 'elementNodes', { value: useFiltered ? filteredNodes : tree.nodes, enumerable: false });
+    return screenInfo;
   }
 
   async back(): Promise<void> {
@@ -615,9 +1030,10 @@ export class AndroidAutomation {
 
   async scroll(direction: 'up' | 'down' | 'left' | 'right'): Promise<void> {
     try {
-      const screenInfo = await this.getScreenInfo();
-      const centerX = screenInfo.width / 2;
-      const centerY = screenInfo.height / 2;
+      // Only the display size is needed here, which is cached for the whole session
+      const { width, height } = await this.getDisplaySize();
+      const centerX = width / 2;
+      const centerY = height / 2;
       
       let startX = centerX, startY = centerY;
       let endX = centerX, endY = centerY;
@@ -647,261 +1063,343 @@ export class AndroidAutomation {
     }
   }
 
-  private async swipe(startX: number, startY: number, endX: number, endY: number, duration = 500): Promise<void> {
+  /**
+   * Swipes through a list until an element exactly matching options is on screen,
+   * the list stops moving or maxSwipes runs out. With the Python bridge
+   * this is a single command.
+   */
+  async scrollTo(options: FindElementOptions, scrollOptions: ScrollToOptions = {}): Promise<ScrollToResult> {
+    const { direction = 'down', maxSwipes = 20, container } = scrollOptions;
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
+      // Exact selectors only: a relaxed match on the first screen (Item 20 for Item 2) would stop the scroll early
+      const python = this.bridgeTier('scroll to', bridge => bridge.scrollTo(rankedSelectors(options).slice(0, 1), {
+        direction,
+        maxSwipes,
+        container: container ? rankedSelectors(container)[1] : undefined,
+      }, (maxSwipes + 1) * 5000), (result): ScrollToResult => {
+        const { found, element, scrolls, reachedEnd, waitedMs } = result.data;
+        const scrollResult: ScrollToResult = { found, scrolls, reachedEnd, waitedMs };
+        // The bridge's element has the node fields toUIElement reads, under the same names
+        if (element) scrollResult.element = toUIElement(element as UINode);
+        return scrollResult;
+      });
+      if (python) {
         try {
-          const result = await this.pythonBridge.swipe(startX, startY, endX, endY, duration / 1000); // Convert to seconds
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge swipe failed');
+          return await this.router.run('scroll_to', { python });
         } catch (error) {
-          console.warn('Python bridge swipe failed, falling back to HTTP/ADB:', error);
+          if (error instanceof RequestAbortedError || error instanceof BackendActionError) throw error;
+          logger.warn('Python bridge scroll to failed, falling back to screen parsing:', error);
         }
       }
+      return await this.scrollToOnScreen(options, direction, maxSwipes, container);
+    } catch (error) {
+      throw new Error(`Failed to scroll to element: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
+    }
+  }
 
-      // Try uiautomator2 API first
-      try {
-        await axios.post(`${this.baseUrl}/swipe`, {
-          fx: startX,
-          fy: startY,
-          tx: endX,
-          ty: endY,
-          duration: duration
-        }, { timeout: 5000 });
-        return;
-      } catch (apiError) {
-        // Fallback to ADB
-        const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-        await execAsync(`adb ${deviceFlag} shell input swipe ${startX} ${startY} ${endX} ${endY} ${duration}`);
+  private async scrollToOnScreen(options: FindElementOptions, direction: ScrollDirection, maxSwipes: number,
+                                 container?: FindElementOptions): Promise<ScrollToResult> {
+    const start = Date.now();
+    let screen = await this.getScreenInfo(true);
+    let box: Bounds = [0, 0, screen.width, screen.height];
+    if (screen.tree) {
+      const list = container
+        ? screen.tree.find(container)
+        : screen.tree.nodes.filter(node => node.scrollable).sort((a, b) => boundsArea(b.bounds) - boundsArea(a.bounds))[0];
+      if (list) {
+        box = list.bounds;
+      } else if (container) {
+        throw new Error(`No scrollable container matches ${JSON.stringify(container)}`);
+      }
+    }
+    const inBox = (bounds: Bounds) => {
+      const x = (bounds[0] + bounds[2]) / 2;
+      const y = (bounds[1] + bounds[3]) / 2;
+      return x >= box[0] && x < box[2] && y >= box[1] && y < box[3];
+    };
+    const match = () => {
+      const node = screen.tree?.nodes.find(node => matchesExactly(node, options) && inBox(node.bounds));
+      if (node) return toUIElement(node);
+      const element = screen.tree ? null : findInScreen(screen, options);
+      return element && inBox(element.bounds) ? element : null;
+    };
+    // An element touching the edge the content comes in from may be cut off, so it is scrolled once more
+    const cutOff = (bounds: Bounds) => ({
+      down: bounds[3] >= box[3],
+      up: bounds[1] <= box[1],
+      right: bounds[2] >= box[2],
+      left: bounds[0] <= box[0],
+    })[direction];
+    const fingerprint = () => JSON.stringify(screen.elements.filter(element => inBox(element.bounds)));
+
+    const [x1, y1, x2, y2] = box;
+    const along = (from: number, to: number, fraction: number) => Math.round(from + (to - from) * fraction);
+    const cx = Math.round((x1 + x2) / 2);
+    const cy = Math.round((y1 + y2) / 2);
+    const gesture: Record<ScrollDirection, [number, number, number, number]> = {
+      down: [cx, along(y1, y2, SCROLL_FROM), cx, along(y1, y2, SCROLL_TO)],
+      up: [cx, along(y1, y2, SCROLL_TO), cx, along(y1, y2, SCROLL_FROM)],
+      right: [along(x1, x2, SCROLL_FROM), cy, along(x1, x2, SCROLL_TO), cy],
+      left: [along(x1, x2, SCROLL_TO), cy, along(x1, x2, SCROLL_FROM), cy],
+    };
+
+    let found = match();
+    let last = fingerprint();
+    let scrolls = 0;
+    let reachedEnd = false;
+    while ((!found || cutOff(found.bounds)) && scrolls < maxSwipes) {
+      await this.swipe(...gesture[direction], 300);
+      scrolls++;
+      await new Promise(resolve => setTimeout(resolve, SCROLL_SETTLE_MS));
+      screen = await this.getScreenInfo(true);
+      const current = fingerprint();
+      if (current === last) {
+        reachedEnd = true;
+        break;
+      }
+      found = match();
+      last = current;
+    }
+    const result: ScrollToResult = { found: !!found, scrolls, reachedEnd, waitedMs: Date.now() - start };
+    if (found) result.element = found;
+    return result;
+  }
+
+  /**
+   * Locates a template image on the current screen, for screens whose
+   * hierarchy has nothing to match on (games, Flutter, WebViews). The
+   * element of a match has its bounds and a className of "image".
+   */
+  async findImage(options: FindImageOptions): Promise<ImageMatch> {
+    // The worker may run in another directory, so relative template paths are resolved here
+    const request = { ...options, template: options.template ? resolve(options.template) : undefined };
+    const python = this.bridgeTier('find image', bridge => bridge.findImage(request), (result): ImageMatch => {
+      const { found, score, scale, bounds, center, clicked, cached } = result.data;
+      const match: ImageMatch = { found, score, scale, cached };
+      if (found) {
+        match.element = { description: '', resourceId: '', className: 'image', bounds };
+        match.center = center;
       }
+      if (clicked) match.clicked = true;
+      return match;
+    });
+    if (!python) {
+      throw new Error('Finding an image needs the Python bridge with numpy');
+    }
+    if (options.click) this.screenCache.invalidate();
+    try {
+      return await this.router.run('find_image', { python });
+    } catch (error) {
+      throw new Error(`Failed to find image: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      if (options.click) this.screenCache.invalidate();
+    }
+  }
+
+  private async swipe(startX: number, startY: number, endX: number, endY: number, duration = 500): Promise<void> {
+    this.screenCache.invalidate();
+    try {
+      await this.router.run('swipe', {
+        python: this.bridgeTier('swipe', bridge => bridge.swipe(startX, startY, endX, endY, duration / 1000)), // Convert to seconds
+        http: async () => {
+          await (await loadAxios()).post(`${this.baseUrl}/swipe`, {
+            fx: startX,
+            fy: startY,
+            tx: endX,
+            ty: endY,
+            duration: duration
+          }, { timeout: 5000 });
+        },
+        adb: async () => { await this.adbShell(`input swipe ${startX} ${startY} ${endX} ${endY} ${duration}`); },
+      });
     } catch (error) {
       throw new Error(`Failed to swipe: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
   async longTap(x: number, y: number, duration = 0.5): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.longTap(x, y, duration);
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge long tap failed');
-        } catch (error) {
-          console.warn('Python bridge long tap failed, falling back to ADB:', error);
-        }
-      }
-
-      // Fallback to ADB long click simulation
-      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-      const durationMs = Math.round(duration * 1000);
-      await execAsync(`adb ${deviceFlag} shell input touchscreen swipe ${x} ${y} ${x} ${y} ${durationMs}`);
+      await this.router.run('long_tap', {
+        python: this.bridgeTier('long tap', bridge => bridge.longTap(x, y, duration)),
+        // A swipe that does not move is a long click
+        adb: async () => { await this.adbShell(`input touchscreen swipe ${x} ${y} ${x} ${y} ${Math.round(duration * 1000)}`); },
+      });
     } catch (error) {
       throw new Error(`Failed to long tap at (${x}, ${y}): ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
   async doubleTap(x: number, y: number, duration = 0.1): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.doubleTap(x, y, duration);
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge double tap failed');
-        } catch (error) {
-          console.warn('Python bridge double tap failed, falling back to ADB:', error);
-        }
-      }
-
-      // Fallback to two quick taps with reduced delay
-      await this.tap(x, y);
-      await new Promise(resolve => setTimeout(resolve, Math.max(50, duration * 1000))); // Min 50ms delay
-      await this.tap(x, y);
+      // Over ADB the two taps are timed on the device: one shell call, so adb
+      // startup latency cannot stretch the gap past the double-tap timeout
+      const gap = Math.max(0.05, duration).toFixed(2); // Min 50ms delay
+      await this.router.run('double_tap', {
+        python: this.bridgeTier('double tap', bridge => bridge.doubleTap(x, y, duration)),
+        adb: async () => { await this.adbShell(`input tap ${x} ${y}; sleep ${gap}; input tap ${x} ${y}`); },
+      });
     } catch (error) {
       throw new Error(`Failed to double tap at (${x}, ${y}): ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
   async pressKey(keyCode: string): Promise<void> {
+    this.screenCache.invalidate();
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.pressKey(keyCode);
-          if (result.success) return;
-          throw new Error(result.error || 'Python bridge press key failed');
-        } catch (error) {
-          console.warn('Python bridge press key failed, falling back to ADB:', error);
-        }
-      }
-
-      // Fallback to ADB
-      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-      await execAsync(`adb ${deviceFlag} shell input keyevent ${keyCode}`);
+      await this.router.run('press_key', {
+        python: this.bridgeTier('press key', bridge => bridge.pressKey(keyCode)),
+        adb: async () => { await this.adbShell(`input keyevent ${keyCode}`); },
+      });
     } catch (error) {
       throw new Error(`Failed to press key ${keyCode}: ${error instanceof Error ? error.message : String(error)}`);
+    } finally {
+      this.screenCache.invalidate();
     }
   }
 
-  private async compressImageToTarget(imageBuffer: Buffer, targetSizeKB = 128): Promise<Buffer> {
-    const targetBytes = targetSizeKB * 1024;
-    let quality = 85;
-    let compressed = imageBuffer;
-    
-    // If already under target size, return as is
-    if (imageBuffer.length <= targetBytes) {
-      return imageBuffer;
-    }
-    
-    // Try different quality levels to reach target size
-    while (quality > 10 && compressed.length > targetBytes) {
-      compressed = await sharp(imageBuffer)
-        .jpeg({ quality })
-        .toBuffer();
-      
-      if (compressed.length > targetBytes) {
-        quality -= 15;
-      }
-    }
-    
-    // If still too large, try reducing dimensions
-    if (compressed.length > targetBytes) {
-      const metadata = await sharp(imageBuffer).metadata();
-      let scale = 0.8;
-      
-      while (scale > 0.3 && compressed.length > targetBytes) {
-        const newWidth = Math.round((metadata.width || 1080) * scale);
-        const newHeight = Math.round((metadata.height || 1920) * scale);
-        
-        compressed = await sharp(imageBuffer)
-          .resize(newWidth, newHeight)
-          .jpeg({ quality: 70 })
-          .toBuffer();
-          
-        scale -= 0.1;
-      }
+  async takeScreenshot(filename?: string, format = 'pillow', options: ScreenshotOptions = {}): Promise<ScreenshotResult> {
+    const encoding: ScreenshotOptions = { maxBytes: DEFAULT_SCREENSHOT_BYTES, ...options };
+    try {
+      return await this.router.run('take_screenshot', {
+        // The bridge captures once and encodes once: same bytes for file and response
+        python: this.bridgeTier('screenshot', bridge => bridge.takeScreenshot(filename, format, encoding), (result): ScreenshotResult => {
+          if (result.data.changed === false) {
+            return { base64Data: '', mimeType: '', width: 0, height: 0, bytes: 0, changed: false, regions: [] };
+          }
+          const imageBuffer = result.payload ?? Buffer.from(result.data.image || '', 'base64');
+          return {
+            base64Data: imageBuffer.toString('base64'),
+            mimeType: `image/${result.data.format}`,
+            width: result.data.width,
+            height: result.data.height,
+            bytes: imageBuffer.length,
+            message: result.message,
+            changed: result.data.changed,
+            regions: result.data.regions,
+            region: result.data.region
+          };
+        }),
+        adb: () => this.takeScreenshotViaADB(filename, encoding),
+      });
+    } catch (error) {
+      throw new Error(`Failed to take screenshot: ${error instanceof Error ? error.message : String(error)}`);
     }
-    
-    return compressed;
   }
 
-  async takeScreenshot(filename?: string, format = 'pillow'): Promise<{base64Data: string, message?: string}> {
-    try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.takeScreenshot(filename, format);
-          if (result.success) {
-            if (filename) {
-              // For Python bridge with filename, we need to also get the base64 data
-              const noFileResult = await this.pythonBridge.takeScreenshot(undefined, format);
-              const imageData = noFileResult.data?.image || '';
-              const imageBuffer = Buffer.from(imageData, 'base64');
-              const compressedBuffer = await this.compressImageToTarget(imageBuffer);
-              return {
-                base64Data: compressedBuffer.toString('base64'),
-                message: result.message || `Screenshot saved to ${filename}`
-              };
-            } else {
-              const imageData = result.data?.image || '';
-              const imageBuffer = Buffer.from(imageData, 'base64');
-              const compressedBuffer = await this.compressImageToTarget(imageBuffer);
-              return {
-                base64Data: compressedBuffer.toString('base64')
-              };
-            }
-          }
-          throw new Error(result.error || 'Python bridge screenshot failed');
-        } catch (error) {
-          console.warn('Python bridge screenshot failed, falling back to ADB:', error);
-        }
-      }
+  /**
+   * ADB screencap, streamed straight to us instead of going through temp files.
+   * changedSince needs the bridge's previous frame, so here it always yields the full image.
+   */
+  private async takeScreenshotViaADB(filename: string | undefined, encoding: ScreenshotOptions): Promise<ScreenshotResult> {
+    const png = await metrics.time({ action: 'take_screenshot', backend: 'adb', phase: 'capture' }, () => this.adbExecOut('screencap -p'));
+    const encoded = await metrics.time({ action: 'take_screenshot', backend: 'adb', phase: 'encode' }, () => this.encodeScreenshot(png, encoding));
 
-      // Fallback to ADB screencap
-      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-      // Always use a temp path on device, never use the filename directly on device
-      const tempScreenshotPath = `/sdcard/screenshot_${Date.now()}.png`;
-      
-      // Delete any existing file with same name first
-      try {
-        await execAsync(`adb ${deviceFlag} shell rm ${tempScreenshotPath}`);
-      } catch (error) {
-        // Ignore error if file doesn't exist
-      }
-      
-      await execAsync(`adb ${deviceFlag} shell screencap -p ${tempScreenshotPath}`);
-      
-      // Always pull screenshot to local temp file and convert to base64
-      const tempLocalPath = `./temp_screenshot_${Date.now()}.png`;
-      await execAsync(`adb ${deviceFlag} pull ${tempScreenshotPath} ${tempLocalPath}`);
-      
-      // Read file and convert to base64 using Node.js
+    let message: string | undefined;
+    if (filename) {
       const fs = await import('fs');
-      const imageBuffer = fs.readFileSync(tempLocalPath);
-      const compressedBuffer = await this.compressImageToTarget(imageBuffer);
-      const base64Data = compressedBuffer.toString('base64');
-      
-      // Clean up temp files
-      await execAsync(`adb ${deviceFlag} shell rm ${tempScreenshotPath}`);
-      
-      if (filename) {
-        // Save compressed image to desired filename
-        fs.writeFileSync(filename, compressedBuffer);
-        fs.unlinkSync(tempLocalPath);
-        return {
-          base64Data,
-          message: `Screenshot saved to ${filename}`
-        };
-      } else {
-        fs.unlinkSync(tempLocalPath);
-        return {
-          base64Data
-        };
+      await fs.promises.writeFile(filename, encoded.data);
+      message = `Screenshot saved to ${filename}`;
+    }
+    return {
+      base64Data: encoded.data.toString('base64'),
+      mimeType: `image/${encoded.format}`,
+      width: encoded.width,
+      height: encoded.height,
+      bytes: encoded.data.length,
+      message,
+      region: encoding.region
+    };
+  }
+
+  /**
+   * Encodes an ADB PNG capture with sharp for the fallback path: cropped to
+   * the region, once at the requested size, plus one proportional downscale
+   * if it misses the budget.
+   */
+  private async encodeScreenshot(png: Buffer, options: ScreenshotOptions): Promise<{data: Buffer, format: string, width: number, height: number}> {
+    const { default: sharp } = await import('sharp');
+    const imageFormat = options.imageFormat || 'jpeg';
+    const metadata = await sharp(png).metadata();
+    let width = metadata.width || 1080;
+    let height = metadata.height || 1920;
+    let extract: { left: number, top: number, width: number, height: number } | undefined;
+    if (options.region) {
+      const [x1, y1, x2, y2] = options.region;
+      const left = Math.max(0, x1);
+      const top = Math.max(0, y1);
+      extract = { left, top, width: Math.min(width, x2) - left, height: Math.min(height, y2) - top };
+      if (extract.width <= 0 || extract.height <= 0) {
+        throw new Error(`Region ${JSON.stringify(options.region)} is outside the ${width}x${height} screen`);
       }
-    } catch (error) {
-      throw new Error(`Failed to take screenshot: ${error instanceof Error ? error.message : String(error)}`);
+      width = extract.width;
+      height = extract.height;
+    }
+    const scale = Math.min(1, options.maxWidth ? options.maxWidth / width : 1, options.maxHeight ? options.maxHeight / height : 1);
+    width = Math.max(1, Math.round(width * scale));
+    height = Math.max(1, Math.round(height * scale));
+
+    const encode = (w: number, h: number): Promise<Buffer> => {
+      const image = sharp(png);
+      const pipeline = (extract ? image.extract(extract) : image).resize(w, h);
+      if (imageFormat === 'png') return pipeline.png().toBuffer();
+      if (imageFormat === 'webp') return pipeline.webp({ quality: options.quality || 80 }).toBuffer();
+      return pipeline.jpeg({ quality: options.quality || 80 }).toBuffer();
+    };
+
+    let data = await encode(width, height);
+    if (imageFormat !== 'png' && options.maxBytes && data.length > options.maxBytes) {
+      const shrink = Math.sqrt(options.maxBytes * 0.9 / data.length);
+      width = Math.max(1, Math.round(width * shrink));
+      height = Math.max(1, Math.round(height * shrink));
+      data = await encode(width, height);
     }
+    return { data, format: imageFormat, width, height };
   }
 
-  async getInstalledApps(): Promise<{packageName: string, appName: string}[]> {
+  /**
+   * A page of installed user apps. Labels come from the bridge's on-disk
+   * cache; without the bridge the package name doubles as the label.
+   */
+  async getInstalledApps(offset = 0, limit?: number): Promise<AppPage> {
     try {
-      // Try Python bridge first
-      if (this.usePythonBridge && this.pythonBridge) {
-        try {
-          const result = await this.pythonBridge.getInstalledApps();
-          if (result.success && result.data) {
-            return result.data.apps || [];
-          }
-          throw new Error(result.error || 'Python bridge get apps failed');
-        } catch (error) {
-          console.warn('Python bridge get apps failed, falling back to ADB:', error);
-        }
-      }
+      return await this.router.run('get_installed_apps', {
+        python: this.bridgeTier('get apps', bridge => bridge.getInstalledApps(offset, limit), (result): AppPage => {
+          const { apps = [], total = apps.length, nextOffset } = result.data;
+          return { apps, total, offset, nextOffset };
+        }),
+        adb: async () => {
+          const stdout = await this.adbShell('pm list packages -3');
 
-      // Fallback to ADB package manager
-      const deviceFlag = this.deviceSerial ? `-s ${this.deviceSerial}` : '';
-      const { stdout } = await execAsync(`adb ${deviceFlag} shell pm list packages -3`);
-      
-      const packages = stdout.split('\n')
-        .filter(line => line.startsWith('package:'))
-        .map(line => line.replace('package:', '').trim())
-        .filter(pkg => pkg.length > 0);
+          const packages = stdout.split('\n')
+            .filter(line => line.startsWith('package:'))
+            .map(line => line.replace('package:', '').trim())
+            .filter(pkg => pkg.length > 0);
 
-      // Get app names for packages (simplified approach)
-      const apps: {packageName: string, appName: string}[] = [];
-      
-      for (const packageName of packages) {
-        // Use simplified approach - just use package name as app name for now
-        // This avoids complex parsing and is faster
-        apps.push({ packageName, appName: packageName });
-      }
-      
-      return apps;
+          const end = limit ? Math.min(packages.length, offset + limit) : packages.length;
+          // Use simplified approach - just use package name as app name for now
+          // This avoids complex parsing and is faster
+          const apps = packages.slice(offset, end).map(packageName => ({ packageName, appName: packageName }));
+          return { apps, total: packages.length, offset, nextOffset: end < packages.length ? end : undefined };
+        },
+      });
     } catch (error) {
       throw new Error(`Failed to get installed apps: ${error instanceof Error ? error.message : String(error)}`);
     }
   }
 
+  async close(): Promise<void> {
+    this.adb.close();
+    await this.pythonBridge?.close();
+  }
 }
\ No newline at end of file
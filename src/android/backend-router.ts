@@ -0,0 +1,279 @@
+/**
+ * Chooses which automation backend handles each call.
+ *
+ * AndroidAutomation can reach a device three ways: the Python uiautomator2
+ * bridge, the uiautomator2 HTTP server on localhost:9008, and ADB. Trying
+ * them in a fixed order puts every timeout of a dead tier in front of each
+ * action. The router instead keeps, per backend, a circuit breaker fed by
+ * transport failures, and per backend and action a latency EWMA. Calls go to
+ * the fastest backend whose circuit is closed; open circuits are skipped
+ * without waiting and are probed in the background until the backend answers
+ * again. A backend that answers with an action error (BackendActionError) is
+ * healthy: the error goes back to the caller and no other backend is tried.
+ */
+
+import { performance } from 'perf_hooks';
+import { logger } from '../utils/logger.js';
+import { metrics } from '../utils/metrics.js';
+import { RequestAbortedError } from '../utils/request-context.js';
+
+export type Backend = 'python' | 'http' | 'adb';
+
+export type CircuitState = 'closed' | 'open' | 'half-open';
+
+export interface BackendRouterOptions {
+  failureThreshold?: number; // Consecutive failures that open a circuit
+  openMs?: number; // How long a circuit stays open before the first probe
+  maxOpenMs?: number; // Cap for the open period, which doubles after each failed probe
+  alpha?: number; // Weight of the newest sample in the latency EWMA
+  recentSize?: number; // Routing decisions kept for stats()
+}
+
+export type BackendCalls<T> = Partial<Record<Backend, () => Promise<T>>>;
+export type BackendProbes = Partial<Record<Backend, () => Promise<unknown>>>;
+
+export interface BackendHealth {
+  state: CircuitState;
+  consecutiveFailures: number;
+  openedAt?: number;
+  retryAt?: number; // When the next probe may run, while open
+  probes: number;
+  lastError?: string;
+}
+
+export interface ActionLatency {
+  calls: number;
+  failures: number;
+  ewmaMs?: number;
+  lastMs?: number;
+}
+
+export interface RoutingDecision {
+  at: number;
+  action: string;
+  backend: Backend | null; // Backend that answered, null if none did
+  ms: number;
+  tried: Backend[];
+  skipped: Backend[]; // Backends passed over because their circuit was open
+}
+
+export interface RouterStats {
+  backends: Record<string, BackendHealth>;
+  actions: Record<string, Record<string, ActionLatency>>;
+  recent: RoutingDecision[];
+}
+
+// Transport errors that mean the backend itself is unreachable, as opposed to a failure that may be passing
+const UNREACHABLE_PATTERN = /timeout after|timeout of \d+ms|timed out|ECONNREFUSED|ECONNRESET|EPIPE|ENOENT|not running|process exited|bridge closed|closed the connection|shell closed|socket hang up/i;
+
+/**
+ * The backend was reached and ran the action, and the action failed: element
+ * not found, bad arguments, a missing file. Another backend would fail the
+ * same way, so the router returns it to the caller without falling through
+ * and without counting it against the backend's circuit.
+ */
+export class BackendActionError extends Error {
+  constructor(message: string) {
+    super(message);
+    this.name = 'BackendActionError';
+  }
+}
+
+const BACKEND_ORDER: Backend[] = ['python', 'http', 'adb'];
+
+export class BackendRouter {
+  private health = new Map<Backend, BackendHealth>();
+  private latency = new Map<string, ActionLatency>();
+  private recent: RoutingDecision[] = [];
+  private probing = new Set<Backend>();
+  private options: Required<BackendRouterOptions>;
+
+  constructor(private probes: BackendProbes = {}, options: BackendRouterOptions = {}) {
+    this.options = {
+      failureThreshold: options.failureThreshold ?? 3,
+      openMs: options.openMs ?? 5000,
+      maxOpenMs: options.maxOpenMs ?? 60000,
+      alpha: options.alpha ?? 0.3,
+      recentSize: options.recentSize ?? 20,
+    };
+  }
+
+  /**
+   * Runs action on the best available backend, falling through to the next
+   * one on transport failures. Throws a BackendActionError as soon as a
+   * backend reports one, otherwise the last error if every backend failed or
+   * none was available.
+   */
+  async run<T>(action: string, calls: BackendCalls<T>): Promise<T> {
+    const start = Date.now();
+    const { order, skipped } = this.plan(action, calls);
+    const tried: Backend[] = [];
+    let lastError: unknown = new Error(`No available backend for ${action}${skipped.length ? ` (circuit open: ${skipped.join(', ')})` : ''}`);
+
+    for (const backend of order) {
+      tried.push(backend);
+      const callStart = performance.now();
+      try {
+        const result = await calls[backend]!();
+        const ms = performance.now() - callStart;
+        metrics.record({ action, backend, phase: 'call' }, ms);
+        this.recordSuccess(backend, action, ms);
+        this.remember({ at: start, action, backend, ms: Date.now() - start, tried, skipped });
+        return result;
+      } catch (error) {
+        // The caller gave up: not the backend's fault, and no other backend should start on it
+        if (error instanceof RequestAbortedError) throw error;
+        if (error instanceof BackendActionError) {
+          // The backend answered, so it is healthy; the failure belongs to the caller
+          const ms = performance.now() - callStart;
+          metrics.record({ action, backend, phase: 'call' }, ms);
+          this.recordSuccess(backend, action, ms, true);
+          this.remember({ at: start, action, backend, ms: Date.now() - start, tried, skipped });
+          throw error;
+        }
+        lastError = error;
+        this.recordFailure(backend, action, performance.now() - callStart, error);
+        logger.debug(`Backend ${backend} failed for ${action}`, error);
+      }
+    }
+
+    this.remember({ at: start, action, backend: null, ms: Date.now() - start, tried, skipped });
+    throw lastError;
+  }
+
+  /**
+   * Whether calls to backend would currently be attempted.
+   */
+  isAvailable(backend: Backend): boolean {
+    return this.circuit(backend).state !== 'open';
+  }
+
+  stats(): RouterStats {
+    const backends: Record<string, BackendHealth> = {};
+    for (const [backend, health] of this.health) backends[backend] = { ...health };
+    const actions: Record<string, Record<string, ActionLatency>> = {};
+    for (const [key, latency] of this.latency) {
+      const [backend, action] = key.split(':');
+      (actions[action] ??= {})[backend] = {
+        ...latency,
+        ewmaMs: latency.ewmaMs === undefined ? undefined : Math.round(latency.ewmaMs * 10) / 10,
+      };
+    }
+    return { backends, actions, recent: this.recent.slice() };
+  }
+
+  /**
+   * Backends to try for action: closed circuits by measured latency, backends
+   * without a measurement yet in the default order after them.
+   */
+  private plan<T>(action: string, calls: BackendCalls<T>): { order: Backend[]; skipped: Backend[] } {
+    const order: Backend[] = [];
+    const skipped: Backend[] = [];
+    for (const backend of BACKEND_ORDER) {
+      if (!calls[backend]) continue;
+      const health = this.circuit(backend);
+      if (health.state === 'open') {
+        skipped.push(backend);
+        this.maybeProbe(backend, health);
+        continue;
+      }
+      order.push(backend);
+    }
+
+    const rank = (backend: Backend) => this.latency.get(`${backend}:${action}`)?.ewmaMs ?? Infinity;
+    // Stable sort keeps the default order among backends that were never measured
+    order.sort((a, b) => rank(a) - rank(b));
+    return { order, skipped };
+  }
+
+  private circuit(backend: Backend): BackendHealth {
+    let health = this.health.get(backend);
+    if (!health) {
+      health = { state: 'closed', consecutiveFailures: 0, probes: 0 };
+      this.health.set(backend, health);
+    }
+    if (health.state === 'open' && !this.probes[backend] && Date.now() >= (health.retryAt ?? 0)) {
+      // Without a probe the next real call is the trial
+      health.state = 'half-open';
+    }
+    return health;
+  }
+
+  private maybeProbe(backend: Backend, health: BackendHealth): void {
+    const probe = this.probes[backend];
+    if (!probe || this.probing.has(backend) || Date.now() < (health.retryAt ?? 0)) return;
+
+    this.probing.add(backend);
+    health.state = 'half-open';
+    health.probes++;
+    const start = Date.now();
+    probe()
+      .then(() => {
+        logger.info(`Backend ${backend} answered its probe after ${Date.now() - start}ms, closing circuit`);
+        this.close(health);
+      })
+      .catch(error => this.open(backend, health, error))
+      .finally(() => this.probing.delete(backend));
+  }
+
+  private recordSuccess(backend: Backend, action: string, ms: number, actionFailed = false): void {
+    const latency = this.actionLatency(backend, action);
+    latency.calls++;
+    if (actionFailed) latency.failures++;
+    latency.lastMs = Math.round(ms);
+    latency.ewmaMs = latency.ewmaMs === undefined ? ms : latency.ewmaMs + this.options.alpha * (ms - latency.ewmaMs);
+    this.close(this.circuit(backend));
+  }
+
+  private recordFailure(backend: Backend, action: string, ms: number, error: unknown): void {
+    const latency = this.actionLatency(backend, action);
+    latency.calls++;
+    latency.failures++;
+    latency.lastMs = Math.round(ms);
+
+    const health = this.circuit(backend);
+    health.consecutiveFailures++;
+    health.lastError = error instanceof Error ? error.message : String(error);
+    // A failed trial call, an unreachable backend or a streak of transport errors opens the circuit
+    const unreachable = UNREACHABLE_PATTERN.test(health.lastError);
+    if (health.state === 'half-open' || unreachable || health.consecutiveFailures >= this.options.failureThreshold) {
+      this.open(backend, health, error);
+    }
+  }
+
+  private open(backend: Backend, health: BackendHealth, error: unknown): void {
+    const now = Date.now();
+    const previous = health.openedAt && health.retryAt ? health.retryAt - health.openedAt : 0;
+    // Back off while the backend keeps failing its probes
+    const period = previous ? Math.min(previous * 2, this.options.maxOpenMs) : this.options.openMs;
+    if (health.state !== 'open') {
+      logger.warn(`Opening circuit for backend ${backend} for ${period}ms:`, error instanceof Error ? error.message : error);
+    }
+    health.state = 'open';
+    health.openedAt = now;
+    health.retryAt = now + period;
+    health.lastError = error instanceof Error ? error.message : String(error);
+  }
+
+  private close(health: BackendHealth): void {
+    health.state = 'closed';
+    health.consecutiveFailures = 0;
+    health.openedAt = undefined;
+    health.retryAt = undefined;
+  }
+
+  private actionLatency(backend: Backend, action: string): ActionLatency {
+    const key = `${backend}:${action}`;
+    let latency = this.latency.get(key);
+    if (!latency) {
+      latency = { calls: 0, failures: 0 };
+      this.latency.set(key, latency);
+    }
+    return latency;
+  }
+
+  private remember(decision: RoutingDecision): void {
+    this.recent.push(decision);
+    if (this.recent.length > this.options.recentSize) this.recent.shift();
+  }
+}
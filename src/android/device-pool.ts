@@ -0,0 +1,235 @@
+import { AndroidAutomation, listDevices } from './automation.js';
+import { BridgeOptions, UIAutomator2Bridge } from './uiautomator2-bridge.js';
+import { ScreenCacheStats } from './screen-cache.js';
+import { RouterStats } from './backend-router.js';
+import { logger } from '../utils/logger.js';
+
+export interface DevicePoolOptions {
+  idleTimeoutMs?: number; // Close a worker that has not been used for this long (0 disables eviction)
+  healthCheckIntervalMs?: number; // How often idle workers are pinged (0 disables health checks)
+  discoveryTtlMs?: number; // How long an `adb devices` result is reused
+  maxRespawns?: number; // Respawn attempts allowed per device within respawnWindowMs
+  respawnWindowMs?: number;
+  bridgeOptions?: BridgeOptions;
+  discover?: () => Promise<string[]>; // Device discovery, defaults to `adb devices`
+}
+
+export interface DeviceWorkerStatus {
+  serial: string;
+  running: boolean;
+  healthy: boolean;
+  lastUsed: number;
+  respawns: number;
+  screenCache: ScreenCacheStats;
+  routing: RouterStats;
+}
+
+interface PoolEntry {
+  serial: string;
+  bridge: UIAutomator2Bridge;
+  automation: AndroidAutomation;
+  lastUsed: number;
+  healthy: boolean;
+  respawnTimes: number[];
+  closing: boolean;
+}
+
+// Key used for the worker that lets uiautomator2 pick the device when nothing is discovered
+const DEFAULT_DEVICE = '';
+
+/**
+ * Keeps one warm Python bridge worker per device serial.
+ *
+ * Tools resolve their target with acquire(deviceSerial); an omitted serial
+ * maps to the first device `adb devices` reports. Workers are pinged in the
+ * background, respawned when their process exits, and closed after sitting
+ * idle for idleTimeoutMs.
+ */
+export class DevicePool {
+  private entries = new Map<string, PoolEntry>();
+  private discovered: string[] = [];
+  private discoveredAt = 0;
+  private timer: NodeJS.Timeout | null = null;
+  private options: Required<Omit<DevicePoolOptions, 'bridgeOptions'>> & { bridgeOptions: BridgeOptions };
+
+  constructor(options: DevicePoolOptions = {}) {
+    this.options = {
+      idleTimeoutMs: options.idleTimeoutMs ?? 10 * 60 * 1000,
+      healthCheckIntervalMs: options.healthCheckIntervalMs ?? 30 * 1000,
+      discoveryTtlMs: options.discoveryTtlMs ?? 5000,
+      maxRespawns: options.maxRespawns ?? 5,
+      respawnWindowMs: options.respawnWindowMs ?? 60 * 1000,
+      bridgeOptions: options.bridgeOptions ?? {},
+      discover: options.discover ?? listDevices,
+    };
+
+    const interval = Math.min(
+      this.options.healthCheckIntervalMs || Infinity,
+      this.options.idleTimeoutMs || Infinity
+    );
+    if (Number.isFinite(interval)) {
+      this.timer = setInterval(() => {
+        this.maintain().catch(error => logger.warn('Device pool maintenance failed', error));
+      }, interval);
+      this.timer.unref();
+    }
+  }
+
+  /**
+   * Serials of connected devices, cached for discoveryTtlMs.
+   */
+  async discover(force = false): Promise<string[]> {
+    if (!force && Date.now() - this.discoveredAt < this.options.discoveryTtlMs) {
+      return this.discovered;
+    }
+    try {
+      this.discovered = await this.options.discover();
+    } catch (error) {
+      logger.warn('Device discovery failed, using default device', error);
+      this.discovered = [];
+    }
+    this.discoveredAt = Date.now();
+    return this.discovered;
+  }
+
+  /**
+   * Serial a call for deviceSerial goes to: that device, or the first connected one when omitted.
+   */
+  async resolveSerial(deviceSerial?: string): Promise<string> {
+    return deviceSerial || (await this.discover())[0] || DEFAULT_DEVICE;
+  }
+
+  /**
+   * Automation bound to the given device, starting its worker if needed.
+   */
+  async acquire(deviceSerial?: string): Promise<AndroidAutomation> {
+    const serial = await this.resolveSerial(deviceSerial);
+    let entry = this.entries.get(serial);
+    if (!entry) {
+      entry = this.createEntry(serial);
+      this.entries.set(serial, entry);
+      logger.info(`Created bridge worker for device ${serial || 'default'}`);
+    }
+    entry.lastUsed = Date.now();
+    return entry.automation;
+  }
+
+  /**
+   * Starts workers for every discovered device so the first tool call on each is warm.
+   */
+  async warmAll(): Promise<string[]> {
+    const serials = await this.discover(true);
+    await Promise.all(serials.map(async serial => {
+      await this.acquire(serial);
+      try {
+        await this.entries.get(serial)?.bridge.initialize();
+      } catch (error) {
+        logger.warn(`Failed to prewarm device ${serial}`, error);
+      }
+    }));
+    return serials;
+  }
+
+  status(): DeviceWorkerStatus[] {
+    return Array.from(this.entries.values()).map(entry => ({
+      serial: entry.serial || 'default',
+      running: entry.bridge.running,
+      healthy: entry.healthy,
+      lastUsed: entry.lastUsed,
+      respawns: entry.respawnTimes.length,
+      screenCache: entry.automation.getCacheStats(),
+      routing: entry.automation.getRoutingStats(),
+    }));
+  }
+
+  async release(deviceSerial: string): Promise<void> {
+    const entry = this.entries.get(deviceSerial);
+    if (!entry) return;
+    entry.closing = true;
+    this.entries.delete(deviceSerial);
+    await entry.automation.close();
+  }
+
+  async closeAll(): Promise<void> {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+    await Promise.all(Array.from(this.entries.keys()).map(serial => this.release(serial)));
+  }
+
+  private createEntry(serial: string): PoolEntry {
+    const bridge = new UIAutomator2Bridge(serial || undefined, this.options.bridgeOptions);
+    const entry: PoolEntry = {
+      serial,
+      bridge,
+      automation: new AndroidAutomation(serial || undefined, bridge),
+      lastUsed: Date.now(),
+      healthy: true,
+      respawnTimes: [],
+      closing: false,
+    };
+    bridge.on('exit', (code: number | null) => this.respawn(entry, code));
+    return entry;
+  }
+
+  private respawn(entry: PoolEntry, code: number | null): void {
+    if (entry.closing || this.entries.get(entry.serial) !== entry) return;
+
+    const now = Date.now();
+    entry.respawnTimes = entry.respawnTimes.filter(t => now - t < this.options.respawnWindowMs);
+    if (entry.respawnTimes.length >= this.options.maxRespawns) {
+      // Crash loop: stop respawning in the background; the next acquire() retries on demand
+      logger.error(`Bridge worker for ${entry.serial || 'default'} keeps exiting (code ${code}), giving up respawn`);
+      entry.healthy = false;
+      return;
+    }
+    entry.respawnTimes.push(now);
+
+    logger.warn(`Bridge worker for ${entry.serial || 'default'} exited with code ${code}, respawning`);
+    entry.bridge.initialize()
+      .then(() => {
+        entry.healthy = true;
+      })
+      .catch(error => {
+        entry.healthy = false;
+        logger.error(`Failed to respawn bridge worker for ${entry.serial || 'default'}`, error);
+      });
+  }
+
+  private async maintain(): Promise<void> {
+    const now = Date.now();
+    const checks: Promise<void>[] = [];
+
+    for (const entry of Array.from(this.entries.values())) {
+      if (entry.bridge.busy) continue;
+
+      if (this.options.idleTimeoutMs && now - entry.lastUsed > this.options.idleTimeoutMs) {
+        logger.info(`Evicting idle bridge worker for ${entry.serial || 'default'}`);
+        checks.push(this.release(entry.serial));
+        continue;
+      }
+
+      if (this.options.healthCheckIntervalMs && entry.bridge.running) {
+        checks.push(this.checkHealth(entry));
+      }
+    }
+
+    await Promise.all(checks);
+  }
+
+  private async checkHealth(entry: PoolEntry): Promise<void> {
+    try {
+      const result = await entry.bridge.ping();
+      entry.healthy = !!result.success;
+    } catch (error) {
+      entry.healthy = false;
+    }
+
+    if (!entry.healthy && !entry.closing) {
+      // Restart the worker; the exit handler brings up a fresh process
+      logger.warn(`Health check failed for ${entry.serial || 'default'}, restarting worker`);
+      await entry.bridge.restart();
+    }
+  }
+}
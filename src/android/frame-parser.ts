@@ -0,0 +1,128 @@
+/**
+ * Incremental decoder for the Python bridge's stdout stream.
+ *
+ * The bridge writes one JSON object per line. A line whose object carries a
+ * numeric `binary` field is a header: exactly that many raw bytes follow the
+ * newline and are handed to the consumer as the frame payload (used to ship
+ * screenshot bytes without base64-encoding them inside JSON).
+ *
+ * Every byte is scanned once: chunks are kept as a list and only concatenated
+ * when a complete line or payload has arrived.
+ */
+
+const NEWLINE = 0x0a;
+
+export type FrameHandler = (message: any, payload?: Buffer) => void;
+export type FrameErrorHandler = (error: Error, raw: string) => void;
+
+export class FrameParser {
+  private chunks: Buffer[] = [];
+  private buffered = 0;
+  // Bytes at the front of `chunks` already known not to contain a newline
+  private scanned = 0;
+  private header: any = null;
+  private payloadLength = -1;
+
+  constructor(private onFrame: FrameHandler, private onError?: FrameErrorHandler) {}
+
+  push(chunk: Buffer): void {
+    if (chunk.length === 0) return;
+    this.chunks.push(chunk);
+    this.buffered += chunk.length;
+
+    while (true) {
+      if (this.payloadLength >= 0) {
+        if (this.buffered < this.payloadLength) return;
+        const payload = this.take(this.payloadLength);
+        const header = this.header;
+        this.header = null;
+        this.payloadLength = -1;
+        this.onFrame(header, payload);
+        continue;
+      }
+
+      const newline = this.findNewline();
+      if (newline === -1) return;
+
+      const line = this.take(newline + 1).toString('utf8', 0, newline).trim();
+      if (!line) continue;
+
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        this.onError?.(error instanceof Error ? error : new Error(String(error)), line);
+        continue;
+      }
+
+      if (message && typeof message.binary === 'number' && message.binary >= 0) {
+        this.header = message;
+        this.payloadLength = message.binary;
+        continue;
+      }
+      this.onFrame(message);
+    }
+  }
+
+  /** Number of bytes received but not yet emitted as part of a frame */
+  get pendingBytes(): number {
+    return this.buffered;
+  }
+
+  reset(): void {
+    this.chunks = [];
+    this.buffered = 0;
+    this.scanned = 0;
+    this.header = null;
+    this.payloadLength = -1;
+  }
+
+  private findNewline(): number {
+    let offset = 0;
+    for (const chunk of this.chunks) {
+      if (offset + chunk.length > this.scanned) {
+        const start = Math.max(0, this.scanned - offset);
+        const index = chunk.indexOf(NEWLINE, start);
+        if (index !== -1) return offset + index;
+      }
+      offset += chunk.length;
+    }
+    this.scanned = this.buffered;
+    return -1;
+  }
+
+  private take(length: number): Buffer {
+    // An empty payload may arrive with nothing buffered after its header
+    if (length === 0) return Buffer.alloc(0);
+    let result: Buffer;
+    const first = this.chunks[0];
+    if (first.length >= length) {
+      result = first.subarray(0, length);
+      if (first.length === length) {
+        this.chunks.shift();
+      } else {
+        this.chunks[0] = first.subarray(length);
+      }
+    } else {
+      const parts: Buffer[] = [];
+      let remaining = length;
+      while (remaining > 0) {
+        const chunk = this.chunks[0];
+        if (chunk.length <= remaining) {
+          parts.push(chunk);
+          this.chunks.shift();
+          remaining -= chunk.length;
+        } else {
+          parts.push(chunk.subarray(0, remaining));
+          this.chunks[0] = chunk.subarray(remaining);
+          remaining = 0;
+        }
+      }
+      result = Buffer.concat(parts, length);
+    }
+
+    this.buffered -= length;
+    this.scanned = 0;
+    return result;
+  }
+}
@@ -0,0 +1,94 @@
+import type { ScreenInfo } from './automation.js';
+import { runDetached } from '../utils/request-context.js';
+
+export interface ScreenCacheStats {
+  hits: number;
+  misses: number;
+  invalidations: number;
+  staticHits: number;
+  staticMisses: number;
+}
+
+/**
+ * Per-device cache of what is on screen.
+ *
+ * The parsed hierarchy is kept for ttlMs and dropped whenever an action that
+ * can change the UI starts or finishes. Data that does not change during a
+ * session (display size, device_info) lives in a separate static map that is
+ * never invalidated.
+ */
+export class ScreenStateCache {
+  private screen: ScreenInfo | null = null;
+  private screenAt = 0;
+  // Bumped by every invalidation so a dump started before a mutation is never stored after it
+  private generation = 0;
+  private pending: Promise<ScreenInfo> | null = null;
+  private staticData = new Map<string, unknown>();
+  private counters: ScreenCacheStats = { hits: 0, misses: 0, invalidations: 0, staticHits: 0, staticMisses: 0 };
+
+  constructor(private ttlMs = 2000) {}
+
+  /**
+   * Cached ScreenInfo if still fresh, otherwise runs loader. Concurrent misses share one load.
+   */
+  async getScreen(loader: () => Promise<ScreenInfo>): Promise<ScreenInfo> {
+    if (this.screen && Date.now() - this.screenAt < this.ttlMs) {
+      this.counters.hits++;
+      return this.screen;
+    }
+    if (this.pending) {
+      this.counters.hits++;
+      return this.pending;
+    }
+
+    this.counters.misses++;
+    const generation = this.generation;
+    // Other callers may join this load, so the request that started it giving up must not cancel it
+    const load = runDetached(loader)
+      .then(info => {
+        if (generation === this.generation) {
+          this.screen = info;
+          this.screenAt = Date.now();
+        }
+        return info;
+      })
+      .finally(() => {
+        if (this.pending === load) this.pending = null;
+      });
+    this.pending = load;
+    return load;
+  }
+
+  /**
+   * Session-lifetime value for key, loading it on first use.
+   */
+  async getStatic<T>(key: string, loader: () => Promise<T>): Promise<T> {
+    if (this.staticData.has(key)) {
+      this.counters.staticHits++;
+      return this.staticData.get(key) as T;
+    }
+    this.counters.staticMisses++;
+    const value = await loader();
+    this.staticData.set(key, value);
+    return value;
+  }
+
+  peekStatic<T>(key: string): T | undefined {
+    return this.staticData.get(key) as T | undefined;
+  }
+
+  setStatic<T>(key: string, value: T): void {
+    this.staticData.set(key, value);
+  }
+
+  invalidate(): void {
+    this.generation++;
+    this.screen = null;
+    this.pending = null;
+    this.counters.invalidations++;
+  }
+
+  stats(): ScreenCacheStats {
+    return { ...this.counters };
+  }
+}
@@ -0,0 +1,194 @@
+import type { ScreenInfo, UIElement } from './automation.js';
+import type { Bounds, UINode } from './ui-parser.js';
+
+export interface ComponentsQuery {
+  visibleOnly?: boolean; // Drop invisible, zero-area, offscreen and fully occluded elements
+  interactiveOnly?: boolean; // Keep only clickable, scrollable or focusable elements
+  offset?: number; // First matching element to return
+  maxElements?: number; // Page size
+}
+
+export interface DroppedCounts {
+  invisible: number; // visible-to-user="false" or zero area
+  offscreen: number; // Entirely outside the display
+  occluded: number; // Fully covered by a clickable node drawn later
+  nonInteractive: number; // Left out by interactiveOnly
+}
+
+export interface ComponentsPage {
+  elements: UIElement[];
+  total: number; // Elements matching the query, before paging
+  offset: number;
+  nextOffset?: number; // Offset of the next page, when there is one
+  dropped: DroppedCounts;
+}
+
+// Bits of ColumnarComponents.columns.flags
+export const FLAG_CLICKABLE = 1;
+export const FLAG_DISABLED = 2;
+export const FLAG_ID_PREFIXED = 4; // The resource id lost the idPrefix in front of it
+
+/**
+ * android_get_components output with one array per field instead of one
+ * object per element. Class names and resource ids go through a string
+ * table, resource ids lose the foreground app's "<package>:id/" prefix
+ * (marked with FLAG_ID_PREFIXED) and bounds are packed four integers per element.
+ */
+export interface ColumnarComponents {
+  format: 'columnar';
+  width: number;
+  height: number;
+  currentApp: string;
+  idPrefix: string; // Prepend to the resource ids of elements flagged FLAG_ID_PREFIXED
+  strings: string[];
+  total: number;
+  offset: number;
+  nextOffset?: number;
+  dropped: DroppedCounts;
+  columns: {
+    className: number[]; // Index into strings
+    resourceId: number[]; // Index into strings, -1 when the element has none
+    text: string[];
+    description: string[];
+    bounds: number[]; // x1, y1, x2, y2 for each element in turn
+    flags: number[]; // FLAG_CLICKABLE | FLAG_DISABLED | FLAG_ID_PREFIXED
+  };
+}
+
+function contains(outer: Bounds, inner: Bounds): boolean {
+  return outer[0] <= inner[0] && outer[1] <= inner[1] && outer[2] >= inner[2] && outer[3] >= inner[3];
+}
+
+/**
+ * For every node, the index of the last node in its subtree. Descendants
+ * follow their ancestor in document order, so a subtree is one index range.
+ */
+function subtreeEnds(nodes: UINode[]): Int32Array {
+  const ends = new Int32Array(nodes.length);
+  for (let i = nodes.length - 1; i >= 0; i--) {
+    if (ends[i] < i) ends[i] = i;
+    const parent = nodes[i].parent;
+    if (parent >= 0 && ends[parent] < ends[i]) ends[parent] = ends[i];
+  }
+  return ends;
+}
+
+/**
+ * Elements of screenInfo matching query, one page of them. Visibility and
+ * occlusion need the tree behind the snapshot; without it (HTTP tier) only
+ * the bounds checks apply.
+ */
+export function selectComponents(screenInfo: ScreenInfo, query: ComponentsQuery = {}): ComponentsPage {
+  const dropped: DroppedCounts = { invisible: 0, offscreen: 0, occluded: 0, nonInteractive: 0 };
+  const { width, height } = screenInfo;
+  const nodes = screenInfo.elementNodes;
+  const tree = screenInfo.tree;
+
+  // A clickable node takes the touches meant for anything drawn before it underneath
+  let occluders: UINode[] = [];
+  let ends: Int32Array | null = null;
+  if (query.visibleOnly && tree && nodes) {
+    occluders = tree.nodes.filter(node => node.clickable && node.visible &&
+      node.bounds[2] > node.bounds[0] && node.bounds[3] > node.bounds[1]);
+    ends = subtreeEnds(tree.nodes);
+  }
+
+  const matching: UIElement[] = [];
+  screenInfo.elements.forEach((element, position) => {
+    const node = nodes?.[position];
+    if (query.visibleOnly) {
+      const [x1, y1, x2, y2] = element.bounds;
+      if ((node && !node.visible) || x2 <= x1 || y2 <= y1) {
+        dropped.invisible++;
+        return;
+      }
+      if (x2 <= 0 || y2 <= 0 || x1 >= width || y1 >= height) {
+        dropped.offscreen++;
+        return;
+      }
+      // Occluders outside the node's own subtree and later in document order are drawn on top of it
+      if (node && ends && occluders.some(other => other.index > ends![node.index] && contains(other.bounds, node.bounds))) {
+        dropped.occluded++;
+        return;
+      }
+    }
+    if (query.interactiveOnly && !(element.clickable || node?.scrollable || node?.focusable)) {
+      dropped.nonInteractive++;
+      return;
+    }
+    matching.push(element);
+  });
+
+  const offset = Math.max(0, Math.floor(query.offset ?? 0));
+  const end = query.maxElements !== undefined ? offset + Math.max(0, Math.floor(query.maxElements)) : matching.length;
+  const page: ComponentsPage = { elements: matching.slice(offset, end), total: matching.length, offset, dropped };
+  if (end < matching.length) page.nextOffset = end;
+  return page;
+}
+
+export function encodeColumnar(screenInfo: ScreenInfo, page: ComponentsPage): ColumnarComponents {
+  const idPrefix = `${screenInfo.currentApp}:id/`;
+  const strings: string[] = [];
+  const stringIndex = new Map<string, number>();
+  const intern = (value: string): number => {
+    let index = stringIndex.get(value);
+    if (index === undefined) {
+      index = strings.length;
+      strings.push(value);
+      stringIndex.set(value, index);
+    }
+    return index;
+  };
+
+  const columns: ColumnarComponents['columns'] = {
+    className: [], resourceId: [], text: [], description: [], bounds: [], flags: [],
+  };
+  for (const element of page.elements) {
+    const id = element.resourceId;
+    // Ids without the prefix (Compose test tags, other apps' ids) are kept whole and not flagged
+    const prefixed = !!id && id.startsWith(idPrefix);
+    columns.className.push(intern(element.className));
+    columns.resourceId.push(id ? intern(prefixed ? id.slice(idPrefix.length) : id) : -1);
+    columns.text.push(element.text ?? '');
+    columns.description.push(element.description);
+    columns.bounds.push(...element.bounds);
+    columns.flags.push((element.clickable ? FLAG_CLICKABLE : 0) | (element.enabled === false ? FLAG_DISABLED : 0) |
+      (prefixed ? FLAG_ID_PREFIXED : 0));
+  }
+
+  const compact: ColumnarComponents = {
+    format: 'columnar',
+    width: screenInfo.width,
+    height: screenInfo.height,
+    currentApp: screenInfo.currentApp,
+    idPrefix,
+    strings,
+    total: page.total,
+    offset: page.offset,
+    dropped: page.dropped,
+    columns,
+  };
+  if (page.nextOffset !== undefined) compact.nextOffset = page.nextOffset;
+  return compact;
+}
+
+/**
+ * Elements back from columnar output, as android_get_components returns them in JSON.
+ */
+export function decodeColumnar(compact: ColumnarComponents): UIElement[] {
+  const { strings, idPrefix, columns } = compact;
+  return columns.className.map((classIndex, i) => {
+    const idIndex = columns.resourceId[i];
+    const id = idIndex === -1 ? '' : strings[idIndex];
+    const element: UIElement = {
+      description: columns.description[i],
+      resourceId: columns.flags[i] & FLAG_ID_PREFIXED ? idPrefix + id : id,
+      className: strings[classIndex],
+      bounds: columns.bounds.slice(i * 4, i * 4 + 4) as [number, number, number, number],
+    };
+    if (columns.text[i]) element.text = columns.text[i];
+    if (columns.flags[i] & FLAG_CLICKABLE) element.clickable = true;
+    if (columns.flags[i] & FLAG_DISABLED) element.enabled = false;
+    return element;
+  });
+}
@@ -0,0 +1,120 @@
+import type { ScreenInfo, UIElement } from './automation.js';
+
+export interface KeyedElement extends UIElement {
+  id: number; // Stays the same for as long as the element's key is on screen
+}
+
+export interface ScreenSnapshot {
+  version: number;
+  full: true;
+  width: number;
+  height: number;
+  currentApp: string;
+  elements: KeyedElement[];
+}
+
+export interface ScreenDiff {
+  version: number;
+  baseVersion: number;
+  full: false;
+  currentApp?: string; // Only when the foreground app changed
+  added: KeyedElement[];
+  removed: number[];
+  changed: KeyedElement[];
+}
+
+/**
+ * Stable identity of an element across dumps: resource-id, class, position in
+ * the tree and bounds. Content (text, description, flags) is left out so an
+ * element whose label changes shows up as changed rather than replaced.
+ */
+function elementKey(element: UIElement, screenInfo: ScreenInfo, position: number): string {
+  const node = screenInfo.elementNodes?.[position];
+  const path = node && screenInfo.tree ? screenInfo.tree.childPath(node) : '';
+  return `${element.resourceId}|${element.className}|${path}|${element.bounds.join(',')}`;
+}
+
+function sameContent(a: UIElement, b: UIElement): boolean {
+  return a.text === b.text &&
+    a.description === b.description &&
+    a.clickable === b.clickable &&
+    a.enabled === b.enabled;
+}
+
+/**
+ * Last android_get_components snapshot of one device, used to answer with
+ * what changed since the version the caller already has.
+ *
+ * Only the latest snapshot is kept. A caller asking for a diff against any
+ * other version, or not passing one, gets a full snapshot instead. Versions
+ * only ever increase, so a stale version can never match a newer snapshot.
+ */
+export class ScreenSnapshotTracker {
+  private version = 0;
+  private currentApp = '';
+  private elements = new Map<string, KeyedElement>();
+  private nextId = 1;
+
+  /**
+   * Records screenInfo as the latest snapshot and describes it relative to
+   * sinceVersion. The version only moves when something actually changed.
+   */
+  update(screenInfo: ScreenInfo, sinceVersion?: number): ScreenSnapshot | ScreenDiff {
+    const baseVersion = this.version;
+    const canDiff = sinceVersion !== undefined && sinceVersion === baseVersion && baseVersion > 0;
+
+    const previous = this.elements;
+    const current = new Map<string, KeyedElement>();
+    const added: KeyedElement[] = [];
+    const changed: KeyedElement[] = [];
+
+    screenInfo.elements.forEach((element, position) => {
+      const baseKey = elementKey(element, screenInfo, position);
+      let key = baseKey;
+      // Identical siblings at the same spot are rare, but must not collapse into one entry
+      for (let duplicate = 1; current.has(key); duplicate++) {
+        key = `${baseKey}#${duplicate}`;
+      }
+
+      const before = previous.get(key);
+      const keyed: KeyedElement = { id: before ? before.id : this.nextId++, ...element };
+      current.set(key, keyed);
+      if (!before) {
+        added.push(keyed);
+      } else if (!sameContent(before, element)) {
+        changed.push(keyed);
+      }
+    });
+
+    const removed: number[] = [];
+    for (const [key, element] of previous) {
+      if (!current.has(key)) removed.push(element.id);
+    }
+
+    const appChanged = screenInfo.currentApp !== this.currentApp;
+    if (this.version === 0 || appChanged || added.length > 0 || removed.length > 0 || changed.length > 0) {
+      this.version++;
+    }
+    this.elements = current;
+    this.currentApp = screenInfo.currentApp;
+
+    if (!canDiff) {
+      return {
+        version: this.version,
+        full: true,
+        width: screenInfo.width,
+        height: screenInfo.height,
+        currentApp: screenInfo.currentApp,
+        elements: Array.from(current.values()),
+      };
+    }
+
+    const diff: ScreenDiff = { version: this.version, baseVersion, full: false, added, removed, changed };
+    if (appChanged) diff.currentApp = screenInfo.currentApp;
+    return diff;
+  }
+
+  get currentVersion(): number {
+    return this.version;
+  }
+}
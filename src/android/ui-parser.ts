@@ -0,0 +1,348 @@
+/**
+ * Single-pass streaming parser for uiautomator hierarchy dumps.
+ *
+ * Feeds on string chunks (a whole dump or pieces of it as they arrive), walks
+ * the tags once with indexOf, and builds a compact tree with parent/child
+ * links. Lookup indexes by resource-id, text, content-desc and class are
+ * filled in during the same pass.
+ */
+
+export type Bounds = [number, number, number, number]; // [x1, y1, x2, y2]
+
+export interface UINode {
+  index: number; // Document order, also the position in UITree.nodes
+  parent: number; // -1 for top-level nodes
+  children: number[];
+  depth: number;
+  text: string;
+  description: string;
+  resourceId: string;
+  className: string;
+  packageName: string;
+  bounds: Bounds;
+  clickable: boolean;
+  enabled: boolean;
+  focusable: boolean;
+  scrollable: boolean;
+  selected: boolean;
+  checked: boolean;
+  visible: boolean; // visible-to-user as reported by the accessibility service
+}
+
+export interface UIQuery {
+  text?: string;
+  description?: string;
+  resourceId?: string;
+  className?: string;
+}
+
+const ENTITY_PATTERN = /&(#x[0-9a-fA-F]+|#\d+|amp|lt|gt|quot|apos);/g;
+const NAMED_ENTITIES: Record<string, string> = { amp: '&', lt: '<', gt: '>', quot: '"', apos: "'" };
+
+function decodeEntities(value: string): string {
+  if (value.indexOf('&') === -1) return value;
+  return value.replace(ENTITY_PATTERN, (_, entity: string) => {
+    if (entity[0] === '#') {
+      const code = entity[1] === 'x' ? parseInt(entity.slice(2), 16) : parseInt(entity.slice(1), 10);
+      return String.fromCodePoint(code);
+    }
+    return NAMED_ENTITIES[entity];
+  });
+}
+
+function parseBounds(value: string): Bounds {
+  // "[x1,y1][x2,y2]"
+  const c1 = value.indexOf(',');
+  const mid = value.indexOf('][', c1);
+  const c2 = value.indexOf(',', mid);
+  if (c1 === -1 || mid === -1 || c2 === -1) return [0, 0, 0, 0];
+  return [
+    parseInt(value.slice(1, c1), 10),
+    parseInt(value.slice(c1 + 1, mid), 10),
+    parseInt(value.slice(mid + 2, c2), 10),
+    parseInt(value.slice(c2 + 1, value.length - 1), 10),
+  ];
+}
+
+function addToIndex(index: Map<string, number[]>, key: string, nodeIndex: number): void {
+  if (!key) return;
+  const list = index.get(key);
+  if (list) {
+    list.push(nodeIndex);
+  } else {
+    index.set(key, [nodeIndex]);
+  }
+}
+
+export class UITree {
+  readonly nodes: UINode[] = [];
+  readonly roots: number[] = [];
+  readonly byResourceId = new Map<string, number[]>();
+  readonly byText = new Map<string, number[]>();
+  readonly byDescription = new Map<string, number[]>();
+  readonly byClass = new Map<string, number[]>();
+
+  /**
+   * First node in document order matching any of the given criteria.
+   * Exact values are answered from the indexes; substring matches only scan
+   * the distinct index keys, not every node.
+   */
+  find(query: UIQuery): UINode | null {
+    let best = Infinity;
+    const consider = (indexes: number[] | undefined) => {
+      if (indexes && indexes[0] < best) best = indexes[0];
+    };
+
+    if (query.text) {
+      consider(this.lookup(this.byText, query.text));
+      consider(this.lookup(this.byDescription, query.text));
+    }
+    if (query.description) consider(this.lookup(this.byDescription, query.description));
+    if (query.resourceId) consider(this.lookup(this.byResourceId, query.resourceId));
+    if (query.className) consider(this.lookup(this.byClass, query.className));
+
+    return best === Infinity ? null : this.nodes[best];
+  }
+
+  /**
+   * Node indexes for an exact key, or for every key containing it when there is no exact match.
+   */
+  lookup(index: Map<string, number[]>, value: string): number[] | undefined {
+    const exact = index.get(value);
+    if (exact) return exact;
+
+    let matches: number[] | undefined;
+    for (const [key, indexes] of index) {
+      if (key.includes(value)) {
+        matches = matches ? matches.concat(indexes) : indexes.slice();
+      }
+    }
+    return matches?.sort((a, b) => a - b);
+  }
+
+  /**
+   * Position of node among its siblings at each level, e.g. "0.2.1". Unlike
+   * document indexes this does not shift when an unrelated subtree grows.
+   */
+  childPath(node: UINode): string {
+    const ordinals: number[] = [];
+    for (let current: UINode | undefined = node; current; current = this.nodes[current.parent]) {
+      const siblings = current.parent === -1 ? this.roots : this.nodes[current.parent].children;
+      ordinals.push(siblings.indexOf(current.index));
+    }
+    return ordinals.reverse().join('.');
+  }
+
+  path(node: UINode): number[] {
+    const path: number[] = [];
+    for (let current: UINode | undefined = node; current; current = this.nodes[current.parent]) {
+      path.push(current.index);
+    }
+    return path.reverse();
+  }
+}
+
+export class UIHierarchyParser {
+  private tree = new UITree();
+  private stack: number[] = [];
+  private tail = '';
+
+  write(chunk: string): this {
+    const data = this.tail ? this.tail + chunk : chunk;
+    let pos = 0;
+
+    while (true) {
+      const start = data.indexOf('<', pos);
+      if (start === -1) {
+        this.tail = '';
+        return this;
+      }
+
+      // Comments and declarations can contain '>' so find their real terminator
+      let end: number;
+      if (data.startsWith('<!--', start)) {
+        end = data.indexOf('-->', start + 4);
+        if (end !== -1) end += 2;
+      } else {
+        end = this.findTagEnd(data, start + 1);
+      }
+      if (end === -1) {
+        // Incomplete tag: keep it for the next chunk
+        this.tail = data.slice(start);
+        return this;
+      }
+
+      this.handleTag(data, start, end);
+      pos = end + 1;
+    }
+  }
+
+  end(): UITree {
+    const tree = this.tree;
+    this.tree = new UITree();
+    this.stack = [];
+    this.tail = '';
+    return tree;
+  }
+
+  private findTagEnd(data: string, from: number): number {
+    // uiautomator escapes '>' inside attribute values, so the first '>' closes the tag
+    return data.indexOf('>', from);
+  }
+
+  private handleTag(data: string, start: number, end: number): void {
+    const second = data.charCodeAt(start + 1);
+    if (second === 63 /* ? */ || second === 33 /* ! */) return;
+
+    if (second === 47 /* / */) {
+      if (data.startsWith('node', start + 2)) this.stack.pop();
+      return;
+    }
+
+    if (!data.startsWith('node', start + 1)) return; // <hierarchy> and anything unknown
+
+    const selfClosing = data.charCodeAt(end - 1) === 47;
+    const node = this.createNode(data, start + 5, selfClosing ? end - 1 : end);
+    if (!selfClosing) this.stack.push(node.index);
+  }
+
+  private createNode(data: string, from: number, to: number): UINode {
+    const tree = this.tree;
+    const parent = this.stack.length > 0 ? this.stack[this.stack.length - 1] : -1;
+    const node: UINode = {
+      index: tree.nodes.length,
+      parent,
+      children: [],
+      depth: this.stack.length,
+      text: '',
+      description: '',
+      resourceId: '',
+      className: '',
+      packageName: '',
+      bounds: [0, 0, 0, 0],
+      clickable: false,
+      enabled: true,
+      focusable: false,
+      scrollable: false,
+      selected: false,
+      checked: false,
+      visible: true,
+    };
+
+    let i = from;
+    while (i < to) {
+      const eq = data.indexOf('="', i);
+      if (eq === -1 || eq >= to) break;
+      const valueEnd = data.indexOf('"', eq + 2);
+      if (valueEnd === -1 || valueEnd > to) break;
+      let nameStart = eq - 1;
+      while (nameStart > i && data.charCodeAt(nameStart - 1) > 32) nameStart--;
+      const name = data.slice(nameStart, eq);
+      const raw = data.slice(eq + 2, valueEnd);
+      i = valueEnd + 1;
+
+      switch (name) {
+        case 'text': node.text = decodeEntities(raw); break;
+        case 'content-desc': node.description = decodeEntities(raw); break;
+        case 'resource-id': node.resourceId = raw; break;
+        case 'class': node.className = raw; break;
+        case 'package': node.packageName = raw; break;
+        case 'bounds': node.bounds = parseBounds(raw); break;
+        case 'clickable': node.clickable = raw === 'true'; break;
+        case 'enabled': node.enabled = raw === 'true'; break;
+        case 'focusable': node.focusable = raw === 'true'; break;
+        case 'scrollable': node.scrollable = raw === 'true'; break;
+        case 'selected': node.selected = raw === 'true'; break;
+        case 'checked': node.checked = raw === 'true'; break;
+        case 'visible-to-user': node.visible = raw === 'true'; break;
+      }
+    }
+
+    tree.nodes.push(node);
+    if (parent === -1) {
+      tree.roots.push(node.index);
+    } else {
+      tree.nodes[parent].children.push(node.index);
+    }
+    addToIndex(tree.byResourceId, node.resourceId, node.index);
+    addToIndex(tree.byText, node.text, node.index);
+    addToIndex(tree.byDescription, node.description, node.index);
+    addToIndex(tree.byClass, node.className, node.index);
+    return node;
+  }
+}
+
+export function parseHierarchy(xml: string): UITree {
+  return new UIHierarchyParser().write(xml).end();
+}
+
+// Hierarchy attribute -> node value, for the XPath subset below
+const XPATH_ATTRIBUTES: Record<string, (node: UINode) => string> = {
+  'text': node => node.text,
+  'content-desc': node => node.description,
+  'resource-id': node => node.resourceId,
+  'class': node => node.className,
+  'package': node => node.packageName,
+  'clickable': node => String(node.clickable),
+  'enabled': node => String(node.enabled),
+  'focusable': node => String(node.focusable),
+  'scrollable': node => String(node.scrollable),
+  'selected': node => String(node.selected),
+  'checked': node => String(node.checked),
+};
+
+const XPATH_STEP_PATTERN = /^\/\/([\w.$-]+|\*)(?:\[(.+)\])?$/;
+const XPATH_EQUALS_PATTERN = /^@([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')$/;
+const XPATH_FUNCTION_PATTERN = /^(contains|starts-with)\(\s*@([\w-]+)\s*,\s*(?:"([^"]*)"|'([^']*)')\s*\)$/;
+
+/**
+ * Nodes matching xpath, for the forms the uiautomator2 xpath plugin is
+ * mostly used with: its shorthands (@resource-id, %text%, text%, %text,
+ * ^regex, plain text) and a single //Class or //* step whose predicate is
+ * @attr="value", contains(@attr, "value") or starts-with(...) joined by
+ * "and". Node names are class names, as in the plugin. Returns null for
+ * anything else.
+ */
+export function selectByXPath(tree: UITree, xpath: string): UINode[] | null {
+  let test: (node: UINode) => boolean;
+  if (xpath.startsWith('@')) {
+    const id = xpath.slice(1);
+    test = node => node.resourceId === id;
+  } else if (xpath.startsWith('^')) {
+    const pattern = new RegExp(xpath);
+    test = node => pattern.test(node.text);
+  } else if (xpath.length > 1 && xpath.startsWith('%') && xpath.endsWith('%')) {
+    const part = xpath.slice(1, -1);
+    test = node => node.text.includes(part);
+  } else if (xpath.startsWith('%')) {
+    const suffix = xpath.slice(1);
+    test = node => node.text.endsWith(suffix);
+  } else if (!xpath.startsWith('/') && !xpath.startsWith('(') && xpath.endsWith('%')) {
+    const prefix = xpath.slice(0, -1);
+    test = node => node.text.startsWith(prefix);
+  } else if (!xpath.startsWith('/') && !xpath.startsWith('(')) {
+    test = node => node.text === xpath;
+  } else {
+    const step = XPATH_STEP_PATTERN.exec(xpath.trim());
+    if (!step) return null;
+    const [, name, predicate] = step;
+    const tests: ((node: UINode) => boolean)[] = [];
+    if (name !== '*') tests.push(node => node.className === name);
+    for (const clause of predicate ? predicate.split(/\s+and\s+/) : []) {
+      const equals = XPATH_EQUALS_PATTERN.exec(clause.trim());
+      const call = equals ? null : XPATH_FUNCTION_PATTERN.exec(clause.trim());
+      const attribute = equals ? equals[1] : call?.[2];
+      const read = attribute ? XPATH_ATTRIBUTES[attribute] : undefined;
+      if (!read) return null;
+      if (equals) {
+        const value = equals[2] ?? equals[3];
+        tests.push(node => read(node) === value);
+      } else {
+        const value = call![3] ?? call![4];
+        tests.push(call![1] === 'contains' ? node => read(node).includes(value) : node => read(node).startsWith(value));
+      }
+    }
+    test = node => tests.every(t => t(node));
+  }
+  return tree.nodes.filter(test);
+}
@@ -1,19 +1,27 @@
 import { spawn, ChildProcess } from 'child_process';
+import { EventEmitter } from 'events';
 import { join } from 'path';
 import { fileURLToPath } from 'url';
 import { dirname } from 'path';
+import { performance } from 'perf_hooks';
+import { FrameParser } from './frame-parser.js';
+import { metrics } from '../utils/metrics.js';
+import { currentRequest } from '../utils/request-context.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
 export interface UIAutomator2Command {
+  id: number;
   action: string;
   args: Record<string, any>;
 }
 
 export interface UIAutomator2Response {
+  id?: number;
   success?: boolean;
   error?: string;
+  transport?: boolean; // The error means the device or its uiautomator2 server could not be reached
   data?: any;
   found?: boolean;
   element?: {
@@ -25,96 +33,184 @@ export interface UIAutomator2Response {
     clickable: boolean;
     enabled: boolean;
   };
+  selector?: number; // Rank of the selector that produced element, for find_any
+  matches?: Array<NonNullable<UIAutomator2Response['element']> & { selector: number }>;
   message?: string;
+  binary?: number; // Length of the raw payload that followed the JSON header, if any
+  payload?: Buffer;
+  timing?: Record<string, number>; // Python-side phases in ms: execMs, queueMs, serializeMs, captureMs, encodeMs, …
+  event?: 'ready'; // Unsolicited frame the worker sends once it has connected to the device
 }
 
-export class UIAutomator2Bridge {
+export interface BridgeOptions {
+  pythonPath?: string; // Python executable (default: python)
+  env?: NodeJS.ProcessEnv; // Extra environment for the worker, e.g. PYTHONPATH for a fake device
+}
+
+// Extra time a wait command gets beyond its own timeout for the final poll and the reply
+const WAIT_RESPONSE_MARGIN_MS = 5000;
+// How long a new worker gets to import uiautomator2, connect and send its ready frame
+const READY_TIMEOUT_MS = 30000;
+
+export interface ScreenshotOptions {
+  imageFormat?: 'jpeg' | 'webp' | 'png'; // Encoding of the returned image (default: jpeg)
+  maxWidth?: number; // Scale down to fit, keeping the aspect ratio
+  maxHeight?: number;
+  maxBytes?: number; // Byte budget for lossy formats
+  quality?: number; // Fixed quality instead of one derived from maxBytes
+  region?: [number, number, number, number]; // Crop [x1, y1, x2, y2] before encoding
+  changedSince?: boolean; // Compare with the previous screenshot and only return what changed
+}
+
+export interface FindImageOptions {
+  template?: string; // Path of the template image, readable by the Python worker
+  templateData?: string; // Base64 image data instead of a path
+  region?: [number, number, number, number]; // Only search [x1, y1, x2, y2]
+  threshold?: number; // Lowest NCC score, 0-1, that counts as a match (default: 0.8)
+  scales?: number[]; // Template sizes to try, relative to the image (default: 0.5 to 2)
+  click?: boolean; // Tap the centre of the match
+}
+
+export interface BatchStep {
+  action: string; // Bridge action, e.g. element_click, input_text, press_key, wait_for_element
+  args?: Record<string, any>; // Passed to the action unchanged; durations and timeouts are in seconds
+  when?: Record<string, any>; // Only run if an element matches this selector
+  unless?: Record<string, any>; // Only run if no element matches this selector
+  optional?: boolean; // Keep going if this step fails
+}
+
+/**
+ * Records a command's round trip and the phases the Python side reported.
+ * transport is what neither side measured itself: pipes, framing and JSON parsing.
+ */
+function recordTimings(action: string, roundtripMs: number, timing?: Record<string, number>): void {
+  metrics.record({ action, backend: 'python', phase: 'roundtrip' }, roundtripMs);
+  if (!timing) return;
+  for (const [key, ms] of Object.entries(timing)) {
+    if (key.endsWith('Ms') && typeof ms === 'number') {
+      metrics.record({ action, backend: 'python', phase: key.slice(0, -2) }, ms);
+    }
+  }
+  const measured = (timing.queueMs ?? 0) + (timing.execMs ?? 0) + (timing.serializeMs ?? 0);
+  metrics.record({ action, backend: 'python', phase: 'transport' }, Math.max(0, roundtripMs - measured));
+}
+
+/**
+ * One Python worker process bound to a single device.
+ *
+ * Emits 'exit' (code) when the worker process goes away so owners such as
+ * DevicePool can respawn it.
+ */
+export class UIAutomator2Bridge extends EventEmitter {
   private pythonProcess: ChildProcess | null = null;
   private isInitialized = false;
   private responseCallbacks = new Map<number, (response: UIAutomator2Response) => void>();
   private commandId = 0;
-  private responseBuffer = '';
+  private frameParser = new FrameParser(
+    (message, payload) => this.handleResponse(payload ? { ...message, payload } : message),
+    (error, raw) => {
+      console.error('Failed to parse Python response:', raw.substring(0, 200) + '...');
+      console.error('Parse error:', error);
+    }
+  );
+  private initPromise: Promise<void> | null = null;
+  private onReady: ((frame: UIAutomator2Response) => void) | null = null;
+  private readyInfo?: Record<string, any>;
+
+  constructor(private deviceSerial?: string, private options: BridgeOptions = {}) {
+    super();
+  }
 
-  constructor(private deviceSerial?: string) {}
+  get serial(): string | undefined {
+    return this.deviceSerial;
+  }
+
+  /** Device info the worker sent with its ready frame, if it has started */
+  get deviceInfo(): Record<string, any> | undefined {
+    return this.readyInfo;
+  }
+
+  get running(): boolean {
+    return this.pythonProcess !== null;
+  }
+
+  /** True while the worker is starting or has commands awaiting a response */
+  get busy(): boolean {
+    return this.initPromise !== null || this.responseCallbacks.size > 0;
+  }
 
   async initialize(): Promise<void> {
     if (this.isInitialized) return;
+    // Concurrent callers share a single spawn instead of racing to start several processes
+    if (!this.initPromise) {
+      this.initPromise = this.startProcess().finally(() => {
+        this.initPromise = null;
+      });
+    }
+    return this.initPromise;
+  }
 
+  private startProcess(): Promise<void> {
     const pythonScript = join(__dirname, '..', '..', 'src', 'python', 'uiautomator2_bridge.py');
     
     return new Promise((resolve, reject) => {
       try {
-        this.pythonProcess = spawn('python', [pythonScript], {
-          stdio: ['pipe', 'pipe', 'pipe']
+        const scriptArgs = this.deviceSerial ? [pythonScript, '--serial', this.deviceSerial] : [pythonScript];
+        this.pythonProcess = spawn(this.options.pythonPath || 'python', scriptArgs, {
+          stdio: ['pipe', 'pipe', 'pipe'],
+          env: this.options.env ? { ...process.env, ...this.options.env } : process.env
         });
 
-        this.pythonProcess.stdout?.on('data', (data) => {
-          this.responseBuffer += data.toString();
-          
-          // Try to extract complete JSON objects from the buffer
-          let startIndex = 0;
-          while (true) {
-            const openBrace = this.responseBuffer.indexOf('{', startIndex);
-            if (openBrace === -1) break;
-            
-            // Find the matching closing brace
-            let braceCount = 0;
-            let endIndex = -1;
-            for (let i = openBrace; i < this.responseBuffer.length; i++) {
-              if (this.responseBuffer[i] === '{') braceCount++;
-              else if (this.responseBuffer[i] === '}') {
-                braceCount--;
-                if (braceCount === 0) {
-                  endIndex = i;
-                  break;
-                }
-              }
-            }
-            
-            if (endIndex === -1) {
-              // Incomplete JSON, wait for more data
-              break;
-            }
-            
-            // Extract complete JSON string
-            const jsonStr = this.responseBuffer.substring(openBrace, endIndex + 1);
-            try {
-              const response = JSON.parse(jsonStr);
-              this.handleResponse(response);
-            } catch (err) {
-              console.error('Failed to parse Python response:', jsonStr.substring(0, 200) + '...');
-              console.error('Parse error:', err);
-            }
-            
-            // Remove processed JSON from buffer
-            this.responseBuffer = this.responseBuffer.substring(endIndex + 1);
-            startIndex = 0;
-          }
+        this.frameParser.reset();
+        this.pythonProcess.stdout?.on('data', (data: Buffer) => {
+          this.frameParser.push(data);
         });
 
         this.pythonProcess.stderr?.on('data', (data) => {
           console.error('Python stderr:', data.toString());
         });
 
-        this.pythonProcess.on('error', (error) => {
+        const child = this.pythonProcess;
+        child.on('error', (error) => {
           console.error('Python process error:', error);
+          if (this.pythonProcess === child) {
+            this.pythonProcess = null;
+          }
+          this.onReady = null;
           reject(error);
         });
 
-        this.pythonProcess.on('exit', (code) => {
-          console.log('Python process exited with code:', code);
+        child.on('exit', (code) => {
+          console.error('Python process exited with code:', code);
+          // A late exit from a process we already replaced must not tear down the new one
+          if (this.pythonProcess !== child) return;
           this.isInitialized = false;
+          this.pythonProcess = null;
+          this.onReady?.({ error: `Python process exited with code ${code} before it was ready` });
+          this.failPending(new Error(`Python process exited with code ${code}`));
+          this.emit('exit', code);
         });
 
-        // Test connection with timeout
-        setTimeout(() => {
-          this.sendCommand('get_device_info', this.deviceSerial ? { deviceSerial: this.deviceSerial } : {})
-            .then(() => {
-              this.isInitialized = true;
-              resolve();
-            })
-            .catch(reject);
-        }, 1000); // Wait 1 second for Python process to be ready
+        // The worker sends a ready frame once uiautomator2 is imported and the device answered
+        const timer = setTimeout(() => {
+          this.onReady?.({ error: `Python bridge not ready after ${READY_TIMEOUT_MS}ms` });
+        }, READY_TIMEOUT_MS);
+        this.onReady = (frame) => {
+          clearTimeout(timer);
+          this.onReady = null;
+          if (frame.success) {
+            this.readyInfo = frame.data;
+            this.isInitialized = true;
+            resolve();
+            return;
+          }
+          // Don't leave a half-started process behind; the next command spawns a fresh one
+          if (this.pythonProcess === child) {
+            this.pythonProcess = null;
+            child.kill();
+          }
+          reject(new Error(frame.error || 'Python bridge failed to connect to the device'));
+        };
 
       } catch (error) {
         reject(error);
@@ -123,45 +219,104 @@ export class UIAutomator2Bridge {
   }
 
   private handleResponse(response: UIAutomator2Response): void {
-    // For now, we'll use a simple approach without command IDs
-    // In a more complex implementation, you'd track command IDs
-    if (this.pendingResolve) {
-      this.pendingResolve(response);
-      this.pendingResolve = null;
+    if (response.event === 'ready') {
+      this.onReady?.(response);
+      return;
+    }
+    if (response.id === undefined) {
+      // Responses without an id are bridge-level failures (e.g. malformed input) that no caller owns
+      console.error('Python bridge response without command id:', response.error || response);
+      return;
     }
+
+    const callback = this.responseCallbacks.get(response.id);
+    if (!callback) {
+      // The command timed out or its caller gave up on it; drop the late response
+      return;
+    }
+    this.responseCallbacks.delete(response.id);
+    callback(response);
   }
 
-  private pendingResolve: ((response: UIAutomator2Response) => void) | null = null;
+  private failPending(error: Error): void {
+    const callbacks = Array.from(this.responseCallbacks.values());
+    this.responseCallbacks.clear();
+    for (const callback of callbacks) {
+      callback({ error: error.message });
+    }
+  }
 
-  private async sendCommand(action: string, args: Record<string, any> = {}): Promise<UIAutomator2Response> {
-    if (!this.pythonProcess) {
+  private async sendCommand(action: string, args: Record<string, any> = {}, timeoutMs?: number): Promise<UIAutomator2Response> {
+    if (!this.isInitialized) {
       await this.initialize();
     }
+    return this.request(action, args, timeoutMs);
+  }
 
+  private request(action: string, args: Record<string, any>, timeoutMs?: number): Promise<UIAutomator2Response> {
     return new Promise((resolve, reject) => {
-      const command: UIAutomator2Command = { action, args };
+      if (!this.pythonProcess) {
+        reject(new Error('Python bridge is not running'));
+        return;
+      }
+      // The tool call this command runs for, if any; its deadline or cancellation abandons the command
+      const signal = currentRequest()?.signal;
+      if (signal?.aborted) {
+        reject(signal.reason);
+        return;
+      }
+
+      const id = ++this.commandId;
+      const command: UIAutomator2Command = { id, action, args };
       const commandStr = JSON.stringify(command) + '\n';
 
-      this.pendingResolve = resolve;
+      const settle = () => {
+        clearTimeout(timer);
+        signal?.removeEventListener('abort', onAbort);
+      };
+      // Nobody waits for the answer any more, so the worker should not keep working on it either
+      const abandon = (error: Error) => {
+        if (!this.responseCallbacks.delete(id)) return;
+        settle();
+        this.cancel(id);
+        reject(error);
+      };
+      const onAbort = () => abandon(signal!.reason);
+
+      // Timeout after 30 seconds for initialization, 10 seconds for regular commands unless the caller knows better
+      const timeout = timeoutMs ?? (action === 'get_device_info' && !this.isInitialized ? 30000 : 10000);
+      const timer = setTimeout(() => abandon(new Error(`Command ${action} timeout after ${timeout}ms`)), timeout);
+      signal?.addEventListener('abort', onAbort, { once: true });
+
+      const sent = performance.now();
+      this.responseCallbacks.set(id, (response) => {
+        settle();
+        recordTimings(action, performance.now() - sent, response.timing);
+        resolve(response);
+      });
 
       this.pythonProcess?.stdin?.write(commandStr, (error) => {
-        if (error) {
-          this.pendingResolve = null;
+        if (error && this.responseCallbacks.delete(id)) {
+          settle();
           reject(error);
         }
       });
-
-      // Timeout after 30 seconds for initialization, 10 seconds for regular commands
-      const timeout = action === 'get_device_info' && !this.isInitialized ? 30000 : 10000;
-      setTimeout(() => {
-        if (this.pendingResolve === resolve) {
-          this.pendingResolve = null;
-          reject(new Error(`Command ${action} timeout after ${timeout}ms`));
-        }
-      }, timeout);
     });
   }
 
+  /**
+   * Tells the worker to drop command id: it is skipped if still queued and
+   * stops at its next check if running. The replies to both are dropped.
+   */
+  private cancel(id: number): void {
+    const command: UIAutomator2Command = { id: ++this.commandId, action: 'cancel', args: { id } };
+    this.pythonProcess?.stdin?.write(JSON.stringify(command) + '\n');
+  }
+
+  async ping(): Promise<UIAutomator2Response> {
+    return this.sendCommand('ping');
+  }
+
   async getDeviceInfo(): Promise<UIAutomator2Response> {
     return this.sendCommand('get_device_info');
   }
@@ -184,6 +339,18 @@ export class UIAutomator2Bridge {
     return this.sendCommand('find_element', options);
   }
 
+  /**
+   * Evaluates ranked selectors against one hierarchy dump; with all, every match is returned too.
+   */
+  async findAny(selectors: Record<string, any>[], all = false): Promise<UIAutomator2Response> {
+    return this.sendCommand('find_any', { selectors, all });
+  }
+
+  async scrollTo(selectors: Record<string, any>[], options: { direction?: string; maxSwipes?: number; container?: Record<string, any> } = {},
+                 timeoutMs = 60000): Promise<UIAutomator2Response> {
+    return this.sendCommand('scroll_to', { selectors, ...options }, timeoutMs);
+  }
+
   async getScreenDump(): Promise<UIAutomator2Response> {
     return this.sendCommand('get_screen_dump');
   }
@@ -208,16 +375,41 @@ export class UIAutomator2Bridge {
     return this.sendCommand('double_tap', { x, y, duration });
   }
 
-  async takeScreenshot(filename?: string, format = 'pillow'): Promise<UIAutomator2Response> {
-    return this.sendCommand('take_screenshot', { filename, format });
+  async takeScreenshot(filename?: string, format = 'pillow', options: ScreenshotOptions = {}): Promise<UIAutomator2Response> {
+    // Ask for the image as a raw binary frame rather than base64 inside the JSON response
+    return this.sendCommand('take_screenshot', { filename, format, binary: true, ...options });
+  }
+
+  async findImage(options: FindImageOptions): Promise<UIAutomator2Response> {
+    return this.sendCommand('find_image', { ...options });
   }
 
   async xpathOperation(xpath: string, action: string = 'click', text?: string): Promise<UIAutomator2Response> {
     return this.sendCommand('xpath_operation', { xpath, action, text });
   }
 
-  async getInstalledApps(): Promise<UIAutomator2Response> {
-    return this.sendCommand('get_installed_apps');
+  async getInstalledApps(offset = 0, limit?: number): Promise<UIAutomator2Response> {
+    // Cold label caches are filled concurrently, but a first run on a big device can still take a while
+    return this.sendCommand('get_installed_apps', { offset, limit }, 30000);
+  }
+
+  async waitForIdle(timeoutMs = 5000, packageName?: string): Promise<UIAutomator2Response> {
+    return this.sendCommand('wait_for_idle', { timeout: timeoutMs / 1000, package: packageName }, timeoutMs + WAIT_RESPONSE_MARGIN_MS);
+  }
+
+  async waitForElement(selector: Record<string, any>, timeoutMs = 10000, gone = false): Promise<UIAutomator2Response> {
+    return this.sendCommand('wait_for_element', { ...selector, timeout: timeoutMs / 1000, gone }, timeoutMs + WAIT_RESPONSE_MARGIN_MS);
+  }
+
+  async runBatch(steps: BatchStep[], timeoutMs = 30000): Promise<UIAutomator2Response> {
+    return this.sendCommand('batch', { steps, timeout: timeoutMs / 1000 }, timeoutMs + WAIT_RESPONSE_MARGIN_MS);
+  }
+
+  /**
+   * Kills the worker without marking it closed, so 'exit' fires and the owner can respawn it.
+   */
+  async restart(): Promise<void> {
+    this.pythonProcess?.kill();
   }
 
   async close(): Promise<void> {
@@ -226,5 +418,6 @@ export class UIAutomator2Bridge {
       this.pythonProcess = null;
       this.isInitialized = false;
     }
+    this.failPending(new Error('Python bridge closed'));
   }
 }
\ No newline at end of file
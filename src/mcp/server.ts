@@ -6,14 +6,16 @@ import {
   ListToolsRequestSchema,
   McpError,
 } from '@modelcontextprotocol/sdk/types.js';
-import { AndroidAutomation } from '../android/automation.js';
+import { DevicePool } from '../android/device-pool.js';
 import { logger } from '../utils/logger.js';
+import { metrics } from '../utils/metrics.js';
+import { RequestAbortedError } from '../utils/request-context.js';
 import { ToolFactory } from './tools/factory.js';
 import { AndroidCommandHandler, CommandProcessor } from './tools/command.js';
 
 export class AndroidMCPServer {
   private server: Server;
-  private androidAutomation: AndroidAutomation;
+  private devicePool: DevicePool;
   private toolFactory: ToolFactory;
   private commandProcessor: CommandProcessor;
 
@@ -30,11 +32,14 @@ export class AndroidMCPServer {
       }
     );
 
-    this.androidAutomation = new AndroidAutomation();
-    this.toolFactory = new ToolFactory(this.androidAutomation);
+    this.devicePool = new DevicePool();
+    this.toolFactory = new ToolFactory(this.devicePool);
     
     const commandHandler = new AndroidCommandHandler(this.toolFactory.getRegistry());
-    this.commandProcessor = new CommandProcessor(commandHandler, this.toolFactory.getRegistry());
+    // Calls without deviceSerial queue behind the same per-device lock as calls naming the default device
+    this.commandProcessor = new CommandProcessor(commandHandler, this.toolFactory.getRegistry(), {
+      resolveDevice: serial => this.devicePool.resolveSerial(serial),
+    });
 
     this.setupRequestHandlers();
     logger.info('Android MCP Server initialized');
@@ -48,8 +53,11 @@ export class AndroidMCPServer {
       };
     });
 
-    this.server.setRequestHandler(CallToolRequestSchema, async (request) => {
+    this.server.setRequestHandler(CallToolRequestSchema, async (request, extra) => {
       const { name, arguments: args } = request.params;
+      // A client can give a call its own deadline in _meta.timeoutMs; notifications/cancelled aborts extra.signal
+      const meta = request.params._meta as { timeoutMs?: unknown } | undefined;
+      const timeoutMs = typeof meta?.timeoutMs === 'number' ? meta.timeoutMs : undefined;
       
       logger.info(`Tool call received: ${name}`, args);
 
@@ -59,18 +67,22 @@ export class AndroidMCPServer {
         throw new McpError(ErrorCode.InvalidParams, error);
       }
 
+      const finished = metrics.startTimer({ tool: name, phase: 'total' });
       try {
         logger.debug(`Processing command: ${name}`);
-        const result = await this.commandProcessor.process({ name, args });
+        const result = await this.commandProcessor.process({ name, args }, { signal: extra.signal, timeoutMs });
         logger.info(`Command '${name}' processed successfully`);
         return { content: result.content };
       } catch (error) {
         const errorMsg = `Error executing tool ${name}: ${error instanceof Error ? error.message : String(error)}`;
         logger.error(errorMsg, { error, args });
+        const timedOut = error instanceof RequestAbortedError && error.reason === 'deadline';
         throw new McpError(
-          ErrorCode.InternalError,
+          timedOut ? ErrorCode.RequestTimeout : ErrorCode.InternalError,
           errorMsg
         );
+      } finally {
+        finished();
       }
     });
   }
@@ -78,6 +90,14 @@ export class AndroidMCPServer {
   async start(): Promise<void> {
     const transport = new StdioServerTransport();
     logger.info('Starting Android MCP Server...');
+    // Prometheus textfile export, if ANDROID_MCP_METRICS_FILE is set
+    metrics.startExport();
+    // Start device workers while the client runs the MCP handshake, so the first tool call is warm
+    if (process.env.ANDROID_MCP_PREWARM !== '0') {
+      this.devicePool.warmAll()
+        .then(serials => logger.info(`Prewarmed ${serials.length} device worker(s)`))
+        .catch(error => logger.warn('Device prewarm failed', error));
+    }
     await this.server.connect(transport);
     logger.info('Android MCP Server running on stdio');
   }
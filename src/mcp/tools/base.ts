@@ -17,6 +17,32 @@ export interface ToolResult {
   }>;
 }
 
+// Shared schema property for tools that act on a device; omitted means the first connected device
+export const DEVICE_SERIAL_PROPERTY = {
+  type: 'string',
+  description: 'Serial of the target device as listed by android_list_devices (default: first connected device)',
+};
+
+// Shared schema property for tools that change the screen
+export const WAIT_IDLE_PROPERTY = {
+  type: ['boolean', 'number'],
+  description: 'Wait until the screen stops changing before returning; true for up to 5000ms or a timeout in milliseconds',
+};
+
+/**
+ * Timeout in milliseconds for a waitIdle argument, or 0 when no wait was asked for.
+ */
+export function waitIdleTimeout(waitIdle: unknown): number {
+  if (typeof waitIdle === 'number') return Math.max(0, waitIdle);
+  return waitIdle ? 5000 : 0;
+}
+
+/**
+ * How a tool call uses its device, for the scheduler: reads of one device run
+ * side by side, writes run alone, and calls that need no isolation take no lock.
+ */
+export type ToolAccess = 'read' | 'write' | 'none';
+
 export interface ToolHandler {
   execute(args: Record<string, any>): Promise<ToolResult>;
 }
@@ -25,6 +51,13 @@ export abstract class BaseTool implements ToolHandler {
   abstract readonly definition: ToolDefinition;
   
   abstract execute(args: Record<string, any>): Promise<ToolResult>;
+
+  /**
+   * Access a call with args needs; anything that may change the screen is a write, the default.
+   */
+  access(args: Record<string, any>): ToolAccess {
+    return 'write';
+  }
   
   protected createTextResult(text: string): ToolResult {
     return {
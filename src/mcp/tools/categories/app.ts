@@ -1,5 +1,5 @@
-import { BaseTool, ToolDefinition, ToolResult } from '../base.js';
-import { AndroidAutomation } from '../../../android/automation.js';
+import { BaseTool, DEVICE_SERIAL_PROPERTY, ToolAccess, ToolDefinition, ToolResult } from '../base.js';
+import { DevicePool } from '../../../android/device-pool.js';
 
 export class AppManagementTool extends BaseTool {
   readonly definition: ToolDefinition = {
@@ -12,18 +12,20 @@ export class AppManagementTool extends BaseTool {
           type: 'string',
           description: 'Package name of the app to open (e.g., com.bilibili.app.in, com.sina.weibo)',
         },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
       },
       required: ['packageName'],
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
   async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
     const { packageName } = args;
-    await this.automation.openApp(packageName as string);
+    await automation.openApp(packageName as string);
     return this.createTextResult(`Opened app: ${packageName}`);
   }
 }
@@ -31,19 +33,37 @@ export class AppManagementTool extends BaseTool {
 export class AppListTool extends BaseTool {
   readonly definition: ToolDefinition = {
     name: 'android_get_applist',
-    description: 'Get list of installed user applications with package names.',
+    description: 'Get list of installed user applications with package names. Results are paged; pass nextOffset from a response as offset to get the next page.',
     inputSchema: {
       type: 'object',
-      properties: {},
+      properties: {
+        offset: {
+          type: 'number',
+          description: 'Index of the first app to return (default: 0)',
+          minimum: 0,
+        },
+        limit: {
+          type: 'number',
+          description: 'Maximum number of apps to return (default: 50)',
+          minimum: 1,
+          maximum: 500,
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
+  access(): ToolAccess {
+    return 'read';
+  }
+
   async execute(args: Record<string, any>): Promise<ToolResult> {
-    const appList = await this.automation.getInstalledApps();
-    return this.createTextResult(JSON.stringify(appList, null, 2));
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const page = await automation.getInstalledApps((args.offset as number) || 0, (args.limit as number) || 50);
+    return this.createTextResult(JSON.stringify(page, null, 2));
   }
 }
\ No newline at end of file
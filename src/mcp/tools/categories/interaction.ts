@@ -1,5 +1,19 @@
-import { BaseTool, ToolDefinition, ToolResult } from '../base.js';
+import { BaseTool, DEVICE_SERIAL_PROPERTY, ToolDefinition, ToolResult, WAIT_IDLE_PROPERTY, waitIdleTimeout } from '../base.js';
+import { DevicePool } from '../../../android/device-pool.js';
 import { AndroidAutomation } from '../../../android/automation.js';
+import { BatchStep } from '../../../android/uiautomator2-bridge.js';
+
+/**
+ * Waits for the UI to settle when the caller asked for it and describes the outcome for the tool result.
+ */
+async function settle(automation: AndroidAutomation, waitIdle: unknown): Promise<string> {
+  const timeoutMs = waitIdleTimeout(waitIdle);
+  if (!timeoutMs) return '';
+  const result = await automation.waitForIdle(timeoutMs);
+  return result.met
+    ? ` (screen idle after ${result.waitedMs}ms)`
+    : ` (screen still changing after ${result.waitedMs}ms)`;
+}
 
 export class TapTool extends BaseTool {
   readonly definition: ToolDefinition = {
@@ -16,19 +30,22 @@ export class TapTool extends BaseTool {
           type: 'number',
           description: 'Y coordinate to tap (pixel position)',
         },
+        waitIdle: WAIT_IDLE_PROPERTY,
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
       },
       required: ['x', 'y'],
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
   async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
     const { x, y } = args;
-    await this.automation.tap(x as number, y as number);
-    return this.createTextResult(`Tapped at coordinates (${x}, ${y})`);
+    await automation.tap(x as number, y as number);
+    return this.createTextResult(`Tapped at coordinates (${x}, ${y})` + await settle(automation, args.waitIdle));
   }
 }
 
@@ -43,19 +60,22 @@ export class InputTextTool extends BaseTool {
           type: 'string',
           description: 'Text to input into the focused element',
         },
+        waitIdle: WAIT_IDLE_PROPERTY,
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
       },
       required: ['text'],
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
   async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
     const { text } = args;
-    await this.automation.inputText(text as string);
-    return this.createTextResult(`Input text: ${text}`);
+    await automation.inputText(text as string);
+    return this.createTextResult(`Input text: ${text}` + await settle(automation, args.waitIdle));
   }
 }
 
@@ -71,19 +91,84 @@ export class ScrollTool extends BaseTool {
           enum: ['up', 'down', 'left', 'right'],
           description: 'Direction to scroll (up/down for vertical, left/right for horizontal)',
         },
+        waitIdle: WAIT_IDLE_PROPERTY,
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
       },
       required: ['direction'],
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
   async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
     const { direction } = args;
-    await this.automation.scroll(direction as 'up' | 'down' | 'left' | 'right');
-    return this.createTextResult(`Scrolled ${direction}`);
+    await automation.scroll(direction as 'up' | 'down' | 'left' | 'right');
+    return this.createTextResult(`Scrolled ${direction}` + await settle(automation, args.waitIdle));
+  }
+}
+
+export class ScrollToTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_scroll_to',
+    description: 'Scroll a list until an element is visible, in one call. Swipes inside the scrollable container and checks after every swipe; stops at the end of the list. Returns the element and the number of swipes used.',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        text: {
+          type: 'string',
+          description: 'Element text, matched exactly (not part of it, so Item 2 does not stop at Item 20)',
+        },
+        description: {
+          type: 'string',
+          description: 'Element content description, matched exactly',
+        },
+        resourceId: {
+          type: 'string',
+          description: 'Element resource id',
+        },
+        className: {
+          type: 'string',
+          description: 'Element class (e.g., android.widget.TextView)',
+        },
+        direction: {
+          type: 'string',
+          enum: ['up', 'down', 'left', 'right'],
+          description: 'Which way to move through the list; down shows what is further down (default: down)',
+        },
+        maxSwipes: {
+          type: 'number',
+          description: 'Give up after this many swipes (default: 20)',
+          minimum: 1,
+          maximum: 100,
+        },
+        containerResourceId: {
+          type: 'string',
+          description: 'Resource id of the list to scroll when the screen has several (default: the largest scrollable element)',
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    const { text, description, resourceId, className, direction, maxSwipes, containerResourceId } = args;
+    if (!text && !description && !resourceId && !className) {
+      throw new Error('android_scroll_to needs text, description, resourceId or className');
+    }
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const result = await automation.scrollTo({ text, description, resourceId, className }, {
+      direction,
+      maxSwipes,
+      container: containerResourceId ? { resourceId: containerResourceId } : undefined,
+    });
+    return this.createTextResult(JSON.stringify(result));
   }
 }
 
@@ -93,16 +178,88 @@ export class BackTool extends BaseTool {
     description: 'Press the system back button.',
     inputSchema: {
       type: 'object',
-      properties: {},
+      properties: {
+        waitIdle: WAIT_IDLE_PROPERTY,
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
+    await automation.back();
+    return this.createTextResult('Pressed back button' + await settle(automation, args.waitIdle));
+  }
+}
+
+// Bridge actions a batch step can run
+const BATCH_ACTIONS = [
+  'tap', 'double_tap', 'long_tap', 'swipe', 'swipe_ext', 'drag',
+  'input_text', 'clear_text', 'press_key',
+  'element_click', 'element_long_click', 'find_element', 'find_any', 'find_all', 'xpath_operation', 'scroll_to', 'find_image',
+  'open_app', 'stop_app', 'get_current_app',
+  'wait_for_idle', 'wait_for_element',
+];
+
+const SELECTOR_SCHEMA = {
+  type: 'object',
+  description: 'uiautomator2 selector, e.g. {"text": "Search"} or {"resourceId": "com.app:id/input"}',
+};
+
+export class BatchTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_batch',
+    description: 'Run a scripted sequence of actions in one call, e.g. click the search box, type a query and press enter. Steps run in order and the batch stops at the first failed step (an error, a missing element or an unmet wait). Returns the result and timing of every step.',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        steps: {
+          type: 'array',
+          description: 'Actions to run in order',
+          items: {
+            type: 'object',
+            properties: {
+              action: {
+                type: 'string',
+                enum: BATCH_ACTIONS,
+              },
+              args: {
+                type: 'object',
+                description: 'Action arguments: x/y for taps, text/clear for input_text, key for press_key, a selector for element_click/find_element/wait_for_element, a ranked list of selectors as selectors for find_any/find_all/scroll_to (with direction, maxSwipes and a container selector), xpath and action (click, input_text, get_text, get_attribute or get_all) for xpath_operation, template (an absolute path) or templateData with region, threshold and click for find_image, packageName for open_app. Durations and timeouts are in seconds.',
+              },
+              when: { ...SELECTOR_SCHEMA, description: 'Only run this step if an element matches this selector' },
+              unless: { ...SELECTOR_SCHEMA, description: 'Only run this step if no element matches this selector' },
+              optional: {
+                type: 'boolean',
+                description: 'Keep going if this step fails (default: false)',
+              },
+            },
+            required: ['action'],
+          },
+        },
+        timeout: {
+          type: 'number',
+          description: 'Maximum duration of the whole batch in milliseconds (default: 30000)',
+          minimum: 1000,
+          maximum: 120000,
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
+      required: ['steps'],
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
   async execute(args: Record<string, any>): Promise<ToolResult> {
-    await this.automation.back();
-    return this.createTextResult('Pressed back button');
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const result = await automation.runBatch(args.steps as BatchStep[], (args.timeout as number) || 30000);
+    return this.createTextResult(JSON.stringify(result));
   }
-}
\ No newline at end of file
+}
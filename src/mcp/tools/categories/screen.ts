@@ -1,5 +1,8 @@
-import { BaseTool, ToolDefinition, ToolResult } from '../base.js';
-import { AndroidAutomation } from '../../../android/automation.js';
+import { BaseTool, DEVICE_SERIAL_PROPERTY, ToolAccess, ToolDefinition, ToolResult } from '../base.js';
+import { DevicePool } from '../../../android/device-pool.js';
+import { ScreenSnapshotTracker } from '../../../android/screen-diff.js';
+import { encodeColumnar, selectComponents } from '../../../android/screen-compact.js';
+import type { ScreenInfo } from '../../../android/automation.js';
 
 export class ScreenshotTool extends BaseTool {
   readonly definition: ToolDefinition = {
@@ -10,129 +13,255 @@ export class ScreenshotTool extends BaseTool {
       properties: {
         filename: {
           type: 'string',
-          description: 'Optional filename to save the screenshot (if not provided, returns base64 data)',
+          description: 'Optional path to also save the returned image to',
         },
         format: {
           type: 'string',
           enum: ['pillow', 'raw'],
-          description: 'Screenshot format (default: pillow)',
+          description: 'Capture mode on the device (default: pillow)',
         },
+        imageFormat: {
+          type: 'string',
+          enum: ['jpeg', 'webp', 'png'],
+          description: 'Encoding of the returned image (default: jpeg)',
+        },
+        maxWidth: {
+          type: 'number',
+          description: 'Scale the image down to at most this width, keeping the aspect ratio',
+        },
+        maxHeight: {
+          type: 'number',
+          description: 'Scale the image down to at most this height, keeping the aspect ratio',
+        },
+        maxBytes: {
+          type: 'number',
+          description: 'Byte budget for jpeg/webp; quality and size are chosen to fit it (default: 131072)',
+        },
+        quality: {
+          type: 'number',
+          description: 'Fixed jpeg/webp quality 1-100 instead of deriving it from maxBytes',
+        },
+        region: {
+          type: 'array',
+          items: { type: 'number' },
+          minItems: 4,
+          maxItems: 4,
+          description: 'Only capture this part of the screen, as [x1, y1, x2, y2] in device pixels',
+        },
+        changedSince: {
+          type: 'boolean',
+          description: 'Compare with the previous screenshot of this device: returns "unchanged" without an image, or the changed regions and an image of just that area. Frames are tracked from the first such call on, which returns the full image',
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
       },
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     super();
   }
 
+  access(): ToolAccess {
+    return 'read';
+  }
+
   async execute(args: Record<string, any>): Promise<ToolResult> {
-    const { filename, format } = args;
-    const screenshotResult = await this.automation.takeScreenshot(filename as string, format as string);
-
-    // Compress image if it's too large (>256KB)
-    let compressedBase64 = screenshotResult.base64Data;
-    const originalSize = Buffer.byteLength(screenshotResult.base64Data, 'base64');
-
-    if (originalSize > 1024 * 256) { // 256KB
-      try {
-        const sharp = await import('sharp');
-        const imageBuffer = Buffer.from(screenshotResult.base64Data, 'base64');
-        
-        let quality = 80;
-        let compressedBuffer: Buffer = imageBuffer;
-
-        while (compressedBuffer.length > 1024 * 256 && quality > 20) {
-          compressedBuffer = await sharp.default(imageBuffer)
-            .jpeg({ quality })
-            .toBuffer() as Buffer;
-          quality -= 10;
-        }
-        
-        compressedBase64 = compressedBuffer.toString('base64');
-      } catch (error) {
-        // Keep original if compression fails
-      }
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const { filename, format, imageFormat, maxWidth, maxHeight, maxBytes, quality, region, changedSince } = args;
+    const screenshot = await automation.takeScreenshot(filename as string, format as string, {
+      imageFormat, maxWidth, maxHeight, maxBytes, quality, region, changedSince
+    });
+
+    if (screenshot.changed === false) {
+      return this.createTextResult('unchanged');
     }
-    
-    if (filename && screenshotResult.message) {
-      return {
-        content: [
-          {
-            type: 'text',
-            text: screenshotResult.message,
-          },
-          {
-            type: 'image',
-            data: compressedBase64,
-            mimeType: originalSize > 1024 * 256 ? 'image/jpeg' : 'image/png',
-          },
-        ],
-      };
-    } else {
-      return {
-        content: [
-          {
-            type: 'image',
-            data: compressedBase64,
-            mimeType: originalSize > 1024 * 256 ? 'image/jpeg' : 'image/png',
-          },
-        ],
-      };
+    if (screenshot.regions) {
+      const summary = JSON.stringify({ changed: true, regions: screenshot.regions, region: screenshot.region });
+      return this.createImageResult(screenshot.base64Data, screenshot.mimeType, filename ? `${summary}\n${screenshot.message}` : summary);
     }
+    return this.createImageResult(screenshot.base64Data, screenshot.mimeType, filename ? screenshot.message : undefined);
+  }
+}
+
+export class FindImageTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_find_image',
+    description: 'Find a reference image on the current screen, for games, Flutter or WebView screens whose components have nothing to match on. Returns the best match with its score and, when found, an element with bounds and center to tap.',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        template: {
+          type: 'string',
+          description: 'Path of the image to look for (png, jpeg or webp)',
+        },
+        templateData: {
+          type: 'string',
+          description: 'Base64 image data to look for, instead of a path',
+        },
+        region: {
+          type: 'array',
+          items: { type: 'number' },
+          minItems: 4,
+          maxItems: 4,
+          description: 'Only search this part of the screen, as [x1, y1, x2, y2] in device pixels',
+        },
+        threshold: {
+          type: 'number',
+          minimum: 0,
+          maximum: 1,
+          description: 'Lowest match score that counts as found; 1 means identical pixels (default: 0.8)',
+        },
+        scales: {
+          type: 'array',
+          items: { type: 'number' },
+          description: 'Sizes of the image to try on screen, relative to the template (default: 0.5 to 2)',
+        },
+        click: {
+          type: 'boolean',
+          description: 'Tap the center of the match if one is found (default: false)',
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  access(args: Record<string, any>): ToolAccess {
+    return args.click ? 'write' : 'read';
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    if (!args.template && !args.templateData) {
+      throw new Error('Provide template or templateData');
+    }
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const { template, templateData, region, threshold, scales, click } = args;
+    const match = await automation.findImage({ template, templateData, region, threshold, scales, click });
+    return this.createTextResult(JSON.stringify(match));
   }
 }
 
 export class ComponentsTool extends BaseTool {
   readonly definition: ToolDefinition = {
     name: 'android_get_components',
-    description: 'Get UI component information for element identification.',
+    description: 'Get UI component information for element identification. format=compact returns one array per field with a string table for class names and resource ids, packed bounds and only what is visible on screen. With diff=true, returns only elements added, removed or changed since sinceVersion.',
     inputSchema: {
       type: 'object',
-      properties: {},
+      properties: {
+        format: {
+          type: 'string',
+          enum: ['json', 'compact'],
+          description: 'json: one object per element; compact: columnar arrays, see idPrefix, strings and columns in the result (default: json)',
+        },
+        visibleOnly: {
+          type: 'boolean',
+          description: 'Drop elements that are invisible, zero-sized, outside the screen or fully covered by another clickable element (default: true for compact, false for json)',
+        },
+        interactiveOnly: {
+          type: 'boolean',
+          description: 'Only return clickable, scrollable or focusable elements (default: false)',
+        },
+        maxElements: {
+          type: 'number',
+          description: 'Return at most this many elements; the result has nextOffset when there are more',
+        },
+        offset: {
+          type: 'number',
+          description: 'Skip this many matching elements, e.g. the nextOffset of the previous page (default: 0)',
+        },
+        diff: {
+          type: 'boolean',
+          description: 'Return a versioned snapshot with element ids; pass its version back as sinceVersion to get only the changes (default: false)',
+        },
+        sinceVersion: {
+          type: 'number',
+          description: 'Version of the last snapshot or diff you have; a full snapshot is returned if it is not the latest',
+        },
+        resync: {
+          type: 'boolean',
+          description: 'Force a full snapshot in diff mode, e.g. after losing track of earlier diffs (default: false)',
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
     },
   };
 
-  constructor(private automation: AndroidAutomation) {
+  // Last snapshot per device serial, kept across worker restarts so versions never repeat
+  private snapshots = new Map<string, ScreenSnapshotTracker>();
+
+  constructor(private devices: DevicePool) {
     super();
   }
 
+  access(): ToolAccess {
+    return 'read';
+  }
+
   async execute(args: Record<string, any>): Promise<ToolResult> {
-    const screenInfo = await this.automation.getScreenInfo();
-    
-    // Debug logging and file writing (keeping original functionality)
-    try {
-      const fs = await import('fs');
-      const path = await import('path');
-      const cwd = process.cwd();
-      
-      const debugDir = path.join(cwd, 'debug');
-      
-      if (!fs.existsSync(debugDir)) {
-        fs.mkdirSync(debugDir, { recursive: true });
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const screenInfo = await automation.getScreenInfo();
+
+    if (args.diff) {
+      const serial = automation.serial ?? '';
+      let tracker = this.snapshots.get(serial);
+      if (!tracker) {
+        tracker = new ScreenSnapshotTracker();
+        this.snapshots.set(serial, tracker);
       }
-      
-      const screenInfoFile = path.join(debugDir, 'debug_components_screenInfo.json');
-      const debugInfoFile = path.join(debugDir, 'debug_components_debugInfo.json');
-      
-      fs.writeFileSync(screenInfoFile, JSON.stringify(screenInfo, null, 2));
-      
-      const debugInfo = {
-        timestamp: new Date().toISOString(),
-        original: screenInfo,
-        simplified: {
-          width: screenInfo.width,
-          height: screenInfo.height,
-          currentApp: screenInfo.currentApp,
-          elementCount: screenInfo.elements.length,
-          interactableElements: screenInfo.elements.filter(el => el.description || el.resourceId).length
-        }
-      };
-      
-      fs.writeFileSync(debugInfoFile, JSON.stringify(debugInfo, null, 2));
-    } catch (error) {
-      // Ignore debug file errors
+      const sinceVersion = args.resync ? undefined : args.sinceVersion as number | undefined;
+      return this.createTextResult(JSON.stringify(tracker.update(screenInfo, sinceVersion)));
     }
     
-    return this.createTextResult(JSON.stringify(screenInfo, null, 2));
+    // Snapshots for debugging, only on request since they cost two file writes per call
+    if (process.env.ANDROID_MCP_DEBUG_DUMPS === '1') {
+      this.writeDebugDumps(screenInfo).catch(() => {});
+    }
+
+    const compact = args.format === 'compact';
+    const query = {
+      visibleOnly: args.visibleOnly ?? compact,
+      interactiveOnly: args.interactiveOnly,
+      maxElements: args.maxElements,
+      offset: args.offset,
+    };
+    if (!compact && !query.visibleOnly && !query.interactiveOnly && query.maxElements === undefined && !query.offset) {
+      return this.createTextResult(JSON.stringify(screenInfo, null, 2));
+    }
+
+    const page = selectComponents(screenInfo, query);
+    if (compact) {
+      return this.createTextResult(JSON.stringify(encodeColumnar(screenInfo, page)));
+    }
+    const { elements, ...paging } = page;
+    return this.createTextResult(JSON.stringify({ ...screenInfo, elements, ...paging }, null, 2));
+  }
+
+  /**
+   * Writes the snapshot and a summary to debug/ in the working directory (ANDROID_MCP_DEBUG_DUMPS=1).
+   */
+  private async writeDebugDumps(screenInfo: ScreenInfo): Promise<void> {
+    const fs = await import('fs');
+    const path = await import('path');
+    const debugDir = path.join(process.cwd(), 'debug');
+    await fs.promises.mkdir(debugDir, { recursive: true });
+
+    const debugInfo = {
+      timestamp: new Date().toISOString(),
+      original: screenInfo,
+      simplified: {
+        width: screenInfo.width,
+        height: screenInfo.height,
+        currentApp: screenInfo.currentApp,
+        elementCount: screenInfo.elements.length,
+        interactableElements: screenInfo.elements.filter(el => el.description || el.resourceId).length
+      }
+    };
+    await Promise.all([
+      fs.promises.writeFile(path.join(debugDir, 'debug_components_screenInfo.json'), JSON.stringify(screenInfo, null, 2)),
+      fs.promises.writeFile(path.join(debugDir, 'debug_components_debugInfo.json'), JSON.stringify(debugInfo, null, 2)),
+    ]);
   }
 }
\ No newline at end of file
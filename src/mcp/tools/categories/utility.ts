@@ -1,9 +1,11 @@
-import { BaseTool, ToolDefinition, ToolResult } from '../base.js';
+import { BaseTool, DEVICE_SERIAL_PROPERTY, ToolAccess, ToolDefinition, ToolResult } from '../base.js';
+import { DevicePool } from '../../../android/device-pool.js';
+import { metrics } from '../../../utils/metrics.js';
 
 export class WaitTool extends BaseTool {
   readonly definition: ToolDefinition = {
     name: 'android_wait',
-    description: 'Wait for a specified duration.',
+    description: 'Wait for a specified duration. Prefer android_wait_for, which returns as soon as the screen is ready.',
     inputSchema: {
       type: 'object',
       properties: {
@@ -21,6 +23,10 @@ export class WaitTool extends BaseTool {
     },
   };
 
+  access(): ToolAccess {
+    return 'none';
+  }
+
   async execute(args: Record<string, any>): Promise<ToolResult> {
     const duration = (args.duration as number) || 1000;
     const reason = args.reason as string;
@@ -33,4 +39,150 @@ export class WaitTool extends BaseTool {
         : `Waited ${duration}ms`
     );
   }
-}
\ No newline at end of file
+}
+
+export class WaitForTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_wait_for',
+    description: 'Wait until the screen is idle, or until an element appears or disappears. Returns as soon as the condition holds and reports how long it took.',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        text: {
+          type: 'string',
+          description: 'Wait for an element whose text contains this',
+        },
+        description: {
+          type: 'string',
+          description: 'Wait for an element whose content description contains this',
+        },
+        resourceId: {
+          type: 'string',
+          description: 'Wait for an element with this resource id',
+        },
+        className: {
+          type: 'string',
+          description: 'Wait for an element of this class (e.g., android.widget.EditText)',
+        },
+        gone: {
+          type: 'boolean',
+          description: 'Wait for the element to disappear instead (default: false)',
+        },
+        packageName: {
+          type: 'string',
+          description: 'Without an element: also wait for this app to be in the foreground',
+        },
+        timeout: {
+          type: 'number',
+          description: 'Maximum wait in milliseconds (default: 10000)',
+          minimum: 100,
+          maximum: 60000,
+        },
+        deviceSerial: DEVICE_SERIAL_PROPERTY,
+      },
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  // Waits for what other calls do to the screen, so it must not hold their writes back
+  access(): ToolAccess {
+    return 'none';
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    const automation = await this.devices.acquire(args.deviceSerial);
+    const { text, description, resourceId, className, gone, packageName } = args;
+    const timeout = (args.timeout as number) || 10000;
+
+    if (text || description || resourceId || className) {
+      const result = await automation.waitForElement({ text, description, resourceId, className }, timeout, !!gone);
+      return this.createTextResult(JSON.stringify({ condition: gone ? 'gone' : 'element', ...result }));
+    }
+
+    const result = await automation.waitForIdle(timeout, packageName as string | undefined);
+    return this.createTextResult(JSON.stringify({ condition: 'idle', ...result }));
+  }
+}
+
+export class DeviceListTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_list_devices',
+    description: 'List connected Android devices and the state of their automation workers, including backend health and per-backend latencies.',
+    inputSchema: {
+      type: 'object',
+      properties: {},
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  access(): ToolAccess {
+    return 'none';
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    const serials = await this.devices.discover(true);
+    const workers = this.devices.status();
+    return this.createTextResult(JSON.stringify({ devices: serials, workers }, null, 2));
+  }
+}
+
+export class StatsTool extends BaseTool {
+  readonly definition: ToolDefinition = {
+    name: 'android_stats',
+    description: 'Latency percentiles (p50/p90/p99) of tool calls and device actions, broken down by backend and phase (total, validate, queue, execute, roundtrip, exec, transport, capture, encode, …), plus calls queued and running per device and backend routing state per device.',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        tool: {
+          type: 'string',
+          description: 'Only series for this tool, e.g. android_tap',
+        },
+        action: {
+          type: 'string',
+          description: 'Only series for this device action, e.g. tap or screenshot',
+        },
+        backend: {
+          type: 'string',
+          enum: ['python', 'http', 'adb'],
+          description: 'Only series for this backend',
+        },
+        format: {
+          type: 'string',
+          enum: ['json', 'prometheus'],
+          description: 'json (default) or Prometheus text exposition',
+        },
+        reset: {
+          type: 'boolean',
+          description: 'Clear all histograms after reading them',
+        },
+      },
+    },
+  };
+
+  constructor(private devices: DevicePool) {
+    super();
+  }
+
+  access(): ToolAccess {
+    return 'none';
+  }
+
+  async execute(args: Record<string, any>): Promise<ToolResult> {
+    const { tool, action, backend, format, reset } = args;
+    let text: string;
+    if (format === 'prometheus') {
+      text = metrics.toPrometheus();
+    } else {
+      const routing = Object.fromEntries(this.devices.status().map(worker => [worker.serial, worker.routing]));
+      text = JSON.stringify({ ...metrics.snapshot({ tool, action, backend }), routing }, null, 2);
+    }
+    if (reset) metrics.reset();
+    return this.createTextResult(text);
+  }
+}
@@ -1,6 +1,8 @@
 import { ToolResult } from './base.js';
 import { ToolRegistry } from './registry.js';
 import { logger } from '../../utils/logger.js';
+import { metrics } from '../../utils/metrics.js';
+import { ScheduleOptions, SchedulerOptions, ToolScheduler } from './scheduler.js';
 
 export interface Command {
   name: string;
@@ -17,7 +19,7 @@ export class AndroidCommandHandler implements CommandHandler {
   async execute(command: Command): Promise<ToolResult> {
     const { name, args } = command;
     
-    logger.info(`Executing command: ${name}`, args);
+    logger.debug(`Executing command: ${name}`, args);
     
     const tool = this.registry.get(name);
     if (!tool) {
@@ -65,12 +67,17 @@ export class CommandValidator {
 }
 
 export class CommandProcessor {
+  private scheduler: ToolScheduler;
+
   constructor(
     private handler: CommandHandler,
-    private registry: ToolRegistry
-  ) {}
+    private registry: ToolRegistry,
+    schedulerOptions: SchedulerOptions = {}
+  ) {
+    this.scheduler = new ToolScheduler(schedulerOptions);
+  }
 
-  async process(command: Command): Promise<ToolResult> {
+  async process(command: Command, options: ScheduleOptions = {}): Promise<ToolResult> {
     // Get tool definition for validation
     const tool = this.registry.get(command.name);
     if (!tool) {
@@ -78,9 +85,12 @@ export class CommandProcessor {
     }
     
     // Validate command
+    const validated = metrics.startTimer({ tool: command.name, phase: 'validate' });
     CommandValidator.validate(command, tool.definition.inputSchema);
+    validated();
     
-    // Execute command
-    return await this.handler.execute(command);
+    // Execute command once the scheduler lets it at the device
+    return await this.scheduler.run(tool, command.args, options,
+      () => metrics.time({ tool: command.name, phase: 'execute' }, () => this.handler.execute(command)));
   }
-}
\ No newline at end of file
+}
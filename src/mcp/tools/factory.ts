@@ -1,42 +1,48 @@
 import { ToolRegistry } from './registry.js';
-import { AndroidAutomation } from '../../android/automation.js';
+import { DevicePool } from '../../android/device-pool.js';
 
 // App Management Tools
 import { AppManagementTool, AppListTool } from './categories/app.js';
 
 // Interaction Tools
-import { TapTool, InputTextTool, ScrollTool, BackTool } from './categories/interaction.js';
+import { TapTool, InputTextTool, ScrollTool, ScrollToTool, BackTool, BatchTool } from './categories/interaction.js';
 
 // Screen Tools
-import { ScreenshotTool, ComponentsTool } from './categories/screen.js';
+import { ScreenshotTool, ComponentsTool, FindImageTool } from './categories/screen.js';
 
 // Utility Tools
-import { WaitTool } from './categories/utility.js';
+import { WaitTool, WaitForTool, DeviceListTool, StatsTool } from './categories/utility.js';
 
 export class ToolFactory {
   private registry = new ToolRegistry();
 
-  constructor(private automation: AndroidAutomation) {
+  constructor(private devices: DevicePool) {
     this.registerAllTools();
   }
 
   private registerAllTools(): void {
     // Register App Management Tools
-    this.registry.register(new AppManagementTool(this.automation), 'app');
-    this.registry.register(new AppListTool(this.automation), 'app');
+    this.registry.register(new AppManagementTool(this.devices), 'app');
+    this.registry.register(new AppListTool(this.devices), 'app');
 
     // Register Interaction Tools  
-    this.registry.register(new TapTool(this.automation), 'interaction');
-    this.registry.register(new InputTextTool(this.automation), 'interaction');
-    this.registry.register(new ScrollTool(this.automation), 'interaction');
-    this.registry.register(new BackTool(this.automation), 'interaction');
+    this.registry.register(new TapTool(this.devices), 'interaction');
+    this.registry.register(new InputTextTool(this.devices), 'interaction');
+    this.registry.register(new ScrollTool(this.devices), 'interaction');
+    this.registry.register(new ScrollToTool(this.devices), 'interaction');
+    this.registry.register(new BackTool(this.devices), 'interaction');
+    this.registry.register(new BatchTool(this.devices), 'interaction');
 
     // Register Screen Tools
-    this.registry.register(new ScreenshotTool(this.automation), 'screen');
-    this.registry.register(new ComponentsTool(this.automation), 'screen');
+    this.registry.register(new ScreenshotTool(this.devices), 'screen');
+    this.registry.register(new ComponentsTool(this.devices), 'screen');
+    this.registry.register(new FindImageTool(this.devices), 'screen');
 
     // Register Utility Tools
     this.registry.register(new WaitTool(), 'utility');
+    this.registry.register(new WaitForTool(this.devices), 'utility');
+    this.registry.register(new DeviceListTool(this.devices), 'utility');
+    this.registry.register(new StatsTool(this.devices), 'utility');
   }
 
   getRegistry(): ToolRegistry {
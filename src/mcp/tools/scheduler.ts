@@ -0,0 +1,163 @@
+import { BaseTool, ToolAccess, ToolResult } from './base.js';
+import { metrics } from '../../utils/metrics.js';
+import { RequestAbortedError, abortable, runInRequest } from '../../utils/request-context.js';
+
+export interface SchedulerOptions {
+  resolveDevice?: (deviceSerial?: string) => Promise<string>; // Device a call goes to, so calls with and without deviceSerial share a lock
+  defaultTimeoutMs?: number; // Deadline of calls that do not set one, queueing included; 0 for none (default: ANDROID_MCP_REQUEST_TIMEOUT_MS or 120000)
+}
+
+export interface ScheduleOptions {
+  signal?: AbortSignal; // Cancels the call, e.g. when the MCP client sends notifications/cancelled
+  timeoutMs?: number; // Deadline of this call instead of the default
+}
+
+type LockMode = Exclude<ToolAccess, 'none'>;
+type Release = () => void;
+
+interface Waiter {
+  mode: LockMode;
+  grant: (release: Release) => void;
+}
+
+/**
+ * Readers-writer lock that grants in arrival order: reads run together, a
+ * write runs alone, and a read that arrives after a queued write waits for
+ * it, so a steady stream of reads cannot starve writes.
+ */
+export class ReadWriteLock {
+  private readers = 0;
+  private writing = false;
+  private queue: Waiter[] = [];
+
+  constructor(private onChange?: () => void) {}
+
+  get queued(): Record<LockMode, number> {
+    const writes = this.queue.filter(waiter => waiter.mode === 'write').length;
+    return { read: this.queue.length - writes, write: writes };
+  }
+
+  get active(): Record<LockMode, number> {
+    return { read: this.readers, write: this.writing ? 1 : 0 };
+  }
+
+  /**
+   * Resolves to the function that releases the lock once it is granted;
+   * rejects with the signal's reason if aborted while still queued.
+   */
+  acquire(mode: LockMode, signal?: AbortSignal): Promise<Release> {
+    if (signal?.aborted) return Promise.reject(signal.reason);
+    return new Promise((resolve, reject) => {
+      const waiter: Waiter = { mode, grant: resolve };
+      if (signal) {
+        const onAbort = () => {
+          const index = this.queue.indexOf(waiter);
+          if (index === -1) return;
+          this.queue.splice(index, 1);
+          // A write leaving the head of the queue may let the reads behind it through
+          this.pump();
+          reject(signal.reason);
+        };
+        signal.addEventListener('abort', onAbort, { once: true });
+        waiter.grant = release => {
+          signal.removeEventListener('abort', onAbort);
+          resolve(release);
+        };
+      }
+      this.queue.push(waiter);
+      this.pump();
+    });
+  }
+
+  private pump(): void {
+    while (this.queue.length > 0) {
+      const next = this.queue[0];
+      if (this.writing || (next.mode === 'write' && this.readers > 0)) break;
+      this.queue.shift();
+      if (next.mode === 'write') this.writing = true;
+      else this.readers++;
+      next.grant(this.releaser(next.mode));
+    }
+    this.onChange?.();
+  }
+
+  private releaser(mode: LockMode): Release {
+    let released = false;
+    return () => {
+      if (released) return;
+      released = true;
+      if (mode === 'write') this.writing = false;
+      else this.readers--;
+      this.pump();
+    };
+  }
+}
+
+/**
+ * Runs tool calls under a per-device readers-writer lock and a deadline.
+ *
+ * Each tool says whether a call reads the device, may change it or needs no
+ * lock (BaseTool.access). Reads of one device run in parallel, writes to it
+ * run one at a time in arrival order, and different devices never wait for
+ * each other. A call that passes its deadline or is cancelled while queued
+ * leaves the queue; while running, its abort reaches the Python bridge
+ * through the request context, which cancels the command in the worker.
+ * Queued and running calls per device are reported as gauges.
+ */
+export class ToolScheduler {
+  private locks = new Map<string, ReadWriteLock>();
+  private defaultTimeoutMs: number;
+
+  constructor(private options: SchedulerOptions = {}) {
+    this.defaultTimeoutMs = options.defaultTimeoutMs ?? parseInt(process.env.ANDROID_MCP_REQUEST_TIMEOUT_MS || '120000', 10);
+  }
+
+  async run(tool: BaseTool, args: Record<string, any>, options: ScheduleOptions, fn: () => Promise<ToolResult>): Promise<ToolResult> {
+    const name = tool.definition.name;
+    const timeoutMs = options.timeoutMs ?? this.defaultTimeoutMs;
+    const controller = new AbortController();
+    const onCancel = () => controller.abort(new RequestAbortedError(`Tool ${name} was cancelled`, 'cancelled'));
+    if (options.signal?.aborted) onCancel();
+    else options.signal?.addEventListener('abort', onCancel, { once: true });
+    const timer = timeoutMs > 0
+      ? setTimeout(() => controller.abort(new RequestAbortedError(`Tool ${name} did not finish within its ${timeoutMs}ms deadline`, 'deadline')), timeoutMs)
+      : null;
+
+    try {
+      const release = await this.lock(tool, args, controller.signal);
+      const work = runInRequest({ signal: controller.signal }, fn);
+      // The lock is held until the tool is really done, even when its caller stops waiting earlier
+      work.then(release, release);
+      return await abortable(work, controller.signal);
+    } finally {
+      if (timer) clearTimeout(timer);
+      options.signal?.removeEventListener('abort', onCancel);
+    }
+  }
+
+  private async lock(tool: BaseTool, args: Record<string, any>, signal: AbortSignal): Promise<Release> {
+    const mode = tool.access(args);
+    if (mode === 'none') return () => {};
+    const device = this.options.resolveDevice ? await this.options.resolveDevice(args.deviceSerial) : args.deviceSerial || '';
+    let lock = this.locks.get(device);
+    if (!lock) {
+      const created: ReadWriteLock = new ReadWriteLock(() => this.report(device, created));
+      this.locks.set(device, created);
+      lock = created;
+    }
+    const queued = metrics.startTimer({ tool: tool.definition.name, phase: 'queue' });
+    const release = await lock.acquire(mode, signal);
+    queued();
+    return release;
+  }
+
+  private report(device: string, lock: ReadWriteLock): void {
+    const queued = lock.queued;
+    const active = lock.active;
+    for (const mode of ['read', 'write'] as LockMode[]) {
+      const labels = { device: device || 'default', mode };
+      metrics.setGauge('scheduler_queued', labels, queued[mode]);
+      metrics.setGauge('scheduler_running', labels, active[mode]);
+    }
+  }
+}
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent app label cache for the installed-apps listing.
+
+Looking up a label is one device call per package, so a phone with a
+hundred apps used to take longer than the command timeout. Labels are kept
+on disk per device together with the versionCode they were read for; a
+single `pm list packages` call tells which ones are still current, and only
+new or updated packages are looked up, several at a time.
+
+uiautomator2 3.x no longer reports labels in app_info(); there the label is
+read from the APK with aapt, when the host has it. A package whose label
+could not be found is shown by its package name and is not written to disk,
+so the next worker tries again.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Concurrent app_info lookups for packages missing from the cache
+MAX_LABEL_WORKERS = 8
+
+CACHE_DIR = os.environ.get("ANDROID_MCP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "android-mcp")
+
+PACKAGE_LINE = re.compile(r"package:(\S+)(?:\s+versionCode:(\d+))?")
+# Default label line of `aapt dump badging`; localized ones are application-label-<locale>:'...'
+BADGING_LABEL = re.compile(r"^application-label:'(.*)'$", re.M)
+AAPT_TIMEOUT = 30
+
+
+def shell_output(result: Any) -> str:
+    """Text of a device.shell() result, which is an (output, exit_code) pair on uiautomator2"""
+    if isinstance(result, tuple):
+        return result[0] or ""
+    return getattr(result, "output", result) or ""
+
+
+class AppLabelCache:
+    def __init__(self, device, serial: Optional[str] = None, cache_dir: str = CACHE_DIR):
+        self.device = device
+        name = re.sub(r"[^\w.-]", "_", serial or "default")
+        self.path = os.path.join(cache_dir, f"app-labels-{name}.json")
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=MAX_LABEL_WORKERS, thread_name_prefix="u2-labels")
+        # Background refresh of the pages nobody asked for yet; a separate lane so it never holds pool workers
+        self.prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="u2-labels-prefetch")
+        self.pending = None
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        # Earlier versions stored the package name when no label was found; look those up again
+        return {package: entry for package, entry in entries.items()
+                if isinstance(entry, dict) and entry.get("label") and entry["label"] != package}
+
+    def _save(self) -> None:
+        with self.lock:
+            snapshot = json.dumps({package: entry for package, entry in self.entries.items() if entry["label"]},
+                                  ensure_ascii=False)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # A cache that cannot be written only costs lookups next time
+
+    def list_packages(self) -> List[Tuple[str, Optional[int]]]:
+        """User packages with their versionCode, from one shell call where Android supports it"""
+        output = shell_output(self.device.shell("pm list packages -3 --show-versioncode"))
+        packages = [(match.group(1), int(match.group(2)) if match.group(2) else None)
+                    for match in PACKAGE_LINE.finditer(output)]
+        if packages:
+            return packages
+        return [(package, None) for package in self.device.app_list_user()]
+
+    def _apk_label(self, package: str) -> Optional[str]:
+        """Label from the package's base APK, read with the host's aapt"""
+        aapt = shutil.which("aapt") or shutil.which("aapt2")
+        if not aapt:
+            return None
+        paths = [line[len("package:"):].strip() for line in shell_output(self.device.shell(f"pm path {package}")).splitlines()
+                 if line.startswith("package:")]
+        base = next((path for path in paths if path.endswith("/base.apk")), paths[0] if paths else None)
+        if not base:
+            return None
+        with tempfile.TemporaryDirectory(prefix="android-mcp-apk-") as tmp:
+            local = os.path.join(tmp, "base.apk")
+            self.device.pull(base, local)
+            badging = subprocess.run([aapt, "dump", "badging", local], capture_output=True, text=True,
+                                     errors="replace", timeout=AAPT_TIMEOUT).stdout
+        match = BADGING_LABEL.search(badging)
+        return match.group(1) if match else None
+
+    def _lookup(self, package: str, version: Optional[int]) -> Dict[str, Any]:
+        try:
+            info = self.device.app_info(package)
+        except Exception:
+            info = {}
+        label = info.get("label") or info.get("app_name")
+        if not label:
+            try:
+                label = self._apk_label(package)
+            except Exception:
+                label = None
+        if version is None:
+            version = info.get("versionCode", info.get("version_code"))
+        entry = {"label": label, "versionCode": version}
+        with self.lock:
+            self.entries[package] = entry
+        return entry
+
+    def _cached(self, package: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Cached entry that is still valid; without a listed version any entry is trusted"""
+        with self.lock:
+            entry = self.entries.get(package)
+        if entry is None or (version is not None and entry.get("versionCode") != version):
+            return None
+        return entry
+
+    def _resolve(self, packages: List[Tuple[str, Optional[int]]]) -> int:
+        """Look up every stale package concurrently; returns how many there were"""
+        misses = [(package, version) for package, version in packages if self._cached(package, version) is None]
+        if misses:
+            list(self.pool.map(lambda item: self._lookup(*item), misses))
+            self._save()
+        return len(misses)
+
+    def apps(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """One page of installed apps with labels
+
+        Only the requested page is looked up before returning; stale labels
+        for the remaining packages are refreshed in the background so the
+        next pages come from the cache.
+        """
+        packages = self.list_packages()
+        end = len(packages) if not limit else min(len(packages), offset + limit)
+        page = packages[offset:end]
+        lookups = self._resolve(page)
+
+        rest = packages[:offset] + packages[end:]
+        stale = any(self._cached(package, version) is None for package, version in rest)
+        if stale and (self.pending is None or self.pending.done()):
+            self.pending = self.prefetch.submit(self._resolve, rest)
+
+        apps = []
+        for package, version in page:
+            entry = self._cached(package, version) or {}
+            apps.append({"packageName": package, "appName": entry.get("label") or package})
+
+        data: Dict[str, Any] = {"apps": apps, "total": len(packages), "offset": offset, "lookups": lookups}
+        if end < len(packages):
+            data["nextOffset"] = end
+        return data
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Cancellation of commands Node no longer waits for.
+
+When a tool call passes its deadline or the MCP client cancels it, Node sends
+{"action": "cancel", "args": {"id": <command id>}}. The reader thread marks
+the command right away: if it is still queued it is answered with an error
+instead of running, and if it is running it stops at its next check. Polling
+loops (waits, scrolls, batches) sleep through wait() here, which wakes up
+as soon as the command is cancelled.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+_local = threading.local()
+_events: Dict[int, threading.Event] = {}
+_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    """The command was cancelled by Node"""
+
+
+def register(command_id: Optional[int]) -> None:
+    """Track a command from the moment it is read, so a cancel finds it while it is queued"""
+    if command_id is not None:
+        with _lock:
+            _events[command_id] = threading.Event()
+
+
+def cancel(command_id: Optional[int]) -> bool:
+    """Mark a command cancelled; False if it already finished or was never seen"""
+    with _lock:
+        event = _events.get(command_id)
+    if event is None:
+        return False
+    event.set()
+    return True
+
+
+def start(command_id: Optional[int]) -> None:
+    """Bind the current thread to the command it is about to run"""
+    with _lock:
+        _local.event = _events.get(command_id)
+
+
+def finish(command_id: Optional[int]) -> None:
+    with _lock:
+        _events.pop(command_id, None)
+    _local.event = None
+
+
+def cancelled() -> bool:
+    event = getattr(_local, "event", None)
+    return event is not None and event.is_set()
+
+
+def check() -> None:
+    """Raise Cancelled if the command on this thread has been cancelled"""
+    if cancelled():
+        raise Cancelled("Command cancelled")
+
+
+def wait(seconds: float) -> None:
+    """Sleep for seconds, or raise Cancelled as soon as the command on this thread is cancelled"""
+    event = getattr(_local, "event", None)
+    if event is None:
+        time.sleep(seconds)
+        return
+    if event.wait(seconds):
+        raise Cancelled("Command cancelled")
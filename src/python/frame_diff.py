@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Change detection between consecutive screenshots of one device.
+
+Every captured frame is reduced to a small grayscale thumbnail. Comparing
+two thumbnails block by block (NumPy) tells whether the screen changed and
+where, without encoding or sending the full image.
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+# Thumbnail is 1/REDUCE of the screen in each direction
+REDUCE = 8
+# Side of a comparison block in thumbnail pixels (BLOCK * REDUCE device pixels)
+BLOCK = 4
+# Mean absolute gray-level difference above which a block counts as changed
+BLOCK_THRESHOLD = 6.0
+# More separate regions than this are merged into their union
+MAX_REGIONS = 8
+
+Box = Tuple[int, int, int, int]  # [x1, y1, x2, y2] in device pixels
+
+
+def thumbnail(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Small grayscale copy of a frame of the given full size, used for comparisons
+
+    image may already be smaller than size, e.g. a JPEG opened in draft mode.
+    """
+    target = (max(1, size[0] // REDUCE), max(1, size[1] // REDUCE))
+    gray = image.convert("L")
+    return gray if gray.size == target else gray.resize(target, Image.BOX)
+
+
+def union(boxes: List[Box]) -> Box:
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def clip(box: Box, region: Box) -> Optional[Box]:
+    x1, y1 = max(box[0], region[0]), max(box[1], region[1])
+    x2, y2 = min(box[2], region[2]), min(box[3], region[3])
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
+
+
+class FrameDiffer:
+    """Remembers the previous frame of a device and reports what changed since"""
+
+    def __init__(self):
+        self.previous: Optional[Image.Image] = None
+        self.previous_size: Optional[Tuple[int, int]] = None
+        self.lock = threading.Lock()
+        # Frames are only kept once someone has asked for a diff, so plain screenshots never pay for a thumbnail
+        self.tracking = False
+
+    def _swap(self, image: Image.Image, size: Tuple[int, int]) -> Tuple[Optional[Image.Image], Image.Image]:
+        current = thumbnail(image, size)
+        with self.lock:
+            previous = self.previous if self.previous_size == size else None
+            self.previous = current
+            self.previous_size = size
+        return previous, current
+
+    def update(self, image: Image.Image, size: Optional[Tuple[int, int]] = None) -> None:
+        """Store image as the latest frame
+
+        size is the full frame size when image is a reduced decode of it.
+        Does nothing until the first compare().
+        """
+        if self.tracking:
+            self._swap(image, size or image.size)
+
+    def compare(self, image: Image.Image, size: Optional[Tuple[int, int]] = None) -> Optional[List[Box]]:
+        """Store image as the latest frame and return the boxes that changed since the previous one
+
+        Returns None if there is no earlier frame of the same size to compare with.
+        """
+        size = size or image.size
+        self.tracking = True
+        previous, current = self._swap(image, size)
+        if previous is None:
+            return None
+        return self.changed_boxes(previous, current, size)
+
+    @staticmethod
+    def changed_boxes(previous: Image.Image, current: Image.Image, size: Tuple[int, int]) -> List[Box]:
+        """Bounding boxes, in device pixels, of the blocks that differ between two thumbnails"""
+        import numpy as np
+
+        a = np.asarray(previous, dtype=np.int16)
+        b = np.asarray(current, dtype=np.int16)
+        h, w = a.shape
+        rows, cols = -(-h // BLOCK), -(-w // BLOCK)
+        diff = np.zeros((rows * BLOCK, cols * BLOCK), dtype=np.float32)
+        diff[:h, :w] = np.abs(a - b)
+        block_means = diff.reshape(rows, BLOCK, cols, BLOCK).mean(axis=(1, 3))
+        changed = block_means > BLOCK_THRESHOLD
+        if not changed.any():
+            return []
+
+        # Group touching changed blocks (8-connectivity) into one box each
+        scale_x = size[0] / w
+        scale_y = size[1] / h
+        seen = np.zeros_like(changed)
+        boxes: List[Box] = []
+        for r, c in zip(*np.nonzero(changed)):
+            if seen[r, c]:
+                continue
+            seen[r, c] = True
+            stack = [(r, c)]
+            r1, c1, r2, c2 = r, c, r, c
+            while stack:
+                y, x = stack.pop()
+                r1, c1, r2, c2 = min(r1, y), min(c1, x), max(r2, y), max(c2, x)
+                for ny in (y - 1, y, y + 1):
+                    for nx in (x - 1, x, x + 1):
+                        if 0 <= ny < rows and 0 <= nx < cols and changed[ny, nx] and not seen[ny, nx]:
+                            seen[ny, nx] = True
+                            stack.append((ny, nx))
+            boxes.append((
+                int(c1 * BLOCK * scale_x),
+                int(r1 * BLOCK * scale_y),
+                min(size[0], int((c2 + 1) * BLOCK * scale_x)),
+                min(size[1], int((r2 + 1) * BLOCK * scale_y)),
+            ))
+
+        if len(boxes) > MAX_REGIONS:
+            boxes = [union(boxes)]
+        return sorted(boxes, key=lambda box: (box[1], box[0]))
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Finding a template image on the screen, for screens without a useful hierarchy.
+
+Games, Flutter and WebView screens often dump as a single FrameLayout, so
+the only way to find a button is by what it looks like. The screenshot and
+the template are compared in grayscale by normalized cross-correlation
+(NCC), which does not care about uniform brightness or contrast changes:
+
+1. Coarse: the screen is reduced to about COARSE_SIZE pixels on its long
+   side and the template is correlated with it at every scale, one FFT
+   product per scale. Window means and variances come from integral images.
+2. Fine: the best coarse candidates are scored again at full resolution in
+   a small window around their position, which places the match to the
+   pixel and drops look-alikes that only match when blurred.
+
+Prepared templates (grayscale, resized per scale and reduction, and their
+spectrum for the screen size) stay in an LRU keyed by file path and mtime,
+or by a digest of the image data, so searching for the same icon again
+skips all template work.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Long side of the reduced screen the coarse search runs on
+COARSE_SIZE = 480
+# Smallest template side, in reduced pixels, that still correlates reliably
+MIN_TEMPLATE = 12
+# Coarse candidates scored again at full resolution, if within CANDIDATE_MARGIN of the best coarse score
+CANDIDATES = 3
+CANDIDATE_MARGIN = 0.1
+# Template sizes tried, relative to the template image
+DEFAULT_SCALES = (0.5, 0.625, 0.75, 0.875, 1.0, 1.25, 1.5, 1.75, 2.0)
+DEFAULT_THRESHOLD = 0.8
+TEMPLATE_CACHE_SIZE = 32
+# Windows flatter than this per-pixel variance have no meaningful correlation and score 0
+FLAT_VARIANCE = 4.0
+
+Box = Tuple[int, int, int, int]  # [x1, y1, x2, y2] in device pixels
+
+
+def fast_length(n: int) -> int:
+    """Smallest size from n up with no prime factor above 5, the sizes FFTs are fastest at"""
+    while True:
+        rest = n
+        for prime in (2, 3, 5):
+            while rest % prime == 0:
+                rest //= prime
+        if rest == 1:
+            return n
+        n += 1
+
+
+def grayscale(image: Image.Image) -> np.ndarray:
+    return np.asarray(image.convert("L"), dtype=np.float64)
+
+
+class Surface:
+    """Grayscale pixels to search in, with the integral images and spectrum computed once"""
+
+    def __init__(self, pixels: np.ndarray):
+        self.pixels = pixels
+        self.shape = pixels.shape
+        # Zero padding to a fast size; positions where a template fits still never wrap around
+        self.fft_shape = (fast_length(self.shape[0]), fast_length(self.shape[1]))
+        self._spectrum = None
+        self._sums = np.zeros((self.shape[0] + 1, self.shape[1] + 1))
+        self._sums[1:, 1:] = pixels.cumsum(0).cumsum(1)
+        self._squares = np.zeros_like(self._sums)
+        self._squares[1:, 1:] = (pixels * pixels).cumsum(0).cumsum(1)
+
+    @property
+    def spectrum(self) -> np.ndarray:
+        if self._spectrum is None:
+            self._spectrum = np.fft.rfft2(self.pixels, s=self.fft_shape)
+        return self._spectrum
+
+    @staticmethod
+    def _windows(table: np.ndarray, h: int, w: int) -> np.ndarray:
+        return table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+
+    def ncc(self, template: np.ndarray, norm: float, spectrum: Optional[np.ndarray] = None) -> np.ndarray:
+        """NCC of a zero-mean template at every position where it fits entirely
+
+        spectrum is the conjugate FFT of template padded to fft_shape; it is
+        computed here if not given.
+        """
+        H, W = self.shape
+        h, w = template.shape
+        if spectrum is None:
+            spectrum = np.conj(np.fft.rfft2(template, s=self.fft_shape))
+        products = np.fft.irfft2(self.spectrum * spectrum, s=self.fft_shape)[:H - h + 1, :W - w + 1]
+        n = h * w
+        sums = self._windows(self._sums, h, w)
+        variance = self._windows(self._squares, h, w) - sums * sums / n
+        scores = np.zeros_like(products)
+        textured = variance > FLAT_VARIANCE * n
+        scores[textured] = products[textured] / (np.sqrt(variance[textured]) * norm)
+        return scores
+
+
+class Template:
+    """A template image and its prepared variants, built on first use"""
+
+    def __init__(self, image: Image.Image):
+        self.image = image.convert("L")
+        self.size = self.image.size
+        self._variants: Dict[Tuple[float, int], Optional[Tuple[np.ndarray, float]]] = {}
+        self._spectra: Dict[Tuple[float, int, Tuple[int, int]], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, scale: float, factor: int) -> Optional[Tuple[np.ndarray, float]]:
+        """Zero-mean pixels and their norm at scale, reduced by factor; None if too small or flat"""
+        key = (scale, factor)
+        with self._lock:
+            if key not in self._variants:
+                w = round(self.size[0] * scale / factor)
+                h = round(self.size[1] * scale / factor)
+                variant = None
+                if min(w, h) >= (MIN_TEMPLATE if factor > 1 else 1):
+                    pixels = grayscale(self.image.resize((w, h), Image.BOX))
+                    pixels -= pixels.mean()
+                    norm = float(np.sqrt((pixels * pixels).sum()))
+                    if norm * norm > FLAT_VARIANCE * w * h:
+                        variant = (pixels, norm)
+                self._variants[key] = variant
+            return self._variants[key]
+
+    def spectrum(self, scale: float, factor: int, shape: Tuple[int, int]) -> np.ndarray:
+        """Conjugate FFT of a variant padded to shape, kept for the next screen of the same size"""
+        key = (scale, factor, shape)
+        with self._lock:
+            spectrum = self._spectra.get(key)
+        if spectrum is None:
+            pixels, _ = self.variant(scale, factor)
+            spectrum = np.conj(np.fft.rfft2(pixels, s=shape))
+            with self._lock:
+                self._spectra[key] = spectrum
+        return spectrum
+
+
+class ImageMatcher:
+    def __init__(self, cache_size: int = TEMPLATE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._templates: "OrderedDict[Any, Template]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def template(self, path: Optional[str] = None, data: Optional[str] = None) -> Tuple[Template, bool]:
+        """The template from a file or base64 image data, and whether it came from the cache
+
+        Files are keyed by path, size and mtime, so an edited file is read again.
+        """
+        if path:
+            path = os.path.realpath(path)
+            stat = os.stat(path)
+            key: Any = ("file", path, stat.st_size, stat.st_mtime_ns)
+        elif data:
+            raw = base64.b64decode(data)
+            key = ("data", hashlib.blake2b(raw, digest_size=16).hexdigest())
+        else:
+            raise ValueError("A template path or base64 image data is required")
+
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template, True
+
+        template = Template(Image.open(path) if path else Image.open(io.BytesIO(raw)))
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+        return template, False
+
+    def find(self, screen: Image.Image, template: Template, region: Optional[Box] = None,
+             threshold: float = DEFAULT_THRESHOLD, scales: Sequence[float] = DEFAULT_SCALES) -> Dict[str, Any]:
+        """Best match of template on screen, searched only inside region if given
+
+        Returns found (score >= threshold), the score and scale of the best
+        match and, when found, its bounds and centre in screen pixels.
+        """
+        origin = (0, 0)
+        if region:
+            screen = screen.crop(region)
+            origin = (region[0], region[1])
+        gray = screen.convert("L")
+        W, H = gray.size
+        smallest = min(template.size) * min(scales)
+        factor = max(1, min(max(H, W) // COARSE_SIZE, int(smallest // MIN_TEMPLATE)))
+
+        # Block means in PIL are several times faster than in NumPy; full resolution stays 8 bit until cropped
+        coarse = Surface(grayscale(gray.reduce(factor)))
+        full = np.asarray(gray)
+        candidates: List[Tuple[float, float, int, int]] = []
+        for scale in scales:
+            variant = template.variant(scale, factor)
+            if variant is None:
+                continue
+            pixels, norm = variant
+            if pixels.shape[0] > coarse.shape[0] or pixels.shape[1] > coarse.shape[1]:
+                continue
+            scores = coarse.ncc(pixels, norm, template.spectrum(scale, factor, coarse.fft_shape))
+            y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+            candidates.append((float(scores[y, x]), scale, int(y) * factor, int(x) * factor))
+
+        best: Tuple[float, float, int, int, int, int] = (-1.0, 1.0, 0, 0, 0, 0)
+        candidates.sort(reverse=True)
+        for coarse_score, scale, y, x in candidates[:CANDIDATES]:
+            if coarse_score < candidates[0][0] - CANDIDATE_MARGIN:
+                break
+            variant = template.variant(scale, 1)
+            if variant is None:
+                continue
+            pixels, norm = variant
+            h, w = pixels.shape
+            if h > H or w > W:
+                continue
+            # The coarse position is off by up to a reduced pixel in each direction, plus rounding
+            margin = 2 * factor
+            y1, x1 = max(0, y - margin), max(0, x - margin)
+            y2, x2 = min(H, y + h + margin), min(W, x + w + margin)
+            scores = Surface(full[y1:y2, x1:x2].astype(np.float64)).ncc(pixels, norm)
+            dy, dx = np.unravel_index(int(np.argmax(scores)), scores.shape)
+            score = float(scores[dy, dx])
+            if score > best[0]:
+                best = (score, scale, y1 + int(dy), x1 + int(dx), h, w)
+
+        score, scale, y, x, h, w = best
+        data: Dict[str, Any] = {
+            "found": score >= threshold,
+            "score": round(max(score, 0.0), 4),
+            "scale": scale,
+        }
+        if data["found"]:
+            bounds = [origin[0] + x, origin[1] + y, origin[0] + x + w, origin[1] + y + h]
+            data["bounds"] = bounds
+            data["center"] = [(bounds[0] + bounds[2]) // 2, (bounds[1] + bounds[3]) // 2]
+        return data
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass screenshot encoding for the uiautomator2 bridge.
+
+Picks JPEG/WebP quality and output size up front from a small size model
+instead of re-encoding at decreasing quality until the image fits.
+"""
+
+import io
+import math
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+# Encoded size relative to quality 75, measured on typical app screens.
+# Lossy codecs are far from linear in quality: below ~60 the size barely
+# drops, so byte budgets are mostly met by scaling down, not by quality.
+QUALITY_CURVES = {
+    "jpeg": ((10, 0.42), (20, 0.54), (30, 0.63), (40, 0.71), (50, 0.77), (60, 0.84),
+             (70, 0.94), (75, 1.0), (80, 1.09), (85, 1.20), (90, 1.38), (95, 1.72)),
+    "webp": ((10, 0.57), (20, 0.65), (30, 0.72), (40, 0.80), (50, 0.87), (60, 0.91),
+             (70, 0.97), (75, 1.0), (80, 1.10), (85, 1.20), (90, 1.35), (95, 1.57)),
+}
+
+# Starting guess for bytes per pixel at quality 75, refined after every encode
+INITIAL_BYTES_PER_PIXEL = {"jpeg": 0.08, "webp": 0.04}
+
+PIL_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "png": "PNG"}
+
+MIN_QUALITY = 50
+MAX_QUALITY = 85
+# Aim below the budget so a slightly busier screen than the model expects still fits
+BUDGET_HEADROOM = 0.9
+# Weight of the newest measurement in the bytes-per-pixel estimate
+CALIBRATION_WEIGHT = 0.5
+
+
+def relative_size(image_format: str, quality: int) -> float:
+    """Interpolated size factor for quality on the format's curve"""
+    curve = QUALITY_CURVES[image_format]
+    if quality <= curve[0][0]:
+        return curve[0][1]
+    for (q1, s1), (q2, s2) in zip(curve, curve[1:]):
+        if quality <= q2:
+            return s1 + (s2 - s1) * (quality - q1) / (q2 - q1)
+    return curve[-1][1]
+
+
+def fit_size(width: int, height: int, max_width: Optional[int], max_height: Optional[int]) -> Tuple[int, int]:
+    """Largest size with the same aspect ratio inside max_width x max_height"""
+    scale = 1.0
+    if max_width and width > max_width:
+        scale = min(scale, max_width / width)
+    if max_height and height > max_height:
+        scale = min(scale, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class ScreenshotEncoder:
+    """Encodes screenshots to a target format, size and byte budget.
+
+    Keeps a per-device estimate of bytes per pixel for each lossy format, so
+    the quality and scale for a budget are chosen before encoding. A second
+    encode only happens when a screen is much busier than the estimate.
+    """
+
+    def __init__(self):
+        self.bytes_per_pixel = dict(INITIAL_BYTES_PER_PIXEL)
+        self.lock = threading.Lock()
+
+    def predict(self, image_format: str, pixels: int, quality: int) -> float:
+        return pixels * self.bytes_per_pixel[image_format] * relative_size(image_format, quality)
+
+    def calibrate(self, image_format: str, pixels: int, quality: int, size: int) -> None:
+        measured = size / (pixels * relative_size(image_format, quality))
+        with self.lock:
+            previous = self.bytes_per_pixel[image_format]
+            self.bytes_per_pixel[image_format] = previous + CALIBRATION_WEIGHT * (measured - previous)
+
+    def plan(self, image_format: str, width: int, height: int, max_bytes: Optional[int]) -> Tuple[int, float]:
+        """Quality and extra scale factor expected to land under max_bytes"""
+        pixels = width * height
+        if not max_bytes:
+            return MAX_QUALITY, 1.0
+
+        target = max_bytes * BUDGET_HEADROOM
+        for quality in range(MAX_QUALITY, MIN_QUALITY - 1, -5):
+            if self.predict(image_format, pixels, quality) <= target:
+                return quality, 1.0
+
+        scale = math.sqrt(target / self.predict(image_format, pixels, MIN_QUALITY))
+        return MIN_QUALITY, scale
+
+    def encode(self, image: Image.Image, image_format: str = "jpeg", max_width: Optional[int] = None,
+               max_height: Optional[int] = None, max_bytes: Optional[int] = None,
+               quality: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """Encode image, returning the bytes and a description of what was produced.
+
+        max_bytes only applies to lossy formats; PNG is encoded once at the
+        requested dimensions.
+        """
+        if image_format not in PIL_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        width, height = fit_size(image.width, image.height, max_width, max_height)
+
+        if image_format == "png":
+            image = self._resize(image, width, height)
+            data = self._save(image, "png")
+            return data, {"format": "png", "width": width, "height": height, "bytes": len(data)}
+
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        scale = 1.0
+        if quality is None:
+            quality, scale = self.plan(image_format, width, height, max_bytes)
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+
+        encoded = self._resize(image, width, height)
+        data = self._save(encoded, image_format, quality)
+        self.calibrate(image_format, width * height, quality, len(data))
+
+        if max_bytes and len(data) > max_bytes:
+            # The model underestimated this screen; one corrective pass using the measured size
+            scale = math.sqrt(max_bytes * BUDGET_HEADROOM / len(data))
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+            encoded = self._resize(image, width, height)
+            data = self._save(encoded, image_format, quality)
+            self.calibrate(image_format, width * height, quality, len(data))
+
+        return data, {"format": image_format, "width": width, "height": height, "quality": quality, "bytes": len(data)}
+
+    @staticmethod
+    def _resize(image: Image.Image, width: int, height: int) -> Image.Image:
+        if (width, height) == image.size:
+            return image
+        return image.resize((width, height), Image.BILINEAR, reducing_gap=2.0)
+
+    @staticmethod
+    def _save(image: Image.Image, image_format: str, quality: Optional[int] = None) -> bytes:
+        buffer = io.BytesIO()
+        if image_format == "png":
+            image.save(buffer, format="PNG", compress_level=1)
+        elif image_format == "webp":
+            image.save(buffer, format="WEBP", quality=quality, method=2)
+        else:
+            image.save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Phase timings for the command running on the current thread.
+
+run_command starts a fresh record before dispatching, code on the way marks
+the phases worth telling apart (capture, encode, dump, ...) and the totals
+travel back to Node in the response's "timing" field, so the server can
+tell device time from encoding and transport without guessing.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+_local = threading.local()
+
+
+def start() -> None:
+    _local.phases = {}
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to phase name of the current command"""
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = getattr(_local, "phases", None)
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + (time.perf_counter() - begin) * 1000
+
+
+def collect() -> Dict[str, float]:
+    """Phases recorded since start(), as {"<name>Ms": milliseconds}; ends the record"""
+    phases = getattr(_local, "phases", None) or {}
+    _local.phases = None
+    return {f"{name}Ms": round(ms, 3) for name, ms in phases.items()}
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Recording of a bridge session into a trace file that a fake device can replay.
+
+Set ANDROID_MCP_RECORD to a file path ("{serial}" is replaced by the device
+serial, ".gz" compresses) and every command the worker runs is written out
+with its arguments, response and phase timings. The device is wrapped as
+well, so each uiautomator2 call is recorded with its latency and, for
+dumps, screenshots and queries, what it returned. Those device calls are
+what test/fakes/uiautomator2 replays (FAKE_U2_TRACE).
+
+The file is JSON lines. Large values (dumps, images) are stored once as a
+blob line and referenced by id, so a session that dumps the same screen ten
+times stores it once. Every device call carries the number of inputs made
+before it (state), which is how the replay knows which recorded screen
+follows which tap.
+"""
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Response strings longer than this go to a blob instead of inline
+INLINE_LIMIT = 512
+# JPEG quality for screenshots returned as images, which have no bytes to store as they are
+SCREENSHOT_QUALITY = 85
+
+# Device calls that change the screen; each one starts a new state
+INPUT_CALLS = {
+    "click", "double_click", "long_click", "swipe", "swipe_ext", "drag", "press", "send_keys", "clear_text",
+    "app_start", "app_stop", "screen_on", "screen_off", "unlock",
+}
+# Device calls whose return value is recorded, so the replay can answer them
+VALUE_CALLS = {"window_size", "app_current", "app_list_user", "app_info", "shell"}
+# Selector (UiObject, XPath) methods that are inputs
+SELECTOR_INPUTS = {"click", "long_click", "set_text", "clear_text", "send_keys"}
+
+
+def trace_path(serial: Optional[str]) -> Optional[str]:
+    """The file ANDROID_MCP_RECORD asks this worker to record to, if any"""
+    path = os.environ.get("ANDROID_MCP_RECORD")
+    if not path:
+        return None
+    return path.replace("{serial}", serial or "default")
+
+
+class TraceWriter:
+    """Appends trace lines and stores each distinct blob once"""
+
+    def __init__(self, path: str, serial: Optional[str]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.stream = gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.blobs = set()
+        self.started = time.monotonic()
+        self.state = 0
+        self.write({"type": "header", "version": 1, "serial": serial,
+                    "started": datetime.now(timezone.utc).isoformat()})
+
+    def now(self) -> float:
+        return round((time.monotonic() - self.started) * 1000, 3)
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def blob(self, data: Any) -> str:
+        """Id of data (str or bytes), writing it the first time it is seen"""
+        raw = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        blob_id = hashlib.blake2b(raw, digest_size=12).hexdigest()
+        with self.lock:
+            if blob_id in self.blobs:
+                return blob_id
+            self.blobs.add(blob_id)
+        if isinstance(data, str):
+            entry = {"type": "blob", "id": blob_id, "encoding": "utf-8", "data": data}
+        else:
+            entry = {"type": "blob", "id": blob_id, "encoding": "base64", "data": base64.b64encode(raw).decode("ascii")}
+        self.write(entry)
+        return blob_id
+
+    def compact(self, value: Any) -> Any:
+        """value with long strings replaced by blob references"""
+        if isinstance(value, str) and len(value) > INLINE_LIMIT:
+            return {"$blob": self.blob(value)}
+        if isinstance(value, dict):
+            return {key: self.compact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.compact(item) for item in value]
+        return value
+
+    def command(self, action: str, args: Dict[str, Any], result: Dict[str, Any], payload: Optional[bytes]) -> None:
+        """One bridge command with its response; payload is the binary frame sent after it, if any"""
+        entry = {"type": "command", "at": self.now(), "action": action, "args": self.compact(args),
+                 "response": self.compact(result)}
+        if payload is not None:
+            entry["payload"] = self.blob(payload)
+        self.write(entry)
+
+    def call(self, name: str, started: float, args: Any = None, **fields: Any) -> None:
+        """One device call that started at started (monotonic) and has just returned"""
+        entry = {"type": "call", "name": name, "at": round((started - self.started) * 1000, 3),
+                 "ms": round((time.monotonic() - started) * 1000, 3), "state": self.state}
+        if args:
+            entry["args"] = args
+        entry.update(fields)
+        if name in INPUT_CALLS or fields.get("input"):
+            with self.lock:
+                self.state += 1
+        self.write(entry)
+
+    def close(self) -> None:
+        with self.lock:
+            self.stream.close()
+
+
+class RecordingSelector:
+    """A UiObject or XPath selector whose inputs count as device inputs"""
+
+    def __init__(self, target, trace: TraceWriter, name: str, query: Any):
+        self._target = target
+        self._trace = trace
+        self._name = name
+        self._query = query
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr not in SELECTOR_INPUTS or not callable(value):
+            return value
+
+        def input_call(*args, **kwargs):
+            started = time.monotonic()
+            result = value(*args, **kwargs)
+            self._trace.call(f"{self._name}.{attr}", started, [self._query, list(args)], input=True)
+            return result
+        return input_call
+
+
+class RecordingDevice:
+    """Wraps a uiautomator2 device and records every call made through it"""
+
+    def __init__(self, device, trace: TraceWriter):
+        self._device = device
+        self._trace = trace
+
+    def __getattr__(self, attr):
+        value = getattr(self._device, attr)
+        if not callable(value) or attr.startswith("_") or (attr not in INPUT_CALLS and attr not in VALUE_CALLS):
+            return value
+
+        def recorded(*args, **kwargs):
+            started = time.monotonic()
+            result = value(*args, **kwargs)
+            call_args = list(args) + ([kwargs] if kwargs else [])
+            if attr in VALUE_CALLS:
+                self._trace.call(attr, started, call_args, value=self._trace.compact(list(result) if isinstance(result, tuple) else result))
+            else:
+                self._trace.call(attr, started, call_args)
+            return result
+        return recorded
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        info = self._device.info
+        self._trace.call("info", started, value=info)
+        return info
+
+    @property
+    def device_info(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        info = self._device.device_info
+        self._trace.call("device_info", started, value=info)
+        return info
+
+    def dump_hierarchy(self, *args, **kwargs) -> str:
+        started = time.monotonic()
+        xml = self._device.dump_hierarchy(*args, **kwargs)
+        compressed = kwargs.get("compressed", args[0] if args else False)
+        self._trace.call("dump_hierarchy", started, {"compressed": compressed}, blob=self._trace.blob(xml))
+        return xml
+
+    def screenshot(self, *args, **kwargs):
+        started = time.monotonic()
+        image = self._device.screenshot(*args, **kwargs)
+        ended = time.monotonic()
+        if isinstance(image, (bytes, bytearray)):
+            data = bytes(image)
+        elif isinstance(image, str):
+            with open(image, "rb") as f:
+                data = f.read()
+        else:
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=SCREENSHOT_QUALITY)
+            data = buffer.getvalue()
+        # Encoding for the trace is not part of the device's latency
+        self._trace.call("screenshot", started, blob=self._trace.blob(data),
+                         ms=round((ended - started) * 1000, 3))
+        return image
+
+    def __call__(self, **kwargs):
+        return RecordingSelector(self._device(**kwargs), self._trace, "selector", kwargs)
+
+    def xpath(self, xpath: str):
+        return RecordingSelector(self._device.xpath(xpath), self._trace, "xpath", xpath)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Matching uiautomator2 selectors against one hierarchy dump.
+
+Every device(**selector).exists is a round trip to the device. Looking up a
+list of alternative selectors (a search box can be labelled in half a dozen
+ways) is one dump here and the rest runs locally, in the order the
+selectors are ranked.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+import timings
+
+# Selector field -> hierarchy attribute, by how the value is compared
+EXACT_FIELDS = {
+    "text": "text",
+    "description": "content-desc",
+    "resourceId": "resource-id",
+    "className": "class",
+    "packageName": "package",
+}
+CONTAINS_FIELDS = {
+    "textContains": "text",
+    "descriptionContains": "content-desc",
+}
+STARTS_WITH_FIELDS = {
+    "textStartsWith": "text",
+    "descriptionStartsWith": "content-desc",
+}
+MATCHES_FIELDS = {
+    "textMatches": "text",
+    "descriptionMatches": "content-desc",
+    "resourceIdMatches": "resource-id",
+    "classNameMatches": "class",
+    "packageNameMatches": "package",
+}
+BOOLEAN_FIELDS = {
+    "clickable": "clickable",
+    "enabled": "enabled",
+    "focusable": "focusable",
+    "focused": "focused",
+    "scrollable": "scrollable",
+    "checkable": "checkable",
+    "checked": "checked",
+    "selected": "selected",
+    "longClickable": "long-clickable",
+}
+
+BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def parse_nodes(xml: str) -> List[Dict[str, str]]:
+    """Attributes of every node in document order"""
+    root = etree.fromstring(xml.encode("utf-8"), parser=etree.XMLParser(recover=True, huge_tree=True))
+    if root is None:
+        return []
+    return [dict(node.attrib) for node in root.iter("node")]
+
+
+def parse_bounds(value: str) -> List[int]:
+    match = BOUNDS_PATTERN.match(value or "")
+    return [int(group) for group in match.groups()] if match else [0, 0, 0, 0]
+
+
+def node_matches(node: Dict[str, str], selector: Dict[str, Any], patterns: Dict[str, Any]) -> bool:
+    """Whether a node satisfies every field of selector, like UiSelector does on the device"""
+    for key, value in selector.items():
+        if key in EXACT_FIELDS:
+            if node.get(EXACT_FIELDS[key], "") != value:
+                return False
+        elif key in CONTAINS_FIELDS:
+            if value not in node.get(CONTAINS_FIELDS[key], ""):
+                return False
+        elif key in STARTS_WITH_FIELDS:
+            if not node.get(STARTS_WITH_FIELDS[key], "").startswith(value):
+                return False
+        elif key in MATCHES_FIELDS:
+            # Java's String.matches: the whole value has to match
+            if not patterns[key].fullmatch(node.get(MATCHES_FIELDS[key], "")):
+                return False
+        elif key in BOOLEAN_FIELDS:
+            if (node.get(BOOLEAN_FIELDS[key]) == "true") != bool(value):
+                return False
+        elif key == "index":
+            if node.get("index") != str(value):
+                return False
+    return True
+
+
+def to_element(node: Dict[str, str]) -> Dict[str, Any]:
+    """Same shape as the bridge's find_element result"""
+    return {
+        "text": node.get("text", ""),
+        "description": node.get("content-desc", ""),
+        "resourceId": node.get("resource-id", ""),
+        "className": node.get("class", ""),
+        "packageName": node.get("package", ""),
+        "bounds": parse_bounds(node.get("bounds", "")),
+        "clickable": node.get("clickable") == "true",
+        "enabled": node.get("enabled", "true") == "true",
+        "focusable": node.get("focusable") == "true",
+        "focused": node.get("focused") == "true",
+        "scrollable": node.get("scrollable") == "true",
+        "selected": node.get("selected") == "true",
+        "checkable": node.get("checkable") == "true",
+        "checked": node.get("checked") == "true",
+    }
+
+
+def find_matches(nodes: List[Dict[str, str]], selector: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Nodes matching selector in document order; instance picks the n-th one"""
+    patterns = {key: re.compile(selector[key], re.DOTALL) for key in MATCHES_FIELDS if key in selector}
+    matches = [node for node in nodes if node_matches(node, selector, patterns)]
+    instance = selector.get("instance")
+    if instance is not None:
+        return matches[instance:instance + 1]
+    return matches
+
+
+class UIMatcher:
+    def __init__(self, device):
+        self.device = device
+
+    def find(self, selectors: List[Dict[str, Any]], include_all: bool = False) -> Dict[str, Any]:
+        """Best match for a ranked list of selectors from a single dump
+
+        The best match is the first node (in document order) of the first
+        selector that matches anything; "selector" is that selector's rank.
+        With include_all, "matches" lists every node matched by any selector,
+        tagged with the best rank it matched, ordered by rank.
+        """
+        with timings.phase("dump"):
+            xml = self.device.dump_hierarchy(compressed=False)
+        with timings.phase("parse"):
+            nodes = parse_nodes(xml)
+        best: Optional[Tuple[int, Dict[str, str]]] = None
+        matches: List[Dict[str, Any]] = []
+        seen = set()
+
+        for rank, selector in enumerate(selectors):
+            found = find_matches(nodes, selector)
+            if found and best is None:
+                best = (rank, found[0])
+                if not include_all:
+                    break
+            if include_all:
+                for node in found:
+                    if id(node) not in seen:
+                        seen.add(id(node))
+                        matches.append({"selector": rank, **to_element(node)})
+
+        result: Dict[str, Any] = {"success": True, "found": best is not None}
+        if best is not None:
+            result["selector"] = best[0]
+            result["element"] = to_element(best[1])
+        if include_all:
+            result["matches"] = matches
+        return result
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Scrolling a list until an element shows up, in one command.
+
+Each round is one compressed hierarchy dump and, if the element is not on
+screen yet, one swipe inside the scrollable container. The content of the
+container is fingerprinted after every swipe: when a swipe leaves it as it
+was, the list is at its end and the search stops instead of swiping on.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+import cancellation
+import timings
+from ui_match import find_matches, parse_bounds, parse_nodes, to_element
+
+# Part of the container a swipe travels, from SWIPE_FROM to SWIPE_TO of its
+# length. Less than a page, so every item is on screen whole at some point.
+SWIPE_FROM = 0.75
+SWIPE_TO = 0.25
+# Pause after a swipe for the fling to come to rest before the next dump
+SETTLE_TIME = 0.15
+
+
+def area(bounds: List[int]) -> int:
+    return max(0, bounds[2] - bounds[0]) * max(0, bounds[3] - bounds[1])
+
+
+def center_inside(bounds: List[int], box: List[int]) -> bool:
+    x, y = (bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2
+    return box[0] <= x < box[2] and box[1] <= y < box[3]
+
+
+class UIScroller:
+    def __init__(self, device):
+        self.device = device
+
+    def dump(self) -> List[Dict[str, str]]:
+        with timings.phase("dump"):
+            xml = self.device.dump_hierarchy(compressed=True)
+        with timings.phase("parse"):
+            return parse_nodes(xml)
+
+    @staticmethod
+    def find_container(nodes: List[Dict[str, str]], selector: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+        """Bounds of the container matching selector, or of the largest scrollable node"""
+        if selector:
+            found = find_matches(nodes, selector)
+            return parse_bounds(found[0].get("bounds", "")) if found else None
+        scrollable = [parse_bounds(node.get("bounds", "")) for node in nodes if node.get("scrollable") == "true"]
+        return max(scrollable, key=area) if scrollable else None
+
+    @staticmethod
+    def fingerprint(nodes: List[Dict[str, str]], box: List[int]) -> str:
+        """Digest of what is visible in box: equal digests before and after a swipe mean nothing moved"""
+        digest = hashlib.blake2b(digest_size=8)
+        for node in nodes:
+            bounds = parse_bounds(node.get("bounds", ""))
+            if area(bounds) and center_inside(bounds, box):
+                digest.update("\x00".join((node.get("text", ""), node.get("content-desc", ""),
+                                           node.get("resource-id", ""), node.get("bounds", ""))).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def match(nodes: List[Dict[str, str]], selectors: List[Dict[str, Any]], box: List[int]) -> Optional[Dict[str, str]]:
+        """First node of the first selector with a match whose centre is in box, so it can be tapped"""
+        for selector in selectors:
+            for node in find_matches(nodes, selector):
+                if center_inside(parse_bounds(node.get("bounds", "")), box):
+                    return node
+        return None
+
+    @staticmethod
+    def cut_off(node: Dict[str, str], box: List[int], direction: str) -> bool:
+        """Whether node touches the edge of box that content scrolls in from, so it may be only partly shown"""
+        bounds = parse_bounds(node.get("bounds", ""))
+        if direction == "down":
+            return bounds[3] >= box[3]
+        if direction == "up":
+            return bounds[1] <= box[1]
+        if direction == "right":
+            return bounds[2] >= box[2]
+        return bounds[0] <= box[0]
+
+    def swipe(self, box: List[int], direction: str, duration: float) -> None:
+        """One swipe inside box that moves the content towards direction"""
+        x1, y1, x2, y2 = box
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        width, height = x2 - x1, y2 - y1
+        # Scrolling down reveals what is below, so the finger moves up
+        if direction == "down":
+            points = (cx, y1 + int(height * SWIPE_FROM), cx, y1 + int(height * SWIPE_TO))
+        elif direction == "up":
+            points = (cx, y1 + int(height * SWIPE_TO), cx, y1 + int(height * SWIPE_FROM))
+        elif direction == "right":
+            points = (x1 + int(width * SWIPE_FROM), cy, x1 + int(width * SWIPE_TO), cy)
+        else:
+            points = (x1 + int(width * SWIPE_TO), cy, x1 + int(width * SWIPE_FROM), cy)
+        with timings.phase("swipe"):
+            self.device.swipe(*points, duration)
+        cancellation.wait(SETTLE_TIME)
+
+    def scroll_to(self, selectors: List[Dict[str, Any]], direction: str = "down", max_swipes: int = 20,
+                  container: Optional[Dict[str, Any]] = None, duration: float = 0.3) -> Dict[str, Any]:
+        """Swipe through a list until an element matching one of selectors is on screen
+
+        selectors are tried in order on every dump, as in find_any. The
+        swipes stay inside container (a selector), or the largest scrollable
+        node, or the whole screen when there is none. Stops when the element
+        is found, when a swipe no longer changes the list (reachedEnd) or
+        after max_swipes. An element at the edge the content comes in from is
+        scrolled once more so it is returned whole, unless the list ends there.
+        """
+        start = time.monotonic()
+        nodes = self.dump()
+        box = self.find_container(nodes, container)
+        if box is None:
+            if container:
+                return {"error": f"No scrollable container matches {container}"}
+            width, height = self.device.window_size()
+            box = [0, 0, width, height]
+
+        scrolls = 0
+        reached_end = False
+        found = self.match(nodes, selectors, box)
+        last = self.fingerprint(nodes, box)
+        while scrolls < max_swipes and (found is None or self.cut_off(found, box, direction)):
+            cancellation.check()
+            self.swipe(box, direction, duration)
+            scrolls += 1
+            nodes = self.dump()
+            current = self.fingerprint(nodes, box)
+            if current == last:
+                # Nothing moved, so the screen (and any element found on it) is as before
+                reached_end = True
+                break
+            found = self.match(nodes, selectors, box)
+            last = current
+
+        data: Dict[str, Any] = {
+            "met": found is not None,
+            "found": found is not None,
+            "scrolls": scrolls,
+            "reachedEnd": reached_end,
+            "container": box,
+            "waitedMs": round((time.monotonic() - start) * 1000),
+        }
+        if found is not None:
+            data["element"] = to_element(found)
+        return {"success": True, "data": data}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Waiting on UI state instead of sleeping for a guessed duration.
+
+Both waits poll cheap device signals with a growing interval: they answer
+within one short poll on a fast device and back off on a slow or busy one,
+so the number of device calls stays low during long transitions.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, Optional
+
+import cancellation
+
+# First poll interval and the cap it grows towards, in seconds. Idle needs two
+# equal samples after the last change, so the cap bounds the overshoot to ~2x it.
+INITIAL_INTERVAL = 0.05
+MAX_INTERVAL = 0.25
+BACKOFF = 1.5
+
+
+class UIWaiter:
+    def __init__(self, device):
+        self.device = device
+
+    def current_package(self) -> str:
+        return self.device.info.get("currentPackageName", "")
+
+    def window_hash(self) -> str:
+        """Digest of the current hierarchy; equal digests mean nothing moved or changed"""
+        xml = self.device.dump_hierarchy(compressed=True)
+        return hashlib.blake2b(xml.encode("utf-8"), digest_size=8).hexdigest()
+
+    def wait_for_idle(self, timeout: float = 5.0, package: Optional[str] = None, stable_samples: int = 2) -> Dict[str, Any]:
+        """Wait until the window stops changing
+
+        The UI counts as idle once stable_samples consecutive polls see the
+        same foreground package and hierarchy digest. With package set, the
+        hierarchy is only sampled after that package is in the foreground.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        interval = INITIAL_INTERVAL
+        polls = 0
+        last = None
+        stable = 0
+        current = ""
+
+        while True:
+            polls += 1
+            current = self.current_package()
+            if package and current != package:
+                last, stable = None, 0
+            else:
+                signature = (current, self.window_hash())
+                stable = stable + 1 if signature == last else 1
+                last = signature
+                if stable >= stable_samples:
+                    return self._result(start, polls, idle=True, package=current)
+
+            if time.monotonic() + interval > deadline:
+                return self._result(start, polls, idle=False, package=current)
+            cancellation.wait(interval)
+            interval = min(interval * BACKOFF, MAX_INTERVAL)
+
+    def wait_for_element(self, selector: Dict[str, Any], timeout: float = 10.0, gone: bool = False) -> Dict[str, Any]:
+        """Wait until an element matching selector exists (or, with gone=True, no longer exists)"""
+        start = time.monotonic()
+        deadline = start + timeout
+        interval = INITIAL_INTERVAL
+        polls = 0
+        element = self.device(**selector)
+
+        while True:
+            polls += 1
+            exists = element.exists
+            if exists != gone:
+                return self._result(start, polls, met=True, found=exists)
+            if time.monotonic() + interval > deadline:
+                return self._result(start, polls, met=False, found=exists)
+            cancellation.wait(interval)
+            interval = min(interval * BACKOFF, MAX_INTERVAL)
+
+    @staticmethod
+    def _result(start: float, polls: int, **data: Any) -> Dict[str, Any]:
+        data["waitedMs"] = round((time.monotonic() - start) * 1000)
+        data["polls"] = polls
+        return {"success": True, "data": data}
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+XPath over a parsed hierarchy kept in the bridge.
+
+device.xpath() dumps and parses the whole hierarchy for every expression.
+Here the last dump stays parsed until an input command runs or it is older
+than the screen cache TTL, compiled expressions are kept in an LRU, and a
+query against an unchanged screen costs one lxml evaluation.
+
+Documents follow the uiautomator2 xpath plugin: every node is an element
+named after its class, so //android.widget.TextView[@text="OK"] works, and
+the plugin's shorthands (@id, ^regex, %text%) are accepted.
+"""
+
+import functools
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+import timings
+
+# Same knob as the Node side's screen cache, so both agree on how long a dump stays usable
+DEFAULT_TTL = float(os.environ.get("ANDROID_MCP_SCREEN_CACHE_TTL_MS", "2000")) / 1000.0
+XPATH_CACHE_SIZE = 256
+
+NAMESPACES = {"re": "http://exslt.org/regular-expressions"}
+UNSAFE_TAG_CHARS = re.compile(r"[^\w.\-]")
+
+
+def string_literal(value: str) -> str:
+    """value as an XPath 1.0 string literal, which has no escape sequences"""
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    parts = value.split('"')
+    return "concat(" + ", '\"', ".join(f'"{part}"' for part in parts) + ")"
+
+
+def strict_xpath(xpath: str) -> str:
+    """Expand the uiautomator2 plugin's shorthands into plain XPath"""
+    if xpath.startswith(("/", "(")):
+        return xpath
+    if xpath.startswith("@"):
+        return f"//*[@resource-id={string_literal(xpath[1:])}]"
+    if xpath.startswith("^"):
+        return f"//*[re:match(@text, {string_literal(xpath)})]"
+    if len(xpath) > 1 and xpath.startswith("%") and xpath.endswith("%"):
+        return f"//*[contains(@text, {string_literal(xpath[1:-1])})]"
+    if xpath.startswith("%"):
+        suffix = xpath[1:]
+        return f"//*[substring(@text, string-length(@text) - {len(suffix) - 1}) = {string_literal(suffix)}]"
+    if xpath.endswith("%"):
+        return f"//*[starts-with(@text, {string_literal(xpath[:-1])})]"
+    return f"//*[@text={string_literal(xpath)}]"
+
+
+@functools.lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compile_xpath(xpath: str) -> etree.XPath:
+    return etree.XPath(strict_xpath(xpath), namespaces=NAMESPACES)
+
+
+def to_document(xml: str) -> etree._Element:
+    """Parse a dump and name every node after its class, as the xpath plugin does"""
+    root = etree.fromstring(xml.encode("utf-8"), parser=etree.XMLParser(recover=True, huge_tree=True))
+    if root is None:
+        raise ValueError("Empty hierarchy dump")
+    for node in root.iter("node"):
+        tag = UNSAFE_TAG_CHARS.sub(".", node.get("class", ""))
+        if tag and (tag[0].isalpha() or tag[0] == "_"):
+            node.tag = tag
+    return root
+
+
+class HierarchyCache:
+    """Last hierarchy dump, parsed on first use and dropped on input or after ttl"""
+
+    def __init__(self, device, ttl: float = DEFAULT_TTL):
+        self.device = device
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._xml: Optional[str] = None
+        self._root: Optional[etree._Element] = None
+        self._stamp = 0.0
+        # Bumped on every invalidate so a dump that raced with an input is not kept
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Read before taking a dump elsewhere and hand it to put()"""
+        with self._lock:
+            return self._generation
+
+    def put(self, xml: str, generation: int, stamp: float) -> None:
+        """Keep a dump taken elsewhere (get_screen_dump) for later queries, unless an input raced with it"""
+        with self._lock:
+            if generation == self._generation:
+                self._xml, self._root, self._stamp = xml, None, stamp
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._xml, self._root = None, None
+
+    def root(self, fresh: bool = False) -> Tuple[etree._Element, bool]:
+        """The parsed hierarchy and whether it came from the cache"""
+        with self._lock:
+            if not fresh and self._xml is not None and time.monotonic() - self._stamp < self.ttl:
+                if self._root is None:
+                    with timings.phase("parse"):
+                        self._root = to_document(self._xml)
+                return self._root, True
+            generation = self._generation
+
+        stamp = time.monotonic()
+        with timings.phase("dump"):
+            xml = self.device.dump_hierarchy(compressed=False)
+        with timings.phase("parse"):
+            root = to_document(xml)
+        with self._lock:
+            if generation == self._generation:
+                self._xml, self._root, self._stamp = xml, root, stamp
+        return root, False
+
+
+class XPathEngine:
+    def __init__(self, cache: HierarchyCache):
+        self.cache = cache
+        # Compiled XPath objects are not safe to evaluate from several threads at once
+        self._lock = threading.Lock()
+
+    def evaluate(self, xpath: str) -> Tuple[List[Any], bool]:
+        """Matches of xpath on the current screen and whether no dump was needed
+
+        An expression that matches nothing on a cached dump is run once more
+        on a fresh one, in case the screen changed without an input from us.
+        Raises etree.XPathError for expressions lxml cannot compile or run.
+        """
+        compiled = compile_xpath(xpath)
+        root, cached = self.cache.root()
+        with self._lock, timings.phase("xpath"):
+            result = compiled(root)
+        if cached and not result:
+            root, cached = self.cache.root(fresh=True)
+            with self._lock, timings.phase("xpath"):
+                result = compiled(root)
+        if not isinstance(result, list):
+            result = [result]
+        return result, cached
+
+    @staticmethod
+    def attributes(match: Any) -> Optional[Dict[str, str]]:
+        """Attributes of an element match, None for strings and numbers"""
+        if isinstance(match, etree._Element):
+            return dict(match.attrib)
+        return None
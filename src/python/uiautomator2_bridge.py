@@ -5,32 +5,126 @@ uiautomator2 Python Bridge for Node.js
 Provides a comprehensive JSON-based interface to control uiautomator2 functions
 """
 
+import argparse
+import io
 import json
+import signal
 import sys
 import traceback
 import base64
+import threading
+import time
 import uiautomator2 as u2
-from typing import Dict, Any, Optional
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from app_labels import AppLabelCache
+from frame_diff import FrameDiffer, clip, union
+try:
+    from image_match import DEFAULT_SCALES, DEFAULT_THRESHOLD, ImageMatcher
+except ImportError:  # numpy is missing; only find_image needs it
+    ImageMatcher = None
+from screenshot_encoder import ScreenshotEncoder
+from trace_recorder import RecordingDevice, TraceWriter, trace_path
+import cancellation
+import timings
+from lxml import etree
+from ui_match import UIMatcher, to_element
+from ui_scroll import UIScroller
+from ui_wait import UIWaiter
+from ui_xpath import HierarchyCache, XPathEngine
+
+# Result key for raw bytes that are sent as a length-prefixed frame after the JSON header
+BINARY_PAYLOAD = "_payload"
+
+# uiautomator2 selector fields accepted from Node.js
+SELECTOR_KEYS = (
+    "text", "textContains", "textMatches", "textStartsWith",
+    "description", "descriptionContains", "descriptionMatches", "descriptionStartsWith",
+    "resourceId", "resourceIdMatches", "className", "classNameMatches", "packageName", "packageNameMatches",
+    "clickable", "longClickable", "enabled", "focusable", "focused", "scrollable", "checkable", "checked", "selected",
+    "index", "instance",
+)
+
+
+def build_selector(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the selector fields of a command's arguments"""
+    return {key: kwargs[key] for key in SELECTOR_KEYS if key in kwargs}
+
+
+# Exceptions that mean the device or its uiautomator2 server could not be reached, as opposed
+# to the action failing. Matched by class name: they come from uiautomator2, adbutils, requests
+# and the standard library, not all of which are importable everywhere.
+TRANSPORT_ERRORS = {
+    "ConnectError", "GatewayError", "UiAutomationNotConnectedError", "AdbError", "AdbTimeout",
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "RemoteDisconnected", "TimeoutError",
+}
+
+
+def failure(error: Exception, message: Optional[str] = None) -> Dict[str, Any]:
+    """Error result for an exception; transport=True tells Node the device is unreachable"""
+    result: Dict[str, Any] = {"error": message or str(error)}
+    if any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__):
+        result["transport"] = True
+    return result
+
+
+def not_connected() -> Dict[str, Any]:
+    return {"error": "Device not connected", "transport": True}
 
 
 class UIAutomator2Bridge:
     def __init__(self, device_serial: Optional[str] = None):
         """Initialize the bridge with optional device serial"""
+        self.serial = device_serial
+        self.error = None
+        self.encoder = ScreenshotEncoder()
+        self.frames = FrameDiffer()
+        self.images = ImageMatcher() if ImageMatcher else None
+        self.trace = None
         try:
             self.device = u2.connect(device_serial) if device_serial else u2.connect()
             # Set reasonable wait timeouts to reduce delays between operations
             self.device.implicitly_wait(5.0)  # Reduced from default 20s to 5s
             self.device.settings['wait_timeout'] = 5.0
+            path = trace_path(device_serial)
+            if path:
+                self.trace = TraceWriter(path, device_serial)
+                self.device = RecordingDevice(self.device, self.trace)
+            self.waiter = UIWaiter(self.device)
+            self.matcher = UIMatcher(self.device)
+            self.scroller = UIScroller(self.device)
+            self.hierarchy = HierarchyCache(self.device)
+            self.xpath = XPathEngine(self.hierarchy)
+            self.app_labels = AppLabelCache(self.device, getattr(self.device, "serial", None) or device_serial)
             self.connected = True
         except Exception as e:
             self.device = None
             self.connected = False
             self.error = str(e)
 
+    def screen_changed(self) -> None:
+        """Forget the cached hierarchy; called around every command that may change the screen"""
+        if self.connected:
+            self.hierarchy.invalidate()
+
+    def ping(self) -> Dict[str, Any]:
+        """Cheap liveness check used by the Node.js bridge pool"""
+        result = {
+            "success": self.connected,
+            "data": {
+                "connected": self.connected,
+                "serial": self.serial
+            }
+        }
+        if not self.connected:
+            result["error"] = f"Device not connected: {self.error}"
+        return result
+
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             info = self.device.info
@@ -52,12 +146,12 @@ class UIAutomator2Bridge:
                 }
             }
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def get_window_size(self) -> Dict[str, Any]:
         """Get window size"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             width, height = self.device.window_size()
@@ -69,12 +163,12 @@ class UIAutomator2Bridge:
                 }
             }
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def get_current_app(self) -> Dict[str, Any]:
         """Get current app info"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             app_info = self.device.app_current()
@@ -83,109 +177,70 @@ class UIAutomator2Bridge:
                 "data": app_info
             }
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def tap(self, x: int, y: int) -> Dict[str, Any]:
         """Tap at coordinates"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.click(x, y)
             return {"success": True, "message": f"Tapped at ({x}, {y})"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def double_tap(self, x: int, y: int, duration: float = 0.1) -> Dict[str, Any]:
         """Double tap at coordinates"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.double_click(x, y, duration)
             return {"success": True, "message": f"Double tapped at ({x}, {y})"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def long_tap(self, x: int, y: int, duration: float = 0.5) -> Dict[str, Any]:
         """Long tap at coordinates"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.long_click(x, y, duration)
             return {"success": True, "message": f"Long tapped at ({x}, {y})"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def input_text(self, text: str, clear: bool = False) -> Dict[str, Any]:
         """Input text using uiautomator2 send_keys"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.send_keys(text, clear=clear)
             return {"success": True, "message": f"Input text: {text}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def clear_text(self) -> Dict[str, Any]:
         """Clear text in current input field"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.clear_text()
             return {"success": True, "message": "Text cleared"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def find_element(self, **kwargs) -> Dict[str, Any]:
         """Find element using various selectors"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
-            # Build selector
-            selector_args = {}
-            if "text" in kwargs:
-                selector_args["text"] = kwargs["text"]
-            if "textContains" in kwargs:
-                selector_args["textContains"] = kwargs["textContains"]
-            if "textMatches" in kwargs:
-                selector_args["textMatches"] = kwargs["textMatches"]
-            if "textStartsWith" in kwargs:
-                selector_args["textStartsWith"] = kwargs["textStartsWith"]
-            if "description" in kwargs:
-                selector_args["description"] = kwargs["description"]
-            if "descriptionContains" in kwargs:
-                selector_args["descriptionContains"] = kwargs["descriptionContains"]
-            if "resourceId" in kwargs:
-                selector_args["resourceId"] = kwargs["resourceId"]
-            if "className" in kwargs:
-                selector_args["className"] = kwargs["className"]
-            if "packageName" in kwargs:
-                selector_args["packageName"] = kwargs["packageName"]
-            if "clickable" in kwargs:
-                selector_args["clickable"] = kwargs["clickable"]
-            if "enabled" in kwargs:
-                selector_args["enabled"] = kwargs["enabled"]
-            if "focusable" in kwargs:
-                selector_args["focusable"] = kwargs["focusable"]
-            if "scrollable" in kwargs:
-                selector_args["scrollable"] = kwargs["scrollable"]
-            if "checkable" in kwargs:
-                selector_args["checkable"] = kwargs["checkable"]
-            if "checked" in kwargs:
-                selector_args["checked"] = kwargs["checked"]
-            if "selected" in kwargs:
-                selector_args["selected"] = kwargs["selected"]
-            if "index" in kwargs:
-                selector_args["index"] = kwargs["index"]
-            if "instance" in kwargs:
-                selector_args["instance"] = kwargs["instance"]
-            
-            element = self.device(**selector_args)
+            element = self.device(**build_selector(kwargs))
             
             if element.exists:
                 info = element.info
@@ -225,41 +280,75 @@ class UIAutomator2Bridge:
                 return {"success": True, "found": False}
                 
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
+
+    def find_any(self, selectors: List[Dict[str, Any]], include_all: bool = False) -> Dict[str, Any]:
+        """Evaluate ranked selectors against a single hierarchy dump and return the best match"""
+        if not self.connected:
+            return not_connected()
+
+        selectors = [build_selector(selector) for selector in selectors]
+        if not selectors or not all(selectors):
+            return {"error": "find_any needs a list of non-empty selectors"}
+        try:
+            return self.matcher.find(selectors, include_all)
+        except Exception as e:
+            return failure(e)
+
+    def scroll_to(self, selectors: List[Dict[str, Any]], direction: str = "down", max_swipes: int = 20,
+                  container: Optional[Dict[str, Any]] = None, duration: float = 0.3) -> Dict[str, Any]:
+        """Swipe inside a scrollable container until an element matching one of selectors is visible"""
+        if not self.connected:
+            return not_connected()
+
+        selectors = [build_selector(selector) for selector in selectors]
+        if not selectors or not all(selectors):
+            return {"error": "scroll_to needs a list of non-empty selectors"}
+        if direction not in ("up", "down", "left", "right"):
+            return {"error": f"Unsupported direction: {direction}"}
+        try:
+            return self.scroller.scroll_to(selectors, direction, max_swipes,
+                                           build_selector(container) if container else None, duration)
+        except Exception as e:
+            return failure(e)
 
     def element_click(self, timeout: float = 10.0, **kwargs) -> Dict[str, Any]:
         """Click element using selectors"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             element = self.device(**kwargs)
             element.click(timeout=timeout)
             return {"success": True, "message": f"Clicked element with selector: {kwargs}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def element_long_click(self, duration: float = 0.5, **kwargs) -> Dict[str, Any]:
         """Long click element using selectors"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             element = self.device(**kwargs)
             element.long_click(duration=duration)
             return {"success": True, "message": f"Long clicked element with selector: {kwargs}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def get_screen_dump(self) -> Dict[str, Any]:
         """Get screen UI hierarchy using dump_hierarchy"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             # Use dump_hierarchy instead of deprecated methods
-            xml = self.device.dump_hierarchy(compressed=False, pretty=True)
-            info = self.device.info
+            generation, stamp = self.hierarchy.generation, time.monotonic()
+            with timings.phase("dump"):
+                xml = self.device.dump_hierarchy(compressed=False, pretty=True)
+            self.hierarchy.put(xml, generation, stamp)
+            with timings.phase("info"):
+                info = self.device.info
             
             return {
                 "success": True,
@@ -271,53 +360,172 @@ class UIAutomator2Bridge:
                 }
             }
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
+
+    def capture(self, format: str = "pillow") -> Tuple[Image.Image, Optional[bytes]]:
+        """One screenshot as an image and, for format="raw", the JPEG bytes the device sent"""
+        with timings.phase("capture"):
+            if format == "raw":
+                raw = self.device.screenshot(format='raw')
+                return Image.open(io.BytesIO(raw)), raw  # Only reads the header until pixels are needed
+            return self.device.screenshot(format='pillow'), None
 
-    def take_screenshot(self, filename: Optional[str] = None, format: str = "pillow") -> Dict[str, Any]:
-        """Take screenshot using d.screenshot()"""
+    def take_screenshot(self, filename: Optional[str] = None, format: str = "pillow", binary: bool = False,
+                        image_format: str = "jpeg", max_width: Optional[int] = None, max_height: Optional[int] = None,
+                        max_bytes: Optional[int] = None, quality: Optional[int] = None,
+                        region: Optional[List[int]] = None, changed_since: bool = False) -> Dict[str, Any]:
+        """Capture the screen once and encode it for the caller
+
+        The image is cropped to region ([x1, y1, x2, y2]) if given, then encoded
+        a single time as image_format (jpeg, webp or png), scaled to fit
+        max_width x max_height and, for lossy formats, sized to stay under
+        max_bytes. The same bytes are written to filename, if given, and
+        returned. With binary=True they travel as a raw payload frame instead
+        of a base64 string inside the JSON response.
+
+        With changed_since=True the frame is compared with the previous
+        screenshot of this device. If nothing changed no image is returned;
+        otherwise only the area covering the changed regions is encoded.
+        """
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
+            if format not in ("raw", "pillow"):
+                return {"error": f"Unsupported format: {format}"}
+            image, raw = self.capture(format)
+            size = image.size
+
+            crop = None
+            if region:
+                crop = clip(tuple(region), (0, 0, size[0], size[1]))
+                if crop is None:
+                    return {"error": f"Region {region} is outside the {size[0]}x{size[1]} screen"}
+
+            # Once changed_since has been used on this device every frame is remembered,
+            # so the next changed_since call can compare against it
+            frame = None
+            if changed_since or self.frames.tracking:
+                frame = image
+                if raw is not None:
+                    # Separate low-resolution decode; the full image may still be passed through as is
+                    frame = Image.open(io.BytesIO(raw))
+                    frame.draft("L", (size[0] // 8, size[1] // 8))
+            regions = None
+            if changed_since:
+                try:
+                    with timings.phase("diff"):
+                        regions = self.frames.compare(frame, size)
+                except ImportError:
+                    return {"error": "changedSince requires numpy (pip install numpy)"}
+                if regions is not None:
+                    if crop:
+                        regions = [box for box in (clip(box, crop) for box in regions) if box]
+                    if not regions:
+                        return {"success": True, "data": {"changed": False, "regions": []}}
+                    crop = union(regions)
+            elif frame is not None:
+                self.frames.update(frame, size)
+
+            if crop:
+                image = image.crop(crop)
+                with timings.phase("encode"):
+                    image_data, info = self.encoder.encode(image, image_format, max_width, max_height, max_bytes, quality)
+                info["region"] = list(crop)
+            elif raw is not None and image_format == "jpeg" and quality is None and not max_width and not max_height \
+                    and (not max_bytes or len(raw) <= max_bytes):
+                # The device already produced a JPEG that fits: no decode, no re-encode
+                image_data = raw
+                info = {"format": "jpeg", "width": size[0], "height": size[1], "bytes": len(raw)}
+            else:
+                with timings.phase("encode"):
+                    image_data, info = self.encoder.encode(image, image_format, max_width, max_height, max_bytes, quality)
+
+            if changed_since:
+                info["changed"] = True
+                if regions is not None:
+                    info["regions"] = [list(box) for box in regions]
+
+            result = {"success": True, "data": info}
             if filename:
-                # Save to file
-                self.device.screenshot(filename)
-                return {"success": True, "message": f"Screenshot saved to {filename}"}
+                with open(filename, "wb") as f:
+                    f.write(image_data)
+                result["message"] = f"Screenshot saved to {filename}"
+
+            if binary:
+                result[BINARY_PAYLOAD] = image_data
             else:
-                # Return base64 encoded image data
-                if format == "raw":
-                    image_data = self.device.screenshot(format='raw')
-                    image_base64 = base64.b64encode(image_data).decode('utf-8')
-                    return {
-                        "success": True, 
-                        "data": {
-                            "format": "jpeg",
-                            "image": image_base64
-                        }
-                    }
-                elif format == "pillow":
-                    import io
-                    image = self.device.screenshot(format='pillow')
-                    buffer = io.BytesIO()
-                    image.save(buffer, format='PNG')
-                    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                    return {
-                        "success": True,
-                        "data": {
-                            "format": "png", 
-                            "image": image_base64
-                        }
-                    }
-                else:
-                    return {"error": f"Unsupported format: {format}"}
+                with timings.phase("encode"):
+                    info["image"] = base64.b64encode(image_data).decode('utf-8')
+            return result
                     
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
+
+    def find_image(self, template: Optional[str] = None, template_data: Optional[str] = None,
+                   region: Optional[List[int]] = None, threshold: Optional[float] = None,
+                   scales: Optional[List[float]] = None, click: bool = False) -> Dict[str, Any]:
+        """Locate a template image on a fresh screenshot
+
+        The template is a file path on this machine or base64 image data;
+        either way it is prepared once and kept for later searches. Only
+        region ([x1, y1, x2, y2]) is searched if given. With click=True the
+        centre of the match is tapped when one is found.
+        """
+        if not self.connected:
+            return not_connected()
+        if self.images is None:
+            return {"error": "find_image requires numpy (pip install numpy)"}
+
+        try:
+            with timings.phase("template"):
+                prepared, cached = self.images.template(template, template_data)
+            image, _ = self.capture()
+            crop = None
+            if region:
+                crop = clip(tuple(region), (0, 0, image.size[0], image.size[1]))
+                if crop is None:
+                    return {"error": f"Region {region} is outside the {image.size[0]}x{image.size[1]} screen"}
+            with timings.phase("match"):
+                data = self.images.find(image, prepared, crop,
+                                        DEFAULT_THRESHOLD if threshold is None else threshold,
+                                        scales or DEFAULT_SCALES)
+            data["met"] = data["found"]
+            data["cached"] = cached
+            if click and data["found"]:
+                self.device.click(*data["center"])
+                data["clicked"] = True
+            return {"success": True, "data": data}
+        except Exception as e:
+            return failure(e)
+
+    def wait_for_idle(self, timeout: float = 5.0, package: Optional[str] = None) -> Dict[str, Any]:
+        """Wait until the foreground window stops changing, optionally in a given package"""
+        if not self.connected:
+            return not_connected()
+
+        try:
+            return self.waiter.wait_for_idle(timeout, package)
+        except Exception as e:
+            return failure(e)
+
+    def wait_for_element(self, timeout: float = 10.0, gone: bool = False, **kwargs) -> Dict[str, Any]:
+        """Wait until an element matching the selector appears, or disappears with gone=True"""
+        if not self.connected:
+            return not_connected()
+
+        selector = build_selector(kwargs)
+        if not selector:
+            return {"error": "wait_for_element needs at least one selector field"}
+        try:
+            return self.waiter.wait_for_element(selector, timeout, gone)
+        except Exception as e:
+            return failure(e)
 
     def open_app(self, package_name: str, stop: bool = False, use_monkey: bool = False, activity: Optional[str] = None) -> Dict[str, Any]:
         """Open app by package name using app_start"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             if activity:
@@ -326,13 +534,62 @@ class UIAutomator2Bridge:
                 self.device.app_start(package_name, stop=stop, use_monkey=use_monkey)
             return {"success": True, "message": f"Opened app: {package_name}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def xpath_operation(self, xpath: str, action: str = "click", text: Optional[str] = None) -> Dict[str, Any]:
-        """Perform operation on element using XPath"""
+        """Perform operation on element using XPath
+
+        The expression is evaluated locally on the cached hierarchy. The
+        uiautomator2 xpath plugin only runs for expressions lxml rejects, and
+        for clicks and input on elements that are not there yet, since it
+        waits for them to appear. get_all returns every match.
+        """
         if not self.connected:
-            return {"error": "Device not connected"}
-        
+            return not_connected()
+        if action not in XPATH_ACTIONS:
+            return {"error": f"Unsupported action: {action}"}
+        if action == "input_text" and text is None:
+            return {"error": "Text parameter required for input_text action"}
+
+        try:
+            matches, cached = self.xpath.evaluate(xpath)
+        except etree.XPathError:
+            return self.xpath_plugin_operation(xpath, action, text)
+        except Exception as e:
+            return failure(e, f"XPath operation failed: {str(e)}")
+
+        elements = [attrs for attrs in (self.xpath.attributes(match) for match in matches) if attrs is not None]
+        try:
+            if action == "get_all":
+                data: Dict[str, Any] = {"count": len(matches), "cached": cached}
+                if len(elements) == len(matches):
+                    data["elements"] = [to_element(attrs) for attrs in elements]
+                else:
+                    # Attribute or function results, e.g. //*/@text or count(//*)
+                    data["values"] = [match if isinstance(match, (bool, int, float)) else str(match) for match in matches]
+                return {"success": True, "data": data}
+            if not elements:
+                if action in XPATH_READ_ACTIONS:
+                    return {"error": f"XPath operation failed: no element matches {xpath}"}
+                return self.xpath_plugin_operation(xpath, action, text)
+
+            element = to_element(elements[0])
+            if action == "get_text":
+                return {"success": True, "data": {"text": element["text"], "cached": cached}}
+            if action == "get_attribute":
+                return {"success": True, "data": {"attributes": element, "cached": cached}}
+
+            x1, y1, x2, y2 = element["bounds"]
+            self.device.click((x1 + x2) // 2, (y1 + y2) // 2)
+            if action == "click":
+                return {"success": True, "message": f"Clicked element with xpath: {xpath}"}
+            self.device.send_keys(text, clear=True)
+            return {"success": True, "message": f"Input text '{text}' to element with xpath: {xpath}"}
+        except Exception as e:
+            return failure(e, f"XPath operation failed: {str(e)}")
+
+    def xpath_plugin_operation(self, xpath: str, action: str, text: Optional[str] = None) -> Dict[str, Any]:
+        """The same operation through the uiautomator2 xpath plugin, which dumps on every call"""
         try:
             element = self.device.xpath(xpath)
             
@@ -340,8 +597,6 @@ class UIAutomator2Bridge:
                 element.click()
                 return {"success": True, "message": f"Clicked element with xpath: {xpath}"}
             elif action == "input_text":
-                if text is None:
-                    return {"error": "Text parameter required for input_text action"}
                 element.click()  # Focus the element first
                 element.set_text(text)
                 return {"success": True, "message": f"Input text '{text}' to element with xpath: {xpath}"}
@@ -352,48 +607,49 @@ class UIAutomator2Bridge:
                 attrs = element.info
                 return {"success": True, "data": {"attributes": attrs}}
             else:
-                return {"error": f"Unsupported action: {action}"}
+                elements = element.all()
+                return {"success": True, "data": {"count": len(elements), "elements": [el.info for el in elements]}}
                 
         except Exception as e:
-            return {"error": f"XPath operation failed: {str(e)}"}
+            return failure(e, f"XPath operation failed: {str(e)}")
 
     def stop_app(self, package_name: str) -> Dict[str, Any]:
         """Stop app using app_stop"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.app_stop(package_name)
             return {"success": True, "message": f"Stopped app: {package_name}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def press_key(self, key: str) -> Dict[str, Any]:
         """Press key using press()"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.press(key)
             return {"success": True, "message": f"Pressed key: {key}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: float = 0.5) -> Dict[str, Any]:
         """Swipe from one point to another"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.swipe(fx, fy, tx, ty, duration)
             return {"success": True, "message": f"Swiped from ({fx}, {fy}) to ({tx}, {ty})"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def swipe_ext(self, direction: str, scale: float = 0.9, box: Optional[tuple] = None) -> Dict[str, Any]:
         """Extended swipe functionality"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             if box:
@@ -402,175 +658,387 @@ class UIAutomator2Bridge:
                 self.device.swipe_ext(direction, scale=scale)
             return {"success": True, "message": f"Swiped {direction}"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def drag(self, sx: int, sy: int, ex: int, ey: int, duration: float = 0.5) -> Dict[str, Any]:
         """Drag from one point to another"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.drag(sx, sy, ex, ey, duration)
             return {"success": True, "message": f"Dragged from ({sx}, {sy}) to ({ex}, {ey})"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def screen_on(self) -> Dict[str, Any]:
         """Turn on screen"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.screen_on()
             return {"success": True, "message": "Screen turned on"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def screen_off(self) -> Dict[str, Any]:
         """Turn off screen"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.screen_off()
             return {"success": True, "message": "Screen turned off"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
     def unlock(self) -> Dict[str, Any]:
         """Unlock device"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
             self.device.unlock()
             return {"success": True, "message": "Device unlocked"}
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
 
-    def get_installed_apps(self) -> Dict[str, Any]:
-        """Get list of installed user applications"""
+    def get_installed_apps(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Get a page of installed user applications, with labels from the on-disk cache"""
         if not self.connected:
-            return {"error": "Device not connected"}
+            return not_connected()
         
         try:
-            # Get installed user apps (3rd party apps)
-            apps = self.device.app_list_user()
-            app_list = []
-            
-            for package_name in apps:
-                # Get app name if possible, fallback to package name
-                try:
-                    app_info = self.device.app_info(package_name)
-                    app_name = app_info.get("app_name", package_name)
-                except:
-                    app_name = package_name
-                
-                app_list.append({
-                    "packageName": package_name,
-                    "appName": app_name
-                })
-            
             return {
                 "success": True,
-                "data": {
-                    "apps": app_list
-                }
+                "data": self.app_labels.apps(offset, limit)
             }
         except Exception as e:
-            return {"error": str(e)}
+            return failure(e)
+
+
+# Actions that only read device state. They run on a shared worker pool so a
+# slow dump or screenshot does not hold up input; everything else goes through a
+# single-threaded lane to keep taps, swipes and key presses in submission order.
+READ_ONLY_ACTIONS = {
+    "get_device_info",
+    "get_window_size",
+    "get_current_app",
+    "find_element",
+    "find_any",
+    "find_all",
+    "get_screen_dump",
+    "take_screenshot",
+    "get_installed_apps",
+    "wait_for_idle",
+    "wait_for_element",
+}
+
+MAX_READ_WORKERS = 4
+
+XPATH_READ_ACTIONS = {"get_text", "get_attribute", "get_all"}
+XPATH_ACTIONS = {"click", "input_text"} | XPATH_READ_ACTIONS
+
+
+def is_read_only(action: str, args: Dict[str, Any]) -> bool:
+    if action == "find_image":
+        return not args.get("click", False)
+    if action == "xpath_operation":
+        return args.get("action", "click") in XPATH_READ_ACTIONS
+    return action in READ_ONLY_ACTIONS
+
+
+def dispatch(bridge: UIAutomator2Bridge, action: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Route a single command to the matching bridge method"""
+    result = {"error": "Unknown action"}
+
+    if action == "get_device_info":
+        result = bridge.get_device_info()
+    elif action == "get_window_size":
+        result = bridge.get_window_size()
+    elif action == "get_current_app":
+        result = bridge.get_current_app()
+    elif action == "tap":
+        result = bridge.tap(args["x"], args["y"])
+    elif action == "double_tap":
+        result = bridge.double_tap(args["x"], args["y"], args.get("duration", 0.1))
+    elif action == "long_tap":
+        result = bridge.long_tap(args["x"], args["y"], args.get("duration", 0.5))
+    elif action == "input_text":
+        result = bridge.input_text(args["text"], args.get("clear", False))
+    elif action == "clear_text":
+        result = bridge.clear_text()
+    elif action == "find_element":
+        result = bridge.find_element(**args)
+    elif action == "find_any":
+        result = bridge.find_any(args.get("selectors", []), args.get("all", False))
+    elif action == "find_all":
+        result = bridge.find_any(args.get("selectors", []), True)
+    elif action == "scroll_to":
+        result = bridge.scroll_to(args.get("selectors", []), args.get("direction", "down"), args.get("maxSwipes", 20),
+                                  args.get("container"), args.get("duration", 0.3))
+    elif action == "element_click":
+        timeout = args.pop("timeout", 10.0)
+        result = bridge.element_click(timeout=timeout, **args)
+    elif action == "element_long_click":
+        duration = args.pop("duration", 0.5)
+        result = bridge.element_long_click(duration=duration, **args)
+    elif action == "get_screen_dump":
+        result = bridge.get_screen_dump()
+    elif action == "take_screenshot":
+        result = bridge.take_screenshot(args.get("filename"), args.get("format", "pillow"), args.get("binary", False),
+                                        args.get("imageFormat", "jpeg"), args.get("maxWidth"), args.get("maxHeight"),
+                                        args.get("maxBytes"), args.get("quality"), args.get("region"),
+                                        args.get("changedSince", False))
+    elif action == "find_image":
+        result = bridge.find_image(args.get("template"), args.get("templateData"), args.get("region"),
+                                   args.get("threshold"), args.get("scales"), args.get("click", False))
+    elif action == "open_app":
+        result = bridge.open_app(args["packageName"], args.get("stop", False), args.get("useMonkey", False), args.get("activity"))
+    elif action == "stop_app":
+        result = bridge.stop_app(args["packageName"])
+    elif action == "press_key":
+        result = bridge.press_key(args["key"])
+    elif action == "swipe":
+        result = bridge.swipe(args["fx"], args["fy"], args["tx"], args["ty"], args.get("duration", 0.5))
+    elif action == "xpath_operation":
+        result = bridge.xpath_operation(args["xpath"], args.get("action", "click"), args.get("text"))
+    elif action == "swipe_ext":
+        result = bridge.swipe_ext(args["direction"], args.get("scale", 0.9), args.get("box"))
+    elif action == "drag":
+        result = bridge.drag(args["sx"], args["sy"], args["ex"], args["ey"], args.get("duration", 0.5))
+    elif action == "screen_on":
+        result = bridge.screen_on()
+    elif action == "screen_off":
+        result = bridge.screen_off()
+    elif action == "unlock":
+        result = bridge.unlock()
+    elif action == "get_installed_apps":
+        result = bridge.get_installed_apps(args.get("offset", 0), args.get("limit"))
+    elif action == "wait_for_idle":
+        result = bridge.wait_for_idle(args.get("timeout", 5.0), args.get("package"))
+    elif action == "wait_for_element":
+        result = bridge.wait_for_element(**args)
+    elif action == "batch":
+        result = run_batch(bridge, args.get("steps", []), args.get("timeout"))
+
+    return result
+
+
+# Actions a batch step may not run: nesting, and results that only make sense as their own response
+BATCH_EXCLUDED_ACTIONS = {"batch", "ping", "take_screenshot", "get_screen_dump"}
+
+
+def step_failed(result: Dict[str, Any]) -> bool:
+    """A step fails on an error, an explicit failure, a missing element or an unmet wait"""
+    if "error" in result or result.get("success") is False or result.get("found") is False:
+        return True
+    data = result.get("data")
+    return isinstance(data, dict) and (data.get("met") is False or data.get("idle") is False)
+
+
+def run_batch(bridge: UIAutomator2Bridge, steps: List[Dict[str, Any]], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run an ordered list of actions in one command
+
+    Each step is {"action", "args", "when", "unless", "optional"}. A step with
+    "when" only runs if an element matches that selector, one with "unless"
+    only if none does; otherwise it is reported as skipped. The batch stops at
+    the first failed step unless that step is optional. With timeout (seconds)
+    set, steps that would start after the deadline are not run.
+    """
+    if not bridge.connected:
+        return not_connected()
+
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+    results = []
+    failed = None
+
+    for index, step in enumerate(steps):
+        cancellation.check()
+        action = step.get("action", "")
+        args = dict(step.get("args") or {})
+        step_start = time.monotonic()
+        entry = {"action": action}
+
+        if deadline is not None and step_start > deadline:
+            entry.update(status="failed", error="Batch timeout")
+        elif action in BATCH_EXCLUDED_ACTIONS:
+            entry.update(status="failed", error=f"Action not allowed in a batch: {action}")
+        else:
+            try:
+                if step.get("when") and not bridge.device(**build_selector(step["when"])).exists:
+                    result = None
+                elif step.get("unless") and bridge.device(**build_selector(step["unless"])).exists:
+                    result = None
+                else:
+                    result = dispatch(bridge, action, args)
+            except cancellation.Cancelled:
+                raise
+            except Exception as e:
+                result = failure(e)
+            if not is_read_only(action, args):
+                bridge.screen_changed()
+            if result is None:
+                entry["status"] = "skipped"
+            else:
+                entry["status"] = "failed" if step_failed(result) else "ok"
+                entry.update((key, value) for key, value in result.items() if key not in ("success", BINARY_PAYLOAD))
+
+        entry["ms"] = round((time.monotonic() - step_start) * 1000)
+        results.append(entry)
+        if entry["status"] == "failed" and not step.get("optional"):
+            failed = index
+            break
+
+    data = {
+        "steps": results,
+        "completed": failed is None,
+        "totalMs": round((time.monotonic() - start) * 1000),
+    }
+    if failed is not None:
+        data["failedStep"] = failed
+    return {"success": True, "data": data}
+
+
+class ResponseWriter:
+    """Serializes responses from worker threads onto stdout.
+
+    Every response is one JSON object per line. If the result carries raw bytes
+    under BINARY_PAYLOAD, the header gets a "binary" length field and the bytes
+    follow the newline unchanged. A "timing" dict gets the time spent
+    serializing the rest of the response added as serializeMs.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout.buffer
+        self.lock = threading.Lock()
+
+    def send(self, result: Dict[str, Any], command_id: Optional[int] = None) -> None:
+        payload = result.pop(BINARY_PAYLOAD, None)
+        if command_id is not None:
+            result["id"] = command_id
+        if payload is not None:
+            result["binary"] = len(payload)
+        timing = result.pop("timing", None)
+        begin = time.perf_counter()
+        body = json.dumps(result)
+        if timing is not None:
+            # Spliced in after the fact so the serialization time can be reported with it
+            timing["serializeMs"] = round((time.perf_counter() - begin) * 1000, 3)
+            body = body[:-1] + (", " if result else "") + '"timing": ' + json.dumps(timing) + "}"
+        line = body.encode("utf-8") + b"\n"
+        with self.lock:
+            self.stream.write(line)
+            if payload is not None:
+                self.stream.write(payload)
+            self.stream.flush()
+
+
+def run_command(bridge: UIAutomator2Bridge, writer: ResponseWriter, command_id: Optional[int], action: str,
+                args: Dict[str, Any], received: Optional[float] = None) -> None:
+    """Execute one command on a worker thread and write its response with its timings
+
+    queueMs is the time between reading the command and a worker picking it
+    up, execMs the time in dispatch; the named phases are parts of execMs.
+    A command cancelled before it got here is answered without running.
+    """
+    begin = time.perf_counter()
+    timings.start()
+    cancellation.start(command_id)
+    # Actions pop some of their arguments, so the trace gets a copy taken before they run
+    recorded_args = dict(args) if bridge.trace else None
+    mutates = not is_read_only(action, args) and not cancellation.cancelled()
+    try:
+        cancellation.check()
+        if mutates:
+            bridge.screen_changed()
+        result = dispatch(bridge, action, args)
+    except cancellation.Cancelled as e:
+        result = {"error": str(e), "cancelled": True}
+    except Exception as e:
+        result = failure(e, f"Command error: {str(e)}")
+        result["traceback"] = traceback.format_exc()
+    finally:
+        cancellation.finish(command_id)
+        # Dumps that started while the command ran may show the screen from before it
+        if mutates:
+            bridge.screen_changed()
+    timing = {"execMs": round((time.perf_counter() - begin) * 1000, 3)}
+    if received is not None:
+        timing["queueMs"] = round((begin - received) * 1000, 3)
+    timing.update(timings.collect())
+    result["timing"] = timing
+    if bridge.trace:
+        bridge.trace.command(action, recorded_args, result, result.get(BINARY_PAYLOAD))
+    writer.send(result, command_id)
 
 
 def main():
     """Main function to handle JSON commands from stdin"""
-    bridge = None
-    
+    parser = argparse.ArgumentParser(description="uiautomator2 JSON bridge")
+    parser.add_argument("--serial", help="Device serial to bind this worker to")
+    options = parser.parse_args()
+
+    writer = ResponseWriter(sys.stdout.buffer)
+    # Anything else that prints (uiautomator2, adbutils) must not corrupt the framed protocol stream
+    sys.stdout = sys.stderr
+    read_pool = ThreadPoolExecutor(max_workers=MAX_READ_WORKERS, thread_name_prefix="u2-read")
+    input_lane = ThreadPoolExecutor(max_workers=1, thread_name_prefix="u2-input")
+    # Connect before reading commands and say so: Node waits for this frame instead of a fixed delay.
+    # The device info call completes the agent handshake, so the first real command finds the device warm.
+    bridge = UIAutomator2Bridge(options.serial)
+    ready = bridge.get_device_info() if bridge.connected else bridge.ping()
+    ready["event"] = "ready"
+    writer.send(ready)
+    if bridge.trace:
+        # Node stops workers with SIGTERM; exit through the finally below so the trace is closed properly
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     try:
         for line in sys.stdin:
             line = line.strip()
             if not line:
                 continue
-                
+
+            command_id = None
+            received = time.perf_counter()
             try:
                 command = json.loads(line)
+                command_id = command.get("id")
                 action = command.get("action")
                 args = command.get("args", {})
                 
-                # Initialize bridge if needed
-                if bridge is None:
-                    device_serial = args.get("deviceSerial")
-                    bridge = UIAutomator2Bridge(device_serial)
-                
-                # Execute command
-                result = {"error": "Unknown action"}
-                
-                if action == "get_device_info":
-                    result = bridge.get_device_info()
-                elif action == "get_window_size":
-                    result = bridge.get_window_size()
-                elif action == "get_current_app":
-                    result = bridge.get_current_app()
-                elif action == "tap":
-                    result = bridge.tap(args["x"], args["y"])
-                elif action == "double_tap":
-                    result = bridge.double_tap(args["x"], args["y"], args.get("duration", 0.1))
-                elif action == "long_tap":
-                    result = bridge.long_tap(args["x"], args["y"], args.get("duration", 0.5))
-                elif action == "input_text":
-                    result = bridge.input_text(args["text"], args.get("clear", False))
-                elif action == "clear_text":
-                    result = bridge.clear_text()
-                elif action == "find_element":
-                    result = bridge.find_element(**args)
-                elif action == "element_click":
-                    timeout = args.pop("timeout", 10.0)
-                    result = bridge.element_click(timeout=timeout, **args)
-                elif action == "element_long_click":
-                    duration = args.pop("duration", 0.5)
-                    result = bridge.element_long_click(duration=duration, **args)
-                elif action == "get_screen_dump":
-                    result = bridge.get_screen_dump()
-                elif action == "take_screenshot":
-                    result = bridge.take_screenshot(args.get("filename"), args.get("format", "pillow"))
-                elif action == "open_app":
-                    result = bridge.open_app(args["packageName"], args.get("stop", False), args.get("useMonkey", False), args.get("activity"))
-                elif action == "stop_app":
-                    result = bridge.stop_app(args["packageName"])
-                elif action == "press_key":
-                    result = bridge.press_key(args["key"])
-                elif action == "swipe":
-                    result = bridge.swipe(args["fx"], args["fy"], args["tx"], args["ty"], args.get("duration", 0.5))
-                elif action == "xpath_operation":
-                    result = bridge.xpath_operation(args["xpath"], args.get("action", "click"), args.get("text"))
-                elif action == "swipe_ext":
-                    result = bridge.swipe_ext(args["direction"], args.get("scale", 0.9), args.get("box"))
-                elif action == "drag":
-                    result = bridge.drag(args["sx"], args["sy"], args["ex"], args["ey"], args.get("duration", 0.5))
-                elif action == "screen_on":
-                    result = bridge.screen_on()
-                elif action == "screen_off":
-                    result = bridge.screen_off()
-                elif action == "unlock":
-                    result = bridge.unlock()
-                elif action == "get_installed_apps":
-                    result = bridge.get_installed_apps()
-                
-                # Send result
-                print(json.dumps(result), flush=True)
+                # Liveness checks are answered inline so they are never queued behind slow device calls
+                if action == "ping":
+                    writer.send(bridge.ping(), command_id)
+                    continue
+                # So are cancels, which must reach commands still waiting in a queue
+                if action == "cancel":
+                    writer.send({"success": True, "data": {"cancelled": cancellation.cancel(args.get("id"))}}, command_id)
+                    continue
+
+                # Execute command off the reader thread so responses can complete out of order
+                cancellation.register(command_id)
+                executor = read_pool if is_read_only(action, args) else input_lane
+                executor.submit(run_command, bridge, writer, command_id, action, args, received)
                 
             except json.JSONDecodeError as e:
-                error_result = {"error": f"Invalid JSON: {str(e)}"}
-                print(json.dumps(error_result), flush=True)
+                writer.send({"error": f"Invalid JSON: {str(e)}"})
             except Exception as e:
-                error_result = {"error": f"Command error: {str(e)}", "traceback": traceback.format_exc()}
-                print(json.dumps(error_result), flush=True)
+                writer.send({"error": f"Command error: {str(e)}", "traceback": traceback.format_exc()}, command_id)
                 
     except KeyboardInterrupt:
         pass
     except Exception as e:
-        error_result = {"error": f"Bridge error: {str(e)}"}
-        print(json.dumps(error_result), flush=True)
+        writer.send({"error": f"Bridge error: {str(e)}"})
+    finally:
+        read_pool.shutdown(wait=True)
+        input_lane.shutdown(wait=True)
+        if bridge.trace:
+            bridge.trace.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
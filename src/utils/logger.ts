@@ -1,68 +1,250 @@
 import * as fs from 'fs';
 import * as path from 'path';
 
+export type LogLevel = 'debug' | 'info' | 'warn' | 'error';
+
+// Payload for a log line; pass a function to build it only when the level is enabled
+export type LogData = any | (() => any);
+
+export interface LoggerOptions {
+  logFile?: string; // Default: ANDROID_MCP_LOG_FILE or android-mcp.log
+  level?: LogLevel; // Default: ANDROID_MCP_LOG_LEVEL or info
+  maxBytes?: number; // Rotate the file past this size (default: ANDROID_MCP_LOG_MAX_BYTES or 10 MB, 0 disables)
+  maxFiles?: number; // Rotated files kept as <logFile>.1 … .N (default: ANDROID_MCP_LOG_FILES or 3)
+  bufferLines?: number; // Ring buffer capacity; the oldest lines are dropped if writes fall behind
+  flushIntervalMs?: number; // Longest a line waits in the buffer
+  stderr?: boolean; // Also write to stderr (default: true unless ANDROID_MCP_LOG_STDERR=0)
+  maxDataChars?: number; // Serialized payloads are cut to this length
+}
+
+const LEVELS: Record<LogLevel, number> = { debug: 10, info: 20, warn: 30, error: 40 };
+
+function envLevel(): LogLevel | undefined {
+  const level = process.env.ANDROID_MCP_LOG_LEVEL?.toLowerCase();
+  return level && level in LEVELS ? level as LogLevel : undefined;
+}
+
+function envInt(name: string): number | undefined {
+  const value = parseInt(process.env[name] || '', 10);
+  return Number.isNaN(value) ? undefined : value;
+}
+
+function serialize(data: any): string {
+  if (data instanceof Error) {
+    return data.stack || `${data.name}: ${data.message}`;
+  }
+  if (typeof data === 'string') return data;
+  try {
+    return JSON.stringify(data, (_key, value) => value instanceof Error ? { name: value.name, message: value.message } : value) ?? String(data);
+  } catch (error) {
+    return String(data);
+  }
+}
+
+/**
+ * File and stderr logger that stays off the hot path: disabled levels cost a
+ * comparison, payloads are serialized only for enabled levels (and only
+ * built at all when passed as a function), and lines are collected in a ring
+ * buffer that is written out in batches on a timer instead of one blocking
+ * append per line. The file is rotated by size.
+ */
 export class Logger {
   private logFile: string;
-  private logLevel: 'debug' | 'info' | 'warn' | 'error';
-
-  constructor(logFile = 'android-mcp.log', logLevel: 'debug' | 'info' | 'warn' | 'error' = 'debug') {
-    this.logFile = path.resolve(logFile);
-    this.logLevel = logLevel;
-    
-    // Create log file if it doesn't exist
-    if (!fs.existsSync(this.logFile)) {
-      fs.writeFileSync(this.logFile, '');
+  private logLevel: LogLevel;
+  private threshold: number;
+  private options: Required<Omit<LoggerOptions, 'logFile' | 'level'>>;
+  private ring: (string | undefined)[];
+  private head = 0; // Index of the oldest buffered line
+  private count = 0;
+  private dropped = 0;
+  private timer: NodeJS.Timeout | null = null;
+  private writing: Promise<void> = Promise.resolve();
+  private fileSize: number | null = null;
+  private stampMs = 0; // Timestamp of the last line and its formatted form, reused within the same millisecond
+  private stamp = '';
+
+  constructor(options: LoggerOptions = {}) {
+    this.logFile = path.resolve(options.logFile ?? process.env.ANDROID_MCP_LOG_FILE ?? 'android-mcp.log');
+    this.logLevel = options.level ?? envLevel() ?? 'info';
+    this.threshold = LEVELS[this.logLevel];
+    this.options = {
+      maxBytes: options.maxBytes ?? envInt('ANDROID_MCP_LOG_MAX_BYTES') ?? 10 * 1024 * 1024,
+      maxFiles: options.maxFiles ?? envInt('ANDROID_MCP_LOG_FILES') ?? 3,
+      bufferLines: options.bufferLines ?? 4096,
+      flushIntervalMs: options.flushIntervalMs ?? 100,
+      stderr: options.stderr ?? process.env.ANDROID_MCP_LOG_STDERR !== '0',
+      maxDataChars: options.maxDataChars ?? 4096,
+    };
+    this.ring = new Array(this.options.bufferLines);
+
+    // Whatever is still buffered when the process exits is written synchronously
+    process.once('exit', () => this.flushSync());
+
+    this.info(`Logger initialized - Log file: ${this.logFile}, level: ${this.logLevel}`);
+  }
+
+  get level(): LogLevel {
+    return this.logLevel;
+  }
+
+  setLevel(level: LogLevel): void {
+    this.logLevel = level;
+    this.threshold = LEVELS[level];
+  }
+
+  isEnabled(level: LogLevel): boolean {
+    return LEVELS[level] >= this.threshold;
+  }
+
+  debug(message: string, data?: LogData) {
+    if (this.threshold <= LEVELS.debug) this.writeLog('debug', message, data);
+  }
+
+  info(message: string, data?: LogData) {
+    if (this.threshold <= LEVELS.info) this.writeLog('info', message, data);
+  }
+
+  warn(message: string, data?: LogData) {
+    if (this.threshold <= LEVELS.warn) this.writeLog('warn', message, data);
+  }
+
+  error(message: string, data?: LogData) {
+    this.writeLog('error', message, data);
+  }
+
+  private writeLog(level: LogLevel, message: string, data: LogData) {
+    // Callers sometimes hand over a caught error as the message
+    let text = typeof message === 'string' ? message : serialize(message);
+    const payload = typeof data === 'function' ? data() : data;
+    if (payload !== undefined) {
+      let serialized = serialize(payload);
+      if (serialized.length > this.options.maxDataChars) {
+        serialized = `${serialized.slice(0, this.options.maxDataChars)}… (${serialized.length} chars)`;
+      }
+      text += `\nData: ${serialized}`;
     }
-    
-    this.info(`Logger initialized - Log file: ${this.logFile}`);
+    this.push(`[${this.timestamp()}] [${level.toUpperCase()}] ${text}\n`);
   }
 
-  private writeLog(level: string, message: string, data?: any) {
-    const timestamp = new Date().toISOString();
-    const logEntry = `[${timestamp}] [${level.toUpperCase()}] ${message}${data ? '\nData: ' + JSON.stringify(data, null, 2) : ''}\n`;
-    
-    // Write to file first
-    try {
-      fs.appendFileSync(this.logFile, logEntry);
-    } catch (error) {
-      console.error('Failed to write to log file:', error);
+  private timestamp(): string {
+    const now = Date.now();
+    if (now !== this.stampMs) {
+      this.stampMs = now;
+      this.stamp = new Date(now).toISOString();
+    }
+    return this.stamp;
+  }
+
+  private push(line: string): void {
+    const capacity = this.ring.length;
+    if (this.count === capacity) {
+      // Writes fell behind: keep the newest lines
+      this.head = (this.head + 1) % capacity;
+      this.count--;
+      this.dropped++;
+    }
+    this.ring[(this.head + this.count) % capacity] = line;
+    this.count++;
+
+    if (!this.timer) {
+      this.timer = setTimeout(() => {
+        this.timer = null;
+        this.flush().catch(() => {});
+      }, this.options.flushIntervalMs);
+      this.timer.unref();
     }
-    
-    // Force flush and output to stderr for MCP
-    process.stderr.write(logEntry);
   }
 
-  debug(message: string, data?: any) {
-    if (this.logLevel === 'debug') {
-      this.writeLog('debug', message, data);
+  private drain(): string {
+    const capacity = this.ring.length;
+    const lines: string[] = [];
+    if (this.dropped) {
+      lines.push(`[${new Date().toISOString()}] [WARN] Log buffer full, dropped ${this.dropped} lines\n`);
+      this.dropped = 0;
     }
+    for (let i = 0; i < this.count; i++) {
+      const index = (this.head + i) % capacity;
+      lines.push(this.ring[index]!);
+      this.ring[index] = undefined;
+    }
+    this.head = 0;
+    this.count = 0;
+    return lines.join('');
   }
 
-  info(message: string, data?: any) {
-    if (['debug', 'info'].includes(this.logLevel)) {
-      this.writeLog('info', message, data);
+  /**
+   * Writes everything buffered so far; resolves once it is in the file.
+   */
+  flush(): Promise<void> {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    const batch = this.count || this.dropped ? this.drain() : '';
+    if (batch && this.options.stderr) {
+      process.stderr.write(batch);
     }
+    // Batches are appended one after the other so lines never interleave
+    this.writing = this.writing.then(() => batch ? this.append(batch) : undefined);
+    return this.writing;
   }
 
-  warn(message: string, data?: any) {
-    if (['debug', 'info', 'warn'].includes(this.logLevel)) {
-      this.writeLog('warn', message, data);
+  private async append(batch: string): Promise<void> {
+    try {
+      if (this.fileSize === null) {
+        this.fileSize = await fs.promises.stat(this.logFile).then(stat => stat.size, () => 0);
+      }
+      const bytes = Buffer.byteLength(batch);
+      if (this.options.maxBytes > 0 && this.fileSize > 0 && this.fileSize + bytes > this.options.maxBytes) {
+        await this.rotate();
+      }
+      await fs.promises.appendFile(this.logFile, batch);
+      this.fileSize += bytes;
+    } catch (error) {
+      console.error('Failed to write to log file:', error);
     }
   }
 
-  error(message: string, data?: any) {
-    this.writeLog('error', message, data);
+  /**
+   * Shifts <logFile>.1 … .N-1 up by one and moves the current file to .1.
+   */
+  private async rotate(): Promise<void> {
+    const { maxFiles } = this.options;
+    if (maxFiles > 0) {
+      await fs.promises.rm(`${this.logFile}.${maxFiles}`, { force: true });
+      for (let i = maxFiles - 1; i >= 1; i--) {
+        await fs.promises.rename(`${this.logFile}.${i}`, `${this.logFile}.${i + 1}`).catch(() => {});
+      }
+      await fs.promises.rename(this.logFile, `${this.logFile}.1`);
+    } else {
+      await fs.promises.truncate(this.logFile, 0);
+    }
+    this.fileSize = 0;
   }
 
-  clearLog() {
+  private flushSync(): void {
+    if (!this.count && !this.dropped) return;
+    const batch = this.drain();
     try {
-      fs.writeFileSync(this.logFile, '');
-      this.info('Log file cleared');
+      if (this.options.stderr) process.stderr.write(batch);
+      fs.appendFileSync(this.logFile, batch);
     } catch (error) {
-      this.error('Failed to clear log file', error);
+      // Nothing left to report it to at exit
     }
   }
+
+  clearLog() {
+    this.writing = this.writing.then(async () => {
+      try {
+        await fs.promises.writeFile(this.logFile, '');
+        this.fileSize = 0;
+      } catch (error) {
+        this.error('Failed to clear log file', error);
+      }
+    });
+    this.info('Log file cleared');
+  }
 }
 
 // Create a singleton logger instance
-export const logger = new Logger();
\ No newline at end of file
+export const logger = new Logger();
@@ -0,0 +1,272 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import { performance } from 'perf_hooks';
+
+/**
+ * Latency instrumentation: monotonic timers feeding HDR-style histograms
+ * keyed by tool, action, backend and phase, plus gauges for current levels
+ * such as queue depths, with a JSON snapshot for the android_stats tool and
+ * a Prometheus textfile export.
+ */
+
+export interface MetricLabels {
+  tool?: string; // MCP tool, e.g. android_tap
+  action?: string; // Device action, e.g. tap, screen_dump
+  backend?: string; // python, http or adb
+  phase: string; // total, validate, execute, roundtrip, queue, exec, transport, encode, …
+}
+
+export interface HistogramSnapshot {
+  count: number;
+  sumMs: number;
+  minMs: number;
+  maxMs: number;
+  meanMs: number;
+  p50Ms: number;
+  p90Ms: number;
+  p99Ms: number;
+}
+
+export interface MetricSnapshot extends HistogramSnapshot {
+  labels: MetricLabels;
+}
+
+export interface GaugeSnapshot {
+  name: string; // e.g. scheduler_queued
+  labels: Record<string, string>;
+  value: number;
+  max: number; // Highest value since start or the last reset
+}
+
+export interface MetricsSnapshot {
+  sinceMs: number; // Milliseconds covered by the snapshot, since start or the last reset
+  series: MetricSnapshot[];
+  gauges: GaugeSnapshot[];
+}
+
+const LABEL_NAMES: (keyof MetricLabels)[] = ['tool', 'action', 'backend', 'phase'];
+
+// Sub-buckets per power of two: recorded values are within 1/32 (~3%) of the truth
+const SUB_BUCKET_BITS = 5;
+const SUB_BUCKETS = 1 << SUB_BUCKET_BITS;
+// Values are stored in microseconds
+const UNITS_PER_MS = 1000;
+
+/**
+ * Log-linear histogram in the style of HdrHistogram: every power-of-two
+ * range is split into equal sub-buckets, so memory stays small while every
+ * percentile keeps the same relative precision from microseconds to minutes.
+ */
+export class Histogram {
+  private buckets = new Map<number, number>();
+  count = 0;
+  sum = 0;
+  min = Infinity;
+  max = 0;
+
+  record(ms: number): void {
+    const value = Math.max(0, Math.round(ms * UNITS_PER_MS));
+    const index = Histogram.bucketIndex(value);
+    this.buckets.set(index, (this.buckets.get(index) ?? 0) + 1);
+    this.count++;
+    this.sum += ms;
+    if (ms < this.min) this.min = ms;
+    if (ms > this.max) this.max = ms;
+  }
+
+  /**
+   * Value at quantile q (0..1) in milliseconds, as the upper edge of its bucket clamped to max.
+   */
+  quantile(q: number): number {
+    if (!this.count) return 0;
+    const rank = Math.max(1, Math.ceil(q * this.count));
+    let seen = 0;
+    for (const index of Array.from(this.buckets.keys()).sort((a, b) => a - b)) {
+      seen += this.buckets.get(index)!;
+      if (seen >= rank) {
+        return Math.min(Histogram.bucketUpper(index) / UNITS_PER_MS, this.max);
+      }
+    }
+    return this.max;
+  }
+
+  snapshot(): HistogramSnapshot {
+    const round = (ms: number) => Math.round(ms * 1000) / 1000;
+    return {
+      count: this.count,
+      sumMs: round(this.sum),
+      minMs: round(this.count ? this.min : 0),
+      maxMs: round(this.max),
+      meanMs: round(this.count ? this.sum / this.count : 0),
+      p50Ms: round(this.quantile(0.5)),
+      p90Ms: round(this.quantile(0.9)),
+      p99Ms: round(this.quantile(0.99)),
+    };
+  }
+
+  private static bucketIndex(value: number): number {
+    if (value < SUB_BUCKETS) return value;
+    const exponent = Math.floor(Math.log2(value)) - SUB_BUCKET_BITS;
+    const sub = Math.floor(value / 2 ** exponent) - SUB_BUCKETS;
+    return (exponent + 1) * SUB_BUCKETS + sub;
+  }
+
+  private static bucketUpper(index: number): number {
+    if (index < SUB_BUCKETS) return index;
+    const exponent = Math.floor(index / SUB_BUCKETS) - 1;
+    const sub = index % SUB_BUCKETS;
+    return (SUB_BUCKETS + sub + 1) * 2 ** exponent - 1;
+  }
+}
+
+function seriesKey(labels: MetricLabels): string {
+  return LABEL_NAMES.map(name => labels[name] ?? '').join('\u0000');
+}
+
+function escapeLabel(value: string): string {
+  return value.replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+}
+
+export class Metrics {
+  private series = new Map<string, { labels: MetricLabels; histogram: Histogram }>();
+  private gauges = new Map<string, GaugeSnapshot>();
+  private since = performance.now();
+  private exportTimer: NodeJS.Timeout | null = null;
+
+  record(labels: MetricLabels, ms: number): void {
+    const key = seriesKey(labels);
+    let entry = this.series.get(key);
+    if (!entry) {
+      entry = { labels: { ...labels }, histogram: new Histogram() };
+      this.series.set(key, entry);
+    }
+    entry.histogram.record(ms);
+  }
+
+  /**
+   * Sets gauge name with labels to value, e.g. how many calls wait for a device right now.
+   */
+  setGauge(name: string, labels: Record<string, string>, value: number): void {
+    const key = `${name}\u0000${Object.entries(labels).map(([label, text]) => `${label}=${text}`).join('\u0000')}`;
+    const gauge = this.gauges.get(key);
+    if (gauge) {
+      gauge.value = value;
+      gauge.max = Math.max(gauge.max, value);
+    } else {
+      this.gauges.set(key, { name, labels: { ...labels }, value, max: value });
+    }
+  }
+
+  /**
+   * Starts a monotonic timer; calling the returned function records the
+   * elapsed time under labels and returns it in milliseconds.
+   */
+  startTimer(labels: MetricLabels): () => number {
+    const start = performance.now();
+    return () => {
+      const ms = performance.now() - start;
+      this.record(labels, ms);
+      return ms;
+    };
+  }
+
+  /**
+   * Runs fn and records how long its promise took to settle, whether it resolved or not.
+   */
+  async time<T>(labels: MetricLabels, fn: () => Promise<T>): Promise<T> {
+    const stop = this.startTimer(labels);
+    try {
+      return await fn();
+    } finally {
+      stop();
+    }
+  }
+
+  snapshot(filter: Partial<MetricLabels> = {}): MetricsSnapshot {
+    const series: MetricSnapshot[] = [];
+    for (const { labels, histogram } of this.series.values()) {
+      if (LABEL_NAMES.some(name => filter[name] !== undefined && labels[name] !== filter[name])) continue;
+      series.push({ labels, ...histogram.snapshot() });
+    }
+    series.sort((a, b) => seriesKey(a.labels).localeCompare(seriesKey(b.labels)));
+    const gauges = Array.from(this.gauges.values(), gauge => ({ ...gauge, labels: { ...gauge.labels } }));
+    return { sinceMs: Math.round(performance.now() - this.since), series, gauges };
+  }
+
+  /**
+   * Clears the histograms; gauges keep their current value, their max starts over from it.
+   */
+  reset(): void {
+    this.series.clear();
+    for (const gauge of this.gauges.values()) gauge.max = gauge.value;
+    this.since = performance.now();
+  }
+
+  /**
+   * Prometheus text exposition: one summary per series, in seconds.
+   */
+  toPrometheus(): string {
+    const name = 'android_mcp_latency_seconds';
+    const lines = [
+      `# HELP ${name} Latency of MCP tool calls and device actions by phase.`,
+      `# TYPE ${name} summary`,
+    ];
+    for (const { labels, histogram } of this.series.values()) {
+      const pairs = LABEL_NAMES
+        .filter(label => labels[label] !== undefined)
+        .map(label => `${label}="${escapeLabel(labels[label]!)}"`);
+      const labelText = (extra?: string) => `{${(extra ? [...pairs, extra] : pairs).join(',')}}`;
+      for (const quantile of [0.5, 0.9, 0.99]) {
+        lines.push(`${name}${labelText(`quantile="${quantile}"`)} ${histogram.quantile(quantile) / 1000}`);
+      }
+      lines.push(`${name}_sum${labelText()} ${histogram.sum / 1000}`);
+      lines.push(`${name}_count${labelText()} ${histogram.count}`);
+    }
+    // Samples of one metric have to be consecutive, under a single TYPE line
+    const typed = new Set<string>();
+    for (const gauge of Array.from(this.gauges.values()).sort((a, b) => a.name.localeCompare(b.name))) {
+      const gaugeName = `android_mcp_${gauge.name}`;
+      if (!typed.has(gaugeName)) {
+        lines.push(`# TYPE ${gaugeName} gauge`);
+        typed.add(gaugeName);
+      }
+      const pairs = Object.entries(gauge.labels).map(([label, value]) => `${label}="${escapeLabel(value)}"`);
+      lines.push(`${gaugeName}{${pairs.join(',')}} ${gauge.value}`);
+    }
+    return lines.join('\n') + '\n';
+  }
+
+  /**
+   * Writes toPrometheus() to file atomically, for node_exporter's textfile collector.
+   */
+  async writePrometheusTextfile(file: string): Promise<void> {
+    const target = path.resolve(file);
+    const tmp = `${target}.${process.pid}.tmp`;
+    await fs.promises.mkdir(path.dirname(target), { recursive: true });
+    await fs.promises.writeFile(tmp, this.toPrometheus());
+    await fs.promises.rename(tmp, target);
+  }
+
+  /**
+   * Rewrites the textfile every intervalMs until stopExport(). Defaults come
+   * from ANDROID_MCP_METRICS_FILE and ANDROID_MCP_METRICS_INTERVAL_MS; does
+   * nothing without a file.
+   */
+  startExport(file = process.env.ANDROID_MCP_METRICS_FILE, intervalMs = parseInt(process.env.ANDROID_MCP_METRICS_INTERVAL_MS || '15000', 10)): void {
+    if (!file || this.exportTimer) return;
+    this.exportTimer = setInterval(() => {
+      this.writePrometheusTextfile(file).catch(() => {});
+    }, intervalMs);
+    this.exportTimer.unref();
+  }
+
+  stopExport(): void {
+    if (this.exportTimer) {
+      clearInterval(this.exportTimer);
+      this.exportTimer = null;
+    }
+  }
+}
+
+// Process-wide registry
+export const metrics = new Metrics();
@@ -0,0 +1,63 @@
+import { AsyncLocalStorage } from 'async_hooks';
+
+/**
+ * Deadline and cancellation of the MCP request the current code runs for.
+ *
+ * The scheduler in CommandProcessor runs each tool call inside a request
+ * context; code further down (the Python bridge) reads it from here instead
+ * of having a signal threaded through every tool, automation and bridge
+ * method. Outside a tool call there is no context and nothing is cut short.
+ */
+
+export interface RequestContext {
+  signal: AbortSignal; // Aborted with a RequestAbortedError when the deadline passes or the client cancels
+}
+
+/**
+ * Why a request stopped early: its deadline passed, or the client cancelled it.
+ */
+export class RequestAbortedError extends Error {
+  constructor(message: string, readonly reason: 'deadline' | 'cancelled') {
+    super(message);
+    this.name = 'RequestAbortedError';
+  }
+}
+
+const storage = new AsyncLocalStorage<RequestContext>();
+
+export function runInRequest<T>(context: RequestContext, fn: () => Promise<T>): Promise<T> {
+  return storage.run(context, fn);
+}
+
+/**
+ * Runs fn outside any request, for work shared between requests (such as a
+ * screen dump several callers wait on) that one caller giving up must not cancel.
+ */
+export function runDetached<T>(fn: () => Promise<T>): Promise<T> {
+  return storage.exit(fn);
+}
+
+export function currentRequest(): RequestContext | undefined {
+  return storage.getStore();
+}
+
+/**
+ * Settles like promise, or rejects with the signal's reason as soon as it is aborted.
+ */
+export function abortable<T>(promise: Promise<T>, signal: AbortSignal): Promise<T> {
+  if (signal.aborted) return Promise.reject(signal.reason);
+  return new Promise<T>((resolve, reject) => {
+    const onAbort = () => reject(signal.reason);
+    signal.addEventListener('abort', onAbort, { once: true });
+    promise.then(
+      value => {
+        signal.removeEventListener('abort', onAbort);
+        resolve(value);
+      },
+      error => {
+        signal.removeEventListener('abort', onAbort);
+        reject(error);
+      }
+    );
+  });
+}
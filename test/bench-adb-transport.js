@@ -0,0 +1,69 @@
+#!/usr/bin/env node
+
+// ADB fallback benchmark: ops/sec for taps and hierarchy dumps through the
+// persistent adb-server session versus spawning `adb shell ...` per command
+// (the exec path). Both talk to the same fake device tools
+// (test/fakes/adb-device); the exec path uses the fake adb executable in
+// test/fakes/adb-cli, so it pays the same process spawns as the real one but
+// none of a real adb server's own overhead. The exec dump uses a single
+// `uiautomator dump /dev/stdout` call, fewer round trips than the old
+// dump-to-sdcard-then-cat sequence, so its numbers are on the kind side.
+//
+// Usage: npm run build && node test/bench-adb-transport.js [ops]
+
+import { exec } from 'child_process';
+import { promisify } from 'util';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
+import { AdbTransport } from '../dist/android/adb-transport.js';
+import { parseHierarchy } from '../dist/android/ui-parser.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+const execAsync = promisify(exec);
+
+const ops = parseInt(process.argv[2] || '50', 10);
+const execEnv = { ...process.env, PATH: `${join(__dirname, 'fakes', 'adb-cli')}:${process.env.PATH}` };
+
+async function measure(label, count, op) {
+  await op(); // Warm up the session or the page cache
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < count; i++) {
+    await op(i);
+  }
+  const ms = Number(process.hrtime.bigint() - start) / 1e6;
+  const rate = count / (ms / 1000);
+  console.log(`${label.padEnd(30)} ${rate.toFixed(1).padStart(8)} ops/s   ${(ms / count).toFixed(2).padStart(7)} ms/op`);
+  return rate;
+}
+
+async function main() {
+  const server = await startFakeAdbServer();
+  const adb = new AdbTransport('fake-0', { port: server.port });
+  console.log(`📊 ${ops} taps and ${Math.ceil(ops / 5)} dumps per path\n`);
+
+  try {
+    const execTap = await measure('tap via adb exec', ops, (i = 0) =>
+      execAsync(`adb -s fake-0 shell input tap ${i} ${i}`, { env: execEnv }));
+    const sessionTap = await measure('tap via adb session', ops, (i = 0) =>
+      adb.shell(`input tap ${i} ${i}`));
+
+    const dumps = Math.ceil(ops / 5);
+    const execDump = await measure('dump via adb exec', dumps, async () => {
+      const { stdout } = await execAsync('adb -s fake-0 shell uiautomator dump /dev/stdout', { env: execEnv, maxBuffer: 16 * 1024 * 1024 });
+      return parseHierarchy(stdout);
+    });
+    const sessionDump = await measure('dump streamed over session', dumps, () => adb.dumpHierarchy());
+
+    console.log(`\n⚡ taps ${(sessionTap / execTap).toFixed(1)}x, dumps ${(sessionDump / execDump).toFixed(1)}x faster over the session`);
+  } finally {
+    adb.close();
+    await server.close();
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,209 @@
+#!/usr/bin/env node
+
+// End-to-end benchmark: starts the MCP server (dist/index.js) the way a client
+// does, speaks JSON-RPC to it over stdio and runs a workload of tool calls,
+// then reports per tool the throughput and the p50/p95/p99 latency as the
+// client sees them, handshake, worker and device included.
+//
+// The device is the fake one (test/fakes): the fake adb on PATH and a fake
+// adb server for discovery and shell commands, the fake uiautomator2 for the
+// worker. To measure against a real session, record one on a phone
+// (ANDROID_MCP_RECORD=trace-{serial}.jsonl.gz, see src/python/trace_recorder.py)
+// and replay it here with FAKE_U2_TRACE; --device runs against the connected
+// device instead of the fakes, which together with ANDROID_MCP_RECORD is a
+// way to record such a trace.
+//
+// Usage: npm run build && node test/bench-e2e.js [rounds] [concurrency] [--device]
+//        FAKE_U2_TRACE=trace-fake-0.jsonl.gz node test/bench-e2e.js
+
+import fs from 'fs';
+import os from 'os';
+import { spawn } from 'child_process';
+import { createInterface } from 'readline';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const positional = process.argv.slice(2).filter(arg => !arg.startsWith('--'));
+const rounds = parseInt(positional[0] || '20', 10);
+const concurrency = parseInt(positional[1] || '4', 10);
+const useDevice = process.argv.includes('--device');
+
+// One round: look at the screen, act on it, look again; what an agent loop does
+const WORKLOAD = [
+  { name: 'android_get_components', args: {} },
+  { name: 'android_get_components', label: 'android_get_components (compact)', args: { format: 'compact' } },
+  { name: 'android_get_screenshot', args: { maxWidth: 540 } },
+  { name: 'android_tap', args: { x: 540, y: 960 } },
+  { name: 'android_get_components', label: 'android_get_components (diff)', args: { diff: true } },
+  { name: 'android_scroll', args: { direction: 'down' } },
+  { name: 'android_back', args: {} },
+];
+// Reads issued concurrently in the throughput phase
+const CONCURRENT = { name: 'android_get_components', label: 'android_get_components (compact, concurrent)', args: { format: 'compact' } };
+
+function percentile(values, p) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+/**
+ * Minimal MCP client over the server's stdio: newline-delimited JSON-RPC.
+ */
+class McpClient {
+  constructor(env) {
+    this.nextId = 1;
+    this.pending = new Map();
+    this.stderr = [];
+    this.server = spawn(process.execPath, [join(__dirname, '..', 'dist', 'index.js')], { stdio: ['pipe', 'pipe', 'pipe'], env });
+    this.server.stderr.on('data', data => {
+      this.stderr.push(data.toString());
+      if (this.stderr.length > 50) this.stderr.shift();
+    });
+    this.server.on('exit', code => {
+      for (const { reject } of this.pending.values()) reject(new Error(`Server exited with code ${code}: ${this.stderr.join('').slice(-2000)}`));
+      this.pending.clear();
+    });
+    createInterface({ input: this.server.stdout }).on('line', line => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        return; // Not protocol output
+      }
+      const pending = this.pending.get(message.id);
+      if (!pending) return;
+      this.pending.delete(message.id);
+      if (message.error) pending.reject(new Error(message.error.message));
+      else pending.resolve(message.result);
+    });
+  }
+
+  request(method, params = {}) {
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.server.stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+    });
+  }
+
+  notify(method, params = {}) {
+    this.server.stdin.write(JSON.stringify({ jsonrpc: '2.0', method, params }) + '\n');
+  }
+
+  async initialize() {
+    const result = await this.request('initialize', {
+      protocolVersion: '2024-11-05',
+      capabilities: {},
+      clientInfo: { name: 'bench-e2e', version: '1.0.0' },
+    });
+    this.notify('notifications/initialized');
+    return result;
+  }
+
+  close() {
+    this.server.stdin.end();
+    this.server.kill();
+  }
+}
+
+class Stats {
+  constructor() {
+    this.tools = new Map();
+  }
+
+  record(label, ms, ok) {
+    if (!this.tools.has(label)) this.tools.set(label, { latencies: [], errors: 0 });
+    const entry = this.tools.get(label);
+    entry.latencies.push(ms);
+    if (!ok) entry.errors++;
+  }
+
+  print(wallMs) {
+    console.log(`  ${'tool'.padEnd(46)} ${'calls'.padStart(5)} ${'err'.padStart(4)} ${'calls/s'.padStart(8)} ${'p50'.padStart(8)} ${'p95'.padStart(8)} ${'p99'.padStart(8)}`);
+    for (const [label, { latencies, errors }] of this.tools) {
+      // Throughput of a tool on its own: calls per second of time spent in it, or of wall time when calls overlap
+      const busyMs = wallMs ?? latencies.reduce((sum, ms) => sum + ms, 0);
+      console.log(
+        `  ${label.padEnd(46)} ${String(latencies.length).padStart(5)} ${String(errors).padStart(4)} ` +
+        `${(latencies.length / (busyMs / 1000)).toFixed(1).padStart(8)} ` +
+        [0.5, 0.95, 0.99].map(p => `${percentile(latencies, p).toFixed(1).padStart(6)}ms`).join(' ')
+      );
+    }
+  }
+}
+
+async function call(client, stats, step) {
+  const start = process.hrtime.bigint();
+  let ok = true;
+  try {
+    const result = await client.request('tools/call', { name: step.name, arguments: step.args });
+    ok = !result.isError;
+  } catch {
+    ok = false;
+  }
+  stats.record(step.label || step.name, Number(process.hrtime.bigint() - start) / 1e6, ok);
+}
+
+async function main() {
+  const tmpDir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-e2e-'));
+  const env = {
+    ...process.env,
+    ANDROID_MCP_LOG_FILE: join(tmpDir, 'android-mcp.log'),
+    ANDROID_MCP_LOG_STDERR: '0',
+  };
+  let adbServer = null;
+  if (!useDevice) {
+    adbServer = await startFakeAdbServer();
+    Object.assign(env, {
+      PATH: `${join(__dirname, 'fakes', 'adb-cli')}:${process.env.PATH}`,
+      PYTHONPATH: join(__dirname, 'fakes'),
+      ANDROID_ADB_SERVER_PORT: String(adbServer.port),
+      FAKE_U2_LATENCY_MS: process.env.FAKE_U2_LATENCY_MS || '20',
+    });
+  }
+
+  const source = useDevice ? 'the connected device' : process.env.FAKE_U2_TRACE ? `trace ${process.env.FAKE_U2_TRACE}` : 'the fake device';
+  console.log(`🚀 End-to-end MCP benchmark against ${source} (${rounds} rounds, concurrency ${concurrency})`);
+  const client = new McpClient(env);
+  try {
+    let start = process.hrtime.bigint();
+    await client.initialize();
+    const { tools } = await client.request('tools/list');
+    console.log(`\n🤝 Handshake and tools/list: ${(Number(process.hrtime.bigint() - start) / 1e6).toFixed(1)} ms, ${tools.length} tools`);
+    start = process.hrtime.bigint();
+    await call(client, new Stats(), WORKLOAD[0]);
+    console.log(`🔥 First tool call: ${(Number(process.hrtime.bigint() - start) / 1e6).toFixed(1)} ms`);
+
+    console.log('\n🔁 Sequential agent loop');
+    const sequential = new Stats();
+    for (let round = 0; round < rounds; round++) {
+      for (const step of WORKLOAD) {
+        await call(client, sequential, step);
+      }
+    }
+    sequential.print();
+
+    console.log(`\n⚡ ${concurrency} reads in flight`);
+    const concurrent = new Stats();
+    start = process.hrtime.bigint();
+    await Promise.all(Array.from({ length: concurrency }, async () => {
+      for (let i = 0; i < rounds; i++) {
+        await call(client, concurrent, CONCURRENT);
+      }
+    }));
+    concurrent.print(Number(process.hrtime.bigint() - start) / 1e6);
+  } finally {
+    client.close();
+    await adbServer?.close();
+    fs.rmSync(tmpDir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,98 @@
+#!/usr/bin/env node
+
+// Template matching benchmark against the fake device (test/fakes/uiautomator2).
+// Fixture templates are cut from its screen at full and reduced size, then
+// searched for: latency per search and the Python-side split between the
+// screenshot and the match, with and without a prepared template, a search
+// region or the default scale range.
+//
+// Usage: npm run build && node test/bench-find-image.js [searches]
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { AndroidAutomation } from '../dist/android/automation.js';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const searches = parseInt(process.argv[2] || '20', 10);
+const tmpDir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-find-image-'));
+
+// Fixtures cut from the fake Weibo screen: a tab, a bottom button and a wide text block
+const FIXTURES = {
+  tab: { region: [540, 80, 830, 190] },
+  button: { region: [432, 1770, 648, 1910], scale: 0.8 },
+  block: { region: [36, 690, 1044, 1016] },
+};
+
+function percentile(values, p) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+async function measure(label, search) {
+  await search(-1); // Warm up imports
+  const latencies = [];
+  const capture = [];
+  const match = [];
+  let result;
+  for (let i = 0; i < searches; i++) {
+    const start = process.hrtime.bigint();
+    result = await search(i);
+    latencies.push(Number(process.hrtime.bigint() - start) / 1e6);
+    if (!result.success || !result.data.found) throw new Error(`${label}: ${result.error || `not found (score ${result.data.score})`}`);
+    capture.push(result.timing?.captureMs ?? 0);
+    match.push((result.timing?.matchMs ?? 0) + (result.timing?.templateMs ?? 0));
+  }
+  console.log(
+    `  ${label.padEnd(36)} p50 ${percentile(latencies, 0.5).toFixed(1).padStart(7)} ms  ` +
+    `p95 ${percentile(latencies, 0.95).toFixed(1).padStart(7)} ms  ` +
+    `capture ${percentile(capture, 0.5).toFixed(1).padStart(6)} ms  match ${percentile(match, 0.5).toFixed(1).padStart(6)} ms  ` +
+    `score ${result.data.score.toFixed(3)} at ${result.data.scale}x`
+  );
+}
+
+async function main() {
+  console.log(`🖼️  Template matching benchmark (${searches} searches per case)`);
+  const bridge = new UIAutomator2Bridge('fake-0', {
+    env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LATENCY_MS: process.env.FAKE_U2_LATENCY_MS || '20' }
+  });
+  const automation = new AndroidAutomation('fake-0', bridge);
+
+  try {
+    await bridge.initialize();
+    for (const [name, fixture] of Object.entries(FIXTURES)) {
+      const [x1, , x2] = fixture.region;
+      const maxWidth = fixture.scale ? Math.round((x2 - x1) * fixture.scale) : undefined;
+      fixture.path = join(tmpDir, `${name}.png`);
+      await automation.takeScreenshot(fixture.path, 'pillow', { imageFormat: 'png', region: fixture.region, maxWidth });
+    }
+
+    console.log('\n🧊 Template prepared on every search (new file each time)');
+    await measure('tab, full screen', async i => {
+      const copy = join(tmpDir, `tab-${i}.png`);
+      fs.copyFileSync(FIXTURES.tab.path, copy);
+      return bridge.findImage({ template: copy });
+    });
+
+    console.log('\n🔥 Prepared template from the cache');
+    for (const [name, fixture] of Object.entries(FIXTURES)) {
+      await measure(`${name}${fixture.scale ? ` at ${fixture.scale}x` : ''}, full screen`, () => bridge.findImage({ template: fixture.path }));
+    }
+    await measure('tab, one scale (1.0)', () => bridge.findImage({ template: FIXTURES.tab.path, scales: [1] }));
+    await measure('tab, top quarter of the screen', () => bridge.findImage({ template: FIXTURES.tab.path, region: [0, 0, 1080, 480] }));
+    const data = fs.readFileSync(FIXTURES.button.path).toString('base64');
+    await measure('button as base64 data', () => bridge.findImage({ templateData: data }));
+  } finally {
+    await bridge.close();
+    fs.rmSync(tmpDir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,134 @@
+#!/usr/bin/env node
+
+// Micro-benchmark for the Python bridge stdout framing.
+// Replays a stream of large dump and screenshot responses through the legacy
+// brace-counting parser and the newline/binary FrameParser.
+//
+// Usage: npm run build && node test/bench-frame-parser.js [recorded-stdout-file]
+
+import fs from 'fs';
+import crypto from 'crypto';
+import { FrameParser } from '../dist/android/frame-parser.js';
+
+const CHUNK_SIZE = 64 * 1024; // Typical pipe read size
+
+// Copy of the original stdout handler from uiautomator2-bridge.ts, kept here as the baseline
+class LegacyBraceParser {
+  constructor(onFrame) {
+    this.onFrame = onFrame;
+    this.responseBuffer = '';
+  }
+
+  push(data) {
+    this.responseBuffer += data.toString();
+    let startIndex = 0;
+    while (true) {
+      const openBrace = this.responseBuffer.indexOf('{', startIndex);
+      if (openBrace === -1) break;
+      let braceCount = 0;
+      let endIndex = -1;
+      for (let i = openBrace; i < this.responseBuffer.length; i++) {
+        if (this.responseBuffer[i] === '{') braceCount++;
+        else if (this.responseBuffer[i] === '}') {
+          braceCount--;
+          if (braceCount === 0) {
+            endIndex = i;
+            break;
+          }
+        }
+      }
+      if (endIndex === -1) break;
+      const jsonStr = this.responseBuffer.substring(openBrace, endIndex + 1);
+      try {
+        this.onFrame(JSON.parse(jsonStr));
+      } catch (err) {
+        // The legacy parser silently loses frames it cannot parse
+      }
+      this.responseBuffer = this.responseBuffer.substring(endIndex + 1);
+      startIndex = 0;
+    }
+  }
+}
+
+function buildDumpXml(nodeCount) {
+  const lines = ["<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>", '<hierarchy rotation="0">'];
+  for (let i = 0; i < nodeCount; i++) {
+    const depth = 1 + (i % 12);
+    const indent = '  '.repeat(depth);
+    lines.push(`${indent}<node index="${i % 7}" text="Item ${i}${i === 4321 ? " :-}" : ""}" resource-id="com.sina.weibo:id/item_${i % 40}" class="android.widget.TextView" package="com.sina.weibo" content-desc="" checkable="false" checked="false" clickable="${i % 3 === 0}" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" visible-to-user="true" bounds="[0,${i * 4}][1080,${i * 4 + 120}]" drawing-order="1" hint="" />`);
+  }
+  lines.push('</hierarchy>');
+  return lines.join('\n');
+}
+
+function buildRecordedStream() {
+  const xml = buildDumpXml(6000); // ~2.5 MB pretty-printed hierarchy
+  const image = crypto.randomBytes(1536 * 1024); // 1.5 MB of incompressible "PNG" bytes
+
+  const jsonParts = [];
+  const binaryParts = [];
+  let id = 0;
+  for (let round = 0; round < 4; round++) {
+    const dump = JSON.stringify({ success: true, data: { xml, displayWidth: 1080, displayHeight: 1920, currentPackageName: 'com.sina.weibo' }, id: ++id }) + '\n';
+    jsonParts.push(dump);
+    binaryParts.push(Buffer.from(dump));
+
+    const shotId = ++id;
+    jsonParts.push(JSON.stringify({ success: true, data: { format: 'png', image: image.toString('base64') }, id: shotId }) + '\n');
+    binaryParts.push(Buffer.from(JSON.stringify({ success: true, data: { format: 'png' }, id: shotId, binary: image.length }) + '\n'));
+    binaryParts.push(image);
+
+    const tap = JSON.stringify({ success: true, message: 'Tapped at (540, 960)', id: ++id }) + '\n';
+    jsonParts.push(tap);
+    binaryParts.push(Buffer.from(tap));
+  }
+  return { json: Buffer.from(jsonParts.join('')), binary: Buffer.concat(binaryParts), frames: id };
+}
+
+function chunk(buffer) {
+  const chunks = [];
+  for (let i = 0; i < buffer.length; i += CHUNK_SIZE) {
+    chunks.push(buffer.subarray(i, i + CHUNK_SIZE));
+  }
+  return chunks;
+}
+
+function run(label, createParser, chunks) {
+  let frames = 0;
+  const parser = createParser(() => frames++);
+  const start = process.hrtime.bigint();
+  for (const c of chunks) parser.push(c);
+  const ms = Number(process.hrtime.bigint() - start) / 1e6;
+  const bytes = chunks.reduce((sum, c) => sum + c.length, 0);
+  console.log(`${label.padEnd(34)} ${ms.toFixed(1).padStart(9)} ms  ${(bytes / 1024 / 1024 / (ms / 1000)).toFixed(1).padStart(8)} MB/s  frames=${frames}`);
+  return frames;
+}
+
+function main() {
+  console.log('📦 Bridge stdout framing benchmark');
+
+  const recordedPath = process.argv[2];
+  let streams;
+  if (recordedPath) {
+    const data = fs.readFileSync(recordedPath);
+    console.log(`Replaying recorded stream ${recordedPath} (${(data.length / 1024 / 1024).toFixed(1)} MB)`);
+    streams = { json: data, binary: null, frames: null };
+  } else {
+    streams = buildRecordedStream();
+    console.log(`Synthetic stream: ${streams.frames} frames, ${(streams.json.length / 1024 / 1024).toFixed(1)} MB as JSON, ${(streams.binary.length / 1024 / 1024).toFixed(1)} MB with binary screenshots`);
+  }
+
+  const jsonChunks = chunk(streams.json);
+  const legacyFrames = run('legacy brace counting (json)', (cb) => new LegacyBraceParser(cb), jsonChunks);
+  const lineFrames = run('FrameParser newline (json)', (cb) => new FrameParser(cb), jsonChunks);
+  if (streams.binary) {
+    run('FrameParser newline + binary', (cb) => new FrameParser(cb), chunk(streams.binary));
+  }
+
+  if (streams.frames !== null) {
+    console.log(legacyFrames === streams.frames ? '✅ legacy parser recovered every frame' : `❌ legacy parser lost ${streams.frames - legacyFrames} frames (braces inside UI text)`);
+    console.log(lineFrames === streams.frames ? '✅ FrameParser recovered every frame' : `❌ FrameParser lost ${streams.frames - lineFrames} frames`);
+  }
+}
+
+main();
@@ -0,0 +1,97 @@
+#!/usr/bin/env node
+
+// Benchmark for logging overhead per tool call: the original synchronous
+// logger (appendFileSync and pretty-printed JSON for every line, debug level)
+// versus the buffered logger at its default info level and at debug. Each
+// simulated call logs what a tool call with a screen dump logs.
+//
+// Usage: npm run build && node test/bench-logger.js 2>/dev/null
+
+import fs from 'fs';
+import os from 'os';
+import path, { join } from 'path';
+import { fileURLToPath } from 'url';
+import { Logger } from '../dist/utils/logger.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const CALLS = 2000;
+
+// Copy of the original Logger.writeLog path, kept as the baseline
+class LegacyLogger {
+  constructor(logFile) {
+    this.logFile = path.resolve(logFile);
+    fs.writeFileSync(this.logFile, '');
+  }
+  writeLog(level, message, data) {
+    const timestamp = new Date().toISOString();
+    const logEntry = `[${timestamp}] [${level.toUpperCase()}] ${message}${data ? '\nData: ' + JSON.stringify(data, null, 2) : ''}\n`;
+    try {
+      fs.appendFileSync(this.logFile, logEntry);
+    } catch (error) {
+      console.error('Failed to write to log file:', error);
+    }
+    process.stderr.write(logEntry);
+  }
+  debug(message, data) { this.writeLog('debug', message, data); }
+  info(message, data) { this.writeLog('info', message, data); }
+  warn(message, data) { this.writeLog('warn', message, data); }
+  error(message, data) { this.writeLog('error', message, data); }
+}
+
+const xml = fs.readFileSync(join(__dirname, 'fixtures', 'weibo_home.xml'), 'utf8');
+const args = { text: '热门直播', timeout: 5000, selectors: [{ resourceId: 'com.sina.weibo:id/search' }, { textContains: 'Search' }] };
+
+// The lines one tool call with a fresh screen dump logs, payloads built lazily where the code now does
+function toolCall(logger, lazy) {
+  logger.info('Tool call received: android_find_element', args);
+  logger.debug('Processing command: android_find_element');
+  logger.debug('Executing command: android_find_element', args);
+  logger.debug('Tool found: android_find_element, executing...');
+  logger.info('🔍 Starting getScreenInfo()');
+  logger.debug('Getting screen info...');
+  logger.info('🔍 Starting parseUIDump (simplified mode)');
+  const details = () => ({ length: xml.length, preview: xml.substring(0, 200) });
+  logger.debug('XML dump details', lazy ? details : details());
+  logger.info('📈 Simplified element processing complete', {
+    totalElements: 131,
+    filteredElements: 124,
+    elementsWithDescription: 13,
+    elementsWithResourceId: 81
+  });
+  logger.info('🎯 Returning 124 simplified elements');
+  logger.info("Command 'android_find_element' executed successfully");
+  logger.info("Command 'android_find_element' processed successfully");
+}
+
+async function bench(name, logger, lazy) {
+  for (let i = 0; i < 50; i++) toolCall(logger, lazy);
+  await logger.flush?.();
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < CALLS; i++) toolCall(logger, lazy);
+  const callPath = Number(process.hrtime.bigint() - start) / 1e3 / CALLS;
+  await logger.flush?.();
+  const total = Number(process.hrtime.bigint() - start) / 1e3 / CALLS;
+  console.log(`${name.padEnd(28)} ${callPath.toFixed(1).padStart(8)} µs/call on the calling path ${total.toFixed(1).padStart(8)} µs/call including writes`);
+  return callPath;
+}
+
+async function main() {
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-bench-'));
+  try {
+    console.log(`📊 Logging overhead per tool call (${CALLS} calls, 12 log lines each)`);
+    const legacy = await bench('sync logger, debug', new LegacyLogger(join(dir, 'legacy.log')), false);
+    const debug = await bench('buffered logger, debug', new Logger({ logFile: join(dir, 'debug.log'), level: 'debug', bufferLines: 32768 }), true);
+    const info = await bench('buffered logger, info', new Logger({ logFile: join(dir, 'info.log'), level: 'info', bufferLines: 32768 }), true);
+    const warn = await bench('buffered logger, warn', new Logger({ logFile: join(dir, 'warn.log'), level: 'warn', bufferLines: 32768 }), true);
+    console.log(`🎯 Calling path speedup: ${(legacy / debug).toFixed(1)}x at debug, ${(legacy / info).toFixed(1)}x at info (default), ${(legacy / warn).toFixed(0)}x at warn`);
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,113 @@
+#!/usr/bin/env node
+
+// Micro-benchmarks for the per-call work the server does in process, on the
+// fixture dump and on every distinct dump of recorded traces: parsing the
+// hierarchy, building elements, encoding get_components output (json,
+// compact, diff against the previous dump) and reading a dump response and a
+// screenshot frame off the bridge's stdout.
+//
+// Usage: npm run build && node test/bench-micro.js [trace.jsonl[.gz] | dump.xml ...]
+
+import fs from 'fs';
+import zlib from 'zlib';
+import { fileURLToPath } from 'url';
+import { dirname, join, basename } from 'path';
+import { parseHierarchy } from '../dist/android/ui-parser.js';
+import { toUIElement } from '../dist/android/automation.js';
+import { selectComponents, encodeColumnar } from '../dist/android/screen-compact.js';
+import { ScreenSnapshotTracker } from '../dist/android/screen-diff.js';
+import { FrameParser } from '../dist/android/frame-parser.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const ITERATIONS = 200;
+const CHUNK_SIZE = 64 * 1024; // Typical pipe read size
+
+function percentile(values, p) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+function measure(label, op, size) {
+  for (let i = 0; i < 10; i++) op(); // Warm up the JIT
+  const latencies = [];
+  let bytes = 0;
+  for (let i = 0; i < ITERATIONS; i++) {
+    const start = process.hrtime.bigint();
+    const result = op();
+    latencies.push(Number(process.hrtime.bigint() - start) / 1e6);
+    if (size) bytes = size(result);
+  }
+  const total = latencies.reduce((sum, ms) => sum + ms, 0);
+  console.log(
+    `  ${label.padEnd(26)} ${(ITERATIONS / (total / 1000)).toFixed(0).padStart(8)} ops/s  ` +
+    `p50 ${percentile(latencies, 0.5).toFixed(3).padStart(7)} ms  p99 ${percentile(latencies, 0.99).toFixed(3).padStart(7)} ms` +
+    (bytes ? `  ${(bytes / 1024).toFixed(1).padStart(6)} KB out` : '')
+  );
+}
+
+// Dumps recorded in a trace (test/fakes/uiautomator2/replay.py reads the same format), each once
+function traceDumps(path) {
+  let raw = fs.readFileSync(path);
+  if (path.endsWith('.gz')) raw = zlib.gunzipSync(raw, { finishFlush: zlib.constants.Z_SYNC_FLUSH });
+  const lines = raw.toString('utf8').split('\n').filter(Boolean).map(line => JSON.parse(line));
+  const blobs = new Map(lines.filter(line => line.type === 'blob').map(line => [line.id, line]));
+  const ids = new Set(lines.filter(line => line.type === 'call' && line.name === 'dump_hierarchy').map(line => line.blob));
+  return Array.from(ids, (id, i) => ({ name: `${basename(path)} #${i + 1}`, xml: blobs.get(id).data }));
+}
+
+function screenInfoOf(xml) {
+  const tree = parseHierarchy(xml);
+  const screenInfo = { width: 1080, height: 1920, elements: tree.nodes.map(toUIElement), currentApp: '' };
+  Object.defineProperty(screenInfo, 'tree', { value: tree, enumerable: false });
+  Object.defineProperty(screenInfo, 'elementNodes', { value: tree.nodes, enumerable: false });
+  return screenInfo;
+}
+
+// The worker's response to get_screen_dump followed by a screenshot frame, cut into pipe-sized chunks
+function stdoutChunks(xml) {
+  const dump = Buffer.from(JSON.stringify({ id: 1, success: true, data: { xml, displayWidth: 1080, displayHeight: 1920 } }) + '\n');
+  const image = Buffer.alloc(96 * 1024, 7);
+  const header = Buffer.from(JSON.stringify({ id: 2, success: true, data: { format: 'jpeg', bytes: image.length }, binary: image.length }) + '\n');
+  const stream = Buffer.concat([dump, header, image]);
+  const chunks = [];
+  for (let offset = 0; offset < stream.length; offset += CHUNK_SIZE) {
+    chunks.push(stream.subarray(offset, offset + CHUNK_SIZE));
+  }
+  return chunks;
+}
+
+function benchDump({ name, xml }) {
+  const screenInfo = screenInfoOf(xml);
+  console.log(`\n📄 ${name}: ${(xml.length / 1024).toFixed(1)} KB, ${screenInfo.elements.length} nodes`);
+  measure('parse hierarchy', () => parseHierarchy(xml));
+  measure('build elements', () => screenInfo.tree.nodes.map(toUIElement));
+  measure('encode json', () => JSON.stringify({ ...screenInfo, elements: selectComponents(screenInfo).elements }), out => out.length);
+  measure('encode compact', () => JSON.stringify(encodeColumnar(screenInfo, selectComponents(screenInfo, { visibleOnly: true }))), out => out.length);
+  const tracker = new ScreenSnapshotTracker();
+  let version = tracker.update(screenInfo).version;
+  measure('parse + diff, same screen', () => {
+    const diff = tracker.update(screenInfoOf(xml), version);
+    version = diff.version;
+    return JSON.stringify(diff);
+  }, out => out.length);
+  const chunks = stdoutChunks(xml);
+  let frames = 0;
+  const parser = new FrameParser(() => frames++);
+  measure('frame dump + screenshot', () => chunks.forEach(chunk => parser.push(chunk)));
+  if (frames !== 2 * (ITERATIONS + 10)) throw new Error(`FrameParser produced ${frames} frames`);
+}
+
+function main() {
+  const inputs = process.argv.slice(2);
+  const dumps = [{ name: 'weibo_home.xml (fixture)', xml: fs.readFileSync(join(__dirname, 'fixtures', 'weibo_home.xml'), 'utf8') }];
+  for (const input of inputs) {
+    if (/\.jsonl(\.gz)?$/.test(input)) dumps.push(...traceDumps(input));
+    else dumps.push({ name: basename(input), xml: fs.readFileSync(input, 'utf8') });
+  }
+  console.log(`⏱️  Parser and encoder micro-benchmarks (${ITERATIONS} iterations per case)`);
+  dumps.forEach(benchDump);
+}
+
+main();
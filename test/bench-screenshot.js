@@ -0,0 +1,108 @@
+#!/usr/bin/env node
+
+// Screenshot pipeline benchmark against a fake device returning a fixed image
+// (test/fakes/uiautomator2): end-to-end latency and CPU per screenshot for the
+// old capture-twice/PNG path versus the single-capture encoder.
+//
+// Usage: npm run build && node test/bench-screenshot.js [shots]
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { AndroidAutomation } from '../dist/android/automation.js';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const shots = parseInt(process.argv[2] || '20', 10);
+const tmpDir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-shots-'));
+const CLOCK_TICKS = 100; // USER_HZ on Linux
+
+// CPU seconds used by our child processes (the Python bridge), Linux only
+function childCpuSeconds() {
+  try {
+    let total = 0;
+    for (const task of fs.readdirSync('/proc/self/task')) {
+      const children = fs.readFileSync(`/proc/self/task/${task}/children`, 'utf8').trim().split(/\s+/).filter(Boolean);
+      for (const pid of children) {
+        const stat = fs.readFileSync(`/proc/${pid}/stat`, 'utf8');
+        const fields = stat.slice(stat.lastIndexOf(')') + 2).split(' ');
+        total += (parseInt(fields[11], 10) + parseInt(fields[12], 10)) / CLOCK_TICKS;
+      }
+    }
+    return total;
+  } catch {
+    return NaN;
+  }
+}
+
+function percentile(values, p) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+async function measure(label, shot) {
+  await shot(0); // Warm up imports and the size model
+  const latencies = [];
+  let bytes = 0;
+  const cpuStart = process.cpuUsage();
+  const childStart = childCpuSeconds();
+  for (let i = 0; i < shots; i++) {
+    const start = process.hrtime.bigint();
+    bytes = await shot(i + 1);
+    latencies.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  const cpu = process.cpuUsage(cpuStart);
+  const nodeCpuMs = (cpu.user + cpu.system) / 1000 / shots;
+  const pythonCpuMs = (childCpuSeconds() - childStart) * 1000 / shots;
+  console.log(
+    `  ${label.padEnd(38)} p50 ${percentile(latencies, 0.5).toFixed(1).padStart(7)} ms  ` +
+    `p95 ${percentile(latencies, 0.95).toFixed(1).padStart(7)} ms  ` +
+    `cpu node ${nodeCpuMs.toFixed(1).padStart(6)} ms  python ${Number.isNaN(pythonCpuMs) ? '   n/a' : pythonCpuMs.toFixed(1).padStart(6)} ms  ` +
+    `${(bytes / 1024).toFixed(0).padStart(5)} KB`
+  );
+}
+
+async function main() {
+  console.log(`📸 Screenshot pipeline benchmark (${shots} shots per case)`);
+  const bridge = new UIAutomator2Bridge('fake-0', {
+    env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LATENCY_MS: process.env.FAKE_U2_LATENCY_MS || '20' }
+  });
+  const automation = new AndroidAutomation('fake-0', bridge);
+
+  try {
+    await bridge.initialize();
+
+    console.log('\n🐢 Previous pipeline (PNG at source, second capture for the file)');
+    await measure('capture twice + PNG, with filename', async i => {
+      await bridge.takeScreenshot(join(tmpDir, `legacy-${i}.png`), 'pillow', { imageFormat: 'png' });
+      const result = await bridge.takeScreenshot(undefined, 'pillow', { imageFormat: 'png' });
+      return result.payload.length;
+    });
+    await measure('PNG at source, no filename', async () => {
+      const result = await bridge.takeScreenshot(undefined, 'pillow', { imageFormat: 'png' });
+      return result.payload.length;
+    });
+    console.log('  (the old path also re-encoded with sharp up to 6 + 6 times and saved PNG at a slower compression level; not counted here)');
+
+    console.log('\n🚀 Single-capture encoder');
+    await measure('jpeg, 128 KB budget, with filename', async i => {
+      const result = await automation.takeScreenshot(join(tmpDir, `shot-${i}.jpg`));
+      return result.bytes;
+    });
+    await measure('jpeg, 128 KB budget', async () => (await automation.takeScreenshot()).bytes);
+    await measure('jpeg, 540 px wide', async () => (await automation.takeScreenshot(undefined, 'pillow', { maxWidth: 540 })).bytes);
+    await measure('webp, 64 KB budget', async () => (await automation.takeScreenshot(undefined, 'pillow', { imageFormat: 'webp', maxBytes: 64 * 1024 })).bytes);
+    await measure('raw device jpeg passthrough', async () => (await automation.takeScreenshot(undefined, 'raw', { maxBytes: 1024 * 1024 })).bytes);
+  } finally {
+    await automation.close();
+    fs.rmSync(tmpDir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
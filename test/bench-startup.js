@@ -0,0 +1,85 @@
+#!/usr/bin/env node
+
+// Benchmark for server startup: time from process start to the first
+// successful tool call against the fake device. Compares a cold start, where
+// the first android_tap spawns the Python worker, with the server's prewarm,
+// where the worker starts while the MCP client is still handshaking. The
+// worker signals readiness with a frame once it has connected; before, the
+// bridge slept a fixed 1000 ms and then asked for device info.
+//
+// Usage: npm run build && node test/bench-startup.js [handshakeMs] [connectMs] 2>/dev/null
+
+import { performance } from 'perf_hooks';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+// Time a client typically spends between spawning the server and its first tools/call
+const handshakeMs = parseInt(process.argv[2] || '150', 10);
+// Time uiautomator2.connect() takes in the fake, standing in for the ATX agent handshake
+const connectMs = parseInt(process.argv[3] || '200', 10);
+const RUNS = 5;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+async function loadModules() {
+  const start = performance.now();
+  const { DevicePool } = await import('../dist/android/device-pool.js');
+  const { ToolFactory } = await import('../dist/mcp/tools/factory.js');
+  const { AndroidCommandHandler, CommandProcessor } = await import('../dist/mcp/tools/command.js');
+  return { DevicePool, ToolFactory, AndroidCommandHandler, CommandProcessor, importMs: performance.now() - start };
+}
+
+function createServer(modules) {
+  const pool = new modules.DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_CONNECT_MS: String(connectMs) } },
+  });
+  const registry = new modules.ToolFactory(pool).getRegistry();
+  const processor = new modules.CommandProcessor(new modules.AndroidCommandHandler(registry), registry);
+  return { pool, processor };
+}
+
+// Milliseconds from "server start" to the first tool call that succeeds
+async function firstCall(modules, prewarm) {
+  const start = performance.now();
+  const { pool, processor } = createServer(modules);
+  try {
+    if (prewarm) pool.warmAll().catch(() => {});
+    await sleep(handshakeMs);
+    const result = await processor.process({ name: 'android_tap', args: { x: 100, y: 200 } });
+    if (result.isError) throw new Error(result.content[0].text);
+    return performance.now() - start;
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function measure(modules, prewarm) {
+  const times = [];
+  for (let i = 0; i < RUNS; i++) times.push(await firstCall(modules, prewarm));
+  times.sort((a, b) => a - b);
+  return times[Math.floor(times.length / 2)];
+}
+
+async function main() {
+  const modules = await loadModules();
+  console.log(`📊 Time to first successful tool call (median of ${RUNS}, ${handshakeMs}ms handshake, ${connectMs}ms device connect)`);
+  console.log(`   module import: ${modules.importMs.toFixed(0)}ms`);
+
+  const cold = await measure(modules, false);
+  const warm = await measure(modules, true);
+  // The old bridge spent a fixed second before its first get_device_info, on top of the same spawn and connect
+  const legacy = cold + 1000;
+  console.log(`   fixed 1s wait (before):   ~${legacy.toFixed(0)}ms`);
+  console.log(`   ready frame, cold:         ${cold.toFixed(0)}ms`);
+  console.log(`   ready frame, prewarmed:    ${warm.toFixed(0)}ms`);
+  console.log(`🎯 ${(legacy / warm).toFixed(1)}x faster to the first tool call; prewarm hides ${(cold - warm).toFixed(0)}ms behind the handshake`);
+}
+
+main().catch(error => {
+  console.error('❌ Benchmark failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,141 @@
+#!/usr/bin/env node
+
+// Benchmark for hierarchy parsing: the legacy regex parseUIDump versus the
+// streaming UIHierarchyParser, plus element lookup by linear scan versus index.
+//
+// Usage: npm run build && node --expose-gc test/bench-ui-parser.js [dump.xml | bridge-response.json ...]
+
+import fs from 'fs';
+import { fileURLToPath } from 'url';
+import { dirname, join, basename } from 'path';
+import { parseHierarchy } from '../dist/android/ui-parser.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const ITERATIONS = 30;
+
+// Copy of the original regex-based parseUIDump from automation.ts (logging removed), kept as the baseline
+function legacyParseUIDump(xml) {
+  const elements = [];
+  const nodeMatches = xml.match(/<node[^>]*\/?>/g) || [];
+  for (const nodeMatch of nodeMatches) {
+    const resourceMatch = nodeMatch.match(/resource-id="([^"]*)"/);
+    const classMatch = nodeMatch.match(/class="([^"]*)"/);
+    const descMatch = nodeMatch.match(/content-desc="([^"]*)"/);
+    const boundsMatch = nodeMatch.match(/bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"/);
+    if (boundsMatch) {
+      elements.push({
+        description: descMatch ? descMatch[1] : '',
+        resourceId: resourceMatch ? resourceMatch[1] : '',
+        className: classMatch ? classMatch[1] : '',
+        bounds: [parseInt(boundsMatch[1]), parseInt(boundsMatch[2]), parseInt(boundsMatch[3]), parseInt(boundsMatch[4])]
+      });
+    }
+  }
+  const filtered = elements.filter(el =>
+    el.description || el.resourceId ||
+    el.className.includes('Button') || el.className.includes('Text') || el.className.includes('Edit') ||
+    el.className.includes('View') || el.className.includes('Image')
+  );
+  // The original also ran these extra passes for its stats log line
+  elements.filter(el => el.description).length;
+  elements.filter(el => el.resourceId).length;
+  return filtered.length > 0 ? filtered : elements;
+}
+
+function legacyFind(elements, options) {
+  for (const element of elements) {
+    if (options.description && element.description.includes(options.description)) return element;
+    if (options.resourceId && element.resourceId.includes(options.resourceId)) return element;
+    if (options.className && element.className.includes(options.className)) return element;
+  }
+  return null;
+}
+
+function loadDump(path) {
+  const raw = fs.readFileSync(path, 'utf8');
+  if (path.endsWith('.json')) {
+    const parsed = JSON.parse(raw);
+    return parsed.data?.xml || parsed.xml;
+  }
+  return raw;
+}
+
+function enlarge(xml, copies) {
+  // Repeat the top-level content to simulate long feeds / deep recycler views
+  const body = xml.slice(xml.indexOf('<node'), xml.lastIndexOf('</hierarchy>'));
+  return `<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n<hierarchy rotation="0">\n${body.repeat(copies)}</hierarchy>\n`;
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.floor(sorted.length / 2)];
+}
+
+function time(fn) {
+  const samples = [];
+  let result;
+  for (let i = 0; i < ITERATIONS; i++) {
+    const start = process.hrtime.bigint();
+    result = fn();
+    samples.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  return { ms: median(samples), result };
+}
+
+function retainedBytes(fn) {
+  if (!global.gc) return null;
+  global.gc();
+  const before = process.memoryUsage().heapUsed;
+  const keep = fn();
+  global.gc();
+  const after = process.memoryUsage().heapUsed;
+  if (!keep) return null;
+  return after - before;
+}
+
+function formatBytes(bytes) {
+  return bytes === null ? 'n/a (run with --expose-gc)' : `${(bytes / 1024).toFixed(0)} KB`;
+}
+
+function benchDump(label, xml) {
+  console.log(`\n📄 ${label}: ${(xml.length / 1024).toFixed(0)} KB`);
+
+  const legacy = time(() => legacyParseUIDump(xml));
+  const streaming = time(() => parseHierarchy(xml));
+  console.log(`  legacy regex parse      ${legacy.ms.toFixed(2).padStart(8)} ms  elements=${legacy.result.length}  retained=${formatBytes(retainedBytes(() => legacyParseUIDump(xml)))}`);
+  console.log(`  streaming tree parse    ${streaming.ms.toFixed(2).padStart(8)} ms  nodes=${streaming.result.nodes.length}  retained=${formatBytes(retainedBytes(() => parseHierarchy(xml)))}`);
+
+  const tree = streaming.result;
+  const queries = [
+    { resourceId: 'com.sina.weibo:id/tv_groupName' },
+    { description: 'Me' },
+    { className: 'android.widget.EditText' },
+    { resourceId: 'does_not_exist' },
+  ];
+  const lookups = 2000;
+  const scan = time(() => {
+    for (let i = 0; i < lookups; i++) legacyFind(legacy.result, queries[i % queries.length]);
+  });
+  const indexed = time(() => {
+    for (let i = 0; i < lookups; i++) tree.find(queries[i % queries.length]);
+  });
+  console.log(`  ${lookups} lookups, linear    ${scan.ms.toFixed(2).padStart(8)} ms`);
+  console.log(`  ${lookups} lookups, indexed   ${indexed.ms.toFixed(2).padStart(8)} ms`);
+}
+
+function main() {
+  console.log('🌲 Hierarchy parser benchmark');
+  const inputs = process.argv.slice(2);
+  if (inputs.length > 0) {
+    for (const path of inputs) benchDump(basename(path), loadDump(path));
+    return;
+  }
+
+  const fixture = loadDump(join(__dirname, 'fixtures', 'weibo_home.xml'));
+  benchDump('weibo_home.xml (from test_debug_output.json)', fixture);
+  benchDump('weibo_home.xml x40', enlarge(fixture, 40));
+}
+
+main();
@@ -0,0 +1,119 @@
+// Fake adb server speaking the smart-socket protocol on a local port.
+//
+// Device services run in a local sh with test/fakes/adb-device first on PATH,
+// so `input`, `uiautomator`, `wm`, `dumpsys` and `screencap` answer like a
+// phone would. `shell:` without a command is a long-lived shell fed from the
+// socket, like adbd's interactive shell.
+
+import { createServer } from 'net';
+import { spawn } from 'child_process';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+
+const __dirname = dirname(fileURLToPath(import.meta.url));
+const DEVICE_BIN = join(__dirname, 'adb-device');
+
+function reply(socket, message) {
+  const body = Buffer.from(message, 'utf8');
+  socket.write(Buffer.concat([Buffer.from('OKAY'), Buffer.from(body.length.toString(16).padStart(4, '0')), body]));
+}
+
+function fail(socket, message) {
+  const body = Buffer.from(message, 'utf8');
+  socket.write(Buffer.concat([Buffer.from('FAIL'), Buffer.from(body.length.toString(16).padStart(4, '0')), body]));
+  socket.end();
+}
+
+/**
+ * Starts the server; resolves to { port, stats, close() }. stats counts
+ * connections and services opened, to check that sessions are reused.
+ */
+export function startFakeAdbServer({ serials = ['fake-0'], env = {} } = {}) {
+  const stats = { connections: 0, shells: 0, execs: 0 };
+  const children = new Set();
+
+  const runDevice = (socket, command) => {
+    const child = spawn('sh', command === null ? [] : ['-c', command], {
+      env: { ...process.env, ...env, PATH: `${DEVICE_BIN}:${process.env.PATH}` },
+      stdio: ['pipe', 'pipe', 'pipe'],
+    });
+    children.add(child);
+    child.stdout.pipe(socket, { end: false });
+    child.stderr.pipe(socket, { end: false });
+    child.on('exit', () => {
+      children.delete(child);
+      socket.end();
+    });
+    if (command === null) {
+      socket.pipe(child.stdin);
+    } else {
+      child.stdin.end();
+    }
+    socket.on('close', () => child.kill());
+    socket.on('error', () => child.kill());
+  };
+
+  const sockets = new Set();
+  const server = createServer((socket) => {
+    stats.connections++;
+    sockets.add(socket);
+    socket.setNoDelay(true); // Like the real server; otherwise a marker written after a big dump waits for a delayed ACK
+    socket.on('close', () => sockets.delete(socket));
+    let buffer = Buffer.alloc(0);
+    let transport = false;
+
+    const onData = (chunk) => {
+      buffer = Buffer.concat([buffer, chunk]);
+      while (buffer.length >= 4) {
+        const length = parseInt(buffer.toString('ascii', 0, 4), 16);
+        if (buffer.length < 4 + length) return;
+        const request = buffer.toString('utf8', 4, 4 + length);
+        buffer = buffer.subarray(4 + length);
+
+        if (request === 'host:version') {
+          reply(socket, '0029');
+          socket.end();
+        } else if (request === 'host:devices') {
+          reply(socket, serials.map(serial => `${serial}\tdevice\n`).join(''));
+          socket.end();
+        } else if (request === 'host:transport-any' || request.startsWith('host:transport:')) {
+          const serial = request.slice('host:transport:'.length);
+          if (request !== 'host:transport-any' && !serials.includes(serial)) {
+            fail(socket, `device '${serial}' not found`);
+            return;
+          }
+          transport = true;
+          socket.write('OKAY');
+        } else if (transport && (request.startsWith('shell:') || request.startsWith('exec:'))) {
+          socket.removeListener('data', onData);
+          socket.write('OKAY');
+          const command = request.slice(request.indexOf(':') + 1);
+          if (request.startsWith('exec:')) stats.execs++;
+          else stats.shells++;
+          runDevice(socket, command === '' ? null : command);
+          if (buffer.length) socket.emit('data', buffer);
+          return;
+        } else {
+          fail(socket, `unknown request ${request}`);
+          return;
+        }
+      }
+    };
+    socket.on('data', onData);
+    socket.on('error', () => {});
+  });
+
+  return new Promise((resolve) => {
+    server.listen(0, '127.0.0.1', () => {
+      resolve({
+        port: server.address().port,
+        stats,
+        close: () => new Promise((done) => {
+          for (const child of children) child.kill();
+          for (const socket of sockets) socket.destroy();
+          server.close(() => done());
+        }),
+      });
+    });
+  });
+}
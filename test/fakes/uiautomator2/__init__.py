@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Fake uiautomator2 module for running the Python bridge without a phone.
+
+Put test/fakes on PYTHONPATH when spawning uiautomator2_bridge.py and
+`import uiautomator2 as u2` picks this module up instead of the real one.
+
+Environment knobs:
+  FAKE_U2_DEVICES     comma separated serials that connect() accepts (default: fake-0)
+  FAKE_U2_LATENCY_MS  simulated round trip per device call (default: 5)
+  FAKE_U2_HIERARCHY   XML returned by dump_hierarchy (default: test/fixtures/weibo_home.xml)
+  FAKE_U2_SCREENSHOT  image file returned by screenshot (default: the hierarchy drawn as boxes and text)
+  FAKE_U2_SETTLE_MS   how long the UI keeps changing after an input, with a "Loading" node
+                      whose progress differs on every dump (default: 0)
+  FAKE_U2_APPS        extra generated user apps on top of the three built-in ones (default: 0)
+  FAKE_U2_APP_VERSION versionCode every user app reports (default: 1)
+  FAKE_U2_APP_LABELS  0 for app_info() without labels, as on uiautomator2 3.x (default: 1)
+  FAKE_U2_CONNECT_MS  time connect() takes, like the real ATX agent handshake (default: 0)
+  FAKE_U2_LAUNCH_AS   package app_start() leaves in the foreground, like a launcher trampoline
+                      (default: the started package)
+  FAKE_U2_OFFLINE     comma separated device calls (click, swipe, ...) that fail as if adb lost the device
+  FAKE_U2_LIST_ITEMS  show a scrollable list of this many rows ("Item 0", "Item 1", ...)
+                      instead of the hierarchy; vertical swipes scroll it (default: 0)
+  FAKE_U2_TRACE       replay a trace recorded with ANDROID_MCP_RECORD instead, see replay.py
+  FAKE_U2_TRACE_SCALE factor on the recorded latencies, 0 to not wait (default: 1)
+"""
+
+import io
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_DEFAULT_HIERARCHY = os.path.join(_HERE, "..", "..", "fixtures", "weibo_home.xml")
+_SCREEN_IMAGE = None
+_SCREEN_LOCK = threading.Lock()
+
+
+def _device_serials() -> List[str]:
+    return [s.strip() for s in os.environ.get("FAKE_U2_DEVICES", "fake-0").split(",") if s.strip()]
+
+
+def _latency() -> float:
+    return float(os.environ.get("FAKE_U2_LATENCY_MS", "5")) / 1000.0
+
+
+def _user_apps() -> List[str]:
+    extra = int(os.environ.get("FAKE_U2_APPS", "0"))
+    return ["com.sina.weibo", "tv.danmaku.bili", "com.tencent.mm"] + ["com.example.app%03d" % i for i in range(extra)]
+
+
+def _app_version() -> int:
+    return int(os.environ.get("FAKE_U2_APP_VERSION", "1"))
+
+
+def _list_items() -> int:
+    return int(os.environ.get("FAKE_U2_LIST_ITEMS", "0"))
+
+
+# Geometry of the FAKE_U2_LIST_ITEMS list: the list's box on screen and the height of a row
+LIST_BOX = (0, 200, 1080, 1800)
+ROW_HEIGHT = 150
+
+
+def _settle_time() -> float:
+    return float(os.environ.get("FAKE_U2_SETTLE_MS", "0")) / 1000.0
+
+
+class ConnectError(Exception):
+    pass
+
+
+class AdbError(Exception):
+    """Stands in for adbutils.AdbError"""
+
+
+class UiObjectNotFoundError(Exception):
+    pass
+
+
+class FakeSelector:
+    """Subset of UiObject backed by the fake device's hierarchy"""
+
+    def __init__(self, device: "FakeDevice", **kwargs):
+        self.device = device
+        self.selector = kwargs
+
+    def _match(self) -> Optional[Dict[str, Any]]:
+        self.device._call()
+        for node in self.device._nodes():
+            if self._matches(node):
+                return node
+        return None
+
+    def _matches(self, node: Dict[str, Any]) -> bool:
+        for key, value in self.selector.items():
+            if key == "text" and node["text"] != value:
+                return False
+            if key == "textContains" and value not in node["text"]:
+                return False
+            if key == "description" and node["contentDescription"] != value:
+                return False
+            if key == "descriptionContains" and value not in node["contentDescription"]:
+                return False
+            if key == "resourceId" and node["resourceName"] != value:
+                return False
+            if key == "className" and node["className"] != value:
+                return False
+            if key == "clickable" and node["clickable"] != value:
+                return False
+        return True
+
+    @property
+    def exists(self) -> bool:
+        return self._match() is not None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        node = self._match()
+        if node is None:
+            raise UiObjectNotFoundError(self.selector)
+        return dict(node)
+
+    def click(self, timeout: Optional[float] = None) -> None:
+        node = self.info
+        bounds = node["bounds"]
+        self.device.click((bounds["left"] + bounds["right"]) // 2, (bounds["top"] + bounds["bottom"]) // 2)
+
+    def long_click(self, duration: float = 0.5) -> None:
+        self.click()
+
+
+class FakeDevice:
+    def __init__(self, serial: str):
+        self.serial = serial
+        self.settings: Dict[str, Any] = {}
+        self.calls = 0
+        self.actions: List[tuple] = []
+        self.current_package = "com.sina.weibo"
+        self.wlan_ip = "10.0.0.%d" % (abs(hash(serial)) % 250 + 1)
+        self._lock = threading.Lock()
+        self._hierarchy_path = os.environ.get("FAKE_U2_HIERARCHY", _DEFAULT_HIERARCHY)
+        self._hierarchy: Optional[str] = None
+        self.last_touch: Optional[tuple] = None
+        self.busy_until = 0.0
+        self.dumps = 0
+        self.scroll_offset = 0
+
+    # -- helpers -----------------------------------------------------------
+
+    def _call(self, action: Optional[tuple] = None) -> None:
+        time.sleep(_latency())
+        if action is not None and action[0] in os.environ.get("FAKE_U2_OFFLINE", "").split(","):
+            raise AdbError("device offline")
+        with self._lock:
+            self.calls += 1
+            if action is not None:
+                self.actions.append(action)
+                # Inputs start a transition that keeps the UI busy for a while
+                self.busy_until = time.monotonic() + _settle_time()
+
+    def _list_xml(self) -> str:
+        """The rows of the fake list that are inside its box, clipped to it like real dumps"""
+        left, top, right, bottom = LIST_BOX
+        rows = []
+        for i in range(_list_items()):
+            row_top = top + i * ROW_HEIGHT - self.scroll_offset
+            row_bottom = row_top + ROW_HEIGHT
+            if row_bottom <= top or row_top >= bottom:
+                continue
+            rows.append('<node index="%d" text="Item %d" resource-id="com.example.list:id/title" class="android.widget.TextView" '
+                        'package="com.example.list" content-desc="" clickable="true" enabled="true" scrollable="false" '
+                        'bounds="[%d,%d][%d,%d]" />' % (len(rows), i, left, max(row_top, top), right, min(row_bottom, bottom)))
+        return ('<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">'
+                '<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="com.example.list" '
+                'content-desc="" clickable="false" enabled="true" scrollable="false" bounds="[0,0][1080,1920]">'
+                '<node index="0" text="List" resource-id="com.example.list:id/toolbar" class="android.widget.TextView" '
+                'package="com.example.list" content-desc="" clickable="false" enabled="true" scrollable="false" bounds="[0,0][1080,200]" />'
+                '<node index="1" text="" resource-id="com.example.list:id/list" class="androidx.recyclerview.widget.RecyclerView" '
+                'package="com.example.list" content-desc="" clickable="false" enabled="true" scrollable="true" bounds="[%d,%d][%d,%d]">'
+                '%s</node></node></hierarchy>' % (left, top, right, bottom, "".join(rows)))
+
+    def _xml(self) -> str:
+        if _list_items():
+            return self._list_xml()
+        if self._hierarchy is None:
+            with open(self._hierarchy_path, encoding="utf-8") as f:
+                self._hierarchy = f.read()
+        if time.monotonic() < self.busy_until:
+            self.dumps += 1
+            loading = ('<node index="0" text="Loading" resource-id="" class="android.widget.ProgressBar" '
+                       'package="%s" content-desc="%d%%" bounds="[440,860][640,1060]" />' % (self.current_package, self.dumps % 100))
+            return self._hierarchy.replace("</hierarchy>", loading + "</hierarchy>")
+        return self._hierarchy
+
+    def _nodes(self) -> List[Dict[str, Any]]:
+        import re
+        import xml.etree.ElementTree as ET
+
+        nodes = []
+        for el in ET.fromstring(self._xml().encode("utf-8")).iter("node"):
+            match = re.match(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]", el.get("bounds", ""))
+            left, top, right, bottom = (int(v) for v in match.groups()) if match else (0, 0, 0, 0)
+            nodes.append({
+                "text": el.get("text", ""),
+                "contentDescription": el.get("content-desc", ""),
+                "resourceName": el.get("resource-id", ""),
+                "className": el.get("class", ""),
+                "packageName": el.get("package", ""),
+                "bounds": {"left": left, "top": top, "right": right, "bottom": bottom},
+                "clickable": el.get("clickable") == "true",
+                "enabled": el.get("enabled") == "true",
+                "focusable": el.get("focusable") == "true",
+                "focused": el.get("focused") == "true",
+                "scrollable": el.get("scrollable") == "true",
+                "selected": el.get("selected") == "true",
+                "checkable": el.get("checkable") == "true",
+                "checked": el.get("checked") == "true",
+            })
+        return nodes
+
+    # -- uiautomator2.Device surface ---------------------------------------
+
+    def implicitly_wait(self, seconds: float) -> None:
+        self.settings["wait_timeout"] = seconds
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        self._call()
+        return {
+            "displayWidth": 1080,
+            "displayHeight": 1920,
+            "currentPackageName": self.current_package,
+            "productName": "fake",
+            "sdkInt": 33,
+            "screenOn": True,
+        }
+
+    @property
+    def device_info(self) -> Dict[str, Any]:
+        self._call()
+        return {"serial": self.serial, "brand": "Fake", "model": "Fake Phone", "version": "13"}
+
+    def window_size(self):
+        self._call()
+        return 1080, 1920
+
+    def app_current(self) -> Dict[str, Any]:
+        self._call()
+        return {"package": self.current_package, "activity": ".MainActivity"}
+
+    def click(self, x, y) -> None:
+        self._call(("click", x, y))
+        self.last_touch = (x, y)
+
+    def double_click(self, x, y, duration=0.1) -> None:
+        self._call(("double_click", x, y))
+
+    def long_click(self, x, y, duration=0.5) -> None:
+        self._call(("long_click", x, y))
+
+    def send_keys(self, text: str, clear: bool = False) -> None:
+        self._call(("send_keys", text))
+
+    def clear_text(self) -> None:
+        self._call(("clear_text",))
+
+    def swipe(self, fx, fy, tx, ty, duration=0.5) -> None:
+        self._call(("swipe", fx, fy, tx, ty))
+        if _list_items():
+            limit = max(0, _list_items() * ROW_HEIGHT - (LIST_BOX[3] - LIST_BOX[1]))
+            self.scroll_offset = min(max(self.scroll_offset + fy - ty, 0), limit)
+
+    def swipe_ext(self, direction, scale=0.9, box=None) -> None:
+        self._call(("swipe_ext", direction))
+
+    def drag(self, sx, sy, ex, ey, duration=0.5) -> None:
+        self._call(("drag", sx, sy, ex, ey))
+
+    def press(self, key) -> None:
+        self._call(("press", key))
+
+    def app_start(self, package_name, activity=None, stop=False, use_monkey=False) -> None:
+        self._call(("app_start", package_name))
+        self.current_package = os.environ.get("FAKE_U2_LAUNCH_AS") or package_name
+
+    def app_stop(self, package_name) -> None:
+        self._call(("app_stop", package_name))
+
+    def app_list_user(self) -> List[str]:
+        self._call()
+        return _user_apps()
+
+    def app_info(self, package_name: str) -> Dict[str, Any]:
+        self._call()
+        info = {"versionName": "1.0", "versionCode": _app_version()}
+        if os.environ.get("FAKE_U2_APP_LABELS", "1") != "0":
+            info["label"] = package_name.split(".")[-1].title()
+        return info
+
+    def screen_on(self) -> None:
+        self._call(("screen_on",))
+
+    def screen_off(self) -> None:
+        self._call(("screen_off",))
+
+    def unlock(self) -> None:
+        self._call(("unlock",))
+
+    def shell(self, cmd, timeout: Optional[float] = None):
+        if isinstance(cmd, str) and cmd.startswith("pm list packages -3 --show-versioncode"):
+            self._call()
+            output = "".join("package:%s versionCode:%d\n" % (package, _app_version()) for package in _user_apps())
+            return (output, 0)
+        self._call(("shell", cmd))
+        return ("", 0)
+
+    def dump_hierarchy(self, compressed: bool = False, pretty: bool = False, max_depth: Optional[int] = None) -> str:
+        self._call()
+        return self._xml()
+
+    def _screen_image(self):
+        from PIL import Image, ImageDraw
+
+        global _SCREEN_IMAGE
+        with _SCREEN_LOCK:
+            if _SCREEN_IMAGE is None:
+                path = os.environ.get("FAKE_U2_SCREENSHOT")
+                if path:
+                    _SCREEN_IMAGE = Image.open(path).convert("RGB")
+                else:
+                    # Draw the hierarchy so the image compresses like a real app screen
+                    image = Image.new("RGB", (1080, 1920), (246, 246, 246))
+                    draw = ImageDraw.Draw(image)
+                    for i, node in enumerate(self._nodes()):
+                        left, top, right, bottom = node["bounds"]["left"], node["bounds"]["top"], node["bounds"]["right"], node["bounds"]["bottom"]
+                        if right <= left or bottom <= top:
+                            continue
+                        shade = (i * 37) % 200
+                        draw.rectangle([left, top, right - 1, bottom - 1], outline=(shade, 120, 255 - shade))
+                        label = node["text"] or node["contentDescription"]
+                        if label:
+                            draw.text((left + 8, top + 8), label, fill=(20, 20, 20))
+                    _SCREEN_IMAGE = image
+            image = _SCREEN_IMAGE.copy()
+        if self.last_touch:
+            # Touch feedback, so screenshots change where the last click landed
+            x, y = self.last_touch
+            ImageDraw.Draw(image).ellipse([x - 40, y - 40, x + 40, y + 40], fill=(90, 90, 90))
+        return image
+
+    def screenshot(self, filename: Optional[str] = None, format: str = "pillow"):
+        self._call()
+        image = self._screen_image()
+        if filename:
+            image.save(filename)
+            return filename
+        if format == "raw":
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=80)
+            return buffer.getvalue()
+        return image
+
+    def xpath(self, xpath: str):
+        raise NotImplementedError("xpath is not supported by the fake device")
+
+    def __call__(self, **kwargs) -> FakeSelector:
+        return FakeSelector(self, **kwargs)
+
+
+def connect(serial: Optional[str] = None) -> FakeDevice:
+    time.sleep(float(os.environ.get("FAKE_U2_CONNECT_MS", "0")) / 1000.0)
+    serials = _device_serials()
+    if serial is None:
+        if not serials:
+            raise ConnectError("no fake devices configured")
+        serial = serials[0]
+    if serial not in serials:
+        raise ConnectError(f"fake device {serial} not found")
+    trace = os.environ.get("FAKE_U2_TRACE")
+    if trace:
+        from .replay import ReplayDevice
+        return ReplayDevice(serial, trace)
+    return FakeDevice(serial)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Replay of a trace recorded with ANDROID_MCP_RECORD (src/python/trace_recorder.py).
+
+With FAKE_U2_TRACE set, connect() returns a ReplayDevice: dumps, screenshots
+and queries answer with what the recorded device returned, and every call
+takes as long as it took when recorded (times FAKE_U2_TRACE_SCALE, 0 to not
+wait at all). Inputs move the device to the next recorded state, so a dump
+after the third tap returns the screen recorded after the third tap.
+Within one state, repeated dumps walk through the dumps recorded there (a
+loading screen settling), then keep returning the last one.
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import FakeDevice
+
+_TRACES: Dict[str, "Trace"] = {}
+_TRACES_LOCK = threading.Lock()
+
+
+def _scale() -> float:
+    return float(os.environ.get("FAKE_U2_TRACE_SCALE", "1"))
+
+
+def _read_lines(path: str) -> List[str]:
+    """Lines of a trace, tolerating a gzip stream cut short by a killed recorder"""
+    opener = gzip.open if path.endswith(".gz") else open
+    lines = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                lines.append(line)
+        except EOFError:
+            pass
+    if lines and not lines[-1].endswith("\n"):
+        lines.pop()  # Partly written last line
+    return lines
+
+
+class Trace:
+    def __init__(self, path: str):
+        self.blobs: Dict[str, Any] = {}
+        self.calls: Dict[str, List[Dict[str, Any]]] = {}
+        self.commands: List[Dict[str, Any]] = []
+        self._images: Dict[str, Any] = {}
+        for line in _read_lines(path):
+            entry = json.loads(line)
+            kind = entry.get("type")
+            if kind == "blob":
+                data = entry["data"]
+                self.blobs[entry["id"]] = base64.b64decode(data) if entry.get("encoding") == "base64" else data
+            elif kind == "call":
+                self.calls.setdefault(entry["name"], []).append(entry)
+            elif kind == "command":
+                self.commands.append(entry)
+        every = [entry["ms"] for entries in self.calls.values() for entry in entries]
+        self.typical_ms = statistics.median(every) if every else 0.0
+        self._latency = {name: statistics.median(entry["ms"] for entry in entries) for name, entries in self.calls.items()}
+
+    def latency(self, name: str) -> float:
+        """Median recorded ms of a call; typical_ms if it was never recorded
+
+        An input recorded on a selector (selector.click) includes finding the
+        element, which the fake's selectors already waited for separately.
+        """
+        if name in self._latency:
+            return self._latency[name]
+        for key in (f"selector.{name}", f"xpath.{name}"):
+            if key in self._latency:
+                return max(0.0, self._latency[key] - self.typical_ms)
+        return self.typical_ms
+
+    def pick(self, name: str, state: int, index: int = 0, args: Any = None) -> Optional[Dict[str, Any]]:
+        """The index-th call recorded in the latest state at or before state, preferring equal args"""
+        entries = self.calls.get(name)
+        if not entries:
+            return None
+        if args is not None:
+            entries = [entry for entry in entries if self.matches(entry, args)] or entries
+        earlier = [entry["state"] for entry in entries if entry["state"] <= state]
+        recorded = max(earlier) if earlier else min(entry["state"] for entry in entries)
+        group = [entry for entry in entries if entry["state"] == recorded]
+        return group[min(index, len(group) - 1)]
+
+    @staticmethod
+    def matches(entry: Dict[str, Any], args: Any) -> bool:
+        """Whether a call was recorded with args; lists compare as a prefix, so keyword arguments may differ"""
+        recorded = entry.get("args")
+        if isinstance(args, list) and isinstance(recorded, list):
+            return recorded[:len(args)] == args
+        return recorded == args
+
+    def value(self, entry: Dict[str, Any]) -> Any:
+        value = entry.get("value")
+        if isinstance(value, dict) and set(value) == {"$blob"}:
+            return self.blobs[value["$blob"]]
+        return value
+
+    def image(self, blob_id: str):
+        from PIL import Image
+
+        with _TRACES_LOCK:
+            if blob_id not in self._images:
+                self._images[blob_id] = Image.open(io.BytesIO(self.blobs[blob_id])).convert("RGB")
+            return self._images[blob_id]
+
+
+def load(path: str) -> Trace:
+    with _TRACES_LOCK:
+        if path not in _TRACES:
+            _TRACES[path] = Trace(path)
+        return _TRACES[path]
+
+
+class ReplayDevice(FakeDevice):
+    def __init__(self, serial: str, path: str):
+        super().__init__(serial)
+        self.trace = load(path)
+        self.state = 0
+        self._cursors: Dict[tuple, int] = {}
+
+    def _wait(self, ms: float) -> None:
+        if ms > 0:
+            time.sleep(ms * _scale() / 1000.0)
+
+    def _call(self, action: Optional[tuple] = None) -> None:
+        self._wait(self.trace.latency(action[0]) if action else self.trace.typical_ms)
+        with self._lock:
+            self.calls += 1
+            if action is not None:
+                self.actions.append(action)
+                self.state += 1
+
+    def _next(self, name: str, args: Any = None) -> Optional[Dict[str, Any]]:
+        """The next recorded call for the current state; advances that state's cursor"""
+        with self._lock:
+            key = (name, self.state)
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        entry = self.trace.pick(name, self.state, index, args)
+        if entry is not None:
+            self._wait(entry["ms"])
+        return entry
+
+    def _recorded(self, name: str, args: Any = None) -> Optional[Dict[str, Any]]:
+        """The recorded answer to a query, if there is one for these args"""
+        entry = self.trace.pick(name, self.state, 0, args)
+        if entry is None or (args is not None and not self.trace.matches(entry, args)):
+            return None
+        self._wait(entry["ms"])
+        return entry
+
+    def _xml(self) -> str:
+        # What the last dump in this state returned, for selector lookups between dumps
+        index = max(0, self._cursors.get(("dump_hierarchy", self.state), 1) - 1)
+        entry = self.trace.pick("dump_hierarchy", self.state, index)
+        return self.trace.blobs[entry["blob"]] if entry else super()._xml()
+
+    def dump_hierarchy(self, compressed: bool = False, pretty: bool = False, max_depth: Optional[int] = None) -> str:
+        entry = self._next("dump_hierarchy", {"compressed": compressed})
+        if entry is None:
+            return super().dump_hierarchy(compressed, pretty, max_depth)
+        return self.trace.blobs[entry["blob"]]
+
+    def screenshot(self, filename: Optional[str] = None, format: str = "pillow"):
+        entry = self._next("screenshot")
+        if entry is None:
+            return super().screenshot(filename, format)
+        data = self.trace.blobs[entry["blob"]]
+        if format == "raw" and not filename and data[:2] == b"\xff\xd8":
+            return data
+        image = self.trace.image(entry["blob"]).copy()
+        if filename:
+            image.save(filename)
+            return filename
+        if format == "raw":
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=80)
+            return buffer.getvalue()
+        return image
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        entry = self._recorded("info")
+        return self.trace.value(entry) if entry else FakeDevice.info.fget(self)
+
+    @property
+    def device_info(self) -> Dict[str, Any]:
+        entry = self._recorded("device_info")
+        return self.trace.value(entry) if entry else FakeDevice.device_info.fget(self)
+
+    def window_size(self):
+        entry = self._recorded("window_size")
+        return tuple(self.trace.value(entry)) if entry else super().window_size()
+
+    def app_current(self) -> Dict[str, Any]:
+        entry = self._recorded("app_current")
+        return self.trace.value(entry) if entry else super().app_current()
+
+    def app_list_user(self) -> List[str]:
+        entry = self._recorded("app_list_user")
+        return self.trace.value(entry) if entry else super().app_list_user()
+
+    def app_info(self, package_name: str) -> Dict[str, Any]:
+        entry = self._recorded("app_info", [package_name])
+        return self.trace.value(entry) if entry else super().app_info(package_name)
+
+    def shell(self, cmd, timeout: Optional[float] = None):
+        entry = self._recorded("shell", [cmd])
+        return tuple(self.trace.value(entry)) if entry else super().shell(cmd, timeout)
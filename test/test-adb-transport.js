@@ -0,0 +1,66 @@
+#!/usr/bin/env node
+
+// Checks the adb-server transport against a local fake adb server: host
+// queries, one persistent shell multiplexing many commands, streamed
+// hierarchy dumps, binary exec output and recovery after a lost session.
+//
+// Usage: npm run build && node test/test-adb-transport.js
+
+import { startFakeAdbServer } from './fakes/adb-server.js';
+import { AdbTransport, adbDevices, adbHostQuery, shellQuote } from '../dist/android/adb-transport.js';
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function rejects(promise, pattern) {
+  try {
+    await promise;
+    return false;
+  } catch (error) {
+    return pattern.test(error.message);
+  }
+}
+
+async function testAdbTransport() {
+  console.log('🧪 Testing the adb transport against a fake adb server...');
+  const server = await startFakeAdbServer();
+  const options = { port: server.port };
+  const adb = new AdbTransport('fake-0', options);
+
+  try {
+    expect(await adbHostQuery('host:version', options) === '0029', 'host:version is answered over the smart socket');
+    expect(JSON.stringify(await adbDevices(options)) === '["fake-0"]', 'host:devices lists the fake device');
+    expect(await rejects(new AdbTransport('missing', options).shell('true'), /device 'missing' not found/), 'FAIL replies surface the server message');
+
+    expect(await adb.shell('echo hello') === 'hello\n', 'shell output comes back unchanged');
+    expect(await adb.shell('printf abc') === 'abc', 'output without a trailing newline is kept exact');
+    expect(await rejects(adb.shell('echo oops; exit 3'), /exited with 3: oops/), 'non-zero exit status becomes an error');
+    expect(await adb.shell(`echo ${shellQuote("it's a \"test\" $HOME")}`) === 'it\'s a "test" $HOME\n', 'shellQuote protects quotes and variables');
+
+    const outputs = await Promise.all(Array.from({ length: 20 }, (_, i) => adb.shell(`sleep 0.0${i % 3}; echo ${i}`)));
+    expect(outputs.every((output, i) => output === `${i}\n`), 'twenty pipelined commands each get their own output');
+    expect(server.stats.shells === 1, `all commands share one shell session (${server.stats.connections} connections)`);
+
+    const tree = await adb.dumpHierarchy();
+    expect(tree.nodes.length === 131 && tree.find({ text: '热门直播' }) !== null, 'uiautomator dump /dev/tty streams into the parser');
+
+    const png = await adb.execOut('screencap -p');
+    const expected = Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a, 0x00, 0x0d, 0x0a, 0x01, 0x02]);
+    expect(png.equals(expected), 'exec: output is binary safe');
+
+    expect(await rejects(adb.shell('sleep 5', 200), /timed out/), 'a command past its timeout is rejected');
+    expect(await adb.shell('echo again') === 'again\n' && server.stats.shells === 2, 'the next command opens a fresh session');
+
+    console.log('🎉 All adb transport tests passed!');
+  } finally {
+    adb.close();
+    await server.close();
+  }
+}
+
+testAdbTransport().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,93 @@
+#!/usr/bin/env node
+
+// Checks the bridge's persistent app label cache against the fake device:
+// a cold listing looks labels up concurrently, a warm one from a new worker
+// makes no lookups, a versionCode change refreshes the labels, and labels
+// that could not be found are not cached.
+//
+// Usage: npm run build && node test/test-app-labels.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { mkdtempSync, rmSync } from 'fs';
+import { tmpdir } from 'os';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { AppListTool } from '../dist/mcp/tools/categories/app.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const LATENCY_MS = 30;
+const EXTRA_APPS = 60;
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function listApps(cacheDir, version, args, env = {}) {
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: {
+      env: {
+        PYTHONPATH: join(__dirname, 'fakes'),
+        ANDROID_MCP_CACHE_DIR: cacheDir,
+        FAKE_U2_LATENCY_MS: String(LATENCY_MS),
+        FAKE_U2_APPS: String(EXTRA_APPS),
+        FAKE_U2_APP_VERSION: String(version),
+        ...env,
+      },
+    },
+  });
+  try {
+    const automation = await pool.acquire('fake-0');
+    await automation.getDisplaySize(); // Start the worker before timing
+    const start = Date.now();
+    const page = await automation.getInstalledApps(args.offset, args.limit);
+    const elapsed = Date.now() - start;
+    let next;
+    if (args.next) {
+      // Give the background refresh time to finish, then read the next page
+      await new Promise(resolve => setTimeout(resolve, LATENCY_MS * EXTRA_APPS / 4));
+      next = JSON.parse((await new AppListTool(pool).execute({ offset: page.nextOffset })).content[0].text);
+    }
+    return { page, elapsed, next };
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function testAppLabels() {
+  console.log(`🧪 Testing the app label cache with ${EXTRA_APPS + 3} apps at ${LATENCY_MS}ms per device call...`);
+  const cacheDir = mkdtempSync(join(tmpdir(), 'android-mcp-labels-'));
+  const serialMs = (EXTRA_APPS + 3) * LATENCY_MS;
+
+  try {
+    const cold = await listApps(cacheDir, 1, {});
+    expect(cold.page.total === EXTRA_APPS + 3 && cold.page.apps.length === EXTRA_APPS + 3, 'cold listing returns every app');
+    expect(cold.page.apps[0].appName === 'Weibo', 'labels come from app_info');
+    expect(cold.elapsed < serialMs / 3, `cold lookups run concurrently (${cold.elapsed}ms vs ${serialMs}ms one by one)`);
+
+    const warm = await listApps(cacheDir, 1, {});
+    expect(warm.elapsed < LATENCY_MS * 4, `a new worker answers from the on-disk cache (${warm.elapsed}ms)`);
+
+    const updated = await listApps(cacheDir, 2, { offset: 0, limit: 10, next: true });
+    expect(updated.page.apps.length === 10 && updated.page.nextOffset === 10, 'first page stops at the limit and points to the next one');
+    expect(updated.elapsed < serialMs / 3, `changed versionCodes only look up the first page before returning (${updated.elapsed}ms)`);
+    expect(updated.next.offset === 10 && updated.next.apps.length === 50 && updated.next.nextOffset === 60, 'android_get_applist pages with offset and a default limit of 50');
+
+    const unlabelled = await listApps(cacheDir, 3, {}, { FAKE_U2_APP_LABELS: '0' });
+    expect(unlabelled.page.apps[0].appName === 'com.sina.weibo', 'without a label source the package name is shown');
+    const relabelled = await listApps(cacheDir, 3, {});
+    expect(relabelled.page.apps[0].appName === 'Weibo', 'a missing label is not cached, so the next worker looks it up again');
+
+    console.log('🎉 All app label tests passed!');
+  } finally {
+    rmSync(cacheDir, { recursive: true, force: true });
+  }
+}
+
+testAppLabels().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
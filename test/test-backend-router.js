@@ -0,0 +1,209 @@
+#!/usr/bin/env node
+
+// Checks the backend router: circuits open on unreachable backends and on
+// transport error streaks but not on action errors, open backends are skipped
+// without a call, background probes close them again, and calls go to the
+// backend with the lowest latency. Ends with AndroidAutomation routing around
+// a Python bridge that cannot start, staying on one that reports action errors
+// and leaving it when it reports connection errors.
+//
+// Usage: npm run build && node test/test-backend-router.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
+import { BackendActionError, BackendRouter } from '../dist/android/backend-router.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// A backend whose speed and health the test controls
+function fakeBackend(name, delayMs) {
+  const backend = {
+    calls: 0,
+    error: null, // Transport failure
+    actionError: null, // The backend answers, but the action fails
+    call: async () => {
+      backend.calls++;
+      await sleep(delayMs);
+      if (backend.error) throw new Error(backend.error);
+      if (backend.actionError) throw new BackendActionError(backend.actionError);
+      return name;
+    },
+  };
+  return backend;
+}
+
+async function testRouting() {
+  console.log('🧪 Testing backend routing...');
+  const python = fakeBackend('python', 30);
+  const adb = fakeBackend('adb', 1);
+  let probeError = 'ECONNREFUSED';
+  let probes = 0;
+  const router = new BackendRouter({
+    python: async () => {
+      probes++;
+      if (probeError) throw new Error(probeError);
+    },
+  }, { failureThreshold: 2, openMs: 50 });
+  const tap = () => router.run('tap', { python: python.call, adb: adb.call });
+
+  expect(await tap() === 'python' && adb.calls === 0, 'unmeasured backends are tried in the default order');
+
+  python.error = 'connect ECONNREFUSED 127.0.0.1:9008';
+  expect(await tap() === 'adb', 'an unreachable backend falls through to the next one');
+  let stats = router.stats();
+  expect(stats.backends.python.state === 'open', 'one connection failure opens the circuit');
+
+  const before = python.calls;
+  expect(await tap() === 'adb' && python.calls === before, 'an open backend is skipped without a call');
+  expect(JSON.stringify(router.stats().recent.at(-1).skipped) === '["python"]', 'the decision records the skipped backend');
+
+  await sleep(60);
+  await tap();
+  await sleep(5);
+  stats = router.stats();
+  expect(probes === 1 && stats.backends.python.state === 'open', 'a failed background probe keeps the circuit open');
+  expect(stats.backends.python.retryAt - stats.backends.python.openedAt === 100, 'the open period doubles after a failed probe');
+
+  probeError = null;
+  python.error = null;
+  await sleep(110);
+  expect(await tap() === 'adb', 'the call that triggers a probe does not wait for it');
+  await sleep(5);
+  expect(router.stats().backends.python.state === 'closed', 'a successful probe closes the circuit');
+
+  // Both backends are measured now: adb answered in ~1ms, python in ~30ms
+  const calls = python.calls;
+  expect(await tap() === 'adb' && python.calls === calls, 'the backend with the lower latency is preferred');
+  stats = router.stats();
+  expect(stats.actions.tap.adb.ewmaMs < stats.actions.tap.python.ewmaMs, `per-action latencies are exposed (${JSON.stringify(stats.actions.tap)})`);
+  expect(await router.run('press_key', { python: python.call, adb: adb.call }) === 'python', 'latencies are kept per action');
+
+  console.log('🎉 Routing tests passed!');
+}
+
+async function testErrorStreaks() {
+  console.log('🧪 Testing circuits on action and transport errors...');
+  // adb is the slower one, so python keeps being tried first once both are measured
+  const python = fakeBackend('python', 1);
+  const adb = fakeBackend('adb', 10);
+  const router = new BackendRouter({}, { failureThreshold: 2, openMs: 30 });
+  const find = () => router.run('find', { python: python.call, adb: adb.call });
+
+  python.actionError = 'UiObjectNotFoundException: no such element';
+  for (let i = 0; i < 3; i++) {
+    const error = await find().catch(e => e);
+    if (!(error instanceof BackendActionError)) throw error;
+  }
+  let stats = router.stats();
+  expect(adb.calls === 0, 'an action error goes back to the caller without trying the next backend');
+  expect(stats.backends.python.state === 'closed' && stats.backends.python.consecutiveFailures === 0,
+    'action errors never open the circuit');
+  expect(stats.actions.find.python.calls === 3 && stats.actions.find.python.failures === 3 && stats.recent.at(-1).backend === 'python',
+    'action errors are recorded as answered calls that failed');
+
+  python.actionError = null;
+  python.error = 'device offline';
+  expect(await find() === 'adb' && router.stats().backends.python.state === 'closed', 'a single transport error falls through and leaves the circuit closed');
+  await find();
+  expect(router.stats().backends.python.state === 'open', 'a transport error streak opens the circuit');
+
+  adb.error = 'connect ECONNREFUSED 127.0.0.1:5037';
+  let error = await find().catch(e => e);
+  expect(error.message === adb.error, 'the last backend error is rethrown');
+  error = await find().catch(e => e);
+  expect(/No available backend for find \(circuit open: python, adb\)/.test(error.message), 'with every circuit open the call fails fast');
+  expect(router.stats().recent.at(-1).backend === null, 'a call nobody answered is recorded');
+
+  await sleep(40);
+  python.error = null;
+  adb.error = null;
+  const backend = await find();
+  expect(router.stats().backends[backend].state === 'closed', 'without a probe the next call after the open period is the trial');
+
+  console.log('🎉 Error streak tests passed!');
+}
+
+async function testAutomation() {
+  console.log('🧪 Testing AndroidAutomation routing around a dead Python bridge...');
+  const server = await startFakeAdbServer();
+  process.env.ANDROID_ADB_SERVER_PORT = String(server.port);
+  const { AndroidAutomation } = await import('../dist/android/automation.js');
+  const { UIAutomator2Bridge } = await import('../dist/android/uiautomator2-bridge.js');
+  const automation = new AndroidAutomation('fake-0', new UIAutomator2Bridge('fake-0', { pythonPath: '/nonexistent/python' }));
+
+  try {
+    await automation.tap(10, 20);
+    let stats = automation.getRoutingStats();
+    expect(stats.recent.at(-1).backend === 'adb', `the tap is served by adb after ${JSON.stringify(stats.recent.at(-1).tried)}`);
+    expect(stats.backends.python.state === 'open', 'the Python backend is marked open');
+
+    const start = Date.now();
+    for (let i = 0; i < 5; i++) await automation.tap(10, 20);
+    const decision = automation.getRoutingStats().recent.at(-1);
+    expect(decision.backend === 'adb' && decision.tried.length === 1, `later taps go straight to adb (${Date.now() - start}ms for 5)`);
+
+    const screen = await automation.getScreenInfo();
+    expect(screen.elements.length > 0, 'the screen dump is routed to adb as well');
+    stats = automation.getRoutingStats();
+    expect(stats.actions.get_screen_dump.adb.calls === 1, 'each action has its own latency entry');
+    console.log('🎉 AndroidAutomation routing tests passed!');
+  } finally {
+    await automation.close();
+    await server.close();
+  }
+}
+
+async function testBridgeErrors() {
+  console.log('🧪 Testing AndroidAutomation on a Python bridge that reports action and connection errors...');
+  const server = await startFakeAdbServer();
+  process.env.ANDROID_ADB_SERVER_PORT = String(server.port);
+  const { AndroidAutomation } = await import('../dist/android/automation.js');
+  const { UIAutomator2Bridge } = await import('../dist/android/uiautomator2-bridge.js');
+  // Clicks fail inside the worker the way they do when adb loses the device
+  const bridge = new UIAutomator2Bridge('fake-0', { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_OFFLINE: 'click' } });
+  const automation = new AndroidAutomation('fake-0', bridge);
+
+  try {
+    await automation.initializeDevice();
+    const errors = [];
+    for (let i = 0; i < 4; i++) {
+      errors.push(await automation.findImage({ template: '/nonexistent/template.png' }).catch(e => e.message));
+    }
+    expect(errors.every(message => message && !/No available backend/.test(message)), `every call gets the bridge's own error (${errors[3]})`);
+    expect(automation.getRoutingStats().backends.python.state === 'closed', 'the Python circuit stays closed');
+
+    await automation.doubleTap(10, 20);
+    let decision = automation.getRoutingStats().recent.at(-1);
+    expect(decision.backend === 'python' && decision.tried.length === 1, 'the next input still goes to the bridge');
+
+    await automation.tap(10, 20);
+    decision = automation.getRoutingStats().recent.at(-1);
+    expect(decision.backend === 'adb' && decision.tried[0] === 'python', `a connection error the bridge reports falls through to adb (${JSON.stringify(decision.tried)})`);
+    expect(/device offline/.test(automation.getRoutingStats().backends.python.lastError), 'and counts against the Python circuit');
+    console.log('🎉 Bridge error tests passed!');
+  } finally {
+    await bridge.close();
+    await server.close();
+  }
+}
+
+async function main() {
+  await testRouting();
+  await testErrorStreaks();
+  await testAutomation();
+  await testBridgeErrors();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
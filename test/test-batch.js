@@ -0,0 +1,76 @@
+#!/usr/bin/env node
+
+// Checks android_batch against the fake device: steps run in order in one
+// bridge command, conditional steps are skipped, and the batch stops at the
+// first failure.
+//
+// Usage: npm run build && node test/test-batch.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { BatchTool } from '../dist/mcp/tools/categories/interaction.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testBatch() {
+  console.log('🧪 Testing android_batch...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes') } },
+  });
+  const tool = new BatchTool(pool);
+  const run = async (args) => JSON.parse((await tool.execute(args)).content[0].text);
+
+  try {
+    await pool.acquire('fake-0');
+
+    const search = await run({
+      steps: [
+        { action: 'element_click', args: { text: '热门直播' } },
+        { action: 'input_text', args: { text: 'hello', clear: true } },
+        { action: 'press_key', args: { key: 'enter' } },
+      ],
+    });
+    expect(search.completed && search.steps.length === 3 && search.steps.every(step => step.status === 'ok'), 'click, type and enter run as one batch');
+    expect(search.steps.every(step => typeof step.ms === 'number') && search.totalMs >= 0, `every step reports its time (total ${search.totalMs}ms)`);
+
+    const conditional = await run({
+      steps: [
+        { action: 'element_click', args: { text: 'Allow' }, when: { text: 'Allow' } },
+        { action: 'press_key', args: { key: 'back' }, unless: { text: '热门直播' } },
+        { action: 'find_element', args: { text: '热门直播' } },
+      ],
+    });
+    expect(conditional.completed && conditional.steps[0].status === 'skipped' && conditional.steps[1].status === 'skipped', 'steps whose condition does not hold are skipped');
+    expect(conditional.steps[2].element && conditional.steps[2].element.text === '热门直播', 'find_element step returns the element');
+
+    const failing = await run({
+      steps: [
+        { action: 'find_element', args: { resourceId: 'does.not:id/exist' }, optional: true },
+        { action: 'wait_for_element', args: { text: 'never there', timeout: 0.2 } },
+        { action: 'press_key', args: { key: 'home' } },
+      ],
+    });
+    expect(failing.steps[0].status === 'failed' && failing.steps[1].status === 'failed', 'missing element and unmet wait count as failures');
+    expect(!failing.completed && failing.failedStep === 1 && failing.steps.length === 2, 'batch stops at the first non-optional failure');
+
+    const excluded = await run({ steps: [{ action: 'take_screenshot' }] });
+    expect(!excluded.completed && /not allowed/.test(excluded.steps[0].error), 'screenshots are not allowed inside a batch');
+
+    console.log('🎉 All batch tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+testBatch().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,154 @@
+#!/usr/bin/env node
+
+// Checks android_get_components filtering and the compact columnar format:
+// invisible, offscreen and occluded elements are dropped, pages chain through
+// nextOffset, compact output decodes back to the JSON elements, and the
+// debug/ snapshot files are only written when asked for.
+//
+// Usage: npm run build && node test/test-compact-components.js
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { ToolFactory } from '../dist/mcp/tools/factory.js';
+import { AndroidCommandHandler, CommandProcessor } from '../dist/mcp/tools/command.js';
+import { decodeColumnar, encodeColumnar, selectComponents } from '../dist/android/screen-compact.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+function node(attrs, children = '') {
+  const defaults = { text: '', 'resource-id': '', class: 'android.view.View', package: 'com.example.app', 'content-desc': '', clickable: 'false', enabled: 'true', 'visible-to-user': 'true' };
+  const attrText = Object.entries({ ...defaults, ...attrs }).map(([k, v]) => `${k}="${v}"`).join(' ');
+  return `<node ${attrText}>${children}</node>`;
+}
+
+// A list with a row scrolled below the 1080x1920 display, a hidden and an empty view, and a dialog over the list
+const SCREEN = `<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation="0">${
+  node({ class: 'android.widget.FrameLayout', bounds: '[0,0][1080,1920]' },
+    node({ 'resource-id': 'com.example.app:id/list', class: 'androidx.recyclerview.widget.RecyclerView', scrollable: 'true', bounds: '[0,0][1080,1920]' },
+      node({ 'resource-id': 'com.example.app:id/row', class: 'android.widget.TextView', text: 'Covered row', clickable: 'true', bounds: '[0,300][1080,500]' }) +
+      node({ 'resource-id': 'com.example.app:id/row', class: 'android.widget.TextView', text: 'Visible row', clickable: 'true', bounds: '[0,1500][1080,1700]' }) +
+      node({ 'resource-id': 'com.example.app:id/row', class: 'android.widget.TextView', text: 'Offscreen row', clickable: 'true', bounds: '[0,2000][1080,2200]' })) +
+    node({ 'resource-id': 'com.example.app:id/hidden', class: 'android.widget.TextView', text: 'Hidden', 'visible-to-user': 'false', bounds: '[0,0][100,100]' }) +
+    node({ 'resource-id': 'com.example.app:id/empty', class: 'android.widget.ImageView', bounds: '[50,50][50,50]' }) +
+    node({ 'resource-id': 'com.example.app:id/dialog', class: 'android.widget.LinearLayout', clickable: 'true', bounds: '[0,200][1080,900]' },
+      node({ 'resource-id': 'android:id/button1', class: 'android.widget.Button', text: 'OK', clickable: 'true', bounds: '[600,750][950,880]' })))
+}</hierarchy>`;
+
+async function withServer(hierarchy, fn) {
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), ...(hierarchy ? { FAKE_U2_HIERARCHY: hierarchy } : {}) } },
+  });
+  const registry = new ToolFactory(pool).getRegistry();
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry);
+  const components = async args => JSON.parse((await processor.process({ name: 'android_get_components', args })).content[0].text);
+  try {
+    await fn(components);
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function testFiltering(dir) {
+  console.log('🧪 Testing viewport filtering and paging...');
+  const file = join(dir, 'screen.xml');
+  fs.writeFileSync(file, SCREEN);
+
+  await withServer(file, async components => {
+    const all = await components({});
+    expect(all.total === undefined && all.elements.some(e => e.text === 'Offscreen row'), 'plain JSON output is unchanged');
+
+    const visible = await components({ visibleOnly: true });
+    const texts = visible.elements.map(e => e.text).filter(Boolean);
+    expect(texts.includes('Visible row') && texts.includes('OK'), `visible elements stay (${texts.join(', ')})`);
+    expect(!texts.includes('Offscreen row') && visible.dropped.offscreen === 1, 'elements below the display are dropped');
+    expect(!texts.includes('Hidden') && visible.dropped.invisible === 2, 'invisible and zero-area elements are dropped');
+    expect(!texts.includes('Covered row') && visible.dropped.occluded === 1, 'an element under the dialog is dropped as occluded');
+    expect(visible.elements.some(e => e.resourceId === 'com.example.app:id/list'), 'containers are not occluded by their own children');
+
+    const interactive = await components({ format: 'compact', interactiveOnly: true });
+    const decoded = decodeColumnar(interactive);
+    expect(decoded.every(e => e.clickable || e.resourceId.endsWith(':id/list')), `interactiveOnly keeps clickable and scrollable elements (${decoded.length})`);
+
+    const seen = [];
+    let page = { nextOffset: 0 };
+    let pages = 0;
+    while (page.nextOffset !== undefined) {
+      page = await components({ format: 'compact', maxElements: 2, offset: page.nextOffset });
+      seen.push(...decodeColumnar(page));
+      pages++;
+    }
+    expect(seen.length === page.total && pages === Math.ceil(page.total / 2), `${pages} pages of 2 cover all ${page.total} elements`);
+  });
+}
+
+async function testCompact(dir) {
+  console.log('🧪 Testing the compact format on the Weibo home screen...');
+  await withServer(null, async components => {
+    const json = await components({});
+    const compact = await components({ format: 'compact', visibleOnly: false });
+    expect(JSON.stringify(decodeColumnar(compact)) === JSON.stringify(json.elements), `compact output decodes to the same ${json.elements.length} elements`);
+    expect(compact.strings.length < json.elements.length, `${compact.strings.length} distinct class names and ids in the string table`);
+
+    const jsonBytes = Buffer.byteLength(JSON.stringify(json, null, 2));
+    const compactBytes = Buffer.byteLength(JSON.stringify(compact));
+    const visible = await components({ format: 'compact' });
+    const visibleBytes = Buffer.byteLength(JSON.stringify(visible));
+    expect(compactBytes * 2 < jsonBytes, `compact output is ${(jsonBytes / compactBytes).toFixed(1)}x smaller (${jsonBytes} → ${compactBytes} bytes)`);
+    expect(visibleBytes <= compactBytes, `visible elements only: ${visible.total} of ${json.elements.length}, ${visibleBytes} bytes`);
+
+    const cwd = process.cwd();
+    process.chdir(dir);
+    try {
+      await components({});
+      expect(!fs.existsSync(join(dir, 'debug')), 'no debug snapshots are written by default');
+      process.env.ANDROID_MCP_DEBUG_DUMPS = '1';
+      await components({});
+      await new Promise(resolve => setTimeout(resolve, 200));
+      expect(fs.existsSync(join(dir, 'debug', 'debug_components_screenInfo.json')), 'ANDROID_MCP_DEBUG_DUMPS=1 writes them');
+    } finally {
+      delete process.env.ANDROID_MCP_DEBUG_DUMPS;
+      process.chdir(cwd);
+    }
+  });
+}
+
+function testIdRoundTrip() {
+  console.log('🧪 Testing resource ids through the compact format...');
+  const element = resourceId => ({ description: '', resourceId, className: 'android.view.View', bounds: [0, 0, 10, 10] });
+  const screenInfo = {
+    width: 1080, height: 1920, currentApp: 'com.example.app',
+    elements: [element('com.example.app:id/ok'), element('login_button'), element('com.other.app:id/ok'), element(''), element('ok')],
+  };
+  const compact = encodeColumnar(screenInfo, selectComponents(screenInfo));
+  const ids = decodeColumnar(compact).map(el => el.resourceId);
+  expect(JSON.stringify(ids) === JSON.stringify(screenInfo.elements.map(el => el.resourceId)),
+    `ids with and without the app prefix decode unchanged (${ids.join(', ')})`);
+  expect(compact.strings.filter(value => value === 'ok').length === 1, 'a stripped id and an equal unprefixed id share one string');
+}
+
+async function main() {
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-components-'));
+  try {
+    await testFiltering(dir);
+    await testCompact(dir);
+    testIdRoundTrip();
+    console.log('🎉 All component output tests passed!');
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
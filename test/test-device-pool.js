@@ -0,0 +1,102 @@
+#!/usr/bin/env node
+
+// Exercises DevicePool against many fake devices (test/fakes/uiautomator2) without a phone:
+// routing by serial, aggregate throughput, respawn after a worker dies and idle eviction.
+//
+// Usage: npm run build && node test/test-device-pool.js [deviceCount] [opsPerDevice]
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const deviceCount = parseInt(process.argv[2] || '8', 10);
+const opsPerDevice = parseInt(process.argv[3] || '40', 10);
+const serials = Array.from({ length: deviceCount }, (_, i) => `fake-${i}`);
+
+function createPool(options = {}) {
+  return new DevicePool({
+    discover: async () => serials,
+    bridgeOptions: {
+      env: {
+        PYTHONPATH: join(__dirname, 'fakes'),
+        FAKE_U2_DEVICES: serials.join(','),
+        FAKE_U2_LATENCY_MS: '10',
+      },
+    },
+    ...options,
+  });
+}
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+async function runOps(pool, deviceSerials) {
+  const start = Date.now();
+  await Promise.all(deviceSerials.map(async serial => {
+    const automation = await pool.acquire(serial);
+    for (let i = 0; i < opsPerDevice; i++) {
+      await automation.tap(100 + i, 200);
+    }
+  }));
+  const seconds = (Date.now() - start) / 1000;
+  return (deviceSerials.length * opsPerDevice) / seconds;
+}
+
+async function testDevicePool() {
+  console.log(`🧪 Testing DevicePool with ${deviceCount} fake devices...`);
+  const pool = createPool();
+
+  try {
+    console.log('🔥 Prewarming workers...');
+    const warmStart = Date.now();
+    await pool.warmAll();
+    console.log(`✅ ${pool.status().length} workers warm in ${Date.now() - warmStart}ms`);
+
+    console.log('🧭 Checking routing by serial...');
+    for (const serial of serials) {
+      const automation = await pool.acquire(serial);
+      if (automation.serial !== serial) throw new Error(`acquire(${serial}) returned ${automation.serial}`);
+    }
+    const fallback = await pool.acquire();
+    if (fallback.serial !== serials[0]) throw new Error(`default device should be ${serials[0]}, got ${fallback.serial}`);
+    console.log('✅ Each serial maps to its own worker; omitted serial maps to the first device');
+
+    console.log('📈 Measuring throughput...');
+    const single = await runOps(pool, serials.slice(0, 1));
+    const aggregate = await runOps(pool, serials);
+    console.log(`✅ 1 device: ${single.toFixed(0)} taps/s, ${deviceCount} devices: ${aggregate.toFixed(0)} taps/s (${(aggregate / single).toFixed(1)}x)`);
+
+    console.log('💥 Killing a worker to check respawn...');
+    const victim = serials[deviceCount - 1];
+    await pool.entries.get(victim).bridge.restart();
+    await sleep(1500);
+    const status = pool.status().find(s => s.serial === victim);
+    if (!status || !status.running || status.respawns !== 1) {
+      throw new Error(`worker was not respawned: ${JSON.stringify(status)}`);
+    }
+    await (await pool.acquire(victim)).tap(1, 1);
+    console.log('✅ Worker respawned and serving commands');
+  } finally {
+    await pool.closeAll();
+  }
+
+  console.log('🧹 Checking idle eviction...');
+  const shortLived = createPool({ idleTimeoutMs: 300, healthCheckIntervalMs: 0 });
+  try {
+    await (await shortLived.acquire(serials[0])).tap(1, 1);
+    await sleep(1000);
+    if (shortLived.status().length !== 0) throw new Error('idle worker was not evicted');
+    console.log('✅ Idle worker evicted');
+  } finally {
+    await shortLived.closeAll();
+  }
+
+  console.log('🎉 All device pool tests passed!');
+}
+
+testDevicePool().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,64 @@
+#!/usr/bin/env node
+
+// Checks that ranked selector lookups are answered from one hierarchy dump:
+// findElement falls back from exact to substring matches, and search() looks
+// for its search box with a single bridge call.
+//
+// Usage: npm run build && node test/test-find-any.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { BatchTool } from '../dist/mcp/tools/categories/interaction.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const LATENCY_MS = 40;
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testFindAny() {
+  console.log(`🧪 Testing find_any against a fake device with ${LATENCY_MS}ms per device call...`);
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LATENCY_MS: String(LATENCY_MS) } },
+  });
+  const batch = new BatchTool(pool);
+
+  try {
+    const automation = await pool.acquire('fake-0');
+
+    const exact = await automation.findElement({ text: '热门直播' });
+    expect(exact !== null && exact.bounds.length === 4, 'exact text match is found');
+
+    const partial = await automation.findElement({ resourceId: 'username' });
+    expect(partial !== null && partial.resourceId === 'com.sina.weibo:id/username', 'resource id falls back to a substring match');
+
+    const first = await automation.findFirst([{ text: 'Nothing like this' }, { description: 'Video' }, { resourceId: 'username' }]);
+    expect(first !== null && first.description === 'Video', 'the first pattern that matches wins, not the first node');
+
+    const start = Date.now();
+    const message = await automation.search('weather');
+    const elapsed = Date.now() - start;
+    expect(message === 'Search box not found' && elapsed < LATENCY_MS * 4, `search() tries all seven patterns in one call (${elapsed}ms)`);
+
+    const result = JSON.parse((await batch.execute({
+      steps: [{ action: 'find_all', args: { selectors: [{ description: 'Video' }, { resourceIdMatches: '.*username' }] } }],
+    })).content[0].text);
+    const matches = result.steps[0].matches;
+    expect(result.completed && matches.length === 6 && matches[0].selector === 0 && matches.slice(1).every(match => match.selector === 1), 'find_all returns every match tagged with its selector rank');
+
+    console.log('🎉 All find_any tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+testFindAny().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
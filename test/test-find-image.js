@@ -0,0 +1,99 @@
+#!/usr/bin/env node
+
+// Checks android_find_image against the fake device's screen: templates cut
+// from a screenshot are found where they were taken, at another scale, as
+// base64 data and only inside the search region, prepared templates are
+// reused, and click taps the centre of the match.
+//
+// Usage: npm run build && node test/test-find-image.js
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { ToolFactory } from '../dist/mcp/tools/factory.js';
+import { AndroidCommandHandler, CommandProcessor } from '../dist/mcp/tools/command.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+// The "Recommend" tab and the "Discover" button of the fake Weibo screen
+const TAB = [540, 80, 830, 190];
+const BUTTON = [432, 1770, 648, 1910];
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+function near(a, b, tolerance) {
+  return a.every((value, i) => Math.abs(value - b[i]) <= tolerance);
+}
+
+async function testFindImage(dir) {
+  console.log('🧪 Testing android_find_image...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes') } },
+  });
+  const registry = new ToolFactory(pool).getRegistry();
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry);
+  const findImage = async args => JSON.parse((await processor.process({ name: 'android_find_image', args })).content[0].text);
+
+  try {
+    // Fixtures: parts of the current screen, one of them at 80% of its size
+    const automation = await pool.acquire('fake-0');
+    const tab = join(dir, 'tab.png');
+    const button = join(dir, 'button.png');
+    await automation.takeScreenshot(tab, 'pillow', { imageFormat: 'png', region: TAB });
+    await automation.takeScreenshot(button, 'pillow', { imageFormat: 'png', region: BUTTON, maxWidth: Math.round((BUTTON[2] - BUTTON[0]) * 0.8) });
+
+    const first = await findImage({ template: tab });
+    expect(first.found && first.score > 0.99 && JSON.stringify(first.element.bounds) === JSON.stringify(TAB), `the template is found where it was cut out (score ${first.score})`);
+    expect(first.center[0] === (TAB[0] + TAB[2]) / 2 && first.element.className === 'image' && !first.cached, 'the match has a centre and element-shaped bounds');
+    const again = await findImage({ template: tab });
+    expect(again.cached && JSON.stringify(again.element) === JSON.stringify(first.element), 'the prepared template is reused on the next search');
+
+    const scaled = await findImage({ template: button });
+    expect(scaled.found && scaled.scale === 1.25 && near(scaled.element.bounds, BUTTON, 4), `a template at 80% is found at scale ${scaled.scale} (${scaled.element?.bounds})`);
+
+    const data = fs.readFileSync(tab).toString('base64');
+    const fromData = await findImage({ templateData: data, region: [0, 0, 1080, 400] });
+    expect(fromData.found && JSON.stringify(fromData.element.bounds) === JSON.stringify(TAB), 'base64 template data is searched inside the region');
+    const outside = await findImage({ templateData: data, region: [0, 400, 1080, 1920] });
+    expect(!outside.found && !outside.element && outside.score < 0.8, `nothing is found when the region excludes it (best score ${outside.score})`);
+
+    const missing = await processor.process({ name: 'android_find_image', args: {} }).catch(e => e);
+    expect(/template or templateData/.test(missing.message), 'a template is required');
+
+    const batch = JSON.parse((await processor.process({
+      name: 'android_batch',
+      args: { steps: [{ action: 'find_image', args: { template: button, click: true } }, { action: 'press_key', args: { key: 'back' } }] },
+    })).content[0].text);
+    expect(batch.completed && batch.steps[0].data.clicked, 'find_image with click works as a batch step');
+
+    // Start tracking frames, so the screenshot after the click can be diffed
+    await automation.takeScreenshot(undefined, 'pillow', { changedSince: true });
+    const clicked = await findImage({ template: tab, click: true });
+    const touch = await automation.takeScreenshot(undefined, 'pillow', { changedSince: true });
+    expect(clicked.clicked && touch.regions.some(box => near(box.slice(0, 2), [clicked.center[0] - 40, clicked.center[1] - 40], 40)), 'click taps the centre of the match');
+    console.log('🎉 android_find_image tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function main() {
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-image-'));
+  try {
+    await testFindImage(dir);
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,53 @@
+#!/usr/bin/env node
+
+// Checks FrameParser on the bridge's stdout framing: JSON lines split across
+// chunks, binary payloads split across chunks, empty payloads, and lines
+// that are not JSON.
+//
+// Usage: npm run build && node test/test-frame-parser.js
+
+import { FrameParser } from '../dist/android/frame-parser.js';
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+function parse(chunks) {
+  const frames = [];
+  const errors = [];
+  const parser = new FrameParser((message, payload) => frames.push({ message, payload }), (error, raw) => errors.push(raw));
+  for (const chunk of chunks) parser.push(Buffer.from(chunk));
+  return { frames, errors, pending: parser.pendingBytes };
+}
+
+function testFrameParser() {
+  console.log('🧪 Testing FrameParser...');
+
+  let result = parse(['{"id": 1, "text": "a {brace"}\n{"id"', ': 2}\n']);
+  expect(result.frames.length === 2 && result.frames[0].message.text === 'a {brace' && result.frames[1].message.id === 2,
+    'lines are split on newlines, also across chunks and with braces in strings');
+
+  const image = Buffer.from([0xff, 0xd8, 0x0a, 0x00, 0xff, 0xd9]);
+  result = parse([`{"id": 3, "binary": ${image.length}}\n`, image.subarray(0, 3), Buffer.concat([image.subarray(3), Buffer.from('{"id": 4}\n')])]);
+  expect(result.frames[0].message.id === 3 && result.frames[0].payload.equals(image), 'a binary payload is passed through whole, newlines included');
+  expect(result.frames[1].message.id === 4 && result.pending === 0, 'the line after a payload is parsed as usual');
+
+  result = parse(['{"id": 5, "binary": 0}\n']);
+  expect(result.frames.length === 1 && result.frames[0].payload.length === 0 && result.pending === 0,
+    'an empty payload with nothing buffered after its header is an empty buffer');
+  result = parse(['{"id": 6, "binary": 0}\n{"id": 7}\n']);
+  expect(result.frames.length === 2 && result.frames[0].payload.length === 0 && result.frames[1].message.id === 7, 'an empty payload is followed by the next line');
+
+  result = parse(['Traceback (most recent call last):\n{"id": 8}\n']);
+  expect(result.errors.length === 1 && result.frames.length === 1, 'a line that is not JSON is reported and skipped');
+
+  console.log('🎉 FrameParser tests passed!');
+}
+
+try {
+  testFrameParser();
+} catch (error) {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+}
@@ -0,0 +1,85 @@
+#!/usr/bin/env node
+
+// Checks the buffered logger: disabled levels skip payload formatting, lines
+// reach the file in batches and in order, the file rotates by size, the
+// ring buffer drops the oldest lines when full, and the level comes from env.
+//
+// Usage: npm run build && node test/test-logger.js
+
+import fs from 'fs';
+import os from 'os';
+import { join } from 'path';
+import { Logger } from '../dist/utils/logger.js';
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testLogger() {
+  console.log('🧪 Testing the logger...');
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-log-'));
+  const logFile = join(dir, 'test.log');
+
+  try {
+    const logger = new Logger({ logFile, level: 'info', stderr: false, flushIntervalMs: 20 });
+    let built = 0;
+    logger.debug('hidden', () => { built++; return { big: 'x'.repeat(1000) }; });
+    logger.info('shown', () => { built++; return { screen: 1 }; });
+    expect(built === 1, 'payload functions only run for enabled levels');
+
+    const appends = fs.appendFileSync;
+    let syncAppends = 0;
+    fs.appendFileSync = (...args) => { syncAppends++; return appends(...args); };
+    for (let i = 0; i < 100; i++) logger.info(`line ${i}`);
+    fs.appendFileSync = appends;
+    expect(syncAppends === 0 && !fs.existsSync(logFile), 'logging does not touch the file on the calling path');
+
+    await new Promise(resolve => setTimeout(resolve, 60));
+    let content = fs.readFileSync(logFile, 'utf8');
+    expect(content.includes('[INFO] shown\nData: {"screen":1}') && !content.includes('hidden'), 'enabled lines are flushed by the timer');
+    const numbers = content.match(/line (\d+)/g).map(line => parseInt(line.slice(5), 10));
+    expect(numbers.length === 100 && numbers.every((n, i) => n === i), 'lines keep their order');
+
+    logger.error('failed', new Error('boom'));
+    logger.warn('nested', { error: new Error('inner'), args: { x: 1 } });
+    await logger.flush();
+    content = fs.readFileSync(logFile, 'utf8');
+    expect(/\[ERROR\] failed\nData: Error: boom\n\s+at /.test(content), 'errors are written with their stack');
+    expect(content.includes('"error":{"name":"Error","message":"inner"}'), 'errors inside payloads keep their message');
+
+    logger.info('long', { text: 'y'.repeat(10000) });
+    await logger.flush();
+    expect(/y… \(\d+ chars\)/.test(fs.readFileSync(logFile, 'utf8')), 'large payloads are truncated');
+
+    const rotating = new Logger({ logFile: join(dir, 'rotate.log'), stderr: false, maxBytes: 2000, maxFiles: 2 });
+    for (let round = 0; round < 6; round++) {
+      for (let i = 0; i < 10; i++) rotating.info(`round ${round} line ${i} ${'z'.repeat(50)}`);
+      await rotating.flush();
+    }
+    const files = fs.readdirSync(dir).filter(name => name.startsWith('rotate.log')).sort();
+    expect(JSON.stringify(files) === '["rotate.log","rotate.log.1","rotate.log.2"]', `the file is rotated by size (${files.join(', ')})`);
+    expect(files.every(name => fs.statSync(join(dir, name)).size <= 2000), 'no file grows past maxBytes');
+    expect(fs.readFileSync(join(dir, 'rotate.log'), 'utf8').includes('round 5 line 9'), 'the newest lines are in the current file');
+
+    const small = new Logger({ logFile: join(dir, 'small.log'), stderr: false, bufferLines: 10 });
+    for (let i = 0; i < 25; i++) small.info(`burst ${i}`);
+    await small.flush();
+    content = fs.readFileSync(join(dir, 'small.log'), 'utf8');
+    expect(content.includes('dropped 16 lines') && content.includes('burst 24') && !content.includes('burst 14\n'), 'a full ring buffer keeps the newest lines and reports the drop');
+
+    process.env.ANDROID_MCP_LOG_LEVEL = 'warn';
+    const fromEnv = new Logger({ logFile: join(dir, 'env.log'), stderr: false });
+    expect(fromEnv.level === 'warn' && !fromEnv.isEnabled('info') && fromEnv.isEnabled('error'), 'ANDROID_MCP_LOG_LEVEL sets the level');
+    delete process.env.ANDROID_MCP_LOG_LEVEL;
+
+    console.log('🎉 All logger tests passed!');
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+testLogger().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
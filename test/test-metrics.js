@@ -0,0 +1,130 @@
+#!/usr/bin/env node
+
+// Checks the latency metrics: histogram percentiles stay within their
+// precision, tool calls and bridge commands are timed by phase (including
+// the timings the Python side reports), and android_stats / the Prometheus
+// textfile expose them.
+//
+// Usage: npm run build && node test/test-metrics.js
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { ToolFactory } from '../dist/mcp/tools/factory.js';
+import { AndroidCommandHandler, CommandProcessor } from '../dist/mcp/tools/command.js';
+import { Histogram, Metrics, metrics } from '../dist/utils/metrics.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+function near(value, expected, tolerance) {
+  return Math.abs(value - expected) <= expected * tolerance;
+}
+
+function testHistogram() {
+  console.log('🧪 Testing the histogram...');
+  const histogram = new Histogram();
+  // Shuffled 0.01ms … 10s, spread over six orders of magnitude
+  const values = Array.from({ length: 100000 }, (_, i) => 0.01 * Math.pow(10, 6 * i / 99999));
+  for (let i = values.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [values[i], values[j]] = [values[j], values[i]];
+  }
+  values.forEach(value => histogram.record(value));
+  const sorted = values.slice().sort((a, b) => a - b);
+  for (const q of [0.5, 0.9, 0.99, 0.999]) {
+    const exact = sorted[Math.ceil(q * sorted.length) - 1];
+    expect(near(histogram.quantile(q), exact, 0.04), `p${q * 100} is within 4% (${histogram.quantile(q).toFixed(3)} vs ${exact.toFixed(3)})`);
+  }
+  const snapshot = histogram.snapshot();
+  expect(snapshot.count === 100000 && snapshot.maxMs === 10000 && snapshot.minMs === 0.01, 'count, min and max are exact');
+}
+
+async function testExport() {
+  console.log('🧪 Testing the Prometheus export...');
+  const registry = new Metrics();
+  registry.record({ tool: 'android_tap', phase: 'total' }, 12);
+  registry.record({ tool: 'android_tap', phase: 'total' }, 20);
+  registry.record({ action: 'tap', backend: 'python', phase: 'exec' }, 5);
+  const text = registry.toPrometheus();
+  expect(text.includes('# TYPE android_mcp_latency_seconds summary'), 'the export declares a summary');
+  expect(text.includes('android_mcp_latency_seconds{tool="android_tap",phase="total",quantile="0.99"} 0.02'), 'quantiles are labelled and in seconds');
+  expect(text.includes('android_mcp_latency_seconds_count{action="tap",backend="python",phase="exec"} 1'), 'unset labels are left out');
+
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-metrics-'));
+  try {
+    const file = join(dir, 'textfile', 'android_mcp.prom');
+    await registry.writePrometheusTextfile(file);
+    expect(fs.readFileSync(file, 'utf8') === text && fs.readdirSync(dirname(file)).length === 1, 'the textfile is written whole, without leftovers');
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+
+  expect(registry.snapshot({ tool: 'android_tap' }).series.length === 1, 'snapshots can be filtered by label');
+  registry.reset();
+  expect(registry.snapshot().series.length === 0, 'reset clears every series');
+}
+
+async function testInstrumentation() {
+  console.log('🧪 Testing tool and bridge instrumentation...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes') } },
+  });
+  const registry = new ToolFactory(pool).getRegistry();
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry);
+
+  try {
+    const automation = await pool.acquire('fake-0');
+    await automation.getDisplaySize();
+    metrics.reset();
+
+    for (let i = 0; i < 3; i++) {
+      await processor.process({ name: 'android_tap', args: { x: 100, y: 200 } });
+    }
+    await processor.process({ name: 'android_get_screenshot', args: {} });
+
+    const result = await processor.process({ name: 'android_stats', args: { backend: 'python' } });
+    const stats = JSON.parse(result.content[0].text);
+    const series = (action, phase) => stats.series.find(s => s.labels.action === action && s.labels.phase === phase);
+
+    const roundtrip = series('tap', 'roundtrip');
+    const exec = series('tap', 'exec');
+    expect(roundtrip?.count === 3 && exec?.count === 3, 'each bridge command records its round trip and Python exec time');
+    expect(series('tap', 'queue') && series('tap', 'serialize') && series('tap', 'transport'), 'queue, serialize and transport phases are reported');
+    expect(exec.p50Ms <= roundtrip.p50Ms, `Python time fits inside the round trip (${exec.p50Ms}ms of ${roundtrip.p50Ms}ms)`);
+    expect(series('take_screenshot', 'capture') && series('take_screenshot', 'encode'), 'screenshots report capture and encode separately');
+    expect(series('tap', 'call')?.count === 3, 'the router times each backend call');
+    expect(stats.series.every(s => s.labels.backend === 'python'), 'android_stats filters by backend');
+    expect(stats.routing['fake-0']?.backends.python.state === 'closed', 'android_stats includes routing state per device');
+
+    const all = JSON.parse((await processor.process({ name: 'android_stats', args: { tool: 'android_tap' } })).content[0].text);
+    const phases = all.series.map(s => s.labels.phase).sort().join(',');
+    expect(phases === 'execute,queue,validate' && all.series.every(s => s.count === 3), `tool calls are timed per phase, queueing included (${phases})`);
+
+    const text = (await processor.process({ name: 'android_stats', args: { format: 'prometheus', reset: true } })).content[0].text;
+    expect(text.includes('phase="roundtrip"') && metrics.snapshot().series.length <= 2, 'android_stats exports Prometheus text and can reset');
+
+    console.log('🎉 All metrics tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function main() {
+  testHistogram();
+  await testExport();
+  await testInstrumentation();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
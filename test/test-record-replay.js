@@ -0,0 +1,103 @@
+#!/usr/bin/env node
+
+// Checks recording a bridge session (ANDROID_MCP_RECORD) and replaying it in
+// the fake device (FAKE_U2_TRACE): the trace holds every command and stores a
+// repeated dump once, the replay answers with the recorded screens in the
+// recorded order (the screen after a swipe is the one recorded after it),
+// and takes about as long as the recorded device did, or no time at scale 0.
+//
+// Usage: npm run build && node test/test-record-replay.js
+
+import fs from 'fs';
+import os from 'os';
+import zlib from 'zlib';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+// Dump, the same dump again, swipe the list up, dump, screenshot
+async function session(bridge) {
+  const results = [];
+  results.push(await bridge.getScreenDump());
+  results.push(await bridge.getScreenDump());
+  results.push(await bridge.swipe(540, 1500, 540, 500, 0.1));
+  results.push(await bridge.getScreenDump());
+  results.push(await bridge.takeScreenshot(undefined, 'raw'));
+  for (const result of results) {
+    if (!result.success) throw new Error(result.error);
+  }
+  return results;
+}
+
+async function run(env) {
+  const bridge = new UIAutomator2Bridge('fake-0', { env: { PYTHONPATH: join(__dirname, 'fakes'), ...env } });
+  try {
+    await bridge.initialize();
+    return await session(bridge);
+  } finally {
+    await bridge.close();
+  }
+}
+
+function readTrace(path) {
+  // The recorder flushes every line, so a trace is readable before its gzip trailer is written
+  const text = zlib.gunzipSync(fs.readFileSync(path), { finishFlush: zlib.constants.Z_SYNC_FLUSH }).toString();
+  return text.split('\n').filter(Boolean).map(line => JSON.parse(line));
+}
+
+async function testRecordReplay(dir) {
+  console.log('🧪 Testing trace recording and replay...');
+  const trace = join(dir, 'trace-{serial}.jsonl.gz');
+  const recorded = await run({ ANDROID_MCP_RECORD: trace, FAKE_U2_LIST_ITEMS: '30', FAKE_U2_LATENCY_MS: '40' });
+  await sleep(200); // Let the worker close the trace after SIGTERM
+  const path = join(dir, 'trace-fake-0.jsonl.gz');
+
+  const lines = readTrace(path);
+  expect(lines[0].type === 'header' && lines[0].serial === 'fake-0', 'the trace starts with a header naming the device');
+  const commands = lines.filter(line => line.type === 'command');
+  expect(commands.map(c => c.action).join() === 'get_screen_dump,get_screen_dump,swipe,get_screen_dump,take_screenshot',
+    'every command is recorded in order');
+  expect(commands[0].response.data.xml.$blob && commands[4].payload, 'dumps and the screenshot frame are stored as blobs');
+  const dumps = lines.filter(line => line.type === 'call' && line.name === 'dump_hierarchy');
+  const blobs = new Set(lines.filter(line => line.type === 'blob').map(line => line.id));
+  expect(dumps.length === 3 && dumps[0].blob === dumps[1].blob && dumps[2].blob !== dumps[0].blob && blobs.size === lines.filter(l => l.type === 'blob').length,
+    'a repeated dump is stored once');
+  expect(dumps[1].state === 0 && dumps[2].state === 1, 'the swipe moves the trace to the next state');
+
+  // Replayed without the list: what comes back can only be the recorded screens
+  const replayed = await run({ FAKE_U2_TRACE: path });
+  expect(replayed[0].data.xml.includes('Item 0') && replayed[0].data.xml === recorded[0].data.xml, 'the replay answers the first dump with the recorded screen');
+  expect(replayed[3].data.xml === recorded[3].data.xml && replayed[3].data.xml !== replayed[0].data.xml, 'after the swipe the replay answers with the screen recorded after it');
+  expect(replayed[4].data.width > 0 && replayed[4].data.width === recorded[4].data.width && replayed[4].data.bytes === recorded[4].data.bytes, 'the screenshot is the recorded image');
+
+  const recordedDump = dumps[2].ms;
+  const replayedDump = replayed[3].timing.dumpMs;
+  expect(Math.abs(replayedDump - recordedDump) < Math.max(15, recordedDump * 0.5), `a dump takes as long as when recorded (${replayedDump} ms vs ${recordedDump} ms)`);
+  const fast = await run({ FAKE_U2_TRACE: path, FAKE_U2_TRACE_SCALE: '0' });
+  expect(fast[3].data.xml === recorded[3].data.xml && fast[3].timing.dumpMs < 10, `FAKE_U2_TRACE_SCALE=0 replays without waiting (${fast[3].timing.dumpMs} ms)`);
+  console.log('🎉 Record and replay tests passed!');
+}
+
+async function main() {
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-trace-'));
+  try {
+    await testRecordReplay(dir);
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,182 @@
+#!/usr/bin/env node
+
+// Checks the tool scheduler in CommandProcessor: reads of one device overlap,
+// writes run alone and in order, devices do not wait for each other, queued
+// and running calls show up as gauges, and a call that passes its deadline or
+// is cancelled is cut short, down to the command in the Python worker.
+//
+// Usage: npm run build && node test/test-scheduler.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { BaseTool } from '../dist/mcp/tools/base.js';
+import { ScrollToTool, TapTool } from '../dist/mcp/tools/categories/interaction.js';
+import { AndroidCommandHandler, CommandProcessor } from '../dist/mcp/tools/command.js';
+import { ToolRegistry } from '../dist/mcp/tools/registry.js';
+import { ReadWriteLock } from '../dist/mcp/tools/scheduler.js';
+import { metrics } from '../dist/utils/metrics.js';
+import { RequestAbortedError } from '../dist/utils/request-context.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// A tool that sleeps and logs when it starts and ends, with the access it is built with
+class SleepTool extends BaseTool {
+  constructor(name, mode, log) {
+    super();
+    this.mode = mode;
+    this.log = log;
+    this.definition = { name, description: name, inputSchema: { type: 'object', properties: {} } };
+  }
+
+  access() {
+    return this.mode;
+  }
+
+  async execute(args) {
+    this.log.push(`${args.id}+`);
+    await sleep(args.ms ?? 50);
+    this.log.push(`${args.id}-`);
+    return this.createTextResult(args.id);
+  }
+}
+
+async function testLock() {
+  console.log('🧪 Testing ReadWriteLock...');
+  const lock = new ReadWriteLock();
+  const read1 = await lock.acquire('read');
+  const read2 = await lock.acquire('read');
+  expect(lock.active.read === 2, 'two reads hold the lock together');
+
+  const granted = [];
+  const write = lock.acquire('write').then(release => { granted.push('write'); return release; });
+  const read3 = lock.acquire('read').then(release => { granted.push('read3'); return release; });
+  await sleep(0);
+  expect(granted.length === 0 && lock.queued.write === 1 && lock.queued.read === 1, 'a write waits for the reads, and a later read waits behind the write');
+
+  read1();
+  read2();
+  const releaseWrite = await write;
+  await sleep(0);
+  expect(granted.join() === 'write' && lock.active.write === 1, 'the write runs alone once the reads are done');
+  releaseWrite();
+  (await read3)();
+  expect(granted.join() === 'write,read3', 'waiters are granted in arrival order');
+
+  const held = await lock.acquire('write');
+  const controller = new AbortController();
+  const aborted = lock.acquire('read', controller.signal);
+  controller.abort(new Error('gave up'));
+  const error = await aborted.catch(error => error);
+  expect(error.message === 'gave up' && lock.queued.read === 0, 'an aborted waiter leaves the queue with the abort reason');
+  held();
+  expect(lock.active.read === 0 && lock.active.write === 0, 'the lock is free again');
+}
+
+async function testScheduling() {
+  console.log('🧪 Testing scheduling in CommandProcessor...');
+  const log = [];
+  const registry = new ToolRegistry();
+  registry.register(new SleepTool('read', 'read', log));
+  registry.register(new SleepTool('write', 'write', log));
+  registry.register(new SleepTool('free', 'none', log));
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry);
+  const call = (name, args, options) => processor.process({ name, args }, options);
+  const gauge = (name, mode) => metrics.snapshot().gauges.find(g => g.name === name && g.labels.device === 'a' && g.labels.mode === mode);
+
+  let start = Date.now();
+  await Promise.all([call('read', { id: 'r1', deviceSerial: 'a', ms: 100 }), call('read', { id: 'r2', deviceSerial: 'a', ms: 100 })]);
+  expect(Date.now() - start < 180, `reads of one device run in parallel (${Date.now() - start}ms for two 100ms reads)`);
+
+  log.length = 0;
+  const writes = Promise.all([
+    call('write', { id: 'w1', deviceSerial: 'a' }),
+    call('read', { id: 'r3', deviceSerial: 'a' }),
+    call('write', { id: 'w2', deviceSerial: 'a' }),
+  ]);
+  await sleep(10);
+  expect(gauge('scheduler_running', 'write')?.value === 1 && gauge('scheduler_queued', 'write')?.value === 1 && gauge('scheduler_queued', 'read')?.value === 1,
+    'running and queued calls are reported per device and mode');
+  await writes;
+  expect(log.join() === 'w1+,w1-,r3+,r3-,w2+,w2-', `writes run alone and calls run in arrival order (${log.join()})`);
+  expect(gauge('scheduler_running', 'write').value === 0 && gauge('scheduler_queued', 'write').value === 0 && gauge('scheduler_queued', 'write').max >= 1,
+    'the gauges go back to zero and keep their high-water mark');
+
+  log.length = 0;
+  start = Date.now();
+  await Promise.all([
+    call('write', { id: 'a', deviceSerial: 'a', ms: 100 }),
+    call('write', { id: 'b', deviceSerial: 'b', ms: 100 }),
+    call('free', { id: 'f', deviceSerial: 'a', ms: 10 }),
+  ]);
+  expect(Date.now() - start < 180 && log.indexOf('f-') < log.indexOf('a-'), 'writes to different devices and lock-free calls do not wait');
+
+  const blocker = call('write', { id: 'slow', deviceSerial: 'a', ms: 300 });
+  start = Date.now();
+  const deadline = await call('write', { id: 'late', deviceSerial: 'a' }, { timeoutMs: 100 }).catch(error => error);
+  expect(deadline instanceof RequestAbortedError && deadline.reason === 'deadline' && Date.now() - start < 200,
+    `a call still queued at its deadline fails with reason deadline (${Date.now() - start}ms)`);
+
+  const controller = new AbortController();
+  const cancelled = call('read', { id: 'gone', deviceSerial: 'a' }, { signal: controller.signal }).catch(error => error);
+  setTimeout(() => controller.abort(), 20);
+  const error = await cancelled;
+  expect(error instanceof RequestAbortedError && error.reason === 'cancelled', 'a cancelled call fails with reason cancelled');
+  await blocker;
+  expect(!log.includes('late+') && !log.includes('gone+'), 'calls that gave up in the queue never run');
+
+  const running = await call('read', { id: 'long', deviceSerial: 'a', ms: 300 }, { timeoutMs: 50 }).catch(error => error);
+  expect(running.reason === 'deadline', 'a running call stops being waited for at its deadline');
+  start = Date.now();
+  await call('write', { id: 'after', deviceSerial: 'a', ms: 0 });
+  expect(Date.now() - start >= 150, 'the lock is held until the abandoned call is really done');
+}
+
+async function testBridgeCancellation() {
+  console.log('🧪 Testing cancellation of a running bridge command...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LIST_ITEMS: '500' } },
+  });
+  const registry = new ToolRegistry();
+  registry.register(new ScrollToTool(pool));
+  registry.register(new TapTool(pool));
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry,
+    { resolveDevice: serial => pool.resolveSerial(serial) });
+
+  try {
+    // Start the worker first, so the deadline below is spent scrolling
+    await processor.process({ name: 'android_tap', args: { x: 100, y: 200 } });
+    let start = Date.now();
+    const error = await processor.process({ name: 'android_scroll_to', args: { text: 'Nowhere', maxSwipes: 50 } }, { timeoutMs: 300 })
+      .catch(error => error);
+    expect(error instanceof RequestAbortedError && Date.now() - start < 600, `a long scroll_to is cut off at its deadline (${Date.now() - start}ms)`);
+
+    start = Date.now();
+    const tap = await processor.process({ name: 'android_tap', args: { x: 100, y: 200 } });
+    expect(/Tapped/.test(tap.content[0].text) && Date.now() - start < 1000,
+      `the worker cancels the scroll, so the next tap runs right away (${Date.now() - start}ms)`);
+    console.log('🎉 All scheduler tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function main() {
+  await testLock();
+  await testScheduling();
+  await testBridgeCancellation();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
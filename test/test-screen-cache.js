@@ -0,0 +1,58 @@
+#!/usr/bin/env node
+
+// Checks the screen-state cache in AndroidAutomation against the fake device:
+// repeated reads hit the cache, mutating actions invalidate it and scrolling
+// no longer dumps the hierarchy just to learn the display size.
+//
+// Usage: npm run build && node test/test-screen-cache.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { AndroidAutomation } from '../dist/android/automation.js';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testScreenCache() {
+  console.log('🧪 Testing screen-state cache...');
+  const bridge = new UIAutomator2Bridge('fake-0', { env: { PYTHONPATH: join(__dirname, 'fakes') } });
+  const automation = new AndroidAutomation('fake-0', bridge);
+
+  try {
+    const first = await automation.getScreenInfo();
+    const second = await automation.getScreenInfo();
+    let stats = automation.getCacheStats();
+    expect(first === second && stats.misses === 1 && stats.hits === 1, 'second read within TTL is served from cache');
+
+    await automation.tap(540, 960);
+    await automation.getScreenInfo();
+    stats = automation.getCacheStats();
+    expect(stats.misses === 2, 'tap invalidates the cached hierarchy');
+
+    const [a, b] = await Promise.all([automation.getScreenInfo(true), automation.getScreenInfo()]);
+    stats = automation.getCacheStats();
+    expect(a === b && stats.misses === 3, 'concurrent reads share a single dump');
+
+    await automation.scroll('down');
+    await automation.scroll('up');
+    stats = automation.getCacheStats();
+    expect(stats.misses === 3, 'scroll uses the cached display size instead of dumping');
+    expect(stats.staticMisses === 0, 'display size was seeded from the first dump');
+
+    console.log('📊 Cache stats:', stats);
+    console.log('🎉 All screen cache tests passed!');
+  } finally {
+    await automation.close();
+  }
+}
+
+testScreenCache().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,104 @@
+#!/usr/bin/env node
+
+// Checks the incremental android_get_components mode: stable element ids,
+// added/removed/changed detection, version handling and the byte savings
+// compared to the full pretty-printed output.
+//
+// Usage: npm run build && node test/test-screen-diff.js
+
+import fs from 'fs';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { parseHierarchy } from '../dist/android/ui-parser.js';
+import { toUIElement } from '../dist/android/automation.js';
+import { ScreenSnapshotTracker } from '../dist/android/screen-diff.js';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { ComponentsTool } from '../dist/mcp/tools/categories/screen.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const fixture = fs.readFileSync(join(__dirname, 'fixtures', 'weibo_home.xml'), 'utf8');
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+// Same shape AndroidAutomation.parseUIDump produces, without the element filter
+function screenInfoFromXml(xml, currentApp = 'com.sina.weibo') {
+  const tree = parseHierarchy(xml);
+  const screenInfo = { width: 1080, height: 1920, elements: tree.nodes.map(toUIElement), currentApp };
+  Object.defineProperty(screenInfo, 'tree', { value: tree, enumerable: false });
+  Object.defineProperty(screenInfo, 'elementNodes', { value: tree.nodes, enumerable: false });
+  return screenInfo;
+}
+
+function testTracker() {
+  console.log('🧪 Testing ScreenSnapshotTracker...');
+  const tracker = new ScreenSnapshotTracker();
+  const base = screenInfoFromXml(fixture);
+
+  const first = tracker.update(base);
+  expect(first.full && first.version === 1 && first.elements.length === base.elements.length, 'first call returns a full snapshot');
+
+  const same = tracker.update(screenInfoFromXml(fixture), 1);
+  expect(!same.full && same.version === 1 && same.added.length + same.removed.length + same.changed.length === 0,
+    'unchanged screen gives an empty diff and keeps the version');
+
+  const target = base.elements.find(el => el.text);
+  const renamed = fixture.replace(`text="${target.text}"`, 'text="Renamed"');
+  const changed = tracker.update(screenInfoFromXml(renamed), 1);
+  expect(!changed.full && changed.version === 2 && changed.changed.length === 1 && changed.changed[0].text === 'Renamed',
+    'text change is reported as changed');
+  expect(changed.changed[0].id === first.elements.find(el => el.text === target.text).id, 'changed element keeps its id');
+
+  const toast = '<node text="Saved" resource-id="" class="android.widget.Toast" bounds="[300,1700][780,1800]" /></hierarchy>';
+  const withToast = tracker.update(screenInfoFromXml(renamed.replace('</hierarchy>', toast)), 2);
+  expect(withToast.version === 3 && withToast.added.length === 1 && withToast.added[0].text === 'Saved' && withToast.removed.length === 0,
+    'new node is reported as added without touching the others');
+
+  const gone = tracker.update(screenInfoFromXml(renamed), 3);
+  expect(gone.version === 4 && gone.removed.length === 1 && gone.removed[0] === withToast.added[0].id, 'vanished node is reported by id');
+
+  const stale = tracker.update(screenInfoFromXml(renamed), 2);
+  expect(stale.full && stale.version === 4, 'stale sinceVersion falls back to a full snapshot');
+
+  const fullBytes = Buffer.byteLength(JSON.stringify(base, null, 2));
+  const diffBytes = Buffer.byteLength(JSON.stringify(changed));
+  console.log(`📊 Full output ${fullBytes} bytes, single-change diff ${diffBytes} bytes`);
+  expect(diffBytes * 10 < fullBytes, 'diff is an order of magnitude smaller than the full output');
+}
+
+async function testComponentsTool() {
+  console.log('🧪 Testing android_get_components diff mode on a fake device...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes') } },
+  });
+  const tool = new ComponentsTool(pool);
+
+  try {
+    const first = JSON.parse((await tool.execute({ diff: true })).content[0].text);
+    expect(first.full && first.version === 1, 'tool returns a full versioned snapshot first');
+
+    const second = JSON.parse((await tool.execute({ diff: true, sinceVersion: first.version })).content[0].text);
+    expect(!second.full && second.added.length === 0 && second.removed.length === 0, 'tool returns an empty diff for an unchanged screen');
+
+    const resync = JSON.parse((await tool.execute({ diff: true, sinceVersion: first.version, resync: true })).content[0].text);
+    expect(resync.full && resync.elements.length === first.elements.length, 'resync returns the full snapshot again');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function main() {
+  testTracker();
+  await testComponentsTool();
+  console.log('🎉 All screen diff tests passed!');
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,70 @@
+#!/usr/bin/env node
+
+// Checks region crops and changedSince screenshots against the fake device,
+// which draws a touch marker where the last click landed (so each tap
+// changes the screen both at the new and at the previous touch point).
+//
+// Usage: npm run build && node test/test-screenshot-delta.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { ScreenshotTool } from '../dist/mcp/tools/categories/screen.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+function contains(box, x, y) {
+  return box[0] <= x && x <= box[2] && box[1] <= y && y <= box[3];
+}
+
+async function testScreenshotDelta() {
+  console.log('🧪 Testing region and changedSince screenshots...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes') } },
+  });
+  const tool = new ScreenshotTool(pool);
+
+  try {
+    const automation = await pool.acquire('fake-0');
+
+    await automation.takeScreenshot(undefined, 'pillow');
+    const full = await automation.takeScreenshot(undefined, 'pillow', { changedSince: true });
+    expect(full.bytes > 0 && full.changed === true && !full.regions, 'the first changedSince call returns the full image: earlier plain screenshots are not tracked');
+
+    const cropped = await automation.takeScreenshot(undefined, 'pillow', { region: [0, 0, 540, 960] });
+    expect(cropped.width === 540 && cropped.height === 960, 'region crops before encoding');
+
+    const same = await tool.execute({ changedSince: true });
+    expect(same.content.length === 1 && same.content[0].text === 'unchanged', 'identical frame is reported as unchanged without an image');
+
+    await automation.tap(540, 960);
+    const delta = await automation.takeScreenshot(undefined, 'pillow', { changedSince: true });
+    expect(delta.regions.length === 1 && contains(delta.regions[0], 540, 960), 'tap marker shows up as one changed region');
+    expect(delta.width < 300 && delta.height < 300 && delta.bytes < full.bytes / 10, `only the changed area is encoded (${delta.width}x${delta.height}, ${delta.bytes} bytes vs ${full.bytes})`);
+
+    await automation.tap(100, 1800);
+    const outside = await tool.execute({ changedSince: true, region: [0, 0, 1080, 800] });
+    expect(outside.content[0].text === 'unchanged', 'changes outside the region are ignored');
+
+    await automation.tap(900, 200);
+    const inside = await tool.execute({ changedSince: true, region: [0, 0, 1080, 800] });
+    const summary = JSON.parse(inside.content[0].text);
+    expect(inside.content[1].type === 'image' && summary.regions.every(box => box[3] <= 800), 'changed regions are clipped to the requested region');
+
+    console.log('🎉 All screenshot delta tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+testScreenshotDelta().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
@@ -0,0 +1,108 @@
+#!/usr/bin/env node
+
+// Checks android_scroll_to against a fake scrollable list: the element is
+// found in one tool call, returned whole, the end of the list stops the
+// search, and the bridge-less fallback swipes inside the largest
+// scrollable container.
+//
+// Usage: npm run build && node test/test-scroll-to.js
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+import { ToolFactory } from '../dist/mcp/tools/factory.js';
+import { AndroidCommandHandler, CommandProcessor } from '../dist/mcp/tools/command.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+// Matches the fake list: rows of 150px inside [0,200][1080,1800]
+const ITEMS = 60;
+const ROW_HEIGHT = 150;
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testScrollTo() {
+  console.log('🧪 Testing android_scroll_to...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LIST_ITEMS: String(ITEMS) } },
+  });
+  const registry = new ToolFactory(pool).getRegistry();
+  const processor = new CommandProcessor(new AndroidCommandHandler(registry), registry);
+  const call = async (name, args) => (await processor.process({ name, args })).content[0].text;
+  const scrollTo = async args => JSON.parse(await call('android_scroll_to', args));
+
+  try {
+    const start = Date.now();
+    const item = await scrollTo({ text: 'Item 37' });
+    const [, top, , bottom] = item.element.bounds;
+    expect(item.found && item.element.text === 'Item 37' && item.scrolls > 3, `Item 37 found after ${item.scrolls} swipes in one call (${Date.now() - start}ms)`);
+    expect(bottom - top === ROW_HEIGHT && bottom < 1800, `the element is returned whole, not cut off at the list edge (${item.element.bounds})`);
+
+    const missing = await scrollTo({ text: 'Item 999', maxSwipes: 50 });
+    expect(!missing.found && missing.reachedEnd && missing.scrolls < 50, `the end of the list stops the search after ${missing.scrolls} more swipes`);
+
+    const back = await scrollTo({ text: 'Item 2', direction: 'up' });
+    expect(back.found && back.element.text === 'Item 2', `scrolling up finds Item 2 after ${back.scrolls} swipes`);
+
+    const limited = await scrollTo({ text: 'Item 59', maxSwipes: 2 });
+    expect(!limited.found && !limited.reachedEnd && limited.scrolls === 2, 'maxSwipes caps the swipes');
+
+    const unknownContainer = await processor.process({ name: 'android_scroll_to', args: { text: 'Item 1', containerResourceId: 'com.example.list:id/nothing' } }).catch(e => e);
+    expect(/No scrollable container/.test(unknownContainer.message), 'an unknown container is reported');
+
+    const batch = JSON.parse(await call('android_batch', {
+      steps: [
+        { action: 'scroll_to', args: { selectors: [{ text: 'Item 50' }] } },
+        { action: 'element_click', args: { text: 'Item 50' } },
+      ],
+    }));
+    expect(batch.completed && batch.steps[0].data.found, 'scroll_to works as a batch step');
+    console.log('🎉 android_scroll_to tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function testFallback() {
+  console.log('🧪 Testing scroll to without the Python bridge...');
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-scroll-'));
+  const log = join(dir, 'adb.log');
+  const server = await startFakeAdbServer({ env: { FAKE_ADB_LOG: log } });
+  process.env.ANDROID_ADB_SERVER_PORT = String(server.port);
+  const { AndroidAutomation } = await import('../dist/android/automation.js');
+  const automation = new AndroidAutomation('fake-0', new UIAutomator2Bridge('fake-0', { pythonPath: '/nonexistent/python' }));
+
+  try {
+    const visible = await automation.scrollTo({ text: '热门直播' });
+    expect(visible.found && visible.scrolls === 0, 'an element already on screen needs no swipe');
+
+    // The fake adb device always dumps the same screen, so the first swipe already looks like the end
+    const missing = await automation.scrollTo({ text: 'never there' });
+    expect(!missing.found && missing.reachedEnd && missing.scrolls === 1, 'an unchanged screen after a swipe ends the search');
+    expect(fs.readFileSync(log, 'utf8').includes('input swipe 540 1440 540 480 300'), 'the swipe stays inside the largest scrollable container');
+    console.log('🎉 Fallback scroll to tests passed!');
+  } finally {
+    await automation.close();
+    await server.close();
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+async function main() {
+  await testScrollTo();
+  await testFallback();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
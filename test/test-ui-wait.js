@@ -0,0 +1,93 @@
+#!/usr/bin/env node
+
+// Checks the bridge wait subsystem against the fake device, whose UI keeps
+// changing (a "Loading" node with moving progress) for FAKE_U2_SETTLE_MS
+// after every input.
+//
+// Usage: npm run build && node test/test-ui-wait.js
+
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { DevicePool } from '../dist/android/device-pool.js';
+import { TapTool } from '../dist/mcp/tools/categories/interaction.js';
+import { WaitForTool } from '../dist/mcp/tools/categories/utility.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const SETTLE_MS = 600;
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testUIWait() {
+  console.log(`🧪 Testing waits against a fake UI that settles ${SETTLE_MS}ms after input...`);
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_SETTLE_MS: String(SETTLE_MS) } },
+  });
+  const waitFor = new WaitForTool(pool);
+  const tap = new TapTool(pool);
+
+  try {
+    const automation = await pool.acquire('fake-0');
+
+    const idleNow = await automation.waitForIdle(2000);
+    expect(idleNow.met && idleNow.waitedMs < 300, `settled screen is idle right away (${idleNow.waitedMs}ms, ${idleNow.polls} polls)`);
+
+    let start = Date.now();
+    await automation.openApp('com.tencent.mm');
+    let elapsed = Date.now() - start;
+    expect(elapsed >= SETTLE_MS && elapsed < SETTLE_MS + 1500, `openApp returns once the app settles (${elapsed}ms)`);
+
+    await automation.tap(540, 960);
+    const gone = JSON.parse((await waitFor.execute({ text: 'Loading', gone: true, timeout: 5000 })).content[0].text);
+    expect(gone.met && !gone.found && gone.waitedMs >= SETTLE_MS - 100, `android_wait_for gone=true waits out the loading node (${gone.waitedMs}ms)`);
+
+    const present = JSON.parse((await waitFor.execute({ text: '热门直播' })).content[0].text);
+    expect(present.met && present.found && present.polls === 1, 'element already on screen is found on the first poll');
+
+    const missing = JSON.parse((await waitFor.execute({ resourceId: 'does.not:id/exist', timeout: 400 })).content[0].text);
+    expect(!missing.met && missing.waitedMs <= 700, `missing element gives up at the timeout (${missing.waitedMs}ms)`);
+
+    start = Date.now();
+    const tapped = await tap.execute({ x: 100, y: 200, waitIdle: true });
+    elapsed = Date.now() - start;
+    expect(/screen idle after \d+ms/.test(tapped.content[0].text) && elapsed >= SETTLE_MS, `android_tap waitIdle reports the settle time: "${tapped.content[0].text}"`);
+
+    console.log('🎉 All wait tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function testLaunchTrampoline() {
+  console.log('🧪 Testing openApp when the launch lands in another app...');
+  const pool = new DevicePool({
+    discover: async () => ['fake-0'],
+    bridgeOptions: { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_SETTLE_MS: String(SETTLE_MS), FAKE_U2_LAUNCH_AS: 'com.android.launcher3' } },
+  });
+
+  try {
+    const automation = await pool.acquire('fake-0');
+    const start = Date.now();
+    await automation.openApp('com.tencent.mm');
+    const elapsed = Date.now() - start;
+    expect(elapsed >= SETTLE_MS && elapsed < 2500, `openApp returns once the screen settles, without waiting out the launch timeout (${elapsed}ms)`);
+    console.log('🎉 Launch trampoline tests passed!');
+  } finally {
+    await pool.closeAll();
+  }
+}
+
+async function main() {
+  await testUIWait();
+  await testLaunchTrampoline();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
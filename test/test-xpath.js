@@ -0,0 +1,111 @@
+#!/usr/bin/env node
+
+// Checks XPath on the cached hierarchy: queries after a screen dump are
+// answered without dumping again, get_all returns every match, input drops
+// the cache, the plugin shorthands work, and without a Python bridge the
+// common forms are evaluated on the parsed screen in Node.
+//
+// Usage: npm run build && node test/test-xpath.js
+
+import fs from 'fs';
+import os from 'os';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
+import { UIAutomator2Bridge } from '../dist/android/uiautomator2-bridge.js';
+import { parseHierarchy, selectByXPath } from '../dist/android/ui-parser.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const ROWS = '//android.widget.TextView[@resource-id="com.sina.weibo:id/username"]';
+const QUERIES = 50;
+
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
+
+async function testBridge() {
+  console.log('🧪 Testing XPath in the Python bridge...');
+  const tree = parseHierarchy(fs.readFileSync(join(__dirname, 'fixtures', 'weibo_home.xml'), 'utf8'));
+  const bridge = new UIAutomator2Bridge('fake-0', { env: { PYTHONPATH: join(__dirname, 'fakes'), FAKE_U2_LATENCY_MS: '20' } });
+  try {
+    await bridge.initialize();
+    await bridge.getScreenDump();
+
+    const all = await bridge.xpathOperation(ROWS, 'get_all');
+    const expected = selectByXPath(tree, ROWS).map(node => node.text);
+    expect(all.success && all.data.cached && all.timing.dumpMs === undefined, 'the query reuses the hierarchy of the last screen dump');
+    expect(JSON.stringify(all.data.elements.map(e => e.text)) === JSON.stringify(expected), `get_all returns all ${expected.length} matches in document order`);
+    expect(all.data.elements[0].bounds.length === 4 && all.data.elements[0].className === 'android.widget.TextView', 'matches have the find_element shape');
+
+    const start = Date.now();
+    for (let i = 0; i < QUERIES; i++) {
+      const text = await bridge.xpathOperation(`//*[@text="${expected[i % expected.length]}"]`, 'get_text');
+      if (!text.data.cached || text.data.text !== expected[i % expected.length]) throw new Error(`query ${i} was not answered from the cache`);
+    }
+    const cachedMs = (Date.now() - start) / QUERIES;
+    expect(cachedMs < 20, `${QUERIES} queries on an unchanged screen: ${cachedMs.toFixed(2)}ms each, below one 20ms device call`);
+
+    const ids = await bridge.xpathOperation('@com.sina.weibo:id/username', 'get_all');
+    const contains = await bridge.xpathOperation('%直播%', 'get_all');
+    expect(ids.data.count === expected.length && contains.data.count === selectByXPath(tree, '%直播%').length, 'the @id and %text% shorthands work');
+    const values = await bridge.xpathOperation(`${ROWS}/@text`, 'get_all');
+    expect(JSON.stringify(values.data.values) === JSON.stringify(expected), 'attribute results come back as values');
+
+    const click = await bridge.xpathOperation(ROWS, 'click');
+    expect(click.success && click.message.includes('Clicked'), 'click taps the first match');
+    const after = await bridge.xpathOperation(ROWS, 'get_all');
+    expect(!after.data.cached && after.timing.dumpMs > 0, 'an input drops the cached hierarchy');
+    expect((await bridge.xpathOperation(ROWS, 'get_all')).data.cached, 'the next dump is cached again');
+
+    const missing = await bridge.xpathOperation('//*[@text="Nothing like this"]', 'get_text');
+    expect(!missing.success && /no element matches/.test(missing.error), 'a read with no match fails');
+    const invalid = await bridge.xpathOperation('//*[', 'get_text');
+    expect(!invalid.success && /xpath is not supported by the fake device/.test(invalid.error), 'expressions lxml rejects go to the uiautomator2 plugin');
+    console.log('🎉 Bridge XPath tests passed!');
+  } finally {
+    await bridge.close();
+  }
+}
+
+async function testFallback() {
+  console.log('🧪 Testing XPath without the Python bridge...');
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-xpath-'));
+  const log = join(dir, 'adb.log');
+  const server = await startFakeAdbServer({ env: { FAKE_ADB_LOG: log } });
+  process.env.ANDROID_ADB_SERVER_PORT = String(server.port);
+  const { AndroidAutomation } = await import('../dist/android/automation.js');
+  const automation = new AndroidAutomation('fake-0', new UIAutomator2Bridge('fake-0', { pythonPath: '/nonexistent/python' }));
+
+  try {
+    const all = JSON.parse(await automation.xpathOperation(ROWS, 'get_all'));
+    expect(all.count === 5 && all.elements[0].text === '蔡依林', `get_all is answered from the parsed screen (${all.count} matches)`);
+    const text = JSON.parse(await automation.xpathOperation("//*[contains(@text, '热门') and @clickable='false']", 'get_text'));
+    expect(text.text === '热门直播', 'contains() and "and" predicates work');
+
+    await automation.xpathOperation('@com.sina.weibo:id/username', 'click');
+    const [x1, y1, x2, y2] = all.elements[0].bounds;
+    const taps = fs.readFileSync(log, 'utf8');
+    expect(taps.includes(`input tap ${(x1 + x2) / 2} ${(y1 + y2) / 2}`), 'click taps the centre of the first match over adb');
+
+    const error = await automation.xpathOperation('(//node)[last()]', 'get_text').catch(e => e);
+    expect(/needs the Python bridge/.test(error.message), 'other expressions report that they need the bridge');
+    console.log('🎉 Fallback XPath tests passed!');
+  } finally {
+    await automation.close();
+    await server.close();
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+async function main() {
+  await testBridge();
+  await testFallback();
+}
+
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});
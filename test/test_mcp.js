@@ -1,78 +1,119 @@
 #!/usr/bin/env node
 
+// Smoke test of the MCP server over stdio against the fake device: the
+// handshake, tools/list, and a components and a screenshot call through the
+// whole stack (server, device pool, Python worker, fake uiautomator2).
+//
+// Usage: npm run build && node test/test_mcp.js
+
+import fs from 'fs';
+import os from 'os';
 import { spawn } from 'child_process';
+import { createInterface } from 'readline';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
+import { startFakeAdbServer } from './fakes/adb-server.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
-function testMCPServer() {
-    console.log('Testing MCP Server...\n');
-    
-    const serverProcess = spawn('node', [join(__dirname, 'dist/index.js')], {
-        stdio: ['pipe', 'pipe', 'pipe']
-    });
+const TIMEOUT_MS = 30000;
 
-    const testCases = [
-        {
-            name: 'List Tools',
-            request: { jsonrpc: "2.0", method: "tools/list", id: 1 }
-        },
-        {
-            name: 'Get Screen Info',
-            request: { jsonrpc: "2.0", method: "tools/call", params: { name: "android_get_screen_info", arguments: {} }, id: 2 }
-        },
-        {
-            name: 'Take Screenshot',
-            request: { jsonrpc: "2.0", method: "tools/call", params: { name: "android_screenshot", arguments: { filename: "test_mcp.png" } }, id: 3 }
-        }
-    ];
+function expect(condition, message) {
+  if (!condition) throw new Error(message);
+  console.log(`✅ ${message}`);
+}
 
-    let currentTest = 0;
+function startServer(env) {
+  const server = spawn(process.execPath, [join(__dirname, '..', 'dist', 'index.js')], { stdio: ['pipe', 'pipe', 'pipe'], env });
+  const pending = new Map();
+  let nextId = 1;
+  let stderr = '';
+  server.stderr.on('data', data => {
+    stderr = (stderr + data.toString()).slice(-4000);
+  });
+  server.on('exit', code => {
+    for (const { reject } of pending.values()) reject(new Error(`Server exited with code ${code}: ${stderr}`));
+  });
+  createInterface({ input: server.stdout }).on('line', line => {
+    const message = JSON.parse(line);
+    pending.get(message.id)?.resolve(message);
+    pending.delete(message.id);
+  });
 
-    function runNextTest() {
-        if (currentTest >= testCases.length) {
-            console.log('\n✓ All tests completed successfully!');
-            serverProcess.kill();
-            process.exit(0);
-            return;
-        }
+  const send = message => server.stdin.write(JSON.stringify({ jsonrpc: '2.0', ...message }) + '\n');
+  return {
+    request(method, params = {}) {
+      const id = nextId++;
+      return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => reject(new Error(`${method} timed out: ${stderr}`)), TIMEOUT_MS);
+        pending.set(id, {
+          resolve: message => { clearTimeout(timer); resolve(message); },
+          reject: error => { clearTimeout(timer); reject(error); },
+        });
+        send({ id, method, params });
+      });
+    },
+    notify: (method, params = {}) => send({ method, params }),
+    close: () => server.kill(),
+  };
+}
 
-        const testCase = testCases[currentTest];
-        console.log(`Running test: ${testCase.name}`);
-        
-        serverProcess.stdin.write(JSON.stringify(testCase.request) + '\n');
-        currentTest++;
-        
-        // Move to next test after delay
-        setTimeout(runNextTest, 3000);
-    }
+async function testMCPServer(dir) {
+  console.log('🧪 Testing the MCP server over stdio...');
+  const adbServer = await startFakeAdbServer();
+  const server = startServer({
+    ...process.env,
+    PATH: `${join(__dirname, 'fakes', 'adb-cli')}:${process.env.PATH}`,
+    PYTHONPATH: join(__dirname, 'fakes'),
+    ANDROID_ADB_SERVER_PORT: String(adbServer.port),
+    ANDROID_MCP_LOG_FILE: join(dir, 'android-mcp.log'),
+    ANDROID_MCP_LOG_STDERR: '0',
+  });
 
-    serverProcess.stdout.on('data', (data) => {
-        const output = data.toString();
-        if (output.includes('"result"')) {
-            console.log('✓ Test passed - got result');
-        } else if (output.includes('"error"')) {
-            console.log('✗ Test failed - got error');
-            console.log(output.substring(0, 200) + '...');
-        }
+  try {
+    const init = await server.request('initialize', {
+      protocolVersion: '2024-11-05',
+      capabilities: {},
+      clientInfo: { name: 'test_mcp', version: '1.0.0' },
     });
+    expect(init.result?.serverInfo?.name === 'android-mcp-server', 'the server answers the handshake');
+    server.notify('notifications/initialized');
 
-    serverProcess.stderr.on('data', (data) => {
-        const stderr = data.toString();
-        if (stderr.includes('Android MCP Server running')) {
-            console.log('✓ Server started successfully');
-            setTimeout(runNextTest, 1000);
-        } else {
-            console.log('Server info:', stderr);
-        }
-    });
+    const { result: { tools } } = await server.request('tools/list');
+    const names = tools.map(tool => tool.name);
+    expect(names.includes('android_get_components') && names.includes('android_get_screenshot') && names.includes('android_tap'),
+      `tools/list lists the device tools (${tools.length} tools)`);
 
-    serverProcess.on('error', (error) => {
-        console.error('Server error:', error);
-        process.exit(1);
-    });
+    const components = await server.request('tools/call', { name: 'android_get_components', arguments: {} });
+    const screen = JSON.parse(components.result.content[0].text);
+    expect(screen.elements.length > 0 && screen.elements.every(el => Array.isArray(el.bounds) && el.bounds.length === 4),
+      `android_get_components returns the fake screen (${screen.elements.length} elements)`);
+
+    const filename = join(dir, 'test_mcp.jpg');
+    const screenshot = await server.request('tools/call', { name: 'android_get_screenshot', arguments: { filename } });
+    const image = screenshot.result.content.find(item => item.type === 'image');
+    expect(image?.data && fs.existsSync(filename), 'android_get_screenshot returns the image and saves it');
+
+    const unknown = await server.request('tools/call', { name: 'android_get_screen_info', arguments: {} });
+    expect(unknown.error || unknown.result?.isError, 'an unknown tool is an error');
+    console.log('🎉 MCP server tests passed!');
+  } finally {
+    server.close();
+    await adbServer.close();
+  }
+}
+
+async function main() {
+  const dir = fs.mkdtempSync(join(os.tmpdir(), 'android-mcp-stdio-'));
+  try {
+    await testMCPServer(dir);
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
 }
 
-testMCPServer();
\ No newline at end of file
+main().catch(error => {
+  console.error('❌ Test failed:', error);
+  process.exit(1);
+});